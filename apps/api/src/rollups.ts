@@ -0,0 +1,33 @@
+import { db } from './db'
+
+// Weekly/monthly rollups (sql/006_rollups.sql). A range [start, end) is answered from
+// the whole buckets in the rollup table plus the daily rows of the partial buckets at
+// either edge, so results equal a date_trunc over the base table at a fraction of the rows.
+// services/chat/data_access.py copies bucketBounds/edgeRows and the metrics route queries
+// for the chat tools' direct reads: change both sides together (services/chat/tests/test_data_access.py).
+export type Grain = 'week' | 'month'
+
+// the coarsest rollup that can serve a groupby; day stays on the base tables
+export function rollupGrain(groupby: string): Grain | null {
+  return (groupby === 'week' || groupby === 'month') ? groupby : null
+}
+
+// CTE body "b": s/e = requested range, fs/fe = first and end of the whole buckets inside it.
+// $1/$2 are the range; grain is sanitized by the caller (can't parametrize a keyword)
+export function bucketBounds(grain: Grain) {
+  return `select $1::date as s, $2::date as e,
+                 date_trunc('${grain}', $1::date + interval '1 ${grain}' - interval '1 day')::date as fs,
+                 date_trunc('${grain}', $2::date)::date as fe`
+}
+
+// daily rows of the partial edge buckets, for a base table joined to "b"
+export function edgeRows(alias: string) {
+  return `((${alias}.ts >= b.s and ${alias}.ts < least(b.fs, b.e)) or (${alias}.ts >= greatest(b.fe, b.fs) and ${alias}.ts < b.e))`
+}
+
+// recompute every rollup bucket overlapping [from, to] after a load into the base table
+export async function refreshRollups(table: 'well_daily' | 'production_timeseries', from: string, to: string, tenant = 'demo') {
+  const fn = table === 'well_daily' ? 'refresh_well_rollup' : 'refresh_production_rollup'
+  const r = await db.query(`select ${fn}($1, $2::date, $3::date) as buckets`, [tenant, from, to])
+  return r.rows[0]?.buckets ?? 0
+}
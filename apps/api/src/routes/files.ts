@@ -118,6 +118,7 @@ export async function routes(app: FastifyInstance) {
           body: JSON.stringify({
             file_id,
             s3_signed_url: signedGet,
+            s3_key: fileRecord.s3_key,  // queued jobs outlive the signed URL; ingest re-signs from the API
             filename: fileRecord.filename,
             checksum,
             mime_type: fileRecord.mime_type
@@ -1,5 +1,6 @@
 import { FastifyInstance } from 'fastify'
 import { db } from '../db'
+import { refreshRollups } from '../rollups'
 import { S3Client, GetObjectCommand } from '@aws-sdk/client-s3'
 import { getSignedUrl } from '@aws-sdk/s3-request-presigner'
 import { parse } from 'csv-parse/sync'
@@ -29,13 +30,16 @@ export async function routes(app: FastifyInstance) {
     // DATEPRD, WELL_BORE_CODE, BLOCK, ON_STREAM_HRS, AVG_DOWNHOLE_PRESSURE, AVG_DP_TUBING,
     // AVG_WHP_P, AVG_WHT_P, DP_CHOKE_SIZE, BORE_OIL_VOL, BORE_GAS_VOL, BORE_WAT_VOL, BORE_WI_VOL, FLOW_KIND
     const BATCH = 1000
+    let minTs = '', maxTs = ''
     for (let i = 0; i < records.length; i += BATCH) {
       const chunk = records.slice(i, i + BATCH)
       const values: any[] = []
       const placeholders = chunk.map((r: any, idx: number) => {
-        const d = new Date(r.DATEPRD)
+        const ts = new Date(r.DATEPRD).toISOString().slice(0,10)
+        if (!minTs || ts < minTs) minTs = ts
+        if (!maxTs || ts > maxTs) maxTs = ts
         values.push(
-          d.toISOString().slice(0,10),
+          ts,
           r.WELL_BORE_CODE || '',
           r.BLOCK || '',
           num(r.ON_STREAM_HRS),
@@ -59,7 +63,14 @@ export async function routes(app: FastifyInstance) {
          values ${placeholders}`, values)
     }
 
-    return { ok: true, rows: records.length }
+    // recompute only the weekly/monthly rollup buckets this file touched
+    const rollup_buckets = minTs ? await refreshRollups('well_daily', minTs, maxTs) : 0
+
+    // cached production tool results in the chat service now miss these rows
+    fetch(`http://127.0.0.1:${process.env.CHAT_PORT || 8000}/cache/invalidate`, { method: 'POST' })
+      .catch(err => console.log('Chat cache invalidation failed:', err.message))
+
+    return { ok: true, rows: records.length, rollup_buckets }
   })
 
   function num(x: any) { const v = Number(x); return Number.isFinite(v) ? v : null }
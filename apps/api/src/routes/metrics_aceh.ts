@@ -1,5 +1,6 @@
 import { FastifyInstance } from 'fastify'
 import { db } from '../db'
+import { bucketBounds, edgeRows, rollupGrain } from '../rollups'
 
 function gb(s?: string) { return (s==='day'||s==='week'||s==='month') ? s : 'month' }
 
@@ -12,11 +13,25 @@ export async function routes(app: FastifyInstance) {
     const end   = (q.end   || new Date().toISOString().slice(0,10))
     const block = q.block || null
     const well  = q.well  || null
-    const precision = groupby
+    const grain = rollupGrain(groupby)
+    // mirrored in services/chat/data_access.py (aceh_sql/production_sql); keep the two in step
 
-    const sql = `
+    const sql = grain ? `
+      with b as (${bucketBounds(grain)}),
+      d as (
+        select r.bucket, r.oil, r.gas, r.water
+        from b join well_rollup r on r.tenant_id='demo' and r.grain='${grain}' and r.bucket >= b.fs and r.bucket < b.fe
+        where ($3::text is null or r.block = $3) and ($4::text is null or r.well_bore_code = $4)
+        union all
+        select date_trunc('${grain}', w.ts)::date, w.bore_oil_vol, w.bore_gas_vol, w.bore_wat_vol
+        from b join well_daily w on w.tenant_id='demo' and ${edgeRows('w')}
+        where ($3::text is null or w.block = $3) and ($4::text is null or w.well_bore_code = $4)
+      )
+      select to_char(bucket, 'YYYY-MM-DD') as ts, sum(oil)::float8 as oil, sum(gas)::float8 as gas, sum(water)::float8 as water
+      from d group by bucket order by bucket
+    ` : `
       with d as (
-        select date_trunc('${precision}', ts::timestamp) as bucket,
+        select ts as bucket,
                sum(bore_oil_vol) as oil,
                sum(bore_gas_vol) as gas,
                sum(bore_wat_vol) as water
@@ -28,7 +43,7 @@ export async function routes(app: FastifyInstance) {
         group by 1
         order by 1
       )
-      select bucket::date as ts, oil::float8, gas::float8, water::float8 from d
+      select to_char(bucket, 'YYYY-MM-DD') as ts, oil::float8, gas::float8, water::float8 from d
     `
     const r = await db.query(sql, [start, end, block, well])
     return {
@@ -44,14 +59,22 @@ export async function routes(app: FastifyInstance) {
   app.get('/api/metrics/aceh/top-wells', async (req) => {
     const q = req.query as any
     const metric = (q.metric==='gas'?'bore_gas_vol': q.metric==='water'?'bore_wat_vol':'bore_oil_vol')
+    const col = (q.metric==='gas'?'gas': q.metric==='water'?'water':'oil')  // same measure in well_rollup
     const start = (q.start || '2007-01-01')
     const end   = (q.end   || new Date().toISOString().slice(0,10))
     const limit = Math.min(Number(q.limit||10), 50)
+    // whole months from the monthly rollup, partial edge months from the daily rows
     const r = await db.query(`
-      select well_bore_code as well, block,
-             sum(${metric})::float8 as value
-      from well_daily
-      where ts >= $1::date and ts < $2::date and tenant_id='demo'
+      with b as (${bucketBounds('month')}),
+      d as (
+        select r.well_bore_code as well, r.block, r.${col} as value
+        from b join well_rollup r on r.tenant_id='demo' and r.grain='month' and r.bucket >= b.fs and r.bucket < b.fe
+        union all
+        select w.well_bore_code, w.block, w.${metric}
+        from b join well_daily w on w.tenant_id='demo' and ${edgeRows('w')}
+      )
+      select well, block, coalesce(sum(value), 0)::float8 as value
+      from d
       group by 1,2
       order by value desc
       limit $3
@@ -61,22 +84,29 @@ export async function routes(app: FastifyInstance) {
 
   // GET /api/metrics/map → blocks+wells with aggregated totals for choropleth / bubbles
   app.get('/api/metrics/map', async () => {
+    // all-time totals: the monthly rollup covers every daily row
     const blocks = await db.query(`
       select b.name, b.props, b.geom,
-             coalesce(sum(w.bore_oil_vol),0)::float8 as oil,
-             coalesce(sum(w.bore_gas_vol),0)::float8 as gas,
-             coalesce(sum(w.bore_wat_vol),0)::float8 as water
+             coalesce(w.oil,0)::float8 as oil,
+             coalesce(w.gas,0)::float8 as gas,
+             coalesce(w.water,0)::float8 as water
       from geo_blocks b
-      left join well_daily w on w.block = b.name and w.tenant_id='demo'
-      group by b.name, b.props, b.geom
+      left join (
+        select block, sum(oil) as oil, sum(gas) as gas, sum(water) as water
+        from well_rollup where tenant_id='demo' and grain='month'
+        group by block
+      ) w on w.block = b.name
     `)
     const wells = await db.query(`
       select g.name, g.block, g.props, g.geom,
-             coalesce(sum(w.bore_oil_vol),0)::float8 as oil,
-             coalesce(sum(w.bore_gas_vol),0)::float8 as gas
+             coalesce(w.oil,0)::float8 as oil,
+             coalesce(w.gas,0)::float8 as gas
       from geo_wells g
-      left join well_daily w on w.well_bore_code = g.name and w.tenant_id='demo'
-      group by g.name, g.block, g.props, g.geom
+      left join (
+        select well_bore_code, sum(oil) as oil, sum(gas) as gas
+        from well_rollup where tenant_id='demo' and grain='month'
+        group by well_bore_code
+      ) w on w.well_bore_code = g.name
     `)
     return { blocks: blocks.rows, wells: wells.rows }
   })
@@ -1,5 +1,6 @@
 import { FastifyInstance } from 'fastify'
 import { db } from '../db'
+import { bucketBounds, edgeRows, rollupGrain } from '../rollups'
 
 function sanitizeGroupBy(g: string | undefined) {
   return (g === 'day' || g === 'week' || g === 'month') ? g : 'month'
@@ -14,17 +15,30 @@ export async function routes(app: FastifyInstance) {
     const end   = (q.end && String(q.end)) || new Date().toISOString().slice(0,10)
 
     // Build safe SQL for date_trunc precision (can't parametrize keyword)
-    const precision = groupby // already sanitized
-    const sql = `
+    const grain = rollupGrain(groupby) // already sanitized
+    // mirrored in services/chat/data_access.py (aceh_sql/production_sql); keep the two in step
+    // averages combine as sum/count across rollup buckets and partial edge days
+    const sql = grain ? `
+      with b as (${bucketBounds(grain)}),
+      g as (
+        select r.bucket, r.oil_sum, r.gas_sum, r.n
+        from b join production_rollup r on r.tenant_id='demo' and r.grain='${grain}' and r.bucket >= b.fs and r.bucket < b.fe
+        union all
+        select date_trunc('${grain}', p.ts)::date, p.oil_bopd, p.gas_mmscfd, 1
+        from b join production_timeseries p on p.tenant_id='demo' and ${edgeRows('p')}
+      )
+      select to_char(bucket, 'YYYY-MM-DD') as ts, (sum(oil_sum)/sum(n))::float8 as oil, (sum(gas_sum)/sum(n))::float8 as gas
+      from g group by bucket order by bucket
+    ` : `
       with g as (
-        select date_trunc('${precision}', ts::timestamp) as bucket,
+        select ts as bucket,
                avg(oil_bopd) as oil, avg(gas_mmscfd) as gas
         from production_timeseries
         where ts >= $1::date and ts < $2::date and tenant_id='demo'
         group by 1
         order by 1
       )
-      select bucket::date as ts, oil::float8, gas::float8 from g
+      select to_char(bucket, 'YYYY-MM-DD') as ts, oil::float8, gas::float8 from g
     `
     const r = await db.query(sql, [start, end])
 
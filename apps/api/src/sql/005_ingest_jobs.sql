@@ -0,0 +1,35 @@
+-- Durable ingest job queue (claimed by services/ingest workers with FOR UPDATE SKIP LOCKED)
+create table if not exists ingest_jobs (
+  id uuid primary key default gen_random_uuid(),
+  file_id uuid not null references files(id) on delete cascade,
+  tenant_id text not null default 'demo',
+  checksum text,
+  payload jsonb not null,                 -- the /ingest/file request body, minus the expiring signed URL
+  status text not null default 'queued',  -- queued | running | done | failed
+  stage text,                             -- current pipeline stage (download, extract, cleanup, chunk, embed, store)
+  progress jsonb not null default '{}'::jsonb,
+  attempts int not null default 0,
+  max_attempts int not null default 3,
+  error text,
+  result jsonb,
+  locked_by text,
+  locked_at timestamptz,
+  run_after timestamptz not null default now(),
+  created_at timestamptz default now(),
+  started_at timestamptz,
+  finished_at timestamptz,
+  updated_at timestamptz default now()
+);
+
+alter table ingest_jobs drop constraint if exists ingest_jobs_status_check;
+alter table ingest_jobs add constraint ingest_jobs_status_check
+  check (status in ('queued', 'running', 'done', 'failed'));
+
+-- claim order for idle workers
+create index if not exists idx_ingest_jobs_claim on ingest_jobs(run_after, created_at) where status = 'queued';
+create index if not exists idx_ingest_jobs_file on ingest_jobs(file_id, created_at desc);
+
+-- at most one live job per file version; re-enqueueing returns the existing one
+create unique index if not exists ux_ingest_jobs_live
+on ingest_jobs(file_id, coalesce(checksum, ''))
+where status in ('queued', 'running');
@@ -0,0 +1,96 @@
+-- Weekly/monthly rollups of well_daily and production_timeseries for the metrics routes.
+-- Plain tables (not materialized views) so a data load refreshes only the buckets it
+-- touched: refresh_*_rollup(tenant, from, to) recomputes every week and month bucket
+-- overlapping [from, to] from the base rows.
+
+-- per well (and its block) per bucket; block and field totals are sums over these rows
+create table if not exists well_rollup (
+  tenant_id text not null,
+  grain text not null check (grain in ('week', 'month')),
+  bucket date not null,
+  well_bore_code text not null,
+  block text not null,
+  oil double precision not null default 0,
+  gas double precision not null default 0,
+  water double precision not null default 0,
+  days int not null,
+  primary key (tenant_id, grain, well_bore_code, bucket)
+);
+-- field-wide and per-block series, index-only
+create index if not exists idx_well_rollup_bucket on well_rollup(tenant_id, grain, bucket) include (oil, gas, water);
+create index if not exists idx_well_rollup_block on well_rollup(tenant_id, grain, block, bucket) include (oil, gas, water);
+
+-- averages are kept as sum + count so partial buckets can be combined exactly
+create table if not exists production_rollup (
+  tenant_id text not null,
+  grain text not null check (grain in ('week', 'month')),
+  bucket date not null,
+  oil_sum double precision not null,
+  gas_sum double precision not null,
+  n int not null,
+  primary key (tenant_id, grain, bucket)
+);
+
+-- composite covering indexes for day grain and for the partial buckets at range edges
+create index if not exists idx_well_daily_tenant_ts on well_daily(tenant_id, ts)
+  include (block, well_bore_code, bore_oil_vol, bore_gas_vol, bore_wat_vol);
+create index if not exists idx_well_daily_tenant_well_ts on well_daily(tenant_id, well_bore_code, ts)
+  include (bore_oil_vol, bore_gas_vol, bore_wat_vol);
+create index if not exists idx_well_daily_tenant_block_ts on well_daily(tenant_id, block, ts)
+  include (bore_oil_vol, bore_gas_vol, bore_wat_vol);
+create index if not exists idx_production_timeseries_tenant_ts on production_timeseries(tenant_id, ts)
+  include (oil_bopd, gas_mmscfd);
+
+create or replace function refresh_well_rollup(p_tenant text, p_from date, p_to date) returns int
+language plpgsql as $$
+declare
+  g text;
+  lo date;
+  hi date;
+  n int := 0;
+  c int;
+begin
+  foreach g in array array['week', 'month'] loop
+    lo := date_trunc(g, p_from)::date;
+    hi := (date_trunc(g, p_to) + ('1 ' || g)::interval)::date;
+    delete from well_rollup where tenant_id = p_tenant and grain = g and bucket >= lo and bucket < hi;
+    insert into well_rollup(tenant_id, grain, bucket, well_bore_code, block, oil, gas, water, days)
+    select p_tenant, g, date_trunc(g, ts)::date, well_bore_code, max(block),
+           coalesce(sum(bore_oil_vol), 0), coalesce(sum(bore_gas_vol), 0), coalesce(sum(bore_wat_vol), 0),
+           count(*)
+    from well_daily
+    where tenant_id = p_tenant and ts >= lo and ts < hi
+    group by 3, 4;
+    get diagnostics c = row_count;
+    n := n + c;
+  end loop;
+  return n;
+end$$;
+
+create or replace function refresh_production_rollup(p_tenant text, p_from date, p_to date) returns int
+language plpgsql as $$
+declare
+  g text;
+  lo date;
+  hi date;
+  n int := 0;
+  c int;
+begin
+  foreach g in array array['week', 'month'] loop
+    lo := date_trunc(g, p_from)::date;
+    hi := (date_trunc(g, p_to) + ('1 ' || g)::interval)::date;
+    delete from production_rollup where tenant_id = p_tenant and grain = g and bucket >= lo and bucket < hi;
+    insert into production_rollup(tenant_id, grain, bucket, oil_sum, gas_sum, n)
+    select p_tenant, g, date_trunc(g, ts)::date, sum(oil_bopd), sum(gas_mmscfd), count(*)
+    from production_timeseries
+    where tenant_id = p_tenant and ts >= lo and ts < hi
+    group by 3;
+    get diagnostics c = row_count;
+    n := n + c;
+  end loop;
+  return n;
+end$$;
+
+-- initial fill (re-running this file rebuilds the rollups from the base tables)
+select refresh_well_rollup(tenant_id, min(ts), max(ts)) from well_daily group by tenant_id;
+select refresh_production_rollup(tenant_id, min(ts), max(ts)) from production_timeseries group by tenant_id;
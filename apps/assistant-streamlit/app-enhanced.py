@@ -8,6 +8,7 @@ Features:
 """
 
 import os
+import re
 import json
 import asyncio
 import websockets
@@ -125,12 +126,20 @@ st.markdown("""
 
 @st.cache_data(ttl=10)
 def check_service_health(url: str, service_name: str) -> dict:
-    """Quick health check with proper error handling"""
+    """Quick health check with proper error handling.
+
+    ``url`` is a service's ``/health/ready`` endpoint, which answers from cached
+    background probes (503 while a required dependency is down) and never
+    runs a generation, so polling it is free."""
     try:
         with httpx.Client(timeout=2) as client:
             response = client.get(f"{url}")
             if response.status_code == 200:
                 return {"status": "connected", "data": response.json()}
+            elif response.status_code == 503:
+                data = response.json()
+                down = [name for name, check in data.get("checks", {}).items() if not check.get("ok")]
+                return {"status": "warning", "error": f"not ready: {', '.join(down)}", "data": data}
             else:
                 return {"status": "warning", "error": f"HTTP {response.status_code}"}
     except httpx.ConnectError:
@@ -197,6 +206,22 @@ def add_message(role: str, content: str, metadata: Optional[Dict[str, Any]] = No
     }
     st.session_state.messages.append(message)
 
+def split_paragraphs(text: str) -> List[str]:
+    """Blank-line separated blocks, split the same way as services/agno/patches.py"""
+    return [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+def apply_answer_patch(text: str, patch: Dict[str, Any]) -> str:
+    """One ``answer_patch`` op (replace / insert / delete by paragraph index) applied to ``text``"""
+    paragraphs = split_paragraphs(text)
+    index = patch.get("index", 0)
+    if patch.get("op") == "replace" and index < len(paragraphs):
+        paragraphs[index] = patch["text"]
+    elif patch.get("op") == "insert":
+        paragraphs.insert(index, patch["text"])
+    elif patch.get("op") == "delete":
+        del paragraphs[index:index + patch.get("count", 1)]
+    return "\n\n".join(paragraphs)
+
 # ============================================================================
 # WebSocket Message Handling
 # ============================================================================
@@ -248,6 +273,13 @@ async def handle_websocket_message(message_data: Dict[str, Any]):
         add_message("assistant", payload, {"type": msg_type})
         st.session_state.is_streaming = False
     
+    elif msg_type == "answer_patch":
+        # Streamed revision: edit the latest assistant answer in place
+        for message in reversed(st.session_state.messages):
+            if message["role"] == "assistant":
+                message["content"] = apply_answer_patch(message["content"], payload)
+                break
+    
     elif msg_type == "result":
         # Document search results
         objects = payload.get("objects", []) if isinstance(payload, dict) else []
@@ -290,6 +322,8 @@ async def send_message_to_ws(query: str, mode: str = "enhanced"):
         st.session_state.search_results = []
         st.session_state.current_response = ""
         st.session_state.is_streaming = False
+        if hasattr(st.session_state, 'revised_answer'):
+            delattr(st.session_state, 'revised_answer')
         
         # Connect to WebSocket
         uri = CHAT_WS_URL.replace("http://", "ws://").replace("https://", "wss://")
@@ -323,6 +357,7 @@ async def send_message_to_ws(query: str, mode: str = "enhanced"):
                     logger.info(f"📤 Sent ({mode}): {query}")
                     
                     # Listen for responses with true streaming
+                    answer = ""  # the text shown so far; answer_patch ops apply to it
                     try:
                         async for response in websocket:
                             data = json.loads(response)
@@ -339,6 +374,9 @@ async def send_message_to_ws(query: str, mode: str = "enhanced"):
                                     "status": status,
                                     "timestamp": datetime.now().strftime("%H:%M:%S")
                                 })
+                                if stage == "done":
+                                    # the turn is over, including any evaluation after the answer
+                                    break
                             
                             # Handle search results with filenames
                             elif msg_type == "result":
@@ -353,17 +391,22 @@ async def send_message_to_ws(query: str, mode: str = "enhanced"):
                             # Handle streaming chunks - yield for real-time display
                             elif msg_type == "stream_chunk":
                                 # Real-time streaming: yield each token immediately
+                                answer += payload
                                 yield payload
                             
                             # Handle direct answers (for simple modes)
-                            elif msg_type in ["answer", "answer_enhanced"]:
+                            elif msg_type == "answer" and not answer:
                                 # For non-streaming responses, yield the complete text
+                                answer = payload
                                 yield payload
-                                break
                             
-                            # Handle stream end
-                            elif msg_type == "stream_end":
-                                break
+                            # Revisions arrive after the answer: as paragraph patches while the
+                            # evaluation streams, or as the whole text from the blocking fallback
+                            elif msg_type == "answer_patch":
+                                revised = getattr(st.session_state, "revised_answer", answer)
+                                st.session_state.revised_answer = apply_answer_patch(revised, payload)
+                            elif msg_type == "answer_enhanced":
+                                st.session_state.revised_answer = payload
                             
                             # Handle visualizations and tables
                             elif msg_type == "viz":
@@ -476,7 +519,7 @@ def render_service_status():
     
     # Chat service status
     chat_url = CHAT_WS_URL.replace("ws://", "http://").replace("/ws", "")
-    chat_status = check_service_health(f"{chat_url}/health", "Chat Service")
+    chat_status = check_service_health(f"{chat_url}/health/ready", "Chat Service")
     
     st.markdown(
         f"{get_status_html(chat_status['status'])} **Chat Service:** {chat_status['status'].title()}", 
@@ -486,9 +529,11 @@ def render_service_status():
     if chat_status['status'] == 'connected' and 'data' in chat_status:
         data = chat_status['data']
         st.caption(f"Models: {data.get('models', {}).get('generation', 'unknown')}")
+    elif chat_status.get('error'):
+        st.caption(chat_status['error'])
     
     # Agno service status
-    agno_status = check_service_health(AGNO_URL, "Agno Service")
+    agno_status = check_service_health(f"{AGNO_URL}/health/ready", "Agno Service")
     st.markdown(
         f"{get_status_html(agno_status['status'])} **Agno Service:** {agno_status['status'].title()}", 
         unsafe_allow_html=True
@@ -497,6 +542,8 @@ def render_service_status():
     if agno_status['status'] == 'connected' and 'data' in agno_status:
         data = agno_status['data']
         st.caption(f"Agents: {len(data.get('agents', []))} available")
+    elif agno_status.get('error'):
+        st.caption(agno_status['error'])
     
     # WebSocket connection status
     ws_status = "connected" if st.session_state.get("ws_connected", False) else "disconnected"
@@ -707,6 +754,13 @@ def main():
             # Use st.write_stream for real-time streaming
             response_text = st.write_stream(generator_func())
             
+            # An evaluation that revised the answer replaces it in the history
+            if hasattr(st.session_state, 'revised_answer'):
+                response_text = st.session_state.revised_answer
+                delattr(st.session_state, 'revised_answer')
+                st.caption("✏️ Revised after evaluation")
+                st.markdown(response_text)
+            
             # Add the complete response to history
             add_message("assistant", response_text)
             
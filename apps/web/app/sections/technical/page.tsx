@@ -1,5 +1,5 @@
 'use client'
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 
 const PARSERS = process.env.NEXT_PUBLIC_PARSERS_BASE || 'http://127.0.0.1:9010'
 
@@ -7,11 +7,53 @@ export default function Technical(){
   const [lasUrl,setLasUrl]=useState<string>('')
   const [segyUrl,setSegyUrl]=useState<string>('')
   const [las,setLas]=useState<any|null>(null)
+  const [seis,setSeis]=useState<any|null>(null)
+  const [wellList,setWellList]=useState<string>('')
+  const [corrCurve,setCorrCurve]=useState<string>('GR')
+  const [corr,setCorr]=useState<any|null>(null)
+  const [level,setLevel]=useState(0)
+  const [view,setView]=useState({left:0,top:0,width:800,height:400})
+  const viewport=useRef<HTMLDivElement>(null)
+
+  async function loadTiles(){
+    if(!segyUrl) return
+    const r = await fetch(`${PARSERS}/segy/tiles/meta?url=${encodeURIComponent(segyUrl)}`)
+    if(!r.ok) return
+    const meta = await r.json()
+    // start at the coarsest level that still fills the viewport width
+    const w = viewport.current?.clientWidth || 800
+    let z = meta.levels.length-1
+    while(z>0 && meta.levels[z][0] < w) z--
+    setSeis(meta); setLevel(z)
+  }
+
+  // every well in one request, read from the parsers' columnar store
+  async function loadCorrelation(){
+    if(!wellList.trim()) return
+    const q = new URLSearchParams({wells:wellList, curves:corrCurve, points:'400'})
+    const r = await fetch(`${PARSERS}/wells/logs?${q}`)
+    if(r.ok) setCorr(await r.json())
+  }
+
+  function onScroll(){
+    const el=viewport.current
+    if(el) setView({left:el.scrollLeft,top:el.scrollTop,width:el.clientWidth,height:el.clientHeight})
+  }
+
+  // only the tiles inside the viewport (plus one ring) are requested; the browser caches the rest
+  const tiles:{x:number,y:number,src:string}[]=[]
+  if(seis){
+    const t=seis.tile, [nx,ny]=seis.tiles[level]
+    for(let x=Math.max(0,Math.floor(view.left/t)-1); x<Math.min(nx,Math.ceil((view.left+view.width)/t)+1); x++)
+      for(let y=Math.max(0,Math.floor(view.top/t)-1); y<Math.min(ny,Math.ceil((view.top+view.height)/t)+1); y++)
+        tiles.push({x,y,src:PARSERS+seis.url.replace('{level}',String(level)).replace('{tx}',String(x)).replace('{ty}',String(y))})
+  }
 
   useEffect(()=>{
     (async()=>{
       if(!lasUrl) return
-      const r = await fetch(`${PARSERS}/las/curve-json?url=${encodeURIComponent(lasUrl)}`)
+      // ask for as many points as the sparkline is wide; the parser decimates server-side (LTTB)
+      const r = await fetch(`${PARSERS}/las/curves?url=${encodeURIComponent(lasUrl)}&points=280`)
       if(r.ok) setLas(await r.json())
     })()
   },[lasUrl])
@@ -32,16 +74,16 @@ export default function Technical(){
           <div className="mt-3">
             <div className="text-sm text-gray-500">Curves: {las.curves.join(', ')}</div>
             <div className="grid grid-cols-3 gap-4 mt-3">
-              {Object.entries(las.sampled).map(([k,v]:any)=>(
+              {Object.entries(las.series).map(([k,s]:any)=>(
                 <div key={k} className="border rounded p-2">
-                  <div className="text-xs text-gray-500">{k}</div>
+                  <div className="text-xs text-gray-500">{k}{s.unit ? ` (${s.unit})` : ''}</div>
                   <svg width="280" height="120">
                     {/* super light-weight polyline (normalize) */}
                     {(()=>{
-                      const arr=v as number[]
-                      const max=Math.max(...arr.filter(Number.isFinite)), min=Math.min(...arr.filter(Number.isFinite))
+                      const arr=(s.values as (number|null)[]).filter((y):y is number=>Number.isFinite(y))
+                      const max=Math.max(...arr), min=Math.min(...arr)
                       const scale=(x:number)=> (max===min?60: (110 - (x-min)/(max-min)*100))
-                      const pts=arr.slice(0,200).map((y,i)=>`${i*1.4},${scale(y)}`).join(' ')
+                      const pts=arr.map((y,i)=>`${(i*280/Math.max(1,arr.length-1)).toFixed(1)},${scale(y)}`).join(' ')
                       return <polyline points={pts} stroke="currentColor" fill="none" strokeWidth="1"/>
                     })()}
                   </svg>
@@ -52,15 +94,70 @@ export default function Technical(){
         )}
       </div>
 
+      {/* Well correlation */}
+      <div className="border rounded p-4 mb-6">
+        <div className="font-medium mb-2">Well Correlation</div>
+        <div className="flex gap-2">
+          <input value={wellList} onChange={e=>setWellList(e.target.value)} className="border p-2 rounded flex-1"
+                 placeholder="Wells, comma separated (e.g. ACEH-01, ACEH-02)"/>
+          <input value={corrCurve} onChange={e=>setCorrCurve(e.target.value)} className="border p-2 rounded w-24" placeholder="Curve"/>
+          <button onClick={loadCorrelation} className="px-3 py-2 border rounded">Load</button>
+        </div>
+        {corr && (
+          <div className="mt-3">
+            {corr.missing.length>0 && <div className="text-xs text-red-500">Not loaded: {corr.missing.join(', ')}</div>}
+            <div className="flex gap-3 overflow-x-auto mt-2">
+              {(()=>{
+                // one depth scale for every track so formations line up across wells
+                const all=corr.wells.flatMap((w:any)=>w.depth as number[])
+                const dmin=Math.min(...all), dmax=Math.max(...all)
+                return corr.wells.map((w:any)=>{
+                  const vals=(w.curves[corrCurve]||[]) as (number|null)[]
+                  const fin=vals.filter((v):v is number=>Number.isFinite(v))
+                  const vmin=Math.min(...fin), vmax=Math.max(...fin)
+                  const pts=vals.map((v,i)=>v==null?null:
+                    `${(4+(vmax===vmin?0.5:(v-vmin)/(vmax-vmin))*92).toFixed(1)},${((w.depth[i]-dmin)/Math.max(1e-9,dmax-dmin)*390+5).toFixed(1)}`)
+                    .filter(Boolean).join(' ')
+                  return (
+                    <div key={w.key} className="border rounded p-1 shrink-0">
+                      <div className="text-xs text-gray-500 text-center">{w.well}</div>
+                      <svg width="100" height="400"><polyline points={pts} stroke="currentColor" fill="none" strokeWidth="1"/></svg>
+                    </div>
+                  )
+                })
+              })()}
+            </div>
+          </div>
+        )}
+      </div>
+
       {/* SEG-Y quicklook */}
       <div className="border rounded p-4">
         <div className="font-medium mb-2">SEG-Y Quicklook</div>
         <div className="flex gap-2">
           <input value={segyUrl} onChange={e=>setSegyUrl(e.target.value)} className="border p-2 rounded flex-1"
                  placeholder="Paste signed URL to a SEG-Y file"/>
+          <button onClick={loadTiles} disabled={!segyUrl} className="px-3 py-2 border rounded disabled:opacity-50">Load</button>
           <a className={`px-3 py-2 border rounded ${!segyUrl?'pointer-events-none opacity-50':''}`}
              href={`${PARSERS}/segy/quicklook.png?url=${encodeURIComponent(segyUrl)}`} target="_blank">Open PNG</a>
         </div>
+        {seis && (
+          <div className="mt-3">
+            <div className="flex items-center gap-2 text-sm text-gray-500 mb-2">
+              <span>{seis.traces} traces × {seis.samples} samples · level {level} (1:{2**level})</span>
+              <button onClick={()=>setLevel(Math.max(0,level-1))} disabled={level===0} className="px-2 border rounded disabled:opacity-50">+</button>
+              <button onClick={()=>setLevel(Math.min(seis.levels.length-1,level+1))} disabled={level===seis.levels.length-1} className="px-2 border rounded disabled:opacity-50">−</button>
+            </div>
+            <div ref={viewport} onScroll={onScroll} className="relative overflow-auto border bg-gray-100" style={{height:400}}>
+              <div className="relative" style={{width:seis.levels[level][0],height:seis.levels[level][1]}}>
+                {tiles.map(t=>(
+                  <img key={`${level}-${t.x}-${t.y}`} src={t.src} alt="" draggable={false}
+                       className="absolute" style={{left:t.x*seis.tile,top:t.y*seis.tile,imageRendering:'pixelated'}}/>
+                ))}
+              </div>
+            </div>
+          </div>
+        )}
       </div>
     </div>
   )
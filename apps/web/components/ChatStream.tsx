@@ -3,6 +3,8 @@ import { useEffect, useMemo, useRef, useState } from 'react'
 import { useSearchParams } from 'next/navigation'
 import PlotCard from './PlotCard'
 import TableCard from './TableCard'
+import { AnswerPatch, applyAnswerPatch } from '@/lib/answerPatch'
+import { vizPoints } from '@/lib/vizDecode'
 
 const WS = process.env.NEXT_PUBLIC_CHAT_WS || 'ws://127.0.0.1:8000/ws'
 
@@ -17,6 +19,10 @@ type Frame =
   | { type:'result', payload:{ objects: Chunk[] } }
   | { type:'answer', payload:string }
   | { type:'answer_enhanced', payload:string }
+  | { type:'answer_patch', payload:AnswerPatch }
+  | { type:'stream_start', payload:{} }
+  | { type:'stream_chunk', payload:string }
+  | { type:'stream_end', payload:{} }
   | { type:'viz', payload:any }
   | { type:'table', payload:{columns:string[], rows:any[]} }
   | { type:'heartbeat' }
@@ -25,6 +31,15 @@ type Frame =
   | { type:'agno_enhancement', payload:{ original:string, enhanced:string, confidence:number, reasoning:string } }
   | { type:'agno_evaluation', payload:{ improvements_made:boolean, confidence:number, reasoning:string, suggestions:string[] } }
 
+// index of the current turn's answer frame (after the latest user frame), or -1
+function turnAnswer(frames: Frame[]): number {
+  for (let i = frames.length - 1; i >= 0; i -= 1) {
+    if (frames[i].type === 'user') return -1
+    if (frames[i].type === 'answer') return i
+  }
+  return -1
+}
+
 export default function ChatStream(){
   const [frames,setFrames]=useState<Frame[]>([])
   const [input,setInput]=useState('')
@@ -145,6 +160,26 @@ export default function ChatStream(){
         setProcessingStage(msg.payload)
         return
       }
+
+      // streamed answers become one answer frame, built up chunk by chunk
+      if(msg.type === 'stream_start') {
+        setFrames(f=>[...f, { type:'answer', payload:'' }])
+        return
+      }
+      if(msg.type === 'stream_end') return
+
+      // chunks and evaluator revisions edit this turn's answer in place; with none, they're dropped
+      if(msg.type === 'stream_chunk' || msg.type === 'answer_patch') {
+        setFrames(f=>{
+          const i = turnAnswer(f)
+          if(i < 0) return f
+          const text = (f[i] as Extract<Frame, { type:'answer' }>).payload
+          const next = [...f]
+          next[i] = { type:'answer', payload: msg.type === 'stream_chunk' ? text + msg.payload : applyAnswerPatch(text, msg.payload) }
+          return next
+        })
+        return
+      }
       
       setFrames(f=>[...f,msg])
     }
@@ -167,7 +202,8 @@ export default function ChatStream(){
       return
     }
     
-    wsRef.current.send(JSON.stringify({ user_id:'demo', conversation_id:'conv-1', query: input, file_id: fileId }))
+    wsRef.current.send(JSON.stringify({ user_id:'demo', conversation_id:'conv-1', query: input, file_id: fileId,
+                                      viz_points: vizPoints(), viz_encoding: 'compact' }))
     setFrames(f=>[...f, {type:'user', payload:input} as any])
     setInput('')
   }
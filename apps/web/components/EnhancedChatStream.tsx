@@ -4,6 +4,8 @@ import { useEffect, useMemo, useRef, useState } from 'react'
 import { useSearchParams } from 'next/navigation'
 import PlotCard from './PlotCard'
 import TableCard from './TableCard'
+import { applyAnswerPatch } from '@/lib/answerPatch'
+import { vizPoints } from '@/lib/vizDecode'
 
 // Simple chevron icons as inline SVGs
 const ChevronDownIcon = ({ className }: { className?: string }) => (
@@ -368,6 +370,18 @@ export default function EnhancedChatStream() {
                 break
               }
 
+              case 'answer_patch': {
+                // evaluator revision: edit the answer in place, paragraph by paragraph
+                const responseMsg = currentBubbleState.response ? 
+                  newMessages.find(m => m.id === currentBubbleState.response) : 
+                  newMessages.filter(m => m.type === 'assistant').pop()
+                if (responseMsg) {
+                  responseMsg.content = applyAnswerPatch(responseMsg.content, msg.payload)
+                  debugLog('🩹 Applied answer patch', msg.payload)
+                }
+                break
+              }
+
               case 'table': {
                 debugLog('📊 Processing table', msg.payload)
                 const responseMsg = currentBubbleState.response ? 
@@ -550,7 +564,9 @@ export default function EnhancedChatStream() {
       user_id: 'demo',
       conversation_id: conversationId,
       query: input.trim(),
-      file_id: fileId
+      file_id: fileId,
+      viz_points: vizPoints(),
+      viz_encoding: 'compact'
     }
     
     debugLog('🚀 Sending WebSocket message', wsMessage)
@@ -1,6 +1,7 @@
 'use client'
 // import Plotly from 'plotly.js-dist-min'
 import { useEffect, useRef } from 'react'
+import { decodeAxis } from '@/lib/vizDecode'
 
 type PlotlyModule = typeof import('plotly.js-dist-min')
 
@@ -12,7 +13,7 @@ export default function PlotCard({ spec }:{ spec:any }){
     const element = ref.current
     if(!element) return
     let isActive = true
-    const traces = (spec.traces||[]).map((t:any)=>({x:t.x, y:t.y, mode:t.mode||'lines', name:t.name}))
+    const traces = (spec.traces||[]).map((t:any)=>({x:decodeAxis(t.x), y:decodeAxis(t.y), mode:t.mode||'lines', name:t.name}))
     const layout = {
       title: spec.title || '',
       xaxis: { title: spec.layout?.xaxis_title || '' },
@@ -0,0 +1,18 @@
+// Paragraph patches sent by the chat service while the evaluator revises an answer.
+// Paragraphs are blank-line separated blocks, split exactly like the agno service does.
+export type AnswerPatch =
+  | { op: 'replace', index: number, text: string }
+  | { op: 'insert', index: number, text: string }
+  | { op: 'delete', index: number, count: number }
+
+export function splitParagraphs(text: string): string[] {
+  return text.split(/\n\s*\n/).map(p => p.trim()).filter(Boolean)
+}
+
+export function applyAnswerPatch(text: string, patch: AnswerPatch): string {
+  const paras = splitParagraphs(text)
+  if (patch.op === 'replace') paras[patch.index] = patch.text
+  else if (patch.op === 'insert') paras.splice(patch.index, 0, patch.text)
+  else paras.splice(patch.index, patch.count)
+  return paras.join('\n\n')
+}
@@ -0,0 +1,41 @@
+// Compact viz traces sent by the chat service when a client asks for viz_encoding 'compact'
+// (services/common/downsample.py): dates as a start day plus day deltas, values as
+// little-endian float32 in base64.
+type DateDelta = { enc: 'date_delta', start: string, d: number[] }
+type Float32B64 = { enc: 'f32', b64: string }
+
+const DAY_MS = 86400000
+
+function decodeDates(x: DateDelta): string[] {
+  let t = Date.parse(`${x.start}T00:00:00Z`)
+  const out = [x.start]
+  for (const step of x.d) {
+    t += step * DAY_MS
+    out.push(new Date(t).toISOString().slice(0, 10))
+  }
+  return out
+}
+
+function decodeF32(y: Float32B64): (number | null)[] {
+  const bin = atob(y.b64)
+  const view = new DataView(new ArrayBuffer(bin.length))
+  for (let i = 0; i < bin.length; i++) view.setUint8(i, bin.charCodeAt(i))
+  const out: (number | null)[] = []
+  for (let i = 0; i < bin.length; i += 4) {
+    const v = view.getFloat32(i, true)
+    out.push(Number.isNaN(v) ? null : v)
+  }
+  return out
+}
+
+export function decodeAxis(v: any): any[] {
+  if (v && v.enc === 'date_delta') return decodeDates(v)
+  if (v && v.enc === 'f32') return decodeF32(v)
+  return v || []
+}
+
+// ~2 points per horizontal pixel: what min/max downsampling needs to keep every peak visible
+export function vizPoints(): number {
+  const width = typeof window === 'undefined' ? 800 : window.innerWidth
+  return Math.round(2 * Math.min(Math.max(width, 320), 1600))
+}
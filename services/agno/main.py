@@ -1,10 +1,21 @@
-import os, json, asyncio, httpx
+import os, json, asyncio, re
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from typing import List, Dict, Any, Optional
 import logging
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.health import HealthMonitor
+from common.llm_router import LLMError, build_router
+from common.response_cache import ResponseCache, cache_key
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from patches import ParagraphPatcher
+from structured import DraftOutput, EvalVerdict, json_schema, parse_json_output
 
 # Load environment variables
 load_dotenv(Path(__file__).resolve().parents[2] / ".env")
@@ -24,6 +35,40 @@ LITELLM_BASE = os.environ["LITELLM_BASE"]
 LITELLM_API_KEY = os.getenv("LITELLM_API_KEY", "sk-local")
 GENERATION_MODEL = os.getenv("RAG_GENERATION_MODEL", "deepseek-r1:14b")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OLLAMA_BASE = os.getenv("OLLAMA_BASE")  # direct Ollama provider, only routed to when set
+
+# LLM_PROVIDERS order, breakers and hedging live in services/common/llm_router.py
+llm = build_router(model=GENERATION_MODEL, litellm_base=LITELLM_BASE, litellm_api_key=LITELLM_API_KEY,
+                   ollama_base=OLLAMA_BASE, openai_api_key=OPENAI_API_KEY)
+
+# Cache for restructure-prompt and simple-response: the chat service sends the same
+# database context with nearly every call, so identical questions repeat verbatim.
+# Entries are served fresh for the TTL, then stale (while one regeneration runs) for
+# AGNO_CACHE_STALE_S more; AGNO_CACHE_PATH adds a sqlite copy that survives restarts.
+response_cache = ResponseCache(
+    ttl_s=float(os.getenv("AGNO_CACHE_TTL_S", 600)),
+    stale_s=float(os.getenv("AGNO_CACHE_STALE_S", 3600)),
+    max_entries=int(os.getenv("AGNO_CACHE_MAX_ENTRIES", 1000)),
+    path=os.getenv("AGNO_CACHE_PATH") or None,
+)
+
+# Completion budget per route (AGNO_MAX_TOKENS_<ROUTE> overrides). Sized to what each
+# route actually returns -- a rewritten prompt is short, a drafted answer is not --
+# instead of 4000 everywhere.
+ROUTE_MAX_TOKENS = {
+    "restructure": 800,
+    "evaluate": 2500,
+    "verdict": 400,
+    "simple": 1500,
+    "draft": 3000,
+    "health": 16,
+}
+
+def max_tokens_for(route: str) -> int:
+    return int(os.getenv(f"AGNO_MAX_TOKENS_{route.upper()}", ROUTE_MAX_TOKENS[route]))
+
+# streaming evaluation: answers scoring at or above this are kept as they are
+REWRITE_THRESHOLD = float(os.getenv("AGNO_REWRITE_THRESHOLD", 0.8))
 
 # Pydantic models
 class PromptRequest(BaseModel):
@@ -38,6 +83,17 @@ class ResponseRequest(BaseModel):
     response_format: Optional[str] = "text"  # text, table, viz, tool
     evaluation_criteria: Optional[List[str]] = ["clarity", "completeness", "relevance"]
 
+class Source(BaseModel):
+    text: str
+    filename: Optional[str] = None
+    page: Optional[int] = None
+
+class DraftRequest(BaseModel):
+    prompt: str
+    sources: List[Source] = []
+    context: Optional[str] = None
+    domain: Optional[str] = "general"
+
 class AgentResponse(BaseModel):
     success: bool
     agent_type: str
@@ -48,73 +104,65 @@ class AgentResponse(BaseModel):
     suggestions: Optional[List[str]] = []
 
 # AI Generation Helper
-async def call_llm(prompt: str, max_retries: int = 2) -> str:
-    """Call LLM with fallback strategy"""
+async def call_llm(prompt: str, max_retries: int = 2, max_tokens: int = 4000,
+                   response_format: Optional[dict] = None, temperature: float = 0.7) -> str:
+    """Call the LLM through the provider router (breakers, latency order, hedging).
+
+    ``max_retries`` extra rounds are tried only when every provider failed,
+    e.g. the whole upstream restarting."""
+    messages = [{"role": "user", "content": prompt}]
     for attempt in range(max_retries + 1):
         try:
-            # Try LiteLLM first
-            async with httpx.AsyncClient(timeout=120) as client:
-                response = await client.post(
-                    f"{LITELLM_BASE}/chat/completions",
-                    headers={"Authorization": f"Bearer {LITELLM_API_KEY}"},
-                    json={
-                        "model": GENERATION_MODEL,
-                        "messages": [{"role": "user", "content": prompt}],
-                        "temperature": 0.7,
-                        "max_tokens": 4000
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    logger.warning(f"LiteLLM failed with status {response.status_code}: {response.text}")
-                    
-        except Exception as e:
-            logger.warning(f"LiteLLM attempt {attempt + 1} failed: {e}")
-            
-            # Fallback to OpenAI on last attempt
-            if attempt == max_retries and OPENAI_API_KEY and OPENAI_API_KEY != "sk-your-openai-api-key-here":
-                try:
-                    logger.info("Falling back to OpenAI...")
-                    async with httpx.AsyncClient(timeout=120) as client:
-                        response = await client.post(
-                            "https://api.openai.com/v1/chat/completions",
-                            headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
-                            json={
-                                "model": "gpt-5-nano",
-                                "messages": [{"role": "user", "content": prompt}],
-                                # "temperature": 0.7,
-                                # "max_tokens": 2000
-                            }
-                        )
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            return data["choices"][0]["message"]["content"]
-                            
-                except Exception as openai_error:
-                    logger.error(f"OpenAI fallback failed: {openai_error}")
-            
+            return await llm.complete(messages, max_tokens=max_tokens, temperature=temperature,
+                                      response_format=response_format)
+        except LLMError as e:
+            logger.warning(f"LLM attempt {attempt + 1} failed: {e}")
             if attempt < max_retries:
                 await asyncio.sleep(2 ** attempt)  # Exponential backoff
-    
     raise HTTPException(500, "All LLM providers failed")
 
+async def stream_llm(prompt: str, max_tokens: int = 4000, temperature: float = 0.7):
+    """Yield completion text as it is generated; falls back to one non-streamed
+    call when no provider could start a stream"""
+    started = False
+    try:
+        async for delta in llm.stream([{"role": "user", "content": prompt}],
+                                      max_tokens=max_tokens, temperature=temperature):
+            started = True
+            yield delta
+        return
+    except Exception as e:
+        if started:  # half an answer is out; a second full one would duplicate it
+            raise
+        logger.warning(f"LLM streaming failed: {e}, falling back to a single call")
+    yield await call_llm(prompt, max_tokens=max_tokens, temperature=temperature)
+
+AGENTS = ["prompt_restructurer", "response_evaluator", "restructure_and_draft"]
+
 @app.get("/")
 async def root():
     return {
         "service": "agno-ai-agent",
         "status": "running",
         "version": "1.0.0",
-        "agents": ["prompt_restructurer", "response_evaluator"],
+        "agents": AGENTS,
+        "max_tokens": {route: max_tokens_for(route) for route in ROUTE_MAX_TOKENS},
         "models": {
             "primary": GENERATION_MODEL,
             "fallback": "openai/gpt-5-nano" if OPENAI_API_KEY else "none"
-        }
+        },
+        "llm_order": llm.metrics()["order"],
+        "response_cache": response_cache.info()
     }
 
+@app.get("/llm/providers")
+async def llm_providers():
+    """Per-provider circuit state, latency percentiles and hedge counters"""
+    return llm.metrics()
+
+# reasoning of a restructure whose model output wasn't JSON (raw output passed through)
+UNPARSED_REASONING = "Response could not be parsed as JSON, returning raw output"
+
 @app.post("/agent/restructure-prompt", response_model=AgentResponse)
 async def restructure_prompt(request: PromptRequest) -> AgentResponse:
     """Agent 1: Prompt Restructuring Agent"""
@@ -150,18 +198,18 @@ Provide your response in the following JSON format:
 }}
 """
     
-    try:
-        response = await call_llm(restructure_system_prompt)
+    async def generate() -> dict:
+        response = await call_llm(restructure_system_prompt, max_tokens=max_tokens_for("restructure"))
         
         # Parse JSON response
         try:
-            parsed_response = json.loads(response)
+            parsed_response = parse_json_output(response)
         except json.JSONDecodeError:
             # Fallback if JSON parsing fails
             parsed_response = {
                 "restructured_prompt": response,
                 "confidence_score": 0.7,
-                "reasoning": "Response could not be parsed as JSON, returning raw output",
+                "reasoning": UNPARSED_REASONING,
                 "suggestions": [],
                 "improvements_made": ["Basic restructuring applied"]
             }
@@ -174,7 +222,16 @@ Provide your response in the following JSON format:
             confidence_score=parsed_response.get("confidence_score", 0.7),
             reasoning=parsed_response.get("reasoning", "Prompt restructured successfully"),
             suggestions=parsed_response.get("suggestions", [])
-        )
+        ).model_dump()
+
+    try:
+        key = cache_key("restructure", request.original_prompt, request.context, request.user_intent,
+                        request.domain, model=GENERATION_MODEL)
+        # a raw-output fallback is served once, not for the TTL: the next call regenerates
+        cached, _ = await response_cache.get_or_compute(
+            key, generate,
+            cacheable=lambda value: value["reasoning"] != UNPARSED_REASONING and bool(value["processed_output"].strip()))
+        return AgentResponse(**{**cached, "original_input": request.original_prompt})
         
     except Exception as e:
         logger.error(f"Prompt restructuring failed: {e}")
@@ -222,11 +279,11 @@ Provide your evaluation in the following JSON format:
 """
     
     try:
-        response = await call_llm(evaluation_system_prompt)
+        response = await call_llm(evaluation_system_prompt, max_tokens=max_tokens_for("evaluate"))
         
         # Parse JSON response
         try:
-            parsed_response = json.loads(response)
+            parsed_response = parse_json_output(response)
         except json.JSONDecodeError:
             # Fallback if JSON parsing fails
             parsed_response = {
@@ -261,6 +318,80 @@ Provide your evaluation in the following JSON format:
             suggestions=["Try simplifying the evaluation criteria", "Check network connectivity"]
         )
 
+@app.post("/agent/evaluate-response/stream")
+async def evaluate_response_stream(request: ResponseRequest):
+    """Agent 2, streaming: a quick verdict first, then (only when the score is below
+    ``AGNO_REWRITE_THRESHOLD``) the rewrite as paragraph patches.
+
+    NDJSON events: ``verdict`` -> ``patch``* -> ``done``. Good answers cost one
+    short generation instead of a full second answer, and revisions show up
+    paragraph by paragraph while the rewrite is still being generated.
+    """
+    criteria = ', '.join(request.evaluation_criteria or ['clarity', 'completeness', 'relevance'])
+    verdict_prompt = f"""
+You are a Response Evaluation Agent. Score how well the response answers the prompt.
+
+Evaluation Criteria: {criteria}
+Original Prompt: "{request.original_prompt}"
+Response Content: "{request.response_content}"
+
+Reply with a single JSON object only (be brief):
+{{
+    "score": <0.0-1.0>,
+    "strengths": ["<up to 3>"],
+    "weaknesses": ["<up to 3 concrete problems worth fixing>"],
+    "reasoning": "<one sentence>"
+}}
+"""
+
+    async def events():
+        try:
+            raw = await call_llm(verdict_prompt, max_tokens=max_tokens_for("verdict"),
+                                 response_format=json_schema(EvalVerdict, "evaluation_verdict"), temperature=0.2)
+            verdict = EvalVerdict.model_validate(parse_json_output(raw))
+        except Exception as e:
+            logger.error(f"Evaluation verdict failed: {e}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            return
+        score = max(0.0, min(1.0, verdict.score))
+        rewrite = score < REWRITE_THRESHOLD and bool(verdict.weaknesses)
+        yield json.dumps({"type": "verdict", "score": score, "needs_rewrite": rewrite,
+                          "threshold": REWRITE_THRESHOLD, "strengths": verdict.strengths,
+                          "weaknesses": verdict.weaknesses, "reasoning": verdict.reasoning}) + "\n"
+        if not rewrite:
+            yield json.dumps({"type": "done", "rewritten": False, "patches": 0}) + "\n"
+            return
+
+        rewrite_prompt = f"""
+Revise the response below to fix these problems:
+{chr(10).join('- ' + w for w in verdict.weaknesses)}
+
+Original Prompt: "{request.original_prompt}"
+
+Response:
+{request.response_content}
+
+Return only the revised response in the same format. Copy paragraphs that need no
+change exactly as they are; separate paragraphs with a blank line.
+"""
+        patcher = ParagraphPatcher(request.response_content)
+        count = 0
+        try:
+            async for delta in stream_llm(rewrite_prompt, max_tokens=max_tokens_for("evaluate")):
+                for op in patcher.feed(delta):
+                    count += 1
+                    yield json.dumps({"type": "patch", **op}) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming rewrite failed: {e}")
+            yield json.dumps({"type": "done", "rewritten": count > 0, "patches": count, "error": str(e)}) + "\n"
+            return
+        for op in patcher.finish():
+            count += 1
+            yield json.dumps({"type": "patch", **op}) + "\n"
+        yield json.dumps({"type": "done", "rewritten": count > 0, "patches": count}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.post("/agent/simple-response")
 async def simple_response(request: Dict[str, Any]) -> Dict[str, Any]:
     """Simple, fast response without heavy processing for query/visualization modes"""
@@ -300,16 +431,21 @@ Available sources: {', '.join([s.get('file_id', 'unknown') for s in sources])}
 
 Response:"""
         
-        # Generate simple response
-        response = await call_llm(simple_prompt)
+        # Generate simple response (cached on the normalized query, mode, context and sources)
+        source_ids = [s.get('file_id', 'unknown') for s in sources]
+        key = cache_key("simple", user_query, mode, context, sorted(source_ids), model=GENERATION_MODEL)
+        response, cache_state = await response_cache.get_or_compute(
+            key, lambda: call_llm(simple_prompt, max_tokens=max_tokens_for("simple")),
+            cacheable=lambda text: bool(text and text.strip()))
         
         return {
             "success": True,
             "response": response,
             "mode": mode,
-            "sources_used": [s.get('file_id', 'unknown') for s in sources],
+            "sources_used": source_ids,
             "processing_time": "fast",
-            "enhancement_level": "minimal"
+            "enhancement_level": "minimal",
+            "cache": cache_state
         }
         
     except Exception as e:
@@ -320,6 +456,70 @@ Response:"""
             "mode": mode,
             "error": str(e)
         }
+@app.post("/agent/restructure-and-draft")
+async def restructure_and_draft(request: DraftRequest) -> Dict[str, Any]:
+    """Agents 1+2 fused: restructure the question and draft the answer in one generation.
+
+    Replaces restructure-prompt -> generate -> evaluate-response (three full
+    generations) with one schema-constrained call whose answer is already the
+    polished one.
+    """
+    sources = "\n\n".join(
+        f"[{i}] {s.filename or 'source'}" + (f" (page {s.page})" if s.page is not None else "") + f"\n{s.text}"
+        for i, s in enumerate(request.sources, 1)
+    ) or "No documents retrieved."
+    fused_prompt = f"""
+You are a Knowledge Assistant for the domain: {request.domain}.
+
+In one pass:
+1. Restate the user's question as a specific, unambiguous question (keep the user's intent).
+2. Answer that restated question using the numbered sources below; prefer facts from the
+   sources, say so when they do not cover something, and keep the answer clear, complete,
+   well-structured and actionable (markdown allowed).
+
+User question: "{request.prompt}"
+Context: "{request.context or 'No additional context provided'}"
+
+Sources:
+{sources}
+
+Reply with a single JSON object only:
+{{
+    "restructured_prompt": "<the restated question>",
+    "answer": "<the final answer>",
+    "confidence_score": <0.0-1.0, how well the sources support the answer>,
+    "reasoning": "<one or two sentences on how the question was interpreted>",
+    "citations": [<numbers of the sources used>]
+}}
+"""
+    try:
+        response = await call_llm(fused_prompt, max_tokens=max_tokens_for("draft"),
+                                  response_format=json_schema(DraftOutput, "restructure_and_draft"),
+                                  temperature=0.3)
+    except Exception as e:
+        logger.error(f"Restructure+draft failed: {e}")
+        return {"success": False, "error": str(e), "original_prompt": request.prompt}
+
+    try:
+        out = DraftOutput.model_validate(parse_json_output(response))
+    except (json.JSONDecodeError, ValidationError) as e:
+        logger.warning(f"Restructure+draft output did not match the schema: {e}")
+        answer = re.sub(r"<think>.*?</think>", "", response, flags=re.S).strip()
+        out = DraftOutput(restructured_prompt=request.prompt, answer=answer, confidence_score=0.5,
+                          reasoning="Model output did not match the schema; returning it as the answer",
+                          citations=[])
+    citations = [c for c in out.citations if 1 <= c <= len(request.sources)]
+    return {
+        "success": bool(out.answer.strip()),
+        "agent_type": "restructure_and_draft",
+        "original_prompt": request.prompt,
+        "restructured_prompt": out.restructured_prompt or request.prompt,
+        "answer": out.answer,
+        "confidence_score": max(0.0, min(1.0, out.confidence_score)),
+        "reasoning": out.reasoning,
+        "citations": citations,
+    }
+
 @app.post("/agent/multi-agent-process")
 async def multi_agent_process(request: Dict[str, Any]):
     
@@ -428,24 +628,17 @@ async def test_agents():
         "timestamp": asyncio.get_event_loop().time()
     }
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    try:
-        # Test LLM connectivity
-        test_response = await call_llm("Hello, respond with 'OK' if you can hear me.")
-        return {
-            "status": "healthy",
-            "llm_connectivity": "ok" if "ok" in test_response.lower() else "partial",
-            "timestamp": asyncio.get_event_loop().time()
-        }
-    except Exception as e:
-        return {
-            "status": "degraded",
-            "llm_connectivity": "failed",
-            "error": str(e),
-            "timestamp": asyncio.get_event_loop().time()
-        }
+# Health: /health/live (no upstream calls), /health/ready (cached model-list probes of
+# the LLM providers), /health/deep (one real generation, rate-limited)
+async def llm_generation_check() -> dict:
+    test_response = await call_llm("Hello, respond with 'OK' if you can hear me.", max_retries=0,
+                                   max_tokens=max_tokens_for("health"))
+    return {"llm_connectivity": "ok" if "ok" in test_response.lower() else "partial"}
+
+health = HealthMonitor("agno", details=lambda: {"agents": AGENTS, "models": {"primary": GENERATION_MODEL}})
+health.probe("llm", llm.probe)
+health.deep("llm_generation", llm_generation_check)
+health.install(app)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,88 @@
+"""Paragraph patches: a streamed rewrite of an answer as edits against the original"""
+import re
+from difflib import SequenceMatcher
+from typing import List
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Blank-line separated blocks; clients split the same way to apply patches"""
+    return [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+def apply_patches(paragraphs: List[str], ops: List[dict]) -> List[str]:
+    out = list(paragraphs)
+    for op in ops:
+        if op["op"] == "replace":
+            out[op["index"]] = op["text"]
+        elif op["op"] == "insert":
+            out.insert(op["index"], op["text"])
+        elif op["op"] == "delete":
+            del out[op["index"]:op["index"] + op["count"]]
+    return out
+
+class ParagraphPatcher:
+    """Turn a streamed rewrite into paragraph patches against the original answer.
+
+    Each finished paragraph of the rewrite is matched to the original: kept
+    paragraphs emit nothing, a skipped-over original is deleted, a similar one
+    is replaced and anything else is inserted. Indexes refer to the client's
+    document as patched so far, so ops are applied in order as they arrive.
+    """
+
+    LOOKAHEAD = 3
+    SIMILAR = 0.5
+
+    def __init__(self, original: str):
+        self.original = split_paragraphs(original)
+        self.j = 0     # next original paragraph not yet accounted for
+        self.pos = 0   # index in the patched document
+        self.buf = ""
+        self._think = False
+
+    @staticmethod
+    def _norm(p: str) -> str:
+        return " ".join(p.split())
+
+    def feed(self, delta: str) -> List[dict]:
+        self.buf += delta
+        if "<think>" in self.buf:  # reasoning models: drop the thinking block
+            self._think = True
+        if self._think:
+            if "</think>" not in self.buf:
+                return []
+            self.buf = self.buf.split("</think>", 1)[1]
+            self._think = False
+        ops = []
+        while True:
+            m = re.search(r"\n\s*\n", self.buf)
+            if not m:
+                return ops
+            para, self.buf = self.buf[:m.start()], self.buf[m.end():]
+            ops += self._paragraph(para)
+
+    def finish(self) -> List[dict]:
+        ops = self._paragraph(self.buf) if not self._think else []
+        self.buf = ""
+        if self.j < len(self.original):
+            ops.append({"op": "delete", "index": self.pos, "count": len(self.original) - self.j})
+            self.j = len(self.original)
+        return ops
+
+    def _paragraph(self, para: str) -> List[dict]:
+        para = para.strip()
+        if not para:
+            return []
+        norm = self._norm(para)
+        for k in range(self.j, min(len(self.original), self.j + self.LOOKAHEAD)):
+            if self._norm(self.original[k]) == norm:
+                ops = [{"op": "delete", "index": self.pos, "count": k - self.j}] if k > self.j else []
+                self.j = k + 1
+                self.pos += 1
+                return ops
+        if self.j < len(self.original) and \
+                SequenceMatcher(None, self.original[self.j], para, autojunk=False).ratio() >= self.SIMILAR:
+            op = {"op": "replace", "index": self.pos, "text": para}
+            self.j += 1
+        else:
+            op = {"op": "insert", "index": self.pos, "text": para}
+        self.pos += 1
+        return [op]
@@ -0,0 +1,44 @@
+"""Structured model output: strict response schemas and JSON extraction from replies"""
+import json
+import re
+from typing import List
+
+from pydantic import BaseModel, ConfigDict
+
+
+class DraftOutput(BaseModel):
+    """Strict shape of the fused restructure + draft generation"""
+    model_config = ConfigDict(extra="forbid")
+    restructured_prompt: str
+    answer: str
+    confidence_score: float
+    reasoning: str
+    citations: List[int]
+
+class EvalVerdict(BaseModel):
+    """Quick verdict, produced before (and instead of, when good enough) a rewrite"""
+    model_config = ConfigDict(extra="forbid")
+    score: float
+    strengths: List[str]
+    weaknesses: List[str]
+    reasoning: str
+
+def json_schema(model: type[BaseModel], name: str) -> dict:
+    """OpenAI-style strict ``response_format`` for a pydantic model (LiteLLM passes it
+    on to Ollama as a format schema)"""
+    schema = model.model_json_schema()
+    schema["additionalProperties"] = False
+    schema["required"] = list(schema["properties"])
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": True}}
+
+def parse_json_output(text: str) -> dict:
+    """The JSON object in a model reply: reasoning models wrap it in <think> blocks
+    and some add code fences, both of which break a bare json.loads"""
+    text = re.sub(r"<think>.*?</think>", "", text, flags=re.S).strip()
+    fenced = re.search(r"```(?:json)?\s*(\{.*\})\s*```", text, re.S)
+    if fenced:
+        text = fenced.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise json.JSONDecodeError("no JSON object in model output", text, 0)
+    return json.loads(text[start:end + 1])
@@ -0,0 +1,73 @@
+import pytest
+
+from services.agno.patches import ParagraphPatcher, apply_patches, split_paragraphs
+
+ORIGINAL = """Arun field produced about 1200 bopd in 2012.
+
+Gas output fell after the compressor outage in March.
+
+Water cut rose steadily through the year.
+
+See the monthly table for details."""
+
+
+def _patch(original: str, rewrite: str, size: int) -> list[dict]:
+    patcher = ParagraphPatcher(original)
+    ops = []
+    for i in range(0, len(rewrite), size):
+        ops += patcher.feed(rewrite[i:i + size])
+    return ops + patcher.finish()
+
+
+REWRITES = {
+    "unchanged": ORIGINAL,
+    "replace": ORIGINAL.replace("about 1200 bopd in 2012", "roughly 1,200 bopd during 2012"),
+    "insert": ORIGINAL.replace("\n\nWater cut", "\n\nCondensate stayed flat at 300 bpd.\n\nWater cut"),
+    "delete middle": ORIGINAL.replace("Gas output fell after the compressor outage in March.\n\n", ""),
+    "delete tail": ORIGINAL.rsplit("\n\n", 1)[0],
+    "prepend": "Summary: output fell in 2012.\n\n" + ORIGINAL,
+    "rewrite all": "Oil held near 1.2 kbopd.\n\nGas dropped in March.\n\nWater rose.",
+    "empty": "",
+}
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 10_000])
+@pytest.mark.parametrize("name", list(REWRITES))
+def test_patches_rebuild_the_rewrite(name, size):
+    rewrite = REWRITES[name]
+    ops = _patch(ORIGINAL, rewrite, size)
+    assert apply_patches(split_paragraphs(ORIGINAL), ops) == split_paragraphs(rewrite)
+
+
+def test_unchanged_paragraphs_emit_nothing():
+    assert _patch(ORIGINAL, ORIGINAL.replace("\n\n", "\n  \n"), 5) == []
+
+
+def test_each_kind_of_edit():
+    paras = split_paragraphs(ORIGINAL)
+    assert _patch(ORIGINAL, REWRITES["replace"], 9) == [
+        {"op": "replace", "index": 0, "text": "Arun field produced roughly 1,200 bopd during 2012."}]
+    assert _patch(ORIGINAL, REWRITES["insert"], 9) == [
+        {"op": "insert", "index": 2, "text": "Condensate stayed flat at 300 bpd."}]
+    assert _patch(ORIGINAL, REWRITES["delete middle"], 9) == [{"op": "delete", "index": 1, "count": 1}]
+    assert _patch(ORIGINAL, REWRITES["delete tail"], 9) == [{"op": "delete", "index": 3, "count": 1}]
+    assert _patch(ORIGINAL, "", 9) == [{"op": "delete", "index": 0, "count": len(paras)}]
+
+
+def test_ops_arrive_as_paragraphs_finish():
+    patcher = ParagraphPatcher(ORIGINAL)
+    assert patcher.feed("Summary: output fell") == []
+    assert patcher.feed(" in 2012.\n") == []
+    assert patcher.feed("\nArun") == [{"op": "insert", "index": 0, "text": "Summary: output fell in 2012."}]
+
+
+@pytest.mark.parametrize("size", [1, 3, 10_000])
+def test_think_blocks_are_dropped(size):
+    reasoning = "<think>\nThe first paragraph is vague.\n\nRewrite it.\n</think>\n\n"
+    ops = _patch(ORIGINAL, reasoning + REWRITES["replace"], size)
+    assert apply_patches(split_paragraphs(ORIGINAL), ops) == split_paragraphs(REWRITES["replace"])
+    assert not any("think" in op.get("text", "") or "vague" in op.get("text", "") for op in ops)
+
+
+def test_split_paragraphs_ignores_blank_runs_and_padding():
+    assert split_paragraphs("\n\n  a \n b\n\n\n \n c  \n") == ["a \n b", "c"]
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from services.agno.structured import DraftOutput, json_schema, parse_json_output
+
+DRAFT = {"restructured_prompt": "What was the Arun field oil rate in 2012?", "answer": "About 1200 bopd [1].",
+         "confidence_score": 0.8, "reasoning": "one source covers it", "citations": [1]}
+
+
+def test_parses_bare_json():
+    assert parse_json_output(json.dumps(DRAFT)) == DRAFT
+
+
+def test_strips_think_blocks_and_code_fences():
+    reply = "<think>the {user} wants\nrates</think>\nHere you go:\n```json\n" + json.dumps(DRAFT, indent=2) + "\n```\n"
+    assert parse_json_output(reply) == DRAFT
+
+
+def test_takes_the_object_out_of_surrounding_prose():
+    assert parse_json_output("Sure! " + json.dumps(DRAFT) + " Hope that helps.") == DRAFT
+
+
+@pytest.mark.parametrize("reply", ["no json here", "<think>{\"a\": 1}</think> plain text", "} backwards {"])
+def test_replies_without_an_object_raise_decode_errors(reply):
+    with pytest.raises(json.JSONDecodeError):
+        parse_json_output(reply)
+
+
+def test_draft_output_validates_parsed_reply():
+    out = DraftOutput.model_validate(parse_json_output(f"<think>x</think>{json.dumps(DRAFT)}"))
+    assert out.answer == DRAFT["answer"] and out.citations == [1]
+
+
+@pytest.mark.parametrize("change", [{"citations": None}, {"extra": "field"}, {"confidence_score": "high"}])
+def test_draft_output_rejects_other_shapes(change):
+    data = {k: v for k, v in {**DRAFT, **change}.items() if v is not None}
+    with pytest.raises(ValidationError):
+        DraftOutput.model_validate(data)
+
+
+def test_json_schema_is_strict_and_requires_every_field():
+    fmt = json_schema(DraftOutput, "restructure_and_draft")
+    schema = fmt["json_schema"]["schema"]
+    assert fmt["type"] == "json_schema" and fmt["json_schema"]["strict"] is True
+    assert schema["additionalProperties"] is False
+    assert sorted(schema["required"]) == sorted(DRAFT)
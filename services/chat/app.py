@@ -9,41 +9,26 @@ import json
 import re
 import asyncio
 sys.path.append(os.path.dirname(__file__))
-from pg_client import search_chunks
+from pg_client import PG_URL, ping, search_chunks
 from zara_verificator import get_verificator
+from tool_cache import TimeseriesCache
+from data_access import PSYCOPG_POOL_AVAILABLE, DirectData
+from tool_merge import plan_calls, run_calls
 
-# Enhanced LiteLLM integration
-try:
-    from litellm import completion
-    LITELLM_AVAILABLE = True
-    print("✅ LiteLLM library available for streaming support")
-except ImportError:
-    LITELLM_AVAILABLE = False
-    print("⚠️  LiteLLM library not available, using HTTP API only")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.health import HealthMonitor, http_probe
+from common.llm_router import build_router
+from common.downsample import ENCODINGS as VIZ_ENCODINGS, METHODS as DOWNSAMPLE_METHODS, downsample_viz
 
 # Load .env from project root
 load_dotenv(Path(__file__).resolve().parents[2] / ".env")
 
 app = FastAPI()
 
-# Add health endpoint
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "chat",
-        "version": "1.0.0",
-        "models": {
-            "embed": EMBED_MODEL,
-            "generation": GEN_MODEL
-        },
-        "dependencies": {
-            "litellm": LITELLM_AVAILABLE,
-            "ollama_base": OLLAMA_BASE,
-            "agno_base": AGNO_BASE
-        }
-    }
+@app.get("/llm/providers")
+async def llm_providers():
+    """Per-provider circuit state, latency percentiles and hedge counters"""
+    return llm.metrics()
 
 LITELLM_BASE = os.environ["LITELLM_BASE"]
 LITELLM_API_KEY = os.getenv("LITELLM_API_KEY", "sk")
@@ -53,8 +38,53 @@ OLLAMA_BASE = os.getenv("OLLAMA_BASE", "http://117.54.250.177:5162")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")   # optional fail-safe
 API_BASE = os.getenv("API_BASE", "http://127.0.0.1:4000")
 AGNO_BASE = os.getenv("AGNO_BASE", "http://127.0.0.1:9010")
+# enhanced mode: one fused restructure+draft agno call instead of restructure -> generate -> evaluate
+AGNO_FUSED = os.getenv("AGNO_FUSED", "1") != "0"
+EMBED_BASE = os.getenv("EMBED_BASE", "http://127.0.0.1:9011")  # shared embedding gateway (services/embed)
+# direct Ollama first (what the litellm library path used to do), then the LiteLLM proxy, then OpenAI
+llm = build_router(os.getenv("LLM_PROVIDERS", "ollama,litellm,openai").split(","), model=GEN_MODEL,
+                   litellm_base=LITELLM_BASE, litellm_api_key=LITELLM_API_KEY,
+                   ollama_base=OLLAMA_BASE, openai_api_key=OPENAI_API_KEY)
+VIZ_POINTS = int(os.getenv("CHAT_VIZ_POINTS", 2000))  # per trace, when the client sends no viz_points
+# metrics tool results: exact-args hits plus bucket stitching for overlapping ranges
+tool_cache = TimeseriesCache(ttl_s=float(os.getenv("CHAT_TOOL_CACHE_TTL_S", 3600)))
+# tools read Postgres in-process ("sql") or through the API routes ("http"); a failed
+# direct read falls back to the API for that call
+DATA_BACKEND = os.getenv("CHAT_DATA_BACKEND", "sql")
+direct = DirectData(PG_URL, max_size=int(os.getenv("CHAT_PG_POOL_MAX", 8))) \
+  if DATA_BACKEND == "sql" and PSYCOPG_POOL_AVAILABLE else None
+if direct is not None:
+  app.on_event("startup")(direct.start)
+  app.on_event("shutdown")(direct.stop)
+# multi-tool plans: calls per plan, and calls in flight against the API at once
+MAX_TOOL_CALLS = int(os.getenv("CHAT_MAX_TOOL_CALLS", 8))
+tool_slots = asyncio.Semaphore(int(os.getenv("CHAT_TOOL_CONCURRENCY", 4)))
 # Initialize Zara Verificator
-verificator = get_verificator(LITELLM_BASE)
+verificator = get_verificator(EMBED_BASE)
+
+# Health: /health/live (no upstream calls), /health/ready (cached background probes),
+# /health/deep (a real generation and embedding, rate-limited). /health is the readiness payload.
+async def _generation_check() -> dict:
+  text = await llm.complete([{"role": "user", "content": "Reply with OK."}], max_tokens=16)
+  return {"reply": text[:40]}
+
+async def _embedding_check() -> dict:
+  return {"dimension": len(await embed("health check"))}
+
+health = HealthMonitor("chat", details=lambda: {
+  "version": "1.0.0",
+  "models": {"embed": EMBED_MODEL, "generation": GEN_MODEL},
+  "dependencies": {"llm_order": llm.metrics()["order"], "ollama_base": OLLAMA_BASE,
+                   "agno_base": AGNO_BASE, "embed_base": EMBED_BASE},
+  "data_backend": direct.info() if direct is not None else "http"
+})
+health.probe("llm", llm.probe)
+health.probe("postgres", lambda: asyncio.to_thread(ping))
+health.probe("embed_gateway", http_probe(f"{EMBED_BASE}/"))
+health.probe("agno", http_probe(f"{AGNO_BASE}/health/live"), required=False)
+health.deep("generation", _generation_check)
+health.deep("embedding", _embedding_check)
+health.install(app)
 
 # === Enhanced Streaming Functions for Thought Process ===
 
@@ -98,106 +128,29 @@ async def handle_fast_response(websocket: WebSocket, intent: str, message: str):
         "stage": "done"
     }))
 
-# === Enhanced LiteLLM Streaming Functions ===
+# === LLM generation (services/common/llm_router.py) ===
 
 async def llm_generate_stream(prompt: str, websocket: WebSocket = None):
-    """Generate streaming response using LiteLLM with Ollama backend"""
-    if LITELLM_AVAILABLE:
-        try:
-            # Use direct LiteLLM library for streaming (preferred method)
-            response = completion(
-                model=f"ollama_chat/{GEN_MODEL}",
-                messages=[{"role": "user", "content": prompt}],
-                stream=True,
-                api_base=OLLAMA_BASE
-            )
-            
-            full_response = ""
-            for chunk in response:
-                if chunk.choices[0].delta.content:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    if websocket:
-                        await websocket.send_text(json.dumps({
-                            "type": "stream_chunk",
-                            "payload": content
-                        }))
-            
-            return full_response
-            
-        except Exception as e:
-            print(f"LiteLLM streaming failed: {e}, falling back to HTTP API")
-    
-    # Fallback to HTTP API streaming
+    """Generate a streaming response through the provider router, forwarding chunks to the websocket"""
+    full_response = ""
     try:
-        async with httpx.AsyncClient(timeout=120) as cli:
-            async with cli.stream(
-                "POST",
-                f"{LITELLM_BASE}/chat/completions",
-                headers={"Authorization": f"Bearer {LITELLM_API_KEY}"},
-                json={
-                    "model": GEN_MODEL,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "stream": True
-                }
-            ) as response:
-                response.raise_for_status()
-                
-                full_response = ""
-                async for line in response.aiter_lines():
-                    if line.startswith("data: ") and not line.endswith("[DONE]"):
-                        try:
-                            chunk_data = json.loads(line[6:])
-                            content = chunk_data["choices"][0]["delta"].get("content", "")
-                            if content:
-                                full_response += content
-                                if websocket:
-                                    await websocket.send_text(json.dumps({
-                                        "type": "stream_chunk",
-                                        "payload": content
-                                    }))
-                        except (json.JSONDecodeError, KeyError):
-                            continue
-                
-                return full_response
-                
+        async for content in llm.stream([{"role": "user", "content": prompt}]):
+            full_response += content
+            if websocket:
+                await websocket.send_text(json.dumps({
+                    "type": "stream_chunk",
+                    "payload": content
+                }))
+        return full_response
     except Exception as e:
-        print(f"HTTP streaming failed: {e}, falling back to non-streaming")
-        # Final fallback to non-streaming
+        if full_response:  # chunks already reached the client
+            raise
+        print(f"LLM streaming failed: {e}, falling back to non-streaming")
         return await llm_generate(prompt)
 
 async def llm_generate(prompt: str) -> str:
-    """Generate non-streaming response using LiteLLM"""
-    if LITELLM_AVAILABLE:
-        try:
-            response = completion(
-                model=f"ollama_chat/{GEN_MODEL}",
-                messages=[{"role": "user", "content": prompt}],
-                stream=False,
-                api_base=OLLAMA_BASE
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"LiteLLM generation failed: {e}, falling back to HTTP API")
-    
-    # Fallback to HTTP API
-    try:
-        async with httpx.AsyncClient(timeout=120) as cli:
-            r = await cli.post(f"{LITELLM_BASE}/chat/completions",
-                headers={"Authorization": f"Bearer {LITELLM_API_KEY}"},
-                json={"model": GEN_MODEL, "messages":[{"role":"user","content": prompt}]})
-            r.raise_for_status()
-            return r.json()["choices"][0]["message"]["content"]
-    except Exception:
-        if not OPENAI_API_KEY: 
-            raise
-        # Final fallback to OpenAI
-        async with httpx.AsyncClient(timeout=120) as cli:
-            r = await cli.post("https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
-                json={"model":"gpt-5-nano","messages":[{"role":"user","content": prompt}]})
-            r.raise_for_status()
-            return r.json()["choices"][0]["message"]["content"]
+    """Generate a non-streaming response through the provider router"""
+    return await llm.complete([{"role": "user", "content": prompt}])
 
 # ---------- Agno AI Agent Integration ----------
 async def agno_enhance_prompt(original_query: str, context: str = "") -> tuple[str, dict]:
@@ -254,9 +207,122 @@ async def agno_evaluate_response(response_content: str, original_prompt: str) ->
   
   # Fallback to original response
   return response_content, {"agno_evaluated": False, "confidence": 0.0, "reasoning": "Agno service unavailable"}
+
+async def agno_evaluate_stream(response_content: str, original_prompt: str):
+  """Events from agno's streaming evaluation: verdict, then paragraph patches, then done"""
+  async with httpx.AsyncClient(timeout=httpx.Timeout(30, read=120)) as cli:
+    async with cli.stream("POST", f"{AGNO_BASE}/agent/evaluate-response/stream",
+      json={
+        "response_content": response_content,
+        "original_prompt": original_prompt,
+        "response_format": "text",
+        "evaluation_criteria": ["clarity", "completeness", "relevance", "actionability"]
+      }) as response:
+      response.raise_for_status()
+      async for line in response.aiter_lines():
+        if line.strip():
+          yield json.loads(line)
+
+async def stream_evaluation(ws: WebSocket, response_text: str, original_query: str) -> bool:
+  """Relay a streaming evaluation to the client; False if nothing could be streamed
+  (the caller then falls back to the blocking evaluate-response)"""
+  verdict = None
+  patches = 0
+  try:
+    async for event in agno_evaluate_stream(response_text, original_query):
+      if event["type"] == "verdict":
+        verdict = event
+        await ws.send_text(json.dumps({
+            "type": "agno_evaluation",
+            "payload": {
+                "improvements_made": event["needs_rewrite"],
+                "confidence": event["score"],
+                "reasoning": event["reasoning"],
+                "suggestions": event["weaknesses"],
+                "streaming": True
+            }
+        }))
+        await stream_thought_stage(ws, "evaluate",
+                                  f"Score {event['score']:.0%}" + (" - revising..." if event["needs_rewrite"] else " - no changes needed"),
+                                  "processing" if event["needs_rewrite"] else "complete")
+      elif event["type"] == "patch":
+        patches += 1
+        await ws.send_text(json.dumps({"type": "answer_patch", "payload": {k: v for k, v in event.items() if k != "type"}}))
+      elif event["type"] == "error" and verdict is None:
+        return False
+  except Exception as e:
+    print(f"Agno streaming evaluation failed: {e}")
+    if verdict is None:
+      return False
+  if verdict is not None and verdict["needs_rewrite"]:
+    await stream_thought_stage(ws, "evaluate", f"Response revised ({patches} edit{'s' if patches != 1 else ''})", "complete")
+  return verdict is not None
+
+async def enhance_query(ws: WebSocket, original_query: str) -> str:
+  """STEP 1: the agno-restructured question (streaming its stages), or the original one"""
+  await stream_thought_stage(ws, "enhance", "Enhancing your question with AI...", "processing")
+  
+  # Get current database context
+  db_context = await get_database_context()
+  enhanced_context = f"User is querying Zara AI Knowledge Navigator. {db_context}"
+  
+  enhanced_query, prompt_metadata = await agno_enhance_prompt(original_query, enhanced_context)
+  
+  if prompt_metadata["agno_enhanced"]:
+    await ws.send_text(json.dumps({
+        "type": "agno_enhancement",
+        "payload": {
+            "original": original_query,
+            "enhanced": enhanced_query,
+            "confidence": prompt_metadata["confidence"],
+            "reasoning": prompt_metadata["reasoning"]
+        }
+    }))
+    await stream_thought_stage(ws, "enhance", 
+                              f"Enhanced query (confidence: {prompt_metadata['confidence']:.1%})", 
+                              "complete")
+  else:
+    await stream_thought_stage(ws, "enhance", "Using original query", "complete")
+  return enhanced_query
+
+async def retrieve(ws: WebSocket, query: str, tenant: str, fid: str | None) -> list[dict]:
+  """STEP 2: top chunks for ``query``, sent to the client as a result frame"""
+  await stream_thought_stage(ws, "retrieve", "Searching your documents...", "processing")
+  
+  q_emb = await embed(query)
+  hits = search_chunks(tenant, q_emb, 8, fid)
+  
+  await ws.send_text(json.dumps({"type":"result","payload":{"objects":[
+    {"text":h["text"], "meta":{"file_id":str(h["file_id"]),"filename":str(h.get("filename", h["file_id"])),"page":h["page"],"section":h["section"]}}
+  for h in hits]}}))
+  
+  await stream_thought_stage(ws, "retrieve", 
+                            f"Found {len(hits)} relevant document sections", 
+                            "complete")
+  return hits
+
+async def agno_restructure_and_draft(original_query: str, hits: list[dict], context: str = "") -> dict | None:
+  """Restructured question + finished answer from one agno generation; None when unavailable"""
+  try:
+    async with httpx.AsyncClient(timeout=120) as cli:
+      response = await cli.post(f"{AGNO_BASE}/agent/restructure-and-draft",
+        json={
+          "prompt": original_query,
+          "context": context,
+          "domain": "knowledge_retrieval",
+          "sources": [{"text": h["text"], "filename": str(h.get("filename", h["file_id"])), "page": h.get("page")}
+                      for h in hits]
+        })
+      if response.status_code == 200:
+        data = response.json()
+        if data.get("success"):
+          return data
+  except Exception as e:
+    print(f"Agno restructure+draft failed: {e}")
+  return None
 async def embed(q:str)->list[float]:
   async with httpx.AsyncClient(timeout=60) as cli:
-    r = await cli.post(f"{LITELLM_BASE}/embeddings",
+    r = await cli.post(f"{EMBED_BASE}/embeddings",
       headers={"Authorization": f"Bearer {LITELLM_API_KEY}"},
       json={"model": EMBED_MODEL, "input": [q]})
     r.raise_for_status()
@@ -306,6 +372,9 @@ Note: Database connection unavailable - using fallback data"""
 
 
 # ---------- Planner ----------
+# plan types answered by data rather than generated text
+DATA_PLANS = ("tool", "tools", "viz", "table")
+
 VIZ_SYSTEM = """You plan responses for a UI that supports TEXT, TABLE, VIZ, or TOOL calls.
 
 Return JSON ONLY using one of:
@@ -330,7 +399,11 @@ Return JSON ONLY using one of:
 
 { "type":"tool", "name":"files.search", "args": { "q":"keyword" } }
 
+{ "type":"tools", "calls":[ { "name":"csv.timeseries", "args":{...} }, { "name":"csv.timeseries", "args":{...} } ] }
+
 Prefer TOOL for any visualization/tabular answer that relies on user data.
+Use TOOLS when the question compares several series (blocks, wells, metrics or ranges):
+one call per series, they run in parallel and are merged into one chart or table.
 Never include code or markdown. Output must be a single JSON object.
 """
 
@@ -372,6 +445,37 @@ async def plan(question:str, chunks:list[dict])->dict:
   return obj
 
 # ---------- Tool executors ----------
+async def read_direct(query:str, *args):
+  """``DirectData.<query>(*args)``, or None when the direct backend is off or failed"""
+  if direct is None:
+    return None
+  try:
+    return await getattr(direct, query)(*args)
+  except Exception as e:
+    print(f"Direct SQL {query} failed, using the API: {e}")
+    return None
+
+def fetch_metrics(path:str, query:str|None = None):
+  """Fetch for ``tool_cache``: the direct SQL ``query`` when enabled, else the API route"""
+  async def fetch(params:dict) -> dict:
+    data = await read_direct(query, params) if query else None
+    if data is not None:
+      return data
+    async with httpx.AsyncClient(timeout=60) as cli:
+      r = await cli.get(f"{API_BASE}{path}", params={k: v for k, v in params.items() if v is not None})
+      r.raise_for_status()
+      return r.json()
+  return fetch
+
+@app.post("/cache/invalidate")
+async def invalidate_tool_cache():
+  """Called by the API after it loads new production rows"""
+  return {"ok": True, "dropped": tool_cache.invalidate()}
+
+@app.get("/cache/stats")
+async def tool_cache_stats():
+  return tool_cache.info()
+
 async def tool_production_timeseries(args:dict):
   params = {
     "start": args.get("start","2024-01-01"),
@@ -380,10 +484,7 @@ async def tool_production_timeseries(args:dict):
     "block": args.get("block"),
     "well": args.get("well")
   }
-  async with httpx.AsyncClient(timeout=60) as cli:
-    r = await cli.get(f"{API_BASE}/api/metrics/production", params=params)
-    r.raise_for_status()
-    data = r.json()
+  data = await tool_cache.get("production", params, fetch_metrics("/api/metrics/production", "production"), fields=("oil", "gas"))
   return {
     "type":"viz",
     "title": f"Production (${data['groupby']})",
@@ -403,10 +504,8 @@ async def tool_csv_timeseries(args:dict):
     "well": args.get("well")
   }
   metric = (args.get("value") or "BORE_OIL_VOL").upper()
-  async with httpx.AsyncClient(timeout=60) as cli:
-    r = await cli.get(f"{API_BASE}/api/metrics/aceh/production", params=params)
-    r.raise_for_status()
-    data = r.json()
+  data = await tool_cache.get("aceh", params, fetch_metrics("/api/metrics/aceh/production", "aceh_production"),
+                              fields=("oil", "gas", "water"), dims=("block", "well"))
   y, yname = (data["oil"], "Oil (bbl)") if metric.endswith("OIL_VOL") else \
              (data["gas"], "Gas (mscf)") if metric.endswith("GAS_VOL") else \
              (data["water"], "Water (bbl)")
@@ -417,10 +516,12 @@ async def tool_csv_timeseries(args:dict):
 
 async def tool_files_search(args:dict):
   q = args.get("q","")
-  async with httpx.AsyncClient(timeout=60) as cli:
-    r = await cli.get(f"{API_BASE}/api/drive/search", params={"q": q})
-    r.raise_for_status()
-    rows = r.json()[:50]
+  rows = await read_direct("files_search", q, 50)
+  if rows is None:
+    async with httpx.AsyncClient(timeout=60) as cli:
+      r = await cli.get(f"{API_BASE}/api/drive/search", params={"q": q})
+      r.raise_for_status()
+      rows = r.json()[:50]
   cols = ["filename","mime_type","doc_type","basin","block"]
   normalized = []
   for r in rows:
@@ -433,9 +534,18 @@ async def tool_files_search(args:dict):
     })
   return { "type":"table", "columns": cols, "rows": normalized }
 
-async def execute_tool(plan_obj:dict):
-  name = plan_obj.get("name")
-  args = plan_obj.get("args",{})
+def viz_frame(payload:dict, msg:dict) -> str:
+  """``viz`` frame bounded to the client's point budget (``viz_points``), with its
+  ``viz_method`` (minmax keeps every peak, lttb the overall shape) and ``viz_encoding``"""
+  try:
+    points = max(16, min(int(msg.get("viz_points") or VIZ_POINTS), 20000))
+  except (TypeError, ValueError):
+    points = VIZ_POINTS
+  method = msg.get("viz_method") if msg.get("viz_method") in DOWNSAMPLE_METHODS else "minmax"
+  encoding = msg.get("viz_encoding") if msg.get("viz_encoding") in VIZ_ENCODINGS else "json"
+  return json.dumps({"type":"viz","payload": downsample_viz(payload, points, method, encoding)})
+
+async def run_tool(name:str, args:dict):
   if name == "production.timeseries":
     return await tool_production_timeseries(args)
   if name == "csv.timeseries":
@@ -444,6 +554,13 @@ async def execute_tool(plan_obj:dict):
     return await tool_files_search(args)
   return {"type":"text","text":"Tool not recognized."}
 
+async def execute_tool(calls:list[dict]) -> list[dict]:
+  """Run the calls of a ``tool``/``tools`` plan (see ``plan_calls``) concurrently, at most
+  ``CHAT_TOOL_CONCURRENCY`` at a time across all sockets, and merge their results"""
+  if not calls:
+    return [{"type":"text","text":"Tool not recognized."}]
+  return await run_calls(calls, run_tool, tool_slots)
+
 
 # ---------- Enhanced WebSocket with Zara Smart Routing ----------
 @app.websocket("/ws")
@@ -558,79 +675,57 @@ async def ws(ws: WebSocket):
         await handle_fast_response(ws, route_decision.intent, fast_response)
         continue
 
-      # 🤖 STEP 1: Agno Prompt Enhancement (only if needed)
+      # 🤖 STEP 1: Agno Prompt Enhancement (only if needed). In fused mode a text answer restructures
+      # while drafting, so enhancement waits until the plan shows whether the answer will be text
       enhanced_query = original_query
-      if route_decision.needs_improvement:
-        await stream_thought_stage(ws, "enhance", "Enhancing your question with AI...", "processing")
-        
-        # Get current database context
-        db_context = await get_database_context()
-        enhanced_context = f"User is querying Zara AI Knowledge Navigator. {db_context}"
-        
-        enhanced_query, prompt_metadata = await agno_enhance_prompt(original_query, enhanced_context)
-        
-        if prompt_metadata["agno_enhanced"]:
-          await ws.send_text(json.dumps({
-              "type": "agno_enhancement",
-              "payload": {
-                  "original": original_query,
-                  "enhanced": enhanced_query,
-                  "confidence": prompt_metadata["confidence"],
-                  "reasoning": prompt_metadata["reasoning"]
-              }
-          }))
-          await stream_thought_stage(ws, "enhance", 
-                                    f"Enhanced query (confidence: {prompt_metadata['confidence']:.1%})", 
-                                    "complete")
-        else:
-          await stream_thought_stage(ws, "enhance", "Using original query", "complete")
+      fused = AGNO_FUSED and route_decision.needs_improvement
+      if route_decision.needs_improvement and not fused:
+        enhanced_query = await enhance_query(ws, original_query)
 
       # 🔍 STEP 2: Document Retrieval (only if needed)
-      hits = []
-      if route_decision.needs_retrieval:
-        await stream_thought_stage(ws, "retrieve", "Searching your documents...", "processing")
-        
-        q_emb = await embed(enhanced_query)
-        hits = search_chunks(tenant, q_emb, 8, fid)
-        
-        await ws.send_text(json.dumps({"type":"result","payload":{"objects":[
-          {"text":h["text"], "meta":{"file_id":str(h["file_id"]),"filename":str(h.get("filename", h["file_id"])),"page":h["page"],"section":h["section"]}}
-        for h in hits]}}))
-        
-        await stream_thought_stage(ws, "retrieve", 
-                                  f"Found {len(hits)} relevant document sections", 
-                                  "complete")
+      hits = await retrieve(ws, enhanced_query, tenant, fid) if route_decision.needs_retrieval else []
 
       # 📊 STEP 3: Response Planning
       await stream_thought_stage(ws, "format", "Planning the best response format...", "processing")
       
       p = await plan(enhanced_query, hits)
+      if fused and p.get("type") in DATA_PLANS:
+        # tool/viz/table answers never reach the fused draft: restructure now, then retrieve and plan again
+        fused = False
+        enhanced_query = await enhance_query(ws, original_query)
+        if enhanced_query != original_query:
+          if route_decision.needs_retrieval:
+            hits = await retrieve(ws, enhanced_query, tenant, fid)
+          p = await plan(enhanced_query, hits)
       
       await stream_thought_stage(ws, "format", 
                                 f"Response type: {p.get('type', 'text')}", 
                                 "complete")
       
       # 🚀 STEP 4: Generate Response
-      if p.get("type") == "tool":
-        await stream_thought_stage(ws, "generate", "Running data analysis...", "processing")
-        out = await execute_tool(p)
-        
-        if out.get("type") == "viz":
-          await ws.send_text(json.dumps({"type":"viz","payload":out}))
-          await stream_thought_stage(ws, "deliver", "Visualization created", "complete")
-        elif out.get("type") == "table":
-          await ws.send_text(json.dumps({"type":"table","payload":out}))
-          await stream_thought_stage(ws, "deliver", "Data table generated", "complete")
-        else:
-          # Send answer for tool results that are text
-          await ws.send_text(json.dumps({
-              "type": "answer",
-              "payload": out.get("text", "Analysis completed.")
-          }))
-          await stream_thought_stage(ws, "deliver", "Response complete", "complete")
-          
+      if p.get("type") in ("tool", "tools"):
+        calls = plan_calls(p, MAX_TOOL_CALLS)
+        n_calls = len(calls)
+        await stream_thought_stage(ws, "generate",
+                                  "Running data analysis..." if n_calls <= 1 else f"Running {n_calls} data queries in parallel...",
+                                  "processing")
+        for out in await execute_tool(calls):
+          if out.get("type") == "viz":
+            await ws.send_text(viz_frame(out, msg))
+            await stream_thought_stage(ws, "deliver", "Visualization created", "complete")
+          elif out.get("type") == "table":
+            await ws.send_text(json.dumps({"type":"table","payload":out}))
+            await stream_thought_stage(ws, "deliver", "Data table generated", "complete")
+          else:
+            # Send answer for tool results that are text
+            await ws.send_text(json.dumps({
+                "type": "answer",
+                "payload": out.get("text", "Analysis completed.")
+            }))
+            await stream_thought_stage(ws, "deliver", "Response complete", "complete")
+
       elif p.get("type") == "viz":
-        await ws.send_text(json.dumps({"type":"viz","payload":p}))
+        await ws.send_text(viz_frame(p, msg))
         await stream_thought_stage(ws, "deliver", "Visualization ready", "complete")
       elif p.get("type") == "table":
         await ws.send_text(json.dumps({"type":"table","payload":p}))
@@ -638,7 +733,28 @@ async def ws(ws: WebSocket):
       else:
         # Generate streaming text response
         await stream_thought_stage(ws, "generate", "Crafting your answer...", "processing")
-        
+
+        if fused:
+          db_context = await get_database_context()
+          draft = await agno_restructure_and_draft(
+            original_query, hits, f"User is querying Zara AI Knowledge Navigator. {db_context}")
+          if draft is not None:
+            await ws.send_text(json.dumps({
+                "type": "agno_enhancement",
+                "payload": {
+                    "original": original_query,
+                    "enhanced": draft["restructured_prompt"],
+                    "confidence": draft["confidence_score"],
+                    "reasoning": draft["reasoning"]
+                }
+            }))
+            await ws.send_text(json.dumps({"type": "answer", "payload": draft["answer"]}))
+            await stream_thought_stage(ws, "generate",
+                                      f"Response complete (confidence: {draft['confidence_score']:.1%})", "complete")
+            await stream_thought_stage(ws, "done", "success", "complete")
+            continue
+          print("⚠️ Fused agno draft unavailable, generating locally")
+
         # Decide whether to stream or send direct answer
         use_streaming = len(hits) > 3 or len(enhanced_query) > 100  # Stream for complex queries
         
@@ -668,7 +784,12 @@ async def ws(ws: WebSocket):
         # 🎯 STEP 5: Response Enhancement (only for complex queries)
         if route_decision.needs_improvement and response_text:
           await stream_thought_stage(ws, "evaluate", "Optimizing response quality...", "processing")
-          
+
+          # quick verdict first, revisions as paragraph patches; blocking evaluation only as a fallback
+          if await stream_evaluation(ws, response_text, original_query):
+            await stream_thought_stage(ws, "done", "success", "complete")
+            continue
+
           enhanced_response, response_metadata = await agno_evaluate_response(response_text, original_query)
           
           if response_metadata["agno_evaluated"]:
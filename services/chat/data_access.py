@@ -0,0 +1,151 @@
+import time
+
+try:
+    from psycopg_pool import AsyncConnectionPool
+    PSYCOPG_POOL_AVAILABLE = True
+except ImportError:
+    AsyncConnectionPool = None
+    PSYCOPG_POOL_AVAILABLE = False
+
+GRAINS = ("week", "month")
+
+# Hand copies of the API's SQL: bucket_bounds/edge_rows are bucketBounds/edgeRows in
+# apps/api/src/rollups.ts, aceh_sql/production_sql the queries in routes/metrics_aceh.ts
+# and routes/metrics_example.ts. Change both sides together; tests/test_data_access.py
+# compares the builders with rollups.ts and the results with the base tables.
+#
+# s/e = requested range, fs/fe = first and end of the whole buckets inside it.
+# grain is one of GRAINS.
+def bucket_bounds(grain: str) -> str:
+    return f"""select %(start)s::date as s, %(end)s::date as e,
+                      date_trunc('{grain}', %(start)s::date + interval '1 {grain}' - interval '1 day')::date as fs,
+                      date_trunc('{grain}', %(end)s::date)::date as fe"""
+
+def edge_rows(alias: str) -> str:
+    """Daily rows of the partial edge buckets, for a base table joined to "b" """
+    return (f"(({alias}.ts >= b.s and {alias}.ts < least(b.fs, b.e)) or "
+            f"({alias}.ts >= greatest(b.fe, b.fs) and {alias}.ts < b.e))")
+
+def _filters(alias: str, block: bool, well: bool) -> str:
+    # one statement per filter combination: a prepared "$3 is null or block = $3"
+    # turns into a generic plan that can't use the block/well indexes
+    return (f" and {alias}.block = %(block)s" if block else "") + \
+           (f" and {alias}.well_bore_code = %(well)s" if well else "")
+
+def aceh_sql(groupby: str, block: bool, well: bool) -> str:
+    if groupby not in GRAINS:
+        return f"""
+          select to_char(ts, 'YYYY-MM-DD'), sum(bore_oil_vol)::float8, sum(bore_gas_vol)::float8, sum(bore_wat_vol)::float8
+          from well_daily w
+          where w.tenant_id = %(tenant)s and w.ts >= %(start)s::date and w.ts < %(end)s::date{_filters('w', block, well)}
+          group by ts order by ts"""
+    return f"""
+      with b as ({bucket_bounds(groupby)}),
+      d as (
+        select r.bucket, r.oil, r.gas, r.water
+        from b join well_rollup r on r.tenant_id = %(tenant)s and r.grain = '{groupby}'
+                                 and r.bucket >= b.fs and r.bucket < b.fe{_filters('r', block, well)}
+        union all
+        select date_trunc('{groupby}', w.ts)::date, w.bore_oil_vol, w.bore_gas_vol, w.bore_wat_vol
+        from b join well_daily w on w.tenant_id = %(tenant)s and {edge_rows('w')}{_filters('w', block, well)}
+      )
+      select to_char(bucket, 'YYYY-MM-DD'), sum(oil)::float8, sum(gas)::float8, sum(water)::float8
+      from d group by bucket order by bucket"""
+
+def production_sql(groupby: str) -> str:
+    if groupby not in GRAINS:
+        return """
+          select to_char(ts, 'YYYY-MM-DD'), avg(oil_bopd)::float8, avg(gas_mmscfd)::float8
+          from production_timeseries
+          where tenant_id = %(tenant)s and ts >= %(start)s::date and ts < %(end)s::date
+          group by ts order by ts"""
+    # averages combine as sum/count across rollup buckets and partial edge days
+    return f"""
+      with b as ({bucket_bounds(groupby)}),
+      g as (
+        select r.bucket, r.oil_sum, r.gas_sum, r.n
+        from b join production_rollup r on r.tenant_id = %(tenant)s and r.grain = '{groupby}'
+                                       and r.bucket >= b.fs and r.bucket < b.fe
+        union all
+        select date_trunc('{groupby}', p.ts)::date, p.oil_bopd, p.gas_mmscfd, 1
+        from b join production_timeseries p on p.tenant_id = %(tenant)s and {edge_rows('p')}
+      )
+      select to_char(bucket, 'YYYY-MM-DD'), (sum(oil_sum) / sum(n))::float8, (sum(gas_sum) / sum(n))::float8
+      from g group by bucket order by bucket"""
+
+FILES_SQL = """
+  select f.id::text, f.filename, f.mime_type, m.doc_type, m.basin, m.block
+  from files f left join file_metadata m on m.file_id = f.id
+  where f.filename ilike '%%' || %(q)s || '%%' order by f.created_at desc limit %(limit)s"""
+
+def _groupby(v) -> str:
+    return v if v in ("day", "week", "month") else "month"
+
+class DirectData:
+    """In-process reads for the chat tools, answering what the API metrics and
+    drive-search routes answer without the HTTP hop.
+
+    Connections come from an async pool and are opened with
+    ``prepare_threshold=0``, so each statement text (a handful per
+    groupby/filter combination) is prepared on first use per connection.
+    Timeseries come back columnar, ``{"dates": [...], "oil": [...], ...}``,
+    in the API's response shape so ``TimeseriesCache`` takes either.
+    """
+
+    def __init__(self, conninfo: str, min_size: int = 1, max_size: int = 8, tenant: str = "demo",
+                 timeout: float = 5.0):
+        self.tenant = tenant
+        # timeout bounds the wait for a connection, so a down database fails fast to the API path
+        self.pool = AsyncConnectionPool(conninfo, min_size=min_size, max_size=max_size, open=False, timeout=timeout,
+                                        kwargs={"autocommit": True, "prepare_threshold": 0})
+        self.stats = {"queries": 0, "errors": 0, "rows": 0, "query_ms": 0.0}
+
+    async def start(self):
+        await self.pool.open(wait=False)  # connects in the background; startup doesn't wait on Postgres
+
+    async def stop(self):
+        await self.pool.close()
+
+    async def _columns(self, sql: str, params: dict, n: int) -> list[list]:
+        t0 = time.perf_counter()
+        try:
+            async with self.pool.connection() as conn:
+                cur = await conn.execute(sql, {"tenant": self.tenant, **params}, prepare=True)
+                rows = await cur.fetchall()
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        self.stats["queries"] += 1
+        self.stats["rows"] += len(rows)
+        self.stats["query_ms"] += (time.perf_counter() - t0) * 1000
+        return [list(c) for c in zip(*rows)] if rows else [[] for _ in range(n)]
+
+    async def aceh_production(self, params: dict) -> dict:
+        """/api/metrics/aceh/production"""
+        groupby = _groupby(params.get("groupby"))
+        block, well = params.get("block") or None, params.get("well") or None
+        args = {"start": params["start"], "end": params["end"], "block": block, "well": well}
+        dates, oil, gas, water = await self._columns(aceh_sql(groupby, block is not None, well is not None), args, 4)
+        return {"start": args["start"], "end": args["end"], "groupby": groupby, "block": block, "well": well,
+                "dates": dates, "oil": [v or 0 for v in oil], "gas": [v or 0 for v in gas],
+                "water": [v or 0 for v in water]}
+
+    async def production(self, params: dict) -> dict:
+        """/api/metrics/production"""
+        groupby = _groupby(params.get("groupby"))
+        args = {"start": params["start"], "end": params["end"]}
+        dates, oil, gas = await self._columns(production_sql(groupby), args, 3)
+        return {**args, "groupby": groupby, "dates": dates, "oil": oil, "gas": gas}
+
+    async def files_search(self, q: str, limit: int = 50) -> list[dict]:
+        """/api/drive/search, as rows"""
+        cols = await self._columns(FILES_SQL, {"q": q or "", "limit": limit}, 6)
+        keys = ("id", "filename", "mime_type", "doc_type", "basin", "block")
+        return [dict(zip(keys, r)) for r in zip(*cols)]
+
+    def info(self) -> dict:
+        pool = self.pool.get_stats()
+        queries = self.stats["queries"]
+        return {**self.stats, "query_ms": round(self.stats["query_ms"], 1),
+                "avg_query_ms": round(self.stats["query_ms"] / queries, 2) if queries else None,
+                "pool": {k: pool.get(k) for k in ("pool_min", "pool_max", "pool_size", "pool_available", "requests_waiting")}}
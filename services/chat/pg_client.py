@@ -9,6 +9,11 @@ PG_URL = os.environ["POSTGRES_URL"]
 
 def get_conn(): return psycopg.connect(PG_URL)
 
+def ping():
+    """Readiness probe: one round trip, no table access"""
+    with get_conn() as conn:
+        conn.execute("select 1")
+
 def to_pgvector(v):
     return "[" + ",".join(f"{float(x):.6f}" for x in v) + "]"
 
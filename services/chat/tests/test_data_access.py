@@ -0,0 +1,156 @@
+import asyncio
+import os
+import random
+import re
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from services.chat.data_access import GRAINS, _filters, aceh_sql, bucket_bounds, edge_rows, production_sql
+
+API_SRC = Path(__file__).resolve().parents[3] / "apps" / "api" / "src"
+TEST_URL = os.getenv("CHAT_TEST_POSTGRES_URL")
+
+
+def _squash(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def _ts_template(name: str) -> str:
+    """Body of a one-template-literal function in apps/api/src/rollups.ts"""
+    src = (API_SRC / "rollups.ts").read_text()
+    m = re.search(rf"export function {name}\([^)]*\) \{{\s*return `(.*?)`", src, re.S)
+    assert m, f"{name} not found in rollups.ts"
+    return m.group(1)
+
+
+@pytest.mark.parametrize("grain", GRAINS)
+def test_bucket_bounds_matches_the_api(grain):
+    ts = _ts_template("bucketBounds").replace("${grain}", grain).replace("$1", "%(start)s").replace("$2", "%(end)s")
+    assert _squash(bucket_bounds(grain)) == _squash(ts)
+
+
+@pytest.mark.parametrize("alias", ["w", "p"])
+def test_edge_rows_matches_the_api(alias):
+    assert _squash(edge_rows(alias)) == _squash(_ts_template("edgeRows").replace("${alias}", alias))
+
+
+@pytest.mark.parametrize("block,well,want", [
+    (False, False, ""),
+    (True, False, " and w.block = %(block)s"),
+    (False, True, " and w.well_bore_code = %(well)s"),
+    (True, True, " and w.block = %(block)s and w.well_bore_code = %(well)s"),
+])
+def test_filters(block, well, want):
+    assert _filters("w", block, well) == want
+
+
+@pytest.mark.parametrize("groupby", ["day", *GRAINS])
+@pytest.mark.parametrize("block", [False, True])
+@pytest.mark.parametrize("well", [False, True])
+def test_aceh_sql_filters_every_source(groupby, block, well):
+    sql = aceh_sql(groupby, block, well)
+    sources = 1 if groupby == "day" else 2  # rollup buckets + edge days
+    assert sql.count("block = %(block)s") == (sources if block else 0)
+    assert sql.count("well_bore_code = %(well)s") == (sources if well else 0)
+    assert set(re.findall(r"%\((\w+)\)s", sql)) <= {"tenant", "start", "end", "block", "well"}
+
+
+def test_production_sql_parameters():
+    for groupby in ("day", *GRAINS):
+        assert set(re.findall(r"%\((\w+)\)s", production_sql(groupby))) == {"tenant", "start", "end"}
+
+
+# --- against Postgres: rollups + edges must equal a date_trunc over the base tables ---
+
+def _migration(name: str) -> str:
+    return (API_SRC / "sql" / name).read_text()
+
+
+@pytest.fixture
+def direct():
+    if not TEST_URL:
+        pytest.skip("set CHAT_TEST_POSTGRES_URL to run the SQL comparison")
+    psycopg = pytest.importorskip("psycopg")
+    pytest.importorskip("psycopg_pool")
+    from services.chat.data_access import DirectData
+
+    schema = f"chat_test_{uuid.uuid4().hex[:8]}"
+    url = psycopg.conninfo.make_conninfo(TEST_URL, options=f"-c search_path={schema}")
+    rng = random.Random(7)
+    day0 = date(2022, 11, 20)
+    with psycopg.connect(TEST_URL, autocommit=True) as conn:
+        conn.execute(f"create schema {schema}")
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute(_migration("002_well_daily.sql").split("create table if not exists geo_blocks")[0])
+        conn.execute("""create table production_timeseries (ts date not null, oil_bopd double precision not null,
+                        gas_mmscfd double precision not null, tenant_id text not null default 'demo')""")
+        with conn.cursor() as cur:
+            cur.executemany(
+                "insert into well_daily(ts, well_bore_code, block, bore_oil_vol, bore_gas_vol, bore_wat_vol) values (%s,%s,%s,%s,%s,%s)",
+                [(day0 + timedelta(days=d), w, blk, rng.uniform(0, 900), rng.uniform(0, 50), rng.uniform(0, 300))
+                 for d in range(500) for w, blk in (("A-1", "A"), ("A-2", "A"), ("B-1", "B")) if rng.random() > 0.1])
+            cur.executemany("insert into production_timeseries(ts, oil_bopd, gas_mmscfd) values (%s,%s,%s)",
+                            [(day0 + timedelta(days=d), rng.uniform(800, 1200), rng.uniform(5, 9)) for d in range(500)])
+        conn.execute(_migration("006_rollups.sql"))
+
+    data = DirectData(url, max_size=2)
+    yield data, url
+    with psycopg.connect(TEST_URL, autocommit=True) as conn:
+        conn.execute(f"drop schema {schema} cascade")
+
+
+def _reference(url, sql, params):
+    import psycopg
+    with psycopg.connect(url) as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [list(c) for c in zip(*rows)] if rows else []
+
+
+RANGES = [("2023-01-17", "2023-11-09"), ("2023-03-01", "2023-06-01"), ("2023-05-03", "2023-05-20"),
+          ("2023-02-06", "2023-02-27"), ("2022-10-01", "2024-06-01")]
+
+
+def _close(a, b):
+    return len(a) == len(b) and all(abs(x - y) <= 1e-6 * max(1.0, abs(x)) for x, y in zip(a, b))
+
+
+@pytest.mark.parametrize("groupby", ["day", *GRAINS])
+def test_direct_reads_equal_date_trunc_over_the_base_tables(direct, groupby):
+    data, url = direct
+
+    async def run():
+        await data.pool.open(wait=True)
+        try:
+            out = []
+            for start, end in RANGES:
+                for block, well in ((None, None), ("A", None), (None, "B-1"), ("A", "A-2")):
+                    got = await data.aceh_production({"start": start, "end": end, "groupby": groupby,
+                                                      "block": block, "well": well})
+                    out.append(("aceh", start, end, block, well, got))
+                got = await data.production({"start": start, "end": end, "groupby": groupby})
+                out.append(("production", start, end, None, None, got))
+            return out
+        finally:
+            await data.stop()
+
+    for kind, start, end, block, well, got in asyncio.run(run()):
+        params = {"start": start, "end": end, "block": block, "well": well}
+        if kind == "aceh":
+            dates, oil, gas, water = _reference(url, f"""
+                select to_char(date_trunc('{groupby}', ts), 'YYYY-MM-DD'), sum(bore_oil_vol), sum(bore_gas_vol), sum(bore_wat_vol)
+                from well_daily where tenant_id = 'demo' and ts >= %(start)s::date and ts < %(end)s::date
+                  and (%(block)s::text is null or block = %(block)s) and (%(well)s::text is null or well_bore_code = %(well)s)
+                group by 1 order by 1""", params) or ([], [], [], [])
+            assert got["dates"] == dates, (start, end, block, well)
+            assert _close(got["oil"], oil) and _close(got["gas"], gas) and _close(got["water"], water)
+            assert (got["block"], got["well"], got["groupby"]) == (block, well, groupby)
+        else:
+            dates, oil, gas = _reference(url, f"""
+                select to_char(date_trunc('{groupby}', ts), 'YYYY-MM-DD'), avg(oil_bopd), avg(gas_mmscfd)
+                from production_timeseries where tenant_id = 'demo' and ts >= %(start)s::date and ts < %(end)s::date
+                group by 1 order by 1""", params) or ([], [], [])
+            assert got["dates"] == dates and _close(got["oil"], oil) and _close(got["gas"], gas), (start, end)
+            assert set(got) == {"start", "end", "groupby", "dates", "oil", "gas"}
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from services.chat.tool_cache import TimeseriesCache, bucket_ceil, bucket_floor, split_range
+
+FIELDS = ("oil", "gas")
+
+
+class FakeApi:
+    """/api/metrics/*: daily rows summed per date_trunc bucket over [start, end)"""
+
+    def __init__(self, offset=0):
+        self.offset = offset
+        self.calls = []
+
+    async def __call__(self, params):
+        self.calls.append((params["start"], params["end"]))
+        start, end = date.fromisoformat(params["start"]), date.fromisoformat(params["end"])
+        buckets = {}
+        d = start
+        while d < end:
+            b = bucket_floor(d, params["groupby"]).isoformat()
+            oil, gas = buckets.get(b, (0, 0))
+            buckets[b] = (oil + d.toordinal() % 17 + self.offset, gas + d.day)
+            d += timedelta(days=1)
+        dates = sorted(buckets)
+        return {**params, "dates": dates, "oil": [buckets[b][0] for b in dates], "gas": [buckets[b][1] for b in dates]}
+
+
+def _get(cache, api, start, end, groupby):
+    args = {"start": start, "end": end, "groupby": groupby}
+    return asyncio.run(cache.get("production", args, api, FIELDS))
+
+
+def test_bucket_edges():
+    assert bucket_floor(date(2024, 3, 14), "month") == date(2024, 3, 1)
+    assert bucket_floor(date(2024, 3, 14), "week") == date(2024, 3, 11)  # Monday, like date_trunc
+    assert bucket_ceil(date(2024, 3, 1), "month") == date(2024, 3, 1)
+    assert bucket_ceil(date(2024, 12, 2), "month") == date(2025, 1, 1)
+    assert split_range(date(2024, 1, 15), date(2024, 4, 10), "month") == \
+        ([(date(2024, 1, 15), date(2024, 2, 1)), (date(2024, 4, 1), date(2024, 4, 10))],
+         [date(2024, 2, 1), date(2024, 3, 1)])
+    assert split_range(date(2024, 1, 3), date(2024, 1, 20), "month") == ([(date(2024, 1, 3), date(2024, 1, 20))], [])
+    assert split_range(date(2024, 1, 1), date(2024, 3, 1), "month") == ([], [date(2024, 1, 1), date(2024, 2, 1)])
+
+
+@pytest.mark.parametrize("groupby", ["week", "month"])
+@pytest.mark.parametrize("warm,start,end", [
+    (("2023-01-01", "2023-12-31"), "2023-03-15", "2024-02-10"),  # overlap on the left, mid-bucket edges
+    (("2023-06-01", "2024-06-01"), "2023-02-20", "2023-08-07"),  # overlap on the right
+    (("2023-01-01", "2023-12-31"), "2023-05-03", "2023-05-06"),  # inside one bucket
+    (("2023-01-01", "2023-12-31"), "2023-05-01", "2023-06-01"),  # exactly one month bucket
+    (("2023-03-10", "2023-03-20"), "2023-01-01", "2024-01-01"),  # aligned on month starts
+])
+def test_stitched_range_equals_a_single_fetch(groupby, warm, start, end):
+    cache, api = TimeseriesCache(), FakeApi()
+    _get(cache, api, *warm, groupby)
+    got = _get(cache, api, start, end, groupby)
+    want = asyncio.run(FakeApi()({"start": start, "end": end, "groupby": groupby}))
+    assert got == want
+
+
+def test_only_missing_runs_and_edges_are_fetched():
+    cache, api = TimeseriesCache(), FakeApi()
+    _get(cache, api, "2024-01-01", "2024-07-01", "month")
+    api.calls.clear()
+
+    _get(cache, api, "2024-03-10", "2024-10-20", "month")
+    assert sorted(api.calls) == [("2024-03-10", "2024-04-01"),   # left edge
+                                 ("2024-07-01", "2024-10-01"),   # the uncached whole months
+                                 ("2024-10-01", "2024-10-20")]   # right edge
+    assert cache.stats["bucket_hits"] == 3 and cache.stats["buckets_fetched"] == 6 + 3
+
+    api.calls.clear()
+    _get(cache, api, "2024-02-01", "2024-09-01", "month")
+    assert api.calls == []  # every bucket is cached, and no edges
+    _get(cache, api, "2024-02-01", "2024-09-01", "month")
+    assert api.calls == [] and cache.stats["hits"] == 1
+
+
+def test_invalidation_during_a_fetch_stores_nothing_stale():
+    cache, old, new = TimeseriesCache(), FakeApi(), FakeApi(offset=100)
+    release = asyncio.Event()
+
+    async def slow_old(params):
+        await release.wait()
+        return await old(params)
+
+    async def go():
+        args = {"start": "2024-01-01", "end": "2024-04-01", "groupby": "month"}
+        pending = asyncio.create_task(cache.get("production", args, slow_old, FIELDS))
+        await asyncio.sleep(0)
+        cache.invalidate()  # new rows were loaded while the old read was in flight
+        release.set()
+        stale = await pending
+        fresh = await cache.get("production", args, new, FIELDS)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(go())
+    assert stale["oil"] != fresh["oil"]
+    assert fresh == asyncio.run(FakeApi(offset=100)({"start": "2024-01-01", "end": "2024-04-01", "groupby": "month"}))
+    assert len(new.calls) == 1
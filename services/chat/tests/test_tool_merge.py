@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from services.chat.tool_merge import call_label, merge_results, plan_calls, run_calls
+
+
+def _viz(name, title="Oil production", y="bopd"):
+    return {"type": "viz", "title": title, "traces": [{"name": name, "x": [1], "y": [2]}],
+            "layout": {"yaxis_title": y}}
+
+
+def test_plan_calls_keeps_named_calls_up_to_the_limit():
+    assert plan_calls({"type": "tool", "name": "files.search", "args": {}}, 8) == \
+        [{"type": "tool", "name": "files.search", "args": {}}]
+    calls = [{"name": f"t{i}"} for i in range(5)]
+    plan = {"type": "tools", "calls": [{"args": {}}, "junk", None, *calls]}
+    assert plan_calls(plan, 3) == calls[:3]
+    assert plan_calls({"type": "tools"}, 8) == [] and plan_calls({"type": "tool"}, 8) == []
+
+
+def test_call_label():
+    assert call_label({"block": "A", "start": "2020-01-01", "end": "2021-01-01"}) == "A / 2020-01-01..2021-01-01"
+    assert call_label({"well": "W-1", "q": "gas", "end": "2021"}) == "W-1 / gas / ..2021"
+    assert call_label({"groupby": "month"}) == ""
+
+
+def test_vizzes_merge_into_one_with_labelled_traces():
+    calls = [{"args": {"block": "A"}}, {"args": {"block": "B"}}]
+    [viz] = merge_results(calls, [_viz("oil"), _viz("oil")])
+    assert [t["name"] for t in viz["traces"]] == ["oil — A", "oil — B"]
+    assert viz["title"] == "Oil production" and viz["layout"]["yaxis_title"] == "bopd"
+
+
+def test_identical_calls_keep_plain_trace_names_and_mixed_units_fall_back():
+    calls = [{"args": {}}, {"args": {}}]
+    [viz] = merge_results(calls, [_viz("oil"), _viz("gas", "Gas production", "mmscfd")])
+    assert [t["name"] for t in viz["traces"]] == ["oil", "gas"]
+    assert viz["title"] == "Oil production vs Gas production" and viz["layout"]["yaxis_title"] == "Value"
+
+
+def test_single_viz_is_passed_through():
+    out = _viz("oil")
+    assert merge_results([{"args": {"block": "A"}}], [out]) == [out]
+
+
+def test_tables_group_by_columns_and_drop_duplicate_rows():
+    a = {"type": "table", "columns": ["id", "filename"], "rows": [{"id": 1, "filename": "a"}, {"id": 2, "filename": "b"}]}
+    b = {"type": "table", "columns": ["id", "filename"], "rows": [{"filename": "b", "id": 2}, {"id": 3, "filename": "c"}]}
+    c = {"type": "table", "columns": ["date", "oil"], "rows": [{"date": "2020", "oil": 1}]}
+    text = {"type": "text", "text": "no data"}
+    merged = merge_results([{"args": {}}] * 4, [a, text, b, c])
+    assert merged == [
+        {"type": "table", "columns": ["id", "filename"],
+         "rows": [{"id": 1, "filename": "a"}, {"id": 2, "filename": "b"}, {"id": 3, "filename": "c"}]},
+        {"type": "table", "columns": ["date", "oil"], "rows": [{"date": "2020", "oil": 1}]},
+        text,
+    ]
+
+
+def test_run_calls_turns_failures_into_text_and_keeps_the_rest():
+    async def run_tool(name, args):
+        if args.get("block") == "B":
+            raise RuntimeError("API down")
+        return _viz(f"oil {name}")
+
+    calls = [{"name": "production.timeseries", "args": {"block": "A"}},
+             {"name": "production.timeseries", "args": {"block": "B"}},
+             {"name": "production.timeseries"}]
+    viz, failed = asyncio.run(run_calls(calls, run_tool, asyncio.Semaphore(2)))
+    assert len(viz["traces"]) == 2
+    assert failed == {"type": "text", "text": "production.timeseries (B) failed: API down"}
+
+
+@pytest.mark.parametrize("slots", [1, 3])
+def test_run_calls_respects_the_concurrency_slots(slots):
+    running, peak = 0, 0
+
+    async def run_tool(name, args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"type": "text", "text": name}
+
+    async def go():
+        return await run_calls([{"name": f"t{i}"} for i in range(6)], run_tool, asyncio.Semaphore(slots))
+
+    out = asyncio.run(go())
+    assert [o["text"] for o in out] == [f"t{i}" for i in range(6)]
+    assert peak == slots
@@ -0,0 +1,166 @@
+import asyncio, time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Optional
+
+GROUPBYS = ("day", "week", "month")
+
+def bucket_floor(d: date, groupby: str) -> date:
+    """Start of the bucket holding ``d`` (same as Postgres date_trunc)"""
+    if groupby == "month":
+        return d.replace(day=1)
+    if groupby == "week":
+        return d - timedelta(days=d.weekday())
+    return d
+
+def bucket_next(b: date, groupby: str) -> date:
+    if groupby == "month":
+        return (b.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return b + timedelta(days=7 if groupby == "week" else 1)
+
+def bucket_ceil(d: date, groupby: str) -> date:
+    b = bucket_floor(d, groupby)
+    return b if b == d else bucket_next(b, groupby)
+
+def split_range(start: date, end: date, groupby: str) -> tuple[list[tuple[date, date]], list[date]]:
+    """``[start, end)`` as partial edge ranges plus the whole buckets in between.
+
+    Only whole buckets are reusable across requests; a range that starts or
+    ends mid-bucket gets that edge fetched exactly, so the stitched answer
+    equals what a single query over ``[start, end)`` returns.
+    """
+    first, last = bucket_ceil(start, groupby), bucket_floor(end, groupby)
+    if first > last:  # inside one bucket
+        return [(start, end)], []
+    edges = [(a, b) for a, b in ((start, first), (last, end)) if a < b]
+    buckets = []
+    b = first
+    while b < last:
+        buckets.append(b)
+        b = bucket_next(b, groupby)
+    return edges, buckets
+
+def _runs(buckets: list[date], groupby: str) -> list[tuple[date, date]]:
+    """Contiguous runs of bucket starts as ``[start, end)`` date ranges"""
+    runs = []
+    for b in buckets:
+        if runs and runs[-1][1] == b:
+            runs[-1][1] = bucket_next(b, groupby)
+        else:
+            runs.append([b, bucket_next(b, groupby)])
+    return [tuple(r) for r in runs]
+
+Fetch = Callable[[dict], Awaitable[dict]]
+
+class TimeseriesCache:
+    """Tool-result cache for the metrics timeseries endpoints.
+
+    Two layers: whole results keyed by the normalized tool arguments, and
+    per-series (groupby, block, well) buckets. A new range that overlaps
+    earlier ones is answered from cached whole buckets; only the missing
+    bucket runs and the partial edges are fetched. ``invalidate()`` (called
+    when the API loads new rows) drops both layers; ``ttl_s`` bounds how
+    long anything is trusted if a load is never announced.
+    """
+
+    def __init__(self, ttl_s: float = 3600, max_results: int = 256, max_series: int = 128):
+        self.ttl_s = ttl_s
+        self.max_results = max_results
+        self.max_series = max_series
+        self.generation = 0
+        self._results: OrderedDict = OrderedDict()  # args key -> (stored_at, data)
+        self._series: OrderedDict = OrderedDict()   # (tool, groupby, block, well) -> {bucket iso: (stored_at, row | None)}
+        self.stats = {"hits": 0, "misses": 0, "stitched": 0, "bucket_hits": 0, "buckets_fetched": 0,
+                      "fetches": 0, "invalidations": 0}
+
+    @staticmethod
+    def normalize(args: dict, dims: tuple[str, ...]) -> Optional[dict]:
+        """Arguments as the API will read them; ``None`` when they can't be cached"""
+        try:
+            start = date.fromisoformat(str(args["start"])[:10])
+            end = date.fromisoformat(str(args["end"])[:10])
+        except (KeyError, ValueError):
+            return None
+        groupby = args.get("groupby") if args.get("groupby") in GROUPBYS else "month"
+        params = {"start": start.isoformat(), "end": end.isoformat(), "groupby": groupby}
+        for d in dims:
+            params[d] = (str(args.get(d) or "").strip() or None)
+        return params
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.ttl_s
+
+    async def get(self, tool: str, args: dict, fetch: Fetch, fields: tuple[str, ...],
+                  dims: tuple[str, ...] = ()) -> dict:
+        params = self.normalize(args, dims)
+        if params is None:
+            self.stats["fetches"] += 1
+            return await fetch(args)
+        key = (tool,) + tuple(params.items())
+        hit = self._results.get(key)
+        if hit is not None and self._fresh(hit[0]):
+            self._results.move_to_end(key)
+            self.stats["hits"] += 1
+            return hit[1]
+        self.stats["misses"] += 1
+        generation = self.generation
+        data = await self._stitch(tool, params, fetch, fields, dims, generation)
+        if generation == self.generation:
+            self._results[key] = (time.time(), data)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return data
+
+    async def _stitch(self, tool, params, fetch, fields, dims, generation) -> dict:
+        groupby = params["groupby"]
+        start, end = date.fromisoformat(params["start"]), date.fromisoformat(params["end"])
+        series_key = (tool, groupby) + tuple(params[d] for d in dims)
+        series = self._series.setdefault(series_key, {})
+        self._series.move_to_end(series_key)
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+
+        edges, buckets = split_range(start, end, groupby) if start < end else ([], [])
+        cached = {b: series[b.isoformat()] for b in buckets
+                  if b.isoformat() in series and self._fresh(series[b.isoformat()][0])}
+        missing = [b for b in buckets if b not in cached]
+        ranges = edges + _runs(missing, groupby)
+
+        async def fetch_range(a: date, b: date) -> dict:
+            return await fetch({**params, "start": a.isoformat(), "end": b.isoformat()})
+
+        results = await asyncio.gather(*(fetch_range(a, b) for a, b in ranges))
+        self.stats["fetches"] += len(ranges)
+        self.stats["bucket_hits"] += len(cached)
+        self.stats["buckets_fetched"] += len(missing)
+        if cached:
+            self.stats["stitched"] += 1
+
+        rows: dict[str, dict] = {}
+        for data in results:
+            for i, ts in enumerate(data.get("dates", [])):
+                rows[str(ts)[:10]] = {f: data[f][i] for f in fields}
+        if generation == self.generation:
+            now = time.time()
+            for b in missing:  # a whole bucket with no rows is cached as empty
+                series[b.isoformat()] = (now, rows.get(b.isoformat()))
+        for b, (_, row) in cached.items():
+            if row is not None:
+                rows[b.isoformat()] = row
+
+        dates = sorted(rows)
+        return {**params, "dates": dates, **{f: [rows[d][f] for d in dates] for f in fields}}
+
+    def invalidate(self) -> dict:
+        dropped = {"results": len(self._results), "series": len(self._series)}
+        self.generation += 1
+        self._results.clear()
+        self._series.clear()
+        self.stats["invalidations"] += 1
+        return dropped
+
+    def info(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "results": len(self._results), "series": len(self._series),
+                "buckets": sum(len(s) for s in self._series.values()), "ttl_s": self.ttl_s,
+                "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else None}
@@ -0,0 +1,65 @@
+import asyncio, json
+from typing import Awaitable, Callable
+
+def plan_calls(plan_obj: dict, limit: int) -> list[dict]:
+    """The calls a ``tool`` or ``tools`` plan actually runs: named ones, at most ``limit``"""
+    calls = plan_obj.get("calls") if plan_obj.get("type") == "tools" else [plan_obj]
+    return [c for c in (calls or []) if isinstance(c, dict) and c.get("name")][:limit]
+
+def call_label(args: dict) -> str:
+    """What tells one call of a multi-tool plan from the others (block, well, metric, range)"""
+    parts = [str(args[k]) for k in ("block", "well", "q") if args.get(k)]
+    if args.get("start") or args.get("end"):
+        parts.append(f"{args.get('start', '')}..{args.get('end', '')}")
+    return " / ".join(parts)
+
+def merge_results(calls: list[dict], results: list[dict]) -> list[dict]:
+    """One viz with every trace, one table per column set, then any text results.
+
+    Trace names get their call's label when the calls differ in block, well,
+    query or range, so "oil — A" and "oil — B" stay apart in the legend.
+    """
+    labels = [call_label(c.get("args") or {}) for c in calls]
+    distinct = len(set(labels)) > 1
+    vizzes, tables, texts = [], {}, []
+    for label, out in zip(labels, results):
+        if out.get("type") == "viz":
+            vizzes.append((label, out))
+        elif out.get("type") == "table":
+            tables.setdefault(tuple(out.get("columns") or []), []).append(out)
+        else:
+            texts.append(out)
+    merged = []
+    if len(vizzes) == 1:
+        merged.append(vizzes[0][1])
+    elif vizzes:
+        traces = [{**t, "name": f"{t.get('name', '')} — {label}" if distinct and label else t.get("name", "")}
+                  for label, v in vizzes for t in v.get("traces", [])]
+        y_titles = {(v.get("layout") or {}).get("yaxis_title") for _, v in vizzes}
+        titles = list(dict.fromkeys(v.get("title", "") for _, v in vizzes))
+        merged.append({"type": "viz",
+                       "title": " vs ".join(titles) if len(titles) <= 3 else f"{len(traces)} series",
+                       "traces": traces,
+                       "layout": {"xaxis_title": "Date", "yaxis_title": y_titles.pop() if len(y_titles) == 1 else "Value",
+                                  "legend": True}})
+    for cols, outs in tables.items():
+        rows = list({json.dumps(r, sort_keys=True, default=str): r for o in outs for r in o.get("rows", [])}.values())
+        merged.append({"type": "table", "columns": list(cols), "rows": rows})
+    return merged + texts
+
+async def run_calls(calls: list[dict], run_tool: Callable[[str, dict], Awaitable[dict]],
+                    slots: asyncio.Semaphore) -> list[dict]:
+    """Run ``calls`` concurrently, at most ``slots`` at a time, and merge their results;
+    a call that raises becomes a text result instead of failing the others"""
+    async def run(call: dict):
+        async with slots:
+            return await run_tool(call["name"], call.get("args") or {})
+
+    results = await asyncio.gather(*(run(c) for c in calls), return_exceptions=True)
+    outs = []
+    for call, r in zip(calls, results):
+        if isinstance(r, Exception):
+            print(f"Tool {call['name']} failed: {r}")
+            r = {"type": "text", "text": f"{call['name']} ({call_label(call.get('args') or {}) or 'no args'}) failed: {r}"}
+        outs.append(r)
+    return merge_results(calls, outs)
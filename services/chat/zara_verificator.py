@@ -64,6 +64,7 @@ class ZaraVerificator:
                 "clarify", "more details"
             ]
         }
+        self._seed_embeddings: Optional[List[Tuple[str, List[float]]]] = None
     
     async def verify_and_route(self, user_input: str, user_id: str = "demo") -> RouteDecision:
         """Main verification and routing function"""
@@ -114,33 +115,30 @@ class ZaraVerificator:
     async def _classify_intent(self, user_input: str) -> Tuple[str, float]:
         """Classify intent using embedding similarity"""
         try:
-            # Get embedding for user input
             async with httpx.AsyncClient(timeout=5) as client:
-                response = await client.post(
-                    f"{self.embed_service_url}/embeddings",
-                    json={"model": "mxbai-embed-large:latest", "input": [user_input]}
-                )
-                if response.status_code == 200:
-                    user_embedding = response.json()["data"][0]["embedding"]
-                else:
+                # Seed embeddings never change, so fetch them once in a single batch
+                if self._seed_embeddings is None:
+                    pairs = [(intent, seed) for intent, seeds in self.intent_seeds.items() for seed in seeds]
+                    vectors = await self._embed(client, [seed for _, seed in pairs])
+                    if vectors is None:
+                        return "general", 0.5
+                    self._seed_embeddings = [(intent, vec) for (intent, _), vec in zip(pairs, vectors)]
+                
+                # Get embedding for user input
+                vectors = await self._embed(client, [user_input])
+                if vectors is None:
                     return "general", 0.5
+                user_embedding = vectors[0]
             
             best_intent = "general"
             best_score = 0.0
             
             # Compare with intent seeds
-            for intent, seeds in self.intent_seeds.items():
-                for seed in seeds:
-                    seed_response = await client.post(
-                        f"{self.embed_service_url}/embeddings",
-                        json={"model": "mxbai-embed-large:latest", "input": [seed]}
-                    )
-                    if seed_response.status_code == 200:
-                        seed_embedding = seed_response.json()["data"][0]["embedding"]
-                        similarity = self._cosine_similarity(user_embedding, seed_embedding)
-                        if similarity > best_score:
-                            best_score = similarity
-                            best_intent = intent
+            for intent, seed_embedding in self._seed_embeddings:
+                similarity = self._cosine_similarity(user_embedding, seed_embedding)
+                if similarity > best_score:
+                    best_score = similarity
+                    best_intent = intent
             
             return best_intent, best_score
             
@@ -148,6 +146,16 @@ class ZaraVerificator:
             print(f"Intent classification failed: {e}")
             return "general", 0.5
     
+    async def _embed(self, client: httpx.AsyncClient, texts: List[str]) -> Optional[List[List[float]]]:
+        """Embed a batch of texts via the embedding service"""
+        response = await client.post(
+            f"{self.embed_service_url}/embeddings",
+            json={"model": "mxbai-embed-large:latest", "input": texts}
+        )
+        if response.status_code != 200:
+            return None
+        return [e["embedding"] for e in response.json()["data"]]
+    
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors"""
         dot_product = sum(a * b for a, b in zip(vec1, vec2))
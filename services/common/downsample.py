@@ -0,0 +1,136 @@
+import base64, math, struct
+from datetime import date
+from typing import List, Optional, Sequence
+
+METHODS = ("minmax", "lttb")
+ENCODINGS = ("json", "compact")
+
+
+def _finite(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+
+
+def minmax_indices(ys: Sequence, n: int) -> List[int]:
+    """Min and max of each of ``n/2`` buckets, in order.
+
+    Every local peak and trough survives at bucket resolution. A bucket
+    holding nulls also keeps its first null so gaps stay gaps (one extra
+    point per such bucket).
+    """
+    N = len(ys)
+    if n >= N or n < 2:
+        return list(range(N))
+    buckets = max(1, n // 2)
+    out: List[int] = []
+    for b in range(buckets):
+        lo_i = hi_i = gap_i = None
+        for i in range(b * N // buckets, (b + 1) * N // buckets):
+            v = ys[i]
+            if not _finite(v):
+                if gap_i is None:
+                    gap_i = i
+                continue
+            if lo_i is None or v < ys[lo_i]:
+                lo_i = i
+            if hi_i is None or v > ys[hi_i]:
+                hi_i = i
+        out.extend(sorted({i for i in (lo_i, hi_i, gap_i) if i is not None}))
+    return out
+
+
+def lttb_indices(xs: Sequence[float], ys: Sequence, n: int) -> List[int]:
+    """Largest-Triangle-Three-Buckets over the finite points of ``ys``"""
+    valid = [i for i, v in enumerate(ys) if _finite(v)]
+    N = len(valid)
+    if n >= N or n < 3:
+        return valid
+    every = (N - 2) / (n - 2)
+    out = [valid[0]]
+    a = 0
+    for i in range(n - 2):
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        nxt_end = min(int(math.floor((i + 2) * every)) + 1, N)
+        nxt = valid[end:nxt_end] or [valid[-1]]
+        avg_x = sum(xs[j] for j in nxt) / len(nxt)
+        avg_y = sum(ys[j] for j in nxt) / len(nxt)
+        ax, ay = xs[valid[a]], ys[valid[a]]
+        best, best_area = start, -1.0
+        for k in range(start, end):
+            j = valid[k]
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = k, area
+        out.append(valid[best])
+        a = best
+    out.append(valid[-1])
+    return out
+
+
+def _day(x) -> Optional[int]:
+    try:
+        return date.fromisoformat(str(x)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def _x_numbers(x: Sequence) -> List[float]:
+    """Numeric x for LTTB: numbers as is, ISO dates as day ordinals, otherwise the position"""
+    if all(_finite(v) for v in x):
+        return list(x)
+    days = [_day(v) for v in x]
+    return days if None not in days else list(range(len(x)))
+
+
+def downsample_trace(trace: dict, points: int, method: str = "minmax") -> dict:
+    x, y = trace.get("x") or [], trace.get("y") or []
+    if len(y) <= points or len(x) != len(y):
+        return trace
+    if method not in METHODS:
+        raise ValueError(f"unknown downsampling method {method!r}, expected one of {METHODS}")
+    keep = minmax_indices(y, points) if method == "minmax" else lttb_indices(_x_numbers(x), y, points)
+    return {**trace, "x": [x[i] for i in keep], "y": [y[i] for i in keep]}
+
+
+def encode_dates(x: Sequence) -> Optional[dict]:
+    """ISO dates as a start date plus day deltas (None if any x is not a date)"""
+    days = [_day(v) for v in x]
+    if not days or None in days:
+        return None
+    return {"enc": "date_delta", "start": date.fromordinal(days[0]).isoformat(),
+            "d": [b - a for a, b in zip(days, days[1:])]}
+
+
+def encode_f32(y: Sequence) -> Optional[dict]:
+    """Little-endian float32, base64; nulls become NaN (Plotly draws a gap either way)"""
+    if not all(_finite(v) or v is None for v in y):
+        return None
+    vals = [float(v) if v is not None else math.nan for v in y]
+    return {"enc": "f32", "b64": base64.b64encode(struct.pack(f"<{len(vals)}f", *vals)).decode()}
+
+
+def downsample_viz(payload: dict, points: Optional[int] = 2000, method: str = "minmax",
+                   encoding: str = "json") -> dict:
+    """Bound every trace of a ``viz`` payload to about ``points`` points.
+
+    ``encoding="compact"`` also replaces date x arrays with day deltas and y
+    arrays with base64 float32, which clients that sent ``viz_encoding``
+    decode (apps/web/lib/vizDecode.ts).
+    """
+    traces = payload.get("traces") or []
+    source = [len(t.get("y") or []) for t in traces]
+    if points:
+        traces = [downsample_trace(t, points, method) for t in traces]
+    if encoding == "compact":
+        encoded = []
+        for t in traces:
+            t = dict(t)
+            x, y = encode_dates(t.get("x") or []), encode_f32(t.get("y") or [])
+            if x:
+                t["x"] = x
+            if y:
+                t["y"] = y
+            encoded.append(t)
+        traces = encoded
+    return {**payload, "traces": traces,
+            "downsampled": {"method": method, "points": points, "encoding": encoding, "source_points": source}}
@@ -0,0 +1,176 @@
+import asyncio, os, time
+from typing import Awaitable, Callable, Dict, Optional
+import logging
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL_S = float(os.getenv("HEALTH_PROBE_INTERVAL_S", 30))
+PROBE_TIMEOUT_S = float(os.getenv("HEALTH_PROBE_TIMEOUT_S", 3))
+DEEP_TIMEOUT_S = float(os.getenv("HEALTH_DEEP_TIMEOUT_S", 60))
+DEEP_MIN_INTERVAL_S = float(os.getenv("HEALTH_DEEP_MIN_INTERVAL_S", 30))  # deep results are reused this long
+STALE_AFTER = 3  # probe results older than 3 intervals no longer count as ready
+
+Check = Callable[[], Awaitable[Optional[dict]]]
+
+
+def http_probe(url: str, headers: Optional[dict] = None, timeout: float = PROBE_TIMEOUT_S) -> Check:
+    """Probe that GETs a cheap endpoint; any answer below 500 means the upstream is up"""
+    async def check():
+        async with httpx.AsyncClient(timeout=timeout) as cli:
+            r = await cli.get(url, headers=headers)
+        if r.status_code >= 500:
+            raise RuntimeError(f"HTTP {r.status_code}")
+        return {"status_code": r.status_code}
+    return check
+
+
+class HealthMonitor:
+    """Tiered health for a service.
+
+    * ``/health/live``: the process answers; no upstream calls
+    * ``/health/ready``: cached results of cheap dependency probes that run
+      in the background every ``interval_s`` (503 when a required one is down)
+    * ``/health/deep``: runs the probes plus the expensive checks (a real
+      generation, an embedding) now; concurrent callers share one run and
+      results are reused for ``DEEP_MIN_INTERVAL_S``
+
+    ``/health`` returns the readiness payload with status 200 so that
+    existing dashboards keep polling something cheap.
+    """
+
+    def __init__(self, service: str, interval_s: float = PROBE_INTERVAL_S, timeout_s: float = PROBE_TIMEOUT_S,
+                 details: Optional[Callable[[], dict]] = None):
+        self.service = service
+        self.interval_s = interval_s
+        self.timeout_s = timeout_s
+        self.details = details
+        self.started = time.time()
+        self._probes: Dict[str, tuple] = {}
+        self._deep: Dict[str, Check] = {}
+        self.results: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._deep_task: Optional[asyncio.Task] = None
+        self._deep_result: Optional[dict] = None
+        self._deep_at = 0.0
+
+    def probe(self, name: str, check: Check, required: bool = True):
+        """Register a cheap readiness probe (no generation, no writes)"""
+        self._probes[name] = (check, required)
+
+    def deep(self, name: str, check: Check):
+        """Register an expensive check that only runs on ``/health/deep``"""
+        self._deep[name] = check
+
+    async def _run(self, check: Check, timeout: float) -> dict:
+        t0 = time.monotonic()
+        try:
+            detail = await asyncio.wait_for(check(), timeout)
+            result = {"ok": True, **({"detail": detail} if detail else {})}
+        except Exception as e:
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}"[:300]}
+        result["latency_ms"] = round((time.monotonic() - t0) * 1000, 1)
+        result["checked_at"] = time.time()
+        return result
+
+    async def refresh(self, timeout: Optional[float] = None):
+        names = list(self._probes)
+        results = await asyncio.gather(*(self._run(self._probes[n][0], timeout or self.timeout_s) for n in names))
+        for name, result in zip(names, results):
+            result["required"] = self._probes[name][1]
+            if not result["ok"] and self.results.get(name, {}).get("ok", True):
+                logger.warning(f"{self.service} dependency '{name}' is down: {result['error']}")
+            self.results[name] = result
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:  # never let the prober die
+                logger.error(f"{self.service} health probes failed: {e}")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def live(self) -> dict:
+        return {"status": "alive", "service": self.service, "uptime_s": round(time.time() - self.started, 1)}
+
+    def _summary(self, results: Dict[str, dict], now: float) -> tuple:
+        checks = {}
+        ok = True
+        for name, (_, required) in self._probes.items():
+            r = results.get(name)
+            if r is None:
+                checks[name] = {"ok": False, "required": required, "error": "not probed yet"}
+            else:
+                age = now - r["checked_at"]
+                checks[name] = {**r, "required": required, "age_s": round(age, 1)}
+                if age > STALE_AFTER * self.interval_s:
+                    checks[name].update(ok=False, error="stale probe result")
+            if required and not checks[name]["ok"]:
+                ok = False
+        return ok, checks
+
+    def ready(self) -> tuple:
+        """``(ready, payload)`` from cached probe results only"""
+        ok, checks = self._summary(self.results, time.time())
+        degraded = any(not c["ok"] for c in checks.values())
+        status = "ready" if ok and not degraded else "degraded" if ok else "not_ready"
+        payload = {"status": status, "service": self.service, "checks": checks,
+                   "probe_interval_s": self.interval_s}
+        if self.details:
+            payload.update(self.details())
+        return ok, payload
+
+    async def _deep_run(self) -> dict:
+        await self.refresh(timeout=DEEP_TIMEOUT_S)
+        names = list(self._deep)
+        results = await asyncio.gather(*(self._run(self._deep[n], DEEP_TIMEOUT_S) for n in names))
+        self._deep_at = time.monotonic()
+        self._deep_result = dict(zip(names, results))
+        return self._deep_result
+
+    async def deep_check(self) -> tuple:
+        if self._deep_result is None or time.monotonic() - self._deep_at > DEEP_MIN_INTERVAL_S:
+            if self._deep_task is None or self._deep_task.done():
+                self._deep_task = asyncio.create_task(self._deep_run())
+            await asyncio.shield(self._deep_task)
+        ok, payload = self.ready()
+        deep = {name: {**r, "age_s": round(time.time() - r["checked_at"], 1)} for name, r in self._deep_result.items()}
+        ok = ok and all(r["ok"] for r in deep.values())
+        payload.update(status="healthy" if ok else "unhealthy", deep_checks=deep)
+        return ok, payload
+
+    def install(self, app: FastAPI):
+        """Add the health routes and run the probes for the app's lifetime"""
+        app.on_event("startup")(self.start)
+        app.on_event("shutdown")(self.stop)
+
+        @app.get("/health/live")
+        async def health_live():
+            return self.live()
+
+        @app.get("/health/ready")
+        async def health_ready():
+            ok, payload = self.ready()
+            return JSONResponse(payload, status_code=200 if ok else 503)
+
+        @app.get("/health/deep")
+        async def health_deep():
+            ok, payload = await self.deep_check()
+            return JSONResponse(payload, status_code=200 if ok else 503)
+
+        @app.get("/health")
+        async def health():
+            return self.ready()[1]
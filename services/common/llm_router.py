@@ -0,0 +1,374 @@
+import asyncio, json, os, time
+from collections import deque
+from typing import AsyncIterator, List, Optional
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "litellm,ollama,openai").split(",")
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))       # consecutive failures that open a circuit
+BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", 30))      # open -> half-open after this long
+CONNECT_TIMEOUT_S = float(os.getenv("LLM_CONNECT_TIMEOUT_S", 3))   # a dead host fails in seconds, not 120 s
+READ_TIMEOUT_S = float(os.getenv("LLM_READ_TIMEOUT_S", 120))
+HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", 8000))  # deadline until enough samples for a p95
+HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", 500))
+_MIN_SAMPLES = 10
+
+
+class LLMError(RuntimeError):
+    """Every provider failed (or none was available)"""
+
+
+class CircuitBreaker:
+    """closed -> open after ``failures`` consecutive errors -> half-open after ``reset_s``
+    (one probe request) -> closed on success, open again on failure"""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_s: float = BREAKER_RESET_S):
+        self.failures = failures
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self._probe_at: Optional[float] = None
+
+    def ready(self) -> bool:
+        """Would a request be let through (without claiming the half-open probe)"""
+        if self.state == "open":
+            return time.monotonic() - self.opened_at >= self.reset_s
+        if self.state == "half_open":
+            return self._probe_at is None or time.monotonic() - self._probe_at >= self.reset_s
+        return True
+
+    def allow(self) -> bool:
+        if not self.ready():
+            return False
+        if self.state != "closed":
+            self.state = "half_open"
+            self._probe_at = time.monotonic()
+        return True
+
+    def success(self):
+        self.state = "closed"
+        self.consecutive = 0
+        self._probe_at = None
+
+    def failure(self):
+        self.consecutive += 1
+        if self.state == "half_open" or self.consecutive >= self.failures:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probe_at = None
+
+
+class LatencyWindow:
+    """Recent latencies (seconds) for p50/p95 plus an EWMA for routing"""
+
+    def __init__(self, size: int = 200, alpha: float = 0.2):
+        self.samples: deque = deque(maxlen=size)
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def info(self) -> dict:
+        ms = lambda v: round(v * 1000, 1) if v is not None else None
+        return {"samples": len(self.samples), "p50_ms": ms(self.quantile(0.5)),
+                "p95_ms": ms(self.quantile(0.95)), "ewma_ms": ms(self.ewma)}
+
+
+class LLMProvider:
+    """One OpenAI-compatible chat completions endpoint with its own breaker and latency stats.
+
+    ``tier`` 0 providers are preferred; higher tiers (hosted fallbacks) are
+    only routed to when every lower tier is failing or slower to answer.
+    """
+
+    def __init__(self, name: str, base_url: Optional[str], model: str, api_key: Optional[str] = None,
+                 tier: int = 0, token_param: str = "max_tokens", fixed_temperature: bool = False):
+        self.name = name
+        self.base_url = (base_url or "").rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.tier = tier
+        self.token_param = token_param
+        self.fixed_temperature = fixed_temperature
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyWindow()   # full completion
+        self.ttft = LatencyWindow()      # time to first streamed token
+        self.stats = {"calls": 0, "failures": 0, "client_errors": 0, "hedged": 0, "hedge_wins": 0}
+        self.last_error: Optional[str] = None
+        self.reachable: Optional[bool] = None  # last readiness probe
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def available(self) -> bool:
+        return bool(self.base_url) and bool(self.model)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(READ_TIMEOUT_S, connect=CONNECT_TIMEOUT_S))
+        return self._client
+
+    def payload(self, messages: List[dict], max_tokens: Optional[int], temperature: Optional[float],
+                response_format: Optional[dict], stream: bool) -> dict:
+        body = {"model": self.model, "messages": messages}
+        if max_tokens:
+            body[self.token_param] = max_tokens
+        if temperature is not None and not self.fixed_temperature:
+            body["temperature"] = temperature
+        if response_format:
+            body["response_format"] = response_format
+        if stream:
+            body["stream"] = True
+        return body
+
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    async def complete(self, body: dict) -> str:
+        response = await self.client.post(f"{self.base_url}/chat/completions", headers=self.headers(), json=body)
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"] or ""
+
+    async def stream(self, body: dict) -> AsyncIterator[str]:
+        async with self.client.stream("POST", f"{self.base_url}/chat/completions",
+                                      headers=self.headers(), json=body) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: ") or line.endswith("[DONE]"):
+                    continue
+                try:
+                    delta = json.loads(line[6:])["choices"][0]["delta"].get("content") or ""
+                except (json.JSONDecodeError, KeyError, IndexError):
+                    continue
+                if delta:
+                    yield delta
+
+    async def probe(self, timeout: float = 5):
+        """Cheap reachability check: list models, no generation"""
+        response = await self.client.get(f"{self.base_url}/models", headers=self.headers(), timeout=timeout)
+        response.raise_for_status()
+
+    def hedge_deadline(self, streaming: bool) -> float:
+        """Seconds to wait before hedging: this provider's p95 once it has enough samples"""
+        window = self.ttft if streaming else self.latency
+        p95 = window.quantile(0.95) if len(window.samples) >= _MIN_SAMPLES else None
+        return max(HEDGE_MIN_MS / 1000, p95 if p95 is not None else HEDGE_DEFAULT_MS / 1000)
+
+    def info(self) -> dict:
+        return {"name": self.name, "model": self.model, "url": self.base_url, "tier": self.tier,
+                "available": self.available(), "state": self.breaker.state, "reachable": self.reachable,
+                "consecutive_failures": self.breaker.consecutive, "times_opened": self.breaker.opened,
+                "latency": self.latency.info(), "ttft": self.ttft.info(),
+                "last_error": self.last_error, **self.stats}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+
+def _is_client_error(e: Exception) -> bool:
+    """4xx other than 408/429: the request was refused, the provider is fine"""
+    if isinstance(e, httpx.HTTPStatusError):
+        code = e.response.status_code
+        return 400 <= code < 500 and code not in (408, 429)
+    return False
+
+
+class LLMRouter:
+    """Route chat completions over several providers.
+
+    * circuit breakers: a provider that keeps failing is skipped until its
+      reset window passes, then probed with a single request
+    * latency-aware order: within a tier, the provider with the lowest
+      recent latency goes first
+    * hedging (``LLM_HEDGE=1``): if the chosen provider has not answered (or,
+      streaming, produced a first token) by its own p95, the next provider is
+      started too and the first to answer wins; the loser is cancelled
+    """
+
+    def __init__(self, providers: List[LLMProvider], hedge: bool = HEDGE):
+        self.providers = providers
+        self.hedge = hedge
+
+    def order(self, streaming: bool = False) -> List[LLMProvider]:
+        ready = [p for p in self.providers if p.available() and p.breaker.ready()]
+        pos = {p.name: i for i, p in enumerate(self.providers)}
+
+        def key(p: LLMProvider):
+            window = p.ttft if streaming else p.latency
+            # untried providers keep config order and sort ahead of measured ones
+            return (p.tier, window.ewma if window.ewma is not None else 0.0, pos[p.name])
+
+        return sorted(ready, key=key)
+
+    def _failed(self, p: LLMProvider, e: Exception):
+        p.last_error = f"{type(e).__name__}: {e}"[:300]
+        if _is_client_error(e):
+            p.stats["client_errors"] += 1
+            p.breaker.success()  # it answered; it's up
+        else:
+            p.stats["failures"] += 1
+            p.breaker.failure()
+        logger.warning(f"LLM provider '{p.name}' failed: {p.last_error}")
+
+    async def _complete_one(self, p: LLMProvider, body: dict) -> str:
+        p.stats["calls"] += 1
+        t0 = time.monotonic()
+        try:
+            text = await p.complete(body)
+        except asyncio.CancelledError:
+            raise  # lost a hedge race; not the provider's fault
+        except Exception as e:
+            self._failed(p, e)
+            raise
+        p.latency.add(time.monotonic() - t0)
+        p.breaker.success()
+        return text
+
+    async def complete(self, messages: List[dict], max_tokens: Optional[int] = None,
+                       temperature: Optional[float] = None, response_format: Optional[dict] = None) -> str:
+        async def start(p: LLMProvider):
+            return asyncio.create_task(
+                self._complete_one(p, p.payload(messages, max_tokens, temperature, response_format, False)))
+        return await self._race(start, streaming=False)
+
+    async def _first_token(self, p: LLMProvider, body: dict):
+        """Open a stream and wait for its first token: ``(provider, iterator, first)``"""
+        p.stats["calls"] += 1
+        t0 = time.monotonic()
+        it = p.stream(body).__aiter__()
+        try:
+            first = await it.__anext__()
+        except asyncio.CancelledError:
+            await it.aclose()
+            raise
+        except StopAsyncIteration:
+            e = RuntimeError("empty response")
+            self._failed(p, e)
+            raise e
+        except Exception as e:
+            self._failed(p, e)
+            raise
+        p.ttft.add(time.monotonic() - t0)
+        return p, it, first
+
+    async def stream(self, messages: List[dict], max_tokens: Optional[int] = None,
+                     temperature: Optional[float] = None, response_format: Optional[dict] = None) -> AsyncIterator[str]:
+        async def start(p: LLMProvider):
+            return asyncio.create_task(
+                self._first_token(p, p.payload(messages, max_tokens, temperature, response_format, True)))
+        p, it, first = await self._race(start, streaming=True)
+        yield first
+        try:
+            async for delta in it:
+                yield delta
+        except Exception as e:
+            # tokens already went out, so there is no switching providers mid-answer
+            self._failed(p, e)
+            raise
+        finally:
+            await it.aclose()
+        p.breaker.success()
+
+    async def _race(self, start, streaming: bool):
+        order = self.order(streaming)
+        if not order:
+            raise LLMError("no LLM provider available (all circuits open)")
+        errors = []
+        i = 0
+        while i < len(order):
+            primary = order[i]
+            i += 1
+            if not primary.breaker.allow():
+                continue
+            running = {await start(primary): primary}
+            if self.hedge and i < len(order):
+                done, _ = await asyncio.wait(running, timeout=primary.hedge_deadline(streaming))
+                if not done:
+                    backup = order[i]
+                    i += 1
+                    if backup.breaker.allow():
+                        backup.stats["hedged"] += 1
+                        logger.info(f"Hedging '{primary.name}' with '{backup.name}'")
+                        running[await start(backup)] = backup
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                finished = {task: running.pop(task) for task in done}
+                won = [task for task in finished if task.exception() is None]
+                errors += [f"{p.name}: {task.exception()}" for task, p in finished.items() if task not in won]
+                if not won:
+                    continue
+                winner = next((task for task in won if finished[task] is primary), won[0])
+                for loser in running:
+                    loser.cancel()
+                late = await asyncio.gather(*running, return_exceptions=True)
+                if streaming:
+                    # a loser that also got its first token (same round, or just before the
+                    # cancel landed) holds an open response: close it
+                    for r in [task.result() for task in won if task is not winner] + late:
+                        if isinstance(r, tuple):
+                            await r[1].aclose()
+                if finished[winner] is not primary:
+                    finished[winner].stats["hedge_wins"] += 1
+                return winner.result()
+        raise LLMError("all LLM providers failed (" + "; ".join(errors) + ")" if errors else "no LLM provider accepted the request")
+
+    async def probe(self) -> dict:
+        """Readiness probe over every configured provider (model list only).
+        Raises ``LLMError`` when none is both reachable and not circuit-open."""
+        providers = [p for p in self.providers if p.available()]
+        results = await asyncio.gather(*(p.probe() for p in providers), return_exceptions=True)
+        status = {}
+        for p, r in zip(providers, results):
+            p.reachable = not isinstance(r, BaseException)
+            status[p.name] = p.breaker.state if p.reachable else "unreachable"
+        if not any(state in ("closed", "half_open") for state in status.values()):
+            raise LLMError(f"no LLM provider can serve: {status}")
+        return status
+
+    def metrics(self) -> dict:
+        return {"hedging": self.hedge, "order": [p.name for p in self.order()],
+                "providers": [p.info() for p in self.providers]}
+
+    async def aclose(self):
+        for p in self.providers:
+            await p.aclose()
+
+
+def build_router(names: List[str] = LLM_PROVIDERS, *, model: str, litellm_base: Optional[str] = None,
+                 litellm_api_key: Optional[str] = None, ollama_base: Optional[str] = None,
+                 openai_api_key: Optional[str] = None, hedge: bool = HEDGE) -> LLMRouter:
+    """Router from provider names (litellm, ollama, openai) in preference order"""
+    providers: List[LLMProvider] = []
+    for name in names:
+        name = name.strip().lower()
+        if name == "litellm":
+            providers.append(LLMProvider("litellm", litellm_base, model, litellm_api_key))
+        elif name == "ollama":
+            # Ollama's own OpenAI-compatible endpoint, bypassing the LiteLLM proxy
+            providers.append(LLMProvider("ollama", f"{ollama_base.rstrip('/')}/v1" if ollama_base else None, model))
+        elif name == "openai":
+            if openai_api_key and openai_api_key != "sk-your-openai-api-key-here":
+                providers.append(LLMProvider("openai", "https://api.openai.com/v1",
+                                             os.getenv("LLM_OPENAI_MODEL", "gpt-5-nano"), openai_api_key,
+                                             tier=1, token_param="max_completion_tokens", fixed_temperature=True))
+        elif name:
+            logger.warning(f"Unknown LLM provider '{name}', skipping")
+    return LLMRouter(providers, hedge=hedge)
@@ -0,0 +1,153 @@
+import asyncio, hashlib, json, os, re, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WS = re.compile(r"\s+")
+
+
+def normalize(text: Any) -> str:
+    """Case- and whitespace-insensitive form of a prompt part"""
+    return _WS.sub(" ", str(text or "")).strip().casefold()
+
+
+def cache_key(*parts: Any, model: str) -> str:
+    """Stable key over normalized inputs plus the model that would answer them"""
+    blob = json.dumps([model] + [normalize(p) if isinstance(p, str) or p is None else p for p in parts],
+                      sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class _Disk:
+    """sqlite table of ``key -> (stored_at, json value)`` shared across restarts"""
+
+    def __init__(self, path: str, max_entries: int):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("pragma journal_mode=wal")
+            self._conn.execute("create table if not exists responses (key text primary key, stored_at real, value text)")
+            self._conn.execute("create index if not exists responses_stored_at on responses (stored_at)")
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute("select stored_at, value from responses where key = ?", (key,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def put(self, key: str, stored_at: float, value: Any):
+        with self._lock, self._conn:
+            self._conn.execute("insert or replace into responses values (?, ?, ?)", (key, stored_at, json.dumps(value)))
+            self._conn.execute("""delete from responses where key in (
+                                    select key from responses order by stored_at desc limit -1 offset ?)""",
+                               (self.max_entries,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("select count(*) from responses").fetchone()[0]
+
+
+class ResponseCache:
+    """TTL + LRU cache for generated responses with stale-while-revalidate.
+
+    * younger than ``ttl_s``: served as is
+    * up to ``stale_s`` past the TTL: served immediately while one background
+      task regenerates it
+    * older, or unknown: generated; concurrent requests for the same key
+      share one generation
+    Entries live in memory (``max_entries``, least recently used evicted
+    first) and, when ``path`` is set, in a sqlite file so a restart does
+    not start cold.
+    """
+
+    def __init__(self, ttl_s: float = 600, stale_s: float = 3600, max_entries: int = 1000, path: Optional[str] = None):
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # key -> (stored_at, value)
+        self._inflight: dict = {}
+        self._disk = _Disk(path, max_entries) if path else None
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "disk_hits": 0, "revalidations": 0,
+                      "revalidation_errors": 0, "evictions": 0, "not_stored": 0}
+
+    async def _lookup(self, key: str) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self._disk is not None:
+            entry = await asyncio.to_thread(self._disk.get, key)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def _store(self, key: str, value: Any):
+        entry = (time.time(), value)
+        self._remember(key, entry)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.put, key, *entry)
+            except Exception as e:  # a full disk only costs the persistence
+                logger.warning(f"Response cache disk write failed: {e}")
+
+    def _generate(self, key: str, compute: Callable[[], Awaitable[Any]],
+                  cacheable: Callable[[Any], bool]) -> asyncio.Future:
+        """One shared generation per key"""
+        task = self._inflight.get(key)
+        if task is None:
+            async def run():
+                try:
+                    value = await compute()
+                    if cacheable(value):
+                        await self._store(key, value)
+                    else:
+                        self.stats["not_stored"] += 1
+                    return value
+                finally:
+                    self._inflight.pop(key, None)
+            task = self._inflight[key] = asyncio.create_task(run())
+        return task
+
+    async def _revalidate(self, task: asyncio.Future):
+        try:
+            await task
+            self.stats["revalidations"] += 1
+        except Exception as e:
+            self.stats["revalidation_errors"] += 1
+            logger.warning(f"Response cache revalidation failed: {e}")
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             cacheable: Callable[[Any], bool] = lambda value: True) -> tuple:
+        """``(value, state)`` where state is ``hit``, ``stale`` or ``miss``"""
+        entry = await self._lookup(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < self.ttl_s:
+                self.stats["hits"] += 1
+                return entry[1], "hit"
+            if age < self.ttl_s + self.stale_s:
+                self.stats["stale_hits"] += 1
+                if key not in self._inflight:
+                    asyncio.create_task(self._revalidate(self._generate(key, compute, cacheable)))
+                return entry[1], "stale"
+        self.stats["misses"] += 1
+        return await asyncio.shield(self._generate(key, compute, cacheable)), "miss"
+
+    def info(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        served = self.stats["hits"] + self.stats["stale_hits"]
+        return {**self.stats, "entries": len(self._entries), "max_entries": self.max_entries,
+                "disk_entries": self._disk.count() if self._disk else None,
+                "ttl_s": self.ttl_s, "stale_s": self.stale_s,
+                "hit_ratio": round(served / lookups, 3) if lookups else None}
@@ -0,0 +1,57 @@
+import base64, json, math, random, struct
+from datetime import date, timedelta
+
+from services.common.downsample import downsample_viz, encode_dates, encode_f32, lttb_indices, minmax_indices
+
+
+def _daily(n=6700, seed=3):
+    rnd = random.Random(seed)
+    start = date(2007, 1, 1)
+    x = [(start + timedelta(days=i)).isoformat() for i in range(n)]
+    y = [1000 + 200 * math.sin(i / 90) + rnd.random() * 50 for i in range(n)]
+    y[n * 2 // 3] = 9999.0  # one-day spike
+    y[100:130] = [None] * 30
+    return x, y
+
+
+def test_minmax_keeps_spikes_and_gaps():
+    _, y = _daily()
+    keep = minmax_indices(y, 400)
+    assert len(keep) <= 400 + 2 and keep == sorted(keep)  # the gap spans two buckets
+    assert 6700 * 2 // 3 in keep
+    assert any(y[i] is None for i in keep)  # the all-null stretch stays a gap
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    x = list(range(5000))
+    y = [math.sin(i / 50) for i in x]
+    keep = lttb_indices(x, y, 300)
+    assert len(keep) == 300 and keep[0] == 0 and keep[-1] == 4999
+    assert lttb_indices(x, y, 10000) == x
+
+
+def test_downsample_viz_bounds_traces_and_reports_source():
+    x, y = _daily()
+    payload = {"type": "viz", "title": "t", "traces": [{"x": x, "y": y, "name": "oil"}, {"x": x[:50], "y": y[:50]}]}
+    for method in ("minmax", "lttb"):
+        out = downsample_viz(payload, points=500, method=method)
+        assert len(out["traces"][0]["y"]) <= 502 and len(out["traces"][1]["y"]) == 50
+        assert out["downsampled"]["source_points"] == [6700, 50] and out["title"] == "t"
+        assert max(v for v in out["traces"][0]["y"] if v is not None) == 9999.0 or method == "lttb"
+    assert len(json.dumps(out)) < len(json.dumps(payload)) / 5
+
+
+def test_compact_encoding_round_trips():
+    x, y = _daily(n=300)
+    enc = encode_dates(x)
+    days = [date.fromisoformat(enc["start"])]
+    for d in enc["d"]:
+        days.append(days[-1] + timedelta(days=d))
+    assert [d.isoformat() for d in days] == x
+
+    vals = struct.unpack(f"<{len(y)}f", base64.b64decode(encode_f32(y)["b64"]))
+    assert all((v is None and math.isnan(f)) or abs(f - v) <= 1e-3 * abs(v) for v, f in zip(y, vals))
+    assert encode_dates(["2024-01-01", "Q1"]) is None and encode_f32(["a"]) is None
+
+    out = downsample_viz({"traces": [{"x": x, "y": y}]}, points=None, encoding="compact")
+    assert out["traces"][0]["x"]["enc"] == "date_delta" and out["traces"][0]["y"]["enc"] == "f32"
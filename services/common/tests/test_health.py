@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from services.common.health import HealthMonitor
+
+
+def _monitor(calls, db_ok=True):
+    async def db():
+        calls.append("db")
+        if not db_ok:
+            raise RuntimeError("connection refused")
+
+    async def cache():
+        raise RuntimeError("down")
+
+    async def generation():
+        calls.append("generation")
+        return {"reply": "OK"}
+
+    h = HealthMonitor("svc", details=lambda: {"version": "1"})
+    h.probe("db", db)
+    h.probe("cache", cache, required=False)
+    h.deep("generation", generation)
+    return h
+
+
+def test_not_ready_until_probed_and_live_makes_no_calls():
+    calls = []
+    h = _monitor(calls)
+    assert h.live()["status"] == "alive"
+    ok, payload = h.ready()
+    assert not ok and payload["checks"]["db"]["error"] == "not probed yet"
+    assert calls == []
+
+
+def test_ready_uses_cached_results_and_optional_probes_degrade():
+    calls = []
+    h = _monitor(calls)
+    asyncio.run(h.refresh())
+    for _ in range(3):
+        ok, payload = h.ready()
+    assert ok and payload["status"] == "degraded" and payload["version"] == "1"
+    assert calls == ["db"]
+
+    h = _monitor(calls, db_ok=False)
+    asyncio.run(h.refresh())
+    ok, payload = h.ready()
+    assert not ok and payload["status"] == "not_ready"
+    assert "connection refused" in payload["checks"]["db"]["error"]
+
+
+def test_stale_probe_results_are_not_ready():
+    h = _monitor([])
+    asyncio.run(h.refresh())
+    h.results["db"]["checked_at"] -= 10 * h.interval_s
+    assert not h.ready()[0]
+
+
+def test_deep_check_is_shared_and_rate_limited():
+    calls = []
+    h = _monitor(calls)
+
+    async def run():
+        return await asyncio.gather(h.deep_check(), h.deep_check(), h.deep_check())
+
+    results = asyncio.run(run())
+    assert calls.count("generation") == 1
+    ok, payload = results[0]
+    assert ok and payload["status"] == "healthy" and payload["deep_checks"]["generation"]["detail"] == {"reply": "OK"}
+    asyncio.run(h.deep_check())
+    assert calls.count("generation") == 1
+
+
+def test_routes():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    _monitor([], db_ok=False).install(app)
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        assert client.get("/health/ready").status_code == 503
+        assert client.get("/health").status_code == 200
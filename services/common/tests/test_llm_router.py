@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from services.common.llm_router import LLMError, LLMProvider, LLMRouter, CircuitBreaker
+
+
+class FakeProvider(LLMProvider):
+    def __init__(self, name, delay=0.0, fail=False, tier=0, tokens=("a", "b")):
+        super().__init__(name, f"http://{name}", "m", tier=tier)
+        self.delay = delay
+        self.fail = fail
+        self.tokens = tokens
+        self.cancelled = 0
+
+    async def complete(self, body):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("down")
+        return self.name
+
+    async def stream(self, body):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("down")
+        for t in self.tokens:
+            yield t
+
+
+def _complete(router):
+    return asyncio.run(router.complete([{"role": "user", "content": "hi"}]))
+
+
+def test_breaker_opens_and_half_opens():
+    b = CircuitBreaker(failures=2, reset_s=0)
+    b.failure()
+    assert b.state == "closed"
+    b.failure()
+    assert b.state == "open"
+    assert b.allow() and b.state == "half_open"  # reset_s=0: probe right away
+    b.failure()
+    assert b.state == "open" and b.opened == 2
+    b.allow()
+    b.success()
+    assert b.state == "closed" and b.consecutive == 0
+
+
+def test_failover_and_open_circuit_is_skipped():
+    bad, good = FakeProvider("bad", fail=True), FakeProvider("good")
+    router = LLMRouter([bad, good])
+    for _ in range(3):
+        assert _complete(router) == "good"
+    assert bad.breaker.state == "open" and bad.stats["calls"] == 3
+    assert _complete(router) == "good"
+    assert bad.stats["calls"] == 3
+    assert router.metrics()["order"] == ["good"]
+
+
+def test_latency_aware_order_within_tier():
+    slow, fast, backup = FakeProvider("slow"), FakeProvider("fast"), FakeProvider("backup", tier=1)
+    slow.latency.add(2.0)
+    fast.latency.add(0.1)
+    backup.latency.add(0.01)
+    assert [p.name for p in LLMRouter([backup, slow, fast]).order()] == ["fast", "slow", "backup"]
+
+
+def test_all_failing_raises():
+    with pytest.raises(LLMError):
+        _complete(LLMRouter([FakeProvider("a", fail=True)]))
+    with pytest.raises(LLMError):
+        _complete(LLMRouter([]))
+
+
+def test_hedge_fires_after_deadline_and_cancels_loser(monkeypatch):
+    monkeypatch.setattr("services.common.llm_router.HEDGE_MIN_MS", 10)
+    slow, fast = FakeProvider("slow", delay=1.0), FakeProvider("fast", delay=0.01)
+    for _ in range(20):
+        slow.latency.add(0.02)  # p95 of 20 ms -> hedge well before the 1 s answer
+    router = LLMRouter([slow, fast], hedge=True)
+    router.order = lambda streaming=False: [slow, fast]
+    assert _complete(router) == "fast"
+    assert fast.stats["hedged"] == 1 and fast.stats["hedge_wins"] == 1
+    assert slow.cancelled == 1 and slow.stats["failures"] == 0 and slow.breaker.state == "closed"
+
+
+def test_no_hedge_when_primary_is_quick():
+    quick, other = FakeProvider("quick"), FakeProvider("other")
+    router = LLMRouter([quick, other], hedge=True)
+    assert _complete(router) == "quick"
+    assert other.stats["calls"] == 0
+
+
+def test_stream_hedges_on_first_token(monkeypatch):
+    monkeypatch.setattr("services.common.llm_router.HEDGE_MIN_MS", 10)
+    monkeypatch.setattr("services.common.llm_router.HEDGE_DEFAULT_MS", 20)
+    slow = FakeProvider("slow", delay=1.0, tokens=("x",))
+    fast = FakeProvider("fast", delay=0.0, tokens=("he", "llo"))
+    router = LLMRouter([slow, fast], hedge=True)
+
+    async def run():
+        return [t async for t in router.stream([{"role": "user", "content": "hi"}])]
+
+    assert asyncio.run(run()) == ["he", "llo"]
+    assert fast.stats["hedge_wins"] == 1 and fast.ttft.info()["samples"] == 1
+
+
+def test_stream_closes_a_loser_that_finished_in_the_same_round(monkeypatch):
+    monkeypatch.setattr("services.common.llm_router.HEDGE_MIN_MS", 10)
+    monkeypatch.setattr("services.common.llm_router.HEDGE_DEFAULT_MS", 10)
+    closed = []
+
+    class GatedProvider(FakeProvider):
+        async def stream(self, body):
+            try:
+                await self.gate.wait()  # both first tokens arrive in one event-loop pass
+                for t in self.tokens:
+                    yield t
+            finally:
+                closed.append(self.name)
+
+    primary, backup = GatedProvider("primary", tokens=("p",)), GatedProvider("backup", tokens=("b",))
+    router = LLMRouter([primary, backup], hedge=True)
+    router.order = lambda streaming=False: [primary, backup]
+
+    async def run():
+        GatedProvider.gate = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.05, GatedProvider.gate.set)
+        tokens = [t async for t in router.stream([{"role": "user", "content": "hi"}])]
+        return tokens, sorted(closed)  # before asyncio.run finalizes leftover generators
+
+    assert asyncio.run(run()) == (["p"], ["backup", "primary"])
+    assert backup.stats["hedged"] == 1 and backup.stats["hedge_wins"] == 0
@@ -0,0 +1,68 @@
+import asyncio
+
+from services.common.response_cache import ResponseCache, cache_key
+
+
+def _counter():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"text": f"answer {len(calls)}"}
+    return calls, compute
+
+
+def test_key_normalizes_inputs_and_includes_model():
+    k = cache_key("simple", "  What is   the OIL rate?\n", None, model="m1")
+    assert k == cache_key("simple", "what is the oil rate?", "", model="m1")
+    assert k != cache_key("simple", "what is the oil rate?", "", model="m2")
+    assert cache_key("s", ["b", "a"], model="m") != cache_key("s", ["a", "b"], model="m")
+
+
+def test_hit_miss_and_shared_generation():
+    calls, compute = _counter()
+    cache = ResponseCache(ttl_s=60)
+
+    async def run():
+        first = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)))
+        return first, await cache.get_or_compute("k", compute)
+
+    first, again = asyncio.run(run())
+    assert len(calls) == 1
+    assert [state for _, state in first] == ["miss"] * 3 and again == ({"text": "answer 1"}, "hit")
+    assert cache.info()["hit_ratio"] == 0.25
+
+
+def test_stale_while_revalidate():
+    calls, compute = _counter()
+    cache = ResponseCache(ttl_s=0, stale_s=60)
+
+    async def run():
+        await cache.get_or_compute("k", compute)
+        stale = await cache.get_or_compute("k", compute)
+        await asyncio.sleep(0.05)  # background regeneration finishes
+        return stale, await cache.get_or_compute("k", compute)
+
+    stale, refreshed = asyncio.run(run())
+    assert stale == ({"text": "answer 1"}, "stale")
+    assert refreshed[0] == {"text": "answer 2"} and cache.stats["revalidations"] >= 1
+
+
+def test_lru_bound_uncacheable_values_and_disk(tmp_path):
+    calls, compute = _counter()
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(ttl_s=60, max_entries=2, path=path)
+
+    async def run(c):
+        for k in ("a", "b", "c"):
+            await c.get_or_compute(k, compute)
+        await c.get_or_compute("bad", compute, cacheable=lambda v: False)
+
+    asyncio.run(run(cache))
+    assert cache.info()["entries"] == 2 and cache.stats["evictions"] == 1
+    assert cache.stats["not_stored"] == 1 and cache.info()["disk_entries"] == 2
+
+    reopened = ResponseCache(ttl_s=60, max_entries=2, path=path)
+    value, state = asyncio.run(reopened.get_or_compute("c", compute))
+    assert state == "hit" and value == {"text": "answer 3"} and reopened.stats["disk_hits"] == 1
@@ -0,0 +1,119 @@
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+EmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into micro-batches.
+
+    Every text submitted within ``max_wait_ms`` of the first pending one is sent
+    upstream in a single call (at most ``max_batch`` texts per call). Identical
+    texts that are already in flight share one future, and finished vectors are
+    kept in a bounded LRU cache keyed by ``(space, text)``, ``space`` being the
+    model the vectors come from.
+    """
+
+    def __init__(self, embed_fn: EmbedFn, max_batch: int = 64, max_wait_ms: float = 5.0, cache_size: int = 20000,
+                 space: str = ""):
+        self.embed_fn = embed_fn
+        self.space = space
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.cache_size = max(0, cache_size)
+
+        self._cache: OrderedDict[tuple[str, str], List[float]] = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: List[str] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+        self.stats = {
+            "requests": 0,
+            "texts": 0,
+            "cache_hits": 0,
+            "inflight_dedup": 0,
+            "upstream_calls": 0,
+            "upstream_texts": 0,
+            "upstream_errors": 0,
+        }
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return one vector per input text, in order"""
+        self.stats["requests"] += 1
+        self.stats["texts"] += len(texts)
+        futures = [self._submit(t) for t in texts]
+        # Shield shared futures so one cancelled caller does not cancel the
+        # batch for everybody else waiting on the same text.
+        return list(await asyncio.gather(*(asyncio.shield(f) for f in futures)))
+
+    def cache_info(self) -> dict:
+        return {"size": len(self._cache), "max_size": self.cache_size, "pending": len(self._pending), "inflight": len(self._inflight)}
+
+    def _submit(self, text: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+
+        vec = self._cache.get((self.space, text))
+        if vec is not None:
+            self._cache.move_to_end((self.space, text))
+            self.stats["cache_hits"] += 1
+            fut = loop.create_future()
+            fut.set_result(vec)
+            return fut
+
+        fut = self._inflight.get(text)
+        if fut is not None:
+            self.stats["inflight_dedup"] += 1
+            return fut
+
+        fut = loop.create_future()
+        self._inflight[text] = fut
+        self._pending.append(text)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            self._pending = self._pending[self.max_batch:]
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[str]):
+        self.stats["upstream_calls"] += 1
+        self.stats["upstream_texts"] += len(batch)
+        try:
+            vectors = await self.embed_fn(batch)
+            if len(vectors) != len(batch):
+                raise ValueError(f"Upstream returned {len(vectors)} vectors for {len(batch)} inputs")
+        except Exception as e:
+            self.stats["upstream_errors"] += 1
+            for text in batch:
+                fut = self._inflight.pop(text, None)
+                if fut is not None and not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for text, vec in zip(batch, vectors):
+            self._remember(text, vec)
+            fut = self._inflight.pop(text, None)
+            if fut is not None and not fut.done():
+                fut.set_result(vec)
+
+    def _remember(self, text: str, vec: List[float]):
+        if not self.cache_size:
+            return
+        self._cache[(self.space, text)] = vec
+        self._cache.move_to_end((self.space, text))
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
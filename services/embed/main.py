@@ -0,0 +1,114 @@
+import asyncio, os
+from pathlib import Path
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional, Union
+import logging
+
+from .batcher import EmbeddingBatcher
+from .providers import ProviderChain, build_chain, schema_dimension
+
+# Load environment variables
+load_dotenv(Path(__file__).resolve().parents[2] / ".env")
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(
+    title="Embedding Gateway",
+    description="Shared embedding endpoint with micro-batching, in-flight dedup and caching",
+    version="1.0.0"
+)
+
+# Environment configuration
+LITELLM_BASE = os.environ["LITELLM_BASE"]
+LITELLM_API_KEY = os.getenv("LITELLM_API_KEY", "sk")
+EMBED_MODEL = os.getenv("RAG_EMBED_MODEL", "mxbai-embed-large:latest")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", 64))
+MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", 5))
+CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", 20000))
+
+# openai is opt-in: it only serves when RAG_EMBED_MODEL is the EMBED_OPENAI_MODEL itself
+EMBED_PROVIDERS = os.getenv("EMBED_PROVIDERS", "litellm,onnx").split(",")
+
+# Target dimension: the declared doc_chunks.embedding column (read at startup) wins over EMBED_DIM
+EMBED_DIM = int(os.getenv("EMBED_DIM", 1024))
+
+# Pydantic models
+class EmbeddingRequest(BaseModel):
+    input: Union[str, List[str]]
+    model: Optional[str] = None
+
+# One provider chain + batcher per model so cached vectors never cross models
+_chains: dict[str, ProviderChain] = {}
+_batchers: dict[str, EmbeddingBatcher] = {}
+
+def get_batcher(model: str) -> EmbeddingBatcher:
+    if model not in _batchers:
+        # Local and hosted fallbacks only stand in for the default model
+        names = EMBED_PROVIDERS if model == EMBED_MODEL else ["litellm"]
+        chain = build_chain(names, litellm_base=LITELLM_BASE, litellm_api_key=LITELLM_API_KEY,
+                            model=model, openai_api_key=OPENAI_API_KEY, dimension=EMBED_DIM)
+        _chains[model] = chain
+        _batchers[model] = EmbeddingBatcher(chain.embed, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS,
+                                            cache_size=CACHE_SIZE, space=chain.space)
+    return _batchers[model]
+
+@app.get("/")
+async def root():
+    return {
+        "service": "know-ai-embed",
+        "status": "running",
+        "version": "1.0.0",
+        "default_model": EMBED_MODEL,
+        "dimension": EMBED_DIM,
+        "providers": [p.strip() for p in EMBED_PROVIDERS],
+        "batching": {"max_batch": MAX_BATCH, "max_wait_ms": MAX_WAIT_MS, "cache_size": CACHE_SIZE}
+    }
+
+@app.get("/stats")
+async def stats():
+    """Batching, dedup and cache counters per model"""
+    return {
+        model: {**b.stats, "cache": b.cache_info(), **_chains[model].info()}
+        for model, b in _batchers.items()
+    }
+
+@app.post("/embeddings")
+async def embeddings(request: EmbeddingRequest):
+    """OpenAI-compatible embeddings endpoint (drop-in for the LiteLLM route)"""
+    model = request.model or EMBED_MODEL
+    texts = [request.input] if isinstance(request.input, str) else request.input
+    if not texts:
+        raise HTTPException(400, "input must not be empty")
+
+    try:
+        vectors = await get_batcher(model).embed(texts)
+    except Exception as e:
+        logger.error(f"Embedding failed: {e}")
+        raise HTTPException(502, f"Embedding failed: {e}")
+
+    return {
+        "object": "list",
+        "model": model,
+        "data": [{"object": "embedding", "index": i, "embedding": v} for i, v in enumerate(vectors)]
+    }
+
+@app.on_event("startup")
+async def read_schema_dimension():
+    global EMBED_DIM
+    EMBED_DIM = await asyncio.to_thread(schema_dimension, os.getenv("POSTGRES_URL")) or EMBED_DIM
+    logger.info(f"Embedding dimension: {EMBED_DIM}")
+
+@app.on_event("shutdown")
+async def shutdown():
+    for chain in _chains.values():
+        await chain.aclose()
+
+if __name__ == "__main__":
+    import uvicorn
+    embed_port = int(os.getenv("EMBED_PORT", 9011))
+    uvicorn.run(app, host="0.0.0.0", port=embed_port)
@@ -0,0 +1,315 @@
+import asyncio, os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import logging
+
+import httpx
+
+# Local CPU backend imports
+try:
+    import numpy as np
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    np = None
+    ort = None
+    Tokenizer = None
+    ONNX_AVAILABLE = False
+
+# Schema lookup imports
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+logger = logging.getLogger(__name__)
+
+
+class DimensionMismatch(ValueError):
+    """Raised when a provider returns vectors that do not fit the vector column"""
+
+
+class EmbeddingProvider:
+    """Base class for embedding backends.
+
+    Subclasses implement ``embed`` and return one vector per input text.
+    ``space`` names the model whose vector space the output lives in; vectors
+    from different spaces are not comparable even when their sizes match.
+    """
+
+    name = "base"
+    space: Optional[str] = None
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def available(self) -> bool:
+        return True
+
+    def info(self) -> dict:
+        return {"name": self.name, "available": self.available(), "space": self.space}
+
+    async def aclose(self):
+        pass
+
+
+class LiteLLMProvider(EmbeddingProvider):
+    """Remote embeddings through the LiteLLM proxy (Ollama behind it)"""
+
+    name = "litellm"
+
+    def __init__(self, base_url: str, api_key: str, model: str, timeout: float = 30):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = self.space = model
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        response = await self._client.post(
+            f"{self.base_url}/embeddings",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={"model": self.model, "input": texts}
+        )
+        response.raise_for_status()
+        data = response.json()["data"]
+        return [e["embedding"] for e in sorted(data, key=lambda e: e.get("index", 0))]
+
+    def info(self) -> dict:
+        return {**super().info(), "model": self.model, "url": self.base_url}
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class OpenAIProvider(EmbeddingProvider):
+    """Hosted OpenAI embeddings, truncated to the column dimension.
+
+    Only a fallback for an OpenAI embedding model: a chain serving another
+    model (e.g. the local mxbai) skips it, since a matching dimension does not
+    make the vectors comparable.
+    """
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], dimensions: int, model: str = "text-embedding-3-small", timeout: float = 60):
+        self.api_key = api_key
+        self.dimensions = dimensions
+        self.model = self.space = model
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    def available(self) -> bool:
+        return bool(self.api_key) and self.api_key != "sk-your-openai-api-key-here"
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        response = await self._client.post(
+            "https://api.openai.com/v1/embeddings",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            # text-embedding-3 models can shorten their output natively
+            json={"model": self.model, "input": texts, "dimensions": self.dimensions}
+        )
+        response.raise_for_status()
+        return [e["embedding"] for e in response.json()["data"]]
+
+    def info(self) -> dict:
+        return {**super().info(), "model": self.model}
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class OnnxProvider(EmbeddingProvider):
+    """Local, quantized CPU embeddings with ONNX Runtime.
+
+    Point ``model_path`` at an ONNX export of the same model the remote
+    embedder serves (e.g. mxbai-embed-large-v1 ``onnx/model_quantized.onnx``)
+    so local and remote vectors live in the same space, and set ``space`` to
+    that model's name. Inference runs in a thread pool; ONNX Runtime releases
+    the GIL while it computes.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: Optional[str], tokenizer_path: Optional[str], workers: int = 2,
+                 intra_op_threads: int = 0, max_length: int = 512, pooling: str = "cls",
+                 space: Optional[str] = None):
+        self.model_path = model_path
+        self.space = space
+        self.tokenizer_path = tokenizer_path
+        self.workers = max(1, workers)
+        self.intra_op_threads = intra_op_threads
+        self.max_length = max_length
+        self.pooling = pooling
+        self._session = None
+        self._tokenizer = None
+        self._input_names: List[str] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._load_error: Optional[str] = None
+
+    def available(self) -> bool:
+        return (
+            ONNX_AVAILABLE
+            and bool(self.model_path) and os.path.exists(self.model_path)
+            and bool(self.tokenizer_path) and os.path.exists(self.tokenizer_path)
+            and self._load_error is None
+        )
+
+    def _load(self):
+        if self._session is not None:
+            return
+        opts = ort.SessionOptions()
+        if self.intra_op_threads:
+            opts.intra_op_num_threads = self.intra_op_threads
+        self._session = ort.InferenceSession(self.model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self._input_names = [i.name for i in self._session.get_inputs()]
+
+        self._tokenizer = Tokenizer.from_file(self.tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=self.max_length)
+        self._tokenizer.enable_padding()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="onnx-embed")
+        logger.info(f"Loaded ONNX embedding model from {self.model_path}")
+
+    def _embed_sync(self, texts: List[str]) -> List[List[float]]:
+        encodings = self._tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        hidden = self._session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+        if self.pooling == "mean":
+            m = mask[..., None].astype(hidden.dtype)
+            pooled = (hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+        else:
+            pooled = hidden[:, 0]
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32).tolist()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        try:
+            self._load()
+        except Exception as e:
+            self._load_error = str(e)
+            raise
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._embed_sync, texts)
+
+    def info(self) -> dict:
+        return {
+            **super().info(),
+            "model_path": self.model_path,
+            "workers": self.workers,
+            "pooling": self.pooling,
+            "loaded": self._session is not None,
+            "error": self._load_error,
+        }
+
+    async def aclose(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+class ProviderChain:
+    """Try providers in order, rejecting any output that does not match ``dimension``.
+
+    With ``space`` set, providers embedding with another model are never
+    called: their vectors would pass the dimension check and silently mix
+    incomparable vectors into doc_chunks and the batcher cache.
+    """
+
+    def __init__(self, providers: List[EmbeddingProvider], dimension: int, space: Optional[str] = None):
+        self.providers = providers
+        self.dimension = dimension
+        self.space = space
+        self.stats = {p.name: {"calls": 0, "texts": 0, "errors": 0} for p in providers}
+        for p in providers:
+            if not self.compatible(p):
+                logger.warning(f"Embedding provider '{p.name}' embeds with {p.space!r}, not {space!r}; it will not be used")
+
+    def compatible(self, provider: EmbeddingProvider) -> bool:
+        return self.space is None or provider.space == self.space
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        errors = []
+        for provider in self.providers:
+            if not provider.available() or not self.compatible(provider):
+                continue
+            counters = self.stats[provider.name]
+            counters["calls"] += 1
+            try:
+                vectors = await provider.embed(texts)
+                check_dimensions(vectors, self.dimension, provider.name)
+                counters["texts"] += len(texts)
+                return vectors
+            except Exception as e:
+                counters["errors"] += 1
+                logger.warning(f"Embedding provider '{provider.name}' failed: {e}")
+                errors.append(f"{provider.name}: {e}")
+        raise RuntimeError("All embedding providers failed" + (f" ({'; '.join(errors)})" if errors else ""))
+
+    def info(self) -> dict:
+        return {
+            "dimension": self.dimension,
+            "space": self.space,
+            "providers": [{**p.info(), **self.stats[p.name], "compatible": self.compatible(p)} for p in self.providers],
+        }
+
+    async def aclose(self):
+        for p in self.providers:
+            await p.aclose()
+
+
+def check_dimensions(vectors: List[List[float]], dimension: int, source: str = "provider"):
+    """Raise DimensionMismatch unless every vector has exactly ``dimension`` values"""
+    for v in vectors:
+        if len(v) != dimension:
+            raise DimensionMismatch(f"{source} returned {len(v)}-d vectors, doc_chunks.embedding is vector({dimension})")
+
+
+def schema_dimension(pg_url: Optional[str], table: str = "doc_chunks", column: str = "embedding") -> Optional[int]:
+    """Read the declared pgvector dimension of ``table.column`` (None if unknown)"""
+    if not pg_url or psycopg is None:
+        return None
+    try:
+        with psycopg.connect(pg_url, connect_timeout=5) as conn, conn.cursor() as cur:
+            # For pgvector columns atttypmod holds the declared dimension
+            cur.execute("""
+                select atttypmod from pg_attribute
+                where attrelid = %s::regclass and attname = %s and not attisdropped
+            """, (table, column))
+            row = cur.fetchone()
+            return int(row[0]) if row and row[0] and row[0] > 0 else None
+    except Exception as e:
+        logger.warning(f"Could not read vector dimension from {table}.{column}: {e}")
+        return None
+
+
+def build_chain(names: List[str], *, litellm_base: str, litellm_api_key: str, model: str,
+                openai_api_key: Optional[str], dimension: int) -> ProviderChain:
+    """Build a provider chain for ``model`` from a list of provider names (litellm, openai, onnx).
+
+    The ONNX export is declared to be ``model`` unless EMBED_ONNX_SPACE names
+    another; OpenAI only joins a chain whose model is its own.
+    """
+    providers: List[EmbeddingProvider] = []
+    for name in names:
+        name = name.strip().lower()
+        if name == "litellm":
+            providers.append(LiteLLMProvider(litellm_base, litellm_api_key, model,
+                                             timeout=float(os.getenv("EMBED_REMOTE_TIMEOUT", 30))))
+        elif name == "openai":
+            providers.append(OpenAIProvider(openai_api_key, dimension,
+                                            model=os.getenv("EMBED_OPENAI_MODEL", "text-embedding-3-small")))
+        elif name == "onnx":
+            providers.append(OnnxProvider(
+                os.getenv("EMBED_ONNX_MODEL"),
+                os.getenv("EMBED_ONNX_TOKENIZER"),
+                workers=int(os.getenv("EMBED_ONNX_WORKERS", 2)),
+                intra_op_threads=int(os.getenv("EMBED_ONNX_THREADS", 0)),
+                pooling=os.getenv("EMBED_ONNX_POOLING", "cls"),
+                space=os.getenv("EMBED_ONNX_SPACE", model),
+            ))
+        elif name:
+            logger.warning(f"Unknown embedding provider '{name}', skipping")
+    return ProviderChain(providers, dimension, space=model)
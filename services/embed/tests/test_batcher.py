@@ -0,0 +1,65 @@
+import asyncio
+
+from services.embed.batcher import EmbeddingBatcher
+
+
+def make_upstream(calls):
+    async def embed_fn(texts):
+        calls.append(list(texts))
+        await asyncio.sleep(0)
+        return [[float(len(t))] for t in texts]
+    return embed_fn
+
+
+def test_concurrent_requests_are_coalesced_into_one_batch():
+    calls = []
+
+    async def run():
+        b = EmbeddingBatcher(make_upstream(calls), max_batch=16, max_wait_ms=5)
+        return await asyncio.gather(b.embed(["a"]), b.embed(["bb", "ccc"]), b.embed(["dddd"]))
+
+    results = asyncio.run(run())
+
+    assert results == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
+    assert calls == [["a", "bb", "ccc", "dddd"]]
+
+
+def test_max_batch_splits_upstream_calls():
+    calls = []
+
+    async def run():
+        b = EmbeddingBatcher(make_upstream(calls), max_batch=2, max_wait_ms=5)
+        return await b.embed(["a", "b", "c", "d", "e"])
+
+    assert len(asyncio.run(run())) == 5
+    assert [len(c) for c in calls] == [2, 2, 1]
+
+
+def test_inflight_dedup_and_cache():
+    calls = []
+
+    async def run():
+        b = EmbeddingBatcher(make_upstream(calls), max_batch=16, max_wait_ms=5)
+        await asyncio.gather(b.embed(["same"]), b.embed(["same", "other"]))
+        await b.embed(["same"])
+        return b.stats
+
+    stats = asyncio.run(run())
+
+    assert calls == [["same", "other"]]
+    assert stats["inflight_dedup"] == 1
+    assert stats["cache_hits"] == 1
+    assert stats["upstream_calls"] == 1
+
+
+def test_upstream_error_propagates_to_all_waiters():
+    async def failing(texts):
+        raise RuntimeError("boom")
+
+    async def run():
+        b = EmbeddingBatcher(failing, max_wait_ms=1)
+        return await asyncio.gather(b.embed(["x"]), b.embed(["x"]), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
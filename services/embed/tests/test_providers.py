@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from services.embed.providers import DimensionMismatch, EmbeddingProvider, ProviderChain, build_chain, check_dimensions
+
+
+class FakeProvider(EmbeddingProvider):
+    def __init__(self, name, dim, fail=False, space=None):
+        self.name = name
+        self.dim = dim
+        self.fail = fail
+        self.space = space
+        self.calls = 0
+
+    async def embed(self, texts):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("unreachable")
+        return [[0.1] * self.dim for _ in texts]
+
+
+def test_check_dimensions_rejects_wrong_size():
+    with pytest.raises(DimensionMismatch):
+        check_dimensions([[0.0] * 384], 1024)
+
+
+def test_chain_skips_failing_and_mismatched_providers():
+    chain = ProviderChain([
+        FakeProvider("remote", 1024, fail=True),
+        FakeProvider("small", 384),
+        FakeProvider("local", 1024),
+    ], dimension=1024)
+
+    vectors = asyncio.run(chain.embed(["a", "b"]))
+
+    assert [len(v) for v in vectors] == [1024, 1024]
+    assert chain.stats["remote"]["errors"] == 1
+    assert chain.stats["small"]["errors"] == 1
+    assert chain.stats["local"]["texts"] == 2
+
+
+def test_chain_raises_when_nothing_fits():
+    chain = ProviderChain([FakeProvider("small", 384)], dimension=1024)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(chain.embed(["a"]))
+
+
+def test_chain_never_calls_providers_from_another_space():
+    hosted = FakeProvider("hosted", 1024, space="text-embedding-3-small")
+    chain = ProviderChain([FakeProvider("remote", 1024, fail=True, space="mxbai"), hosted], dimension=1024, space="mxbai")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(chain.embed(["a"]))
+    assert hosted.calls == 0
+    assert [p["compatible"] for p in chain.info()["providers"]] == [True, False]
+
+
+def test_openai_only_serves_its_own_model():
+    kw = dict(litellm_base="http://x", litellm_api_key="k", openai_api_key="sk-real", dimension=1024)
+    local = build_chain(["litellm", "openai"], model="mxbai-embed-large:latest", **kw)
+    hosted = build_chain(["openai"], model="text-embedding-3-small", **kw)
+
+    assert [local.compatible(p) for p in local.providers] == [True, False]
+    assert [hosted.compatible(p) for p in hosted.providers] == [True]
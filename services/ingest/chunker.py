@@ -12,3 +12,34 @@ def chunk_markdown(md: str, window_sent: int = 5, overlap: int = 1):
     chunks.append({"idx": idx, "text": text, "page": 0, "section": f"chunk-{idx}"})
     idx += 1
   return chunks
+
+def chunk_markdown_sections(md: str, page: int = 0, max_chars: int = 1500, start_idx: int = 0):
+  """Split markdown on headings, cutting sections longer than ``max_chars``.
+
+  Section names carry the page and the chunk's index within that page, so they
+  stay unique per file (doc_chunks dedups on file_id, checksum, section) and a
+  re-index produces the same keys whatever order the pages finish in.
+  ``start_idx`` only offsets ``idx``, the file-wide ordering.
+  """
+  chunks, idx = [], start_idx
+  current, heading = "", "intro"
+
+  def flush():
+    nonlocal idx
+    if current.strip():
+      chunks.append({"idx": idx, "text": current.strip(), "page": page,
+                     "section": f"p{page}:{heading}#{idx - start_idx}", "chunk_type": "markdown_section"})
+      idx += 1
+
+  for line in md.split('\n'):
+    if line.startswith('#'):
+      flush()
+      heading = line.strip('#').strip()[:50] or heading
+      current = line + '\n'
+    else:
+      current += line + '\n'
+      if len(current) > max_chars:
+        flush()
+        current = ""
+  flush()
+  return chunks
@@ -0,0 +1,187 @@
+import asyncio, hashlib, json, re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable
+
+# (window text, content_type) -> cleaned text; raises on failure
+CleanupFn = Callable[[str, str], Awaitable[str]]
+
+_PAGE_SPLIT = re.compile(r"(?m)^(?=#{1,3} )")
+_PARA_SPLIT = re.compile(r"\n\s*\n")
+
+def split_windows(text: str, max_chars: int = 6000) -> list[str]:
+    """Split a document into cleanup windows of at most ``max_chars``.
+
+    Cuts on page/section headings first, then paragraphs, then lines, and
+    packs consecutive small pieces together so short pages don't each cost a
+    model call. Joining the windows with "\\n\\n" gives back the document.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    pieces: list[str] = []
+    for section in _PAGE_SPLIT.split(text):
+        section = section.strip()
+        if not section:
+            continue
+        if len(section) <= max_chars:
+            pieces.append(section)
+            continue
+        for para in _PARA_SPLIT.split(section):
+            para = para.strip()
+            while len(para) > max_chars:
+                cut = para.rfind("\n", 0, max_chars)
+                if cut <= 0:
+                    cut = max_chars
+                pieces.append(para[:cut].strip())
+                para = para[cut:].strip()
+            if para:
+                pieces.append(para)
+
+    windows: list[str] = []
+    for piece in pieces:
+        if windows and len(windows[-1]) + len(piece) + 2 <= max_chars:
+            windows[-1] += "\n\n" + piece
+        else:
+            windows.append(piece)
+    return windows
+
+class CleanupEngine:
+    """Windowed, parallel LLM cleanup with a content-hash cache.
+
+    Long documents are split into windows (``split_windows``) that are cleaned
+    concurrently, at most ``parallelism`` model calls at a time across the
+    whole process, and stitched back together in order. A window that fails or
+    times out keeps its original text, so one bad window no longer throws away
+    the cleanup of the whole document.
+
+    Results are cached by sha256 of (model, content_type, window). Outputs are
+    remembered too: feeding already-cleaned text back in returns it unchanged
+    instead of paying for a second pass.
+    """
+
+    def __init__(self, cleanup_fn: CleanupFn, model: str = "", parallelism: int = 2,
+                 window_chars: int = 6000, timeout: float = 120.0,
+                 cache_size: int = 2000, cache_dir: str | None = None):
+        self.cleanup_fn = cleanup_fn
+        self.model = model
+        self.parallelism = max(1, parallelism)
+        self.window_chars = window_chars
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._cleaned: OrderedDict[str, None] = OrderedDict()  # hashes of our own outputs
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._sem: asyncio.Semaphore | None = None
+        self.stats = {"documents": 0, "windows": 0, "cache_hits": 0, "already_clean": 0,
+                      "model_calls": 0, "failures": 0}
+
+    def _key(self, text: str, content_type: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{content_type}\0{text}".encode()).hexdigest()
+
+    def _out_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0out\0{text.strip()}".encode()).hexdigest()
+
+    async def clean(self, text: str, content_type: str = "markdown") -> str:
+        """Clean ``text`` window by window and return the stitched result"""
+        self.stats["documents"] += 1
+        if not text.strip():
+            return text
+        if self._out_key(text) in self._cleaned:
+            self.stats["already_clean"] += 1
+            return text
+        windows = split_windows(text, self.window_chars)
+        self.stats["windows"] += len(windows)
+        cleaned = await asyncio.gather(*(self._clean_window(w, content_type) for w in windows))
+        result = "\n\n".join(c.strip() for c, _ in cleaned)
+        if all(ok for _, ok in cleaned):  # raw fallback text must stay retryable
+            self._remember_output(result)
+        return result
+
+    async def _clean_window(self, window: str, content_type: str) -> tuple[str, bool]:
+        """``(text, ok)``: the cleaned window, or the original with ok=False when cleanup failed"""
+        key = self._key(window, content_type)
+        hit = self._cache_get(key)
+        if hit is not None:
+            self.stats["cache_hits"] += 1
+            return hit, True
+        if key in self._inflight:
+            self.stats["cache_hits"] += 1
+            fut = self._inflight[key]
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if not fut.cancelled():  # we were cancelled ourselves
+                    raise
+            # the call we were waiting on was cancelled with its job; make our own
+            return await self._clean_window(window, content_type)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            try:
+                if self._sem is None:
+                    self._sem = asyncio.Semaphore(self.parallelism)
+                async with self._sem:
+                    self.stats["model_calls"] += 1
+                    out = await asyncio.wait_for(self.cleanup_fn(window, content_type), self.timeout)
+                if not out or not out.strip():
+                    raise ValueError("empty cleanup result")
+                self._cache_put(key, out)
+                self._remember_output(out)
+                result = out, True
+            except Exception as e:
+                self.stats["failures"] += 1
+                print(f"⚠️ Cleanup window failed ({len(window)} chars), keeping original: {e!r}")
+                result = window, False  # not cached, so a later run retries it
+            fut.set_result(result)
+            return result
+        finally:
+            # CancelledError skips the handler above: cancel the shared future so
+            # waiters retry instead of awaiting it forever
+            if not fut.done():
+                fut.cancel()
+            self._inflight.pop(key, None)
+
+    def _remember_output(self, text: str):
+        self._cleaned[self._out_key(text)] = None
+        while len(self._cleaned) > self.cache_size:
+            self._cleaned.popitem(last=False)
+
+    def _cache_get(self, key: str) -> str | None:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        if self.cache_dir:
+            path = self.cache_dir / f"{key}.json"
+            try:
+                value = json.loads(path.read_text(encoding="utf-8"))["text"]
+            except (OSError, ValueError, KeyError):
+                return None
+            self._cache_put(key, value, persist=False)
+            return value
+        return None
+
+    def _cache_put(self, key: str, value: str, persist: bool = True):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        if persist and self.cache_dir:
+            try:
+                (self.cache_dir / f"{key}.json").write_text(json.dumps({"text": value}), encoding="utf-8")
+            except OSError as e:
+                print(f"⚠️ Could not persist cleanup cache entry: {e}")
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "cached": len(self._cache),
+            "parallelism": self.parallelism,
+            "window_chars": self.window_chars,
+            "persistent": bool(self.cache_dir),
+        }
@@ -0,0 +1,226 @@
+import os, asyncio, socket, time, traceback
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from .pg_client import (
+    claim_job, complete_job, fail_job, requeue_stale_jobs,
+    set_chunks_count, set_file_status, update_job_progress,
+)
+
+# === Job queue configuration ===
+WORKERS = int(os.getenv("INGEST_WORKERS", 4))
+POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", 2.0))
+STALE_AFTER_S = int(os.getenv("INGEST_JOB_STALE_AFTER", 900))
+MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", 3))
+RETRY_BACKOFF_S = int(os.getenv("INGEST_RETRY_BACKOFF", 30))
+HEARTBEAT_S = max(5, STALE_AFTER_S // 3)
+# how often each process looks for jobs left running by a dead worker (any process's)
+REQUEUE_EVERY_S = float(os.getenv("INGEST_REQUEUE_INTERVAL", HEARTBEAT_S))
+
+STAGES = ["download", "extract", "cleanup", "chunk", "embed", "store"]
+
+# Bounded concurrency per stage, shared by every job in this process.
+# OCR is CPU-bound, embedding/cleanup are bound by the remote model hosts.
+STAGE_LIMITS = {
+    "download": int(os.getenv("INGEST_DOWNLOAD_CONCURRENCY", 4)),
+    "ocr": int(os.getenv("INGEST_OCR_CONCURRENCY", max(1, (os.cpu_count() or 2) // 2))),
+    "cleanup": int(os.getenv("INGEST_CLEANUP_CONCURRENCY", 2)),
+    "embed": int(os.getenv("INGEST_EMBED_CONCURRENCY", 4)),
+    "store": int(os.getenv("INGEST_STORE_CONCURRENCY", 2)),
+}
+_semaphores: dict[str, asyncio.Semaphore] = {}
+_SAME_AS_STAGE = object()
+
+def stage_limiter(name: str | None) -> asyncio.Semaphore | None:
+    if not name or name not in STAGE_LIMITS:
+        return None
+    if name not in _semaphores:
+        _semaphores[name] = asyncio.Semaphore(max(1, STAGE_LIMITS[name]))
+    return _semaphores[name]
+
+class JobTracker:
+    """Per-job stage progress, persisted to ingest_jobs.progress (throttled).
+
+    With ``job_id=None`` it only enforces the stage limits, so the pipeline can
+    run the same code path outside the queue.
+    """
+
+    def __init__(self, job_id: str | None = None, flush_interval: float = 1.0):
+        self.job_id = job_id
+        self.flush_interval = flush_interval
+        self.current: str | None = None
+        self.stages: dict[str, dict] = {}
+        self._last_flush = 0.0
+
+    @asynccontextmanager
+    async def stage(self, name: str, total: int | None = None, limit=_SAME_AS_STAGE):
+        """Run a block as pipeline stage ``name``, holding that stage's limiter.
+
+        ``limit`` picks a different limiter (e.g. "ocr" for extraction of scans),
+        or None for no limit.
+        """
+        limiter = stage_limiter(name if limit is _SAME_AS_STAGE else limit)
+        info = self.stages.setdefault(name, {"state": "waiting", "done": 0, "total": total})
+        if total is not None:
+            info["total"] = total
+        self.current = name
+        await self.flush()
+        if limiter is not None:
+            await limiter.acquire()
+        started = time.monotonic()
+        info["state"] = "running"
+        await self.flush(force=True)
+        try:
+            yield self
+            info["state"] = "done"
+        except Exception:
+            info["state"] = "failed"
+            raise
+        finally:
+            if limiter is not None:
+                limiter.release()
+            info["elapsed_s"] = round(info.get("elapsed_s", 0) + time.monotonic() - started, 3)
+            await self.flush(force=True)
+
+    async def mark(self, name: str, state: str):
+        """Set a stage's state directly (used by the streaming pipeline, where stages overlap)"""
+        info = self.stages.setdefault(name, {"state": "waiting", "done": 0, "total": None})
+        info["state"] = state
+        if state == "running":
+            self.current = name
+        await self.flush(force=True)
+
+    def advance(self, name: str, n: int = 1, total: int | None = None):
+        info = self.stages.setdefault(name, {"state": "running", "done": 0, "total": total})
+        info["done"] += n
+        if total is not None:
+            info["total"] = total
+
+    def snapshot(self) -> dict:
+        finished = 0.0
+        for name in STAGES:
+            info = self.stages.get(name)
+            if not info:
+                continue
+            if info["state"] == "done":
+                finished += 1
+            elif info.get("total"):
+                finished += min(1.0, info["done"] / info["total"])
+        return {
+            "current": self.current,
+            "percent": round(100 * finished / len(STAGES), 1),
+            "stages": self.stages,
+        }
+
+    async def flush(self, force: bool = False):
+        if not self.job_id:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        try:
+            await asyncio.to_thread(update_job_progress, self.job_id, self.current, self.snapshot())
+        except Exception as e:
+            print(f"⚠️ Job progress update failed for {self.job_id}: {e}")
+
+Handler = Callable[[dict, JobTracker], Awaitable[dict]]
+
+class IngestWorkerPool:
+    """Background workers that claim ingest_jobs rows and run ``handler`` on them"""
+
+    def __init__(self, handler: Handler, workers: int = WORKERS, poll_interval: float = POLL_INTERVAL):
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self.active = 0
+
+    async def start(self):
+        self._running = True
+        await self.requeue_stale()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._requeue_loop()))
+        print(f"👷 Started {self.workers} ingest workers ({self.worker_id}), stage limits: {STAGE_LIMITS}")
+
+    async def stop(self):
+        self._running = False
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def requeue_stale(self):
+        """Recover jobs whose worker died: requeued, or failed once out of attempts"""
+        try:
+            requeued, failed = await asyncio.to_thread(requeue_stale_jobs, STALE_AFTER_S)
+        except Exception as e:
+            print(f"⚠️ Could not requeue stale jobs: {e}")
+            return
+        if requeued:
+            print(f"♻️ Requeued {requeued} stale ingest jobs")
+            self.notify()
+        if failed:
+            print(f"❌ Failed {failed} stale ingest jobs that were out of attempts")
+
+    async def _requeue_loop(self):
+        # a sibling process that crashes leaves its jobs running until someone looks
+        while self._running:
+            await asyncio.sleep(REQUEUE_EVERY_S)
+            await self.requeue_stale()
+
+    def notify(self):
+        """Wake idle workers right away (a job was just enqueued in this process)"""
+        self._wakeup.set()
+
+    async def _worker(self, n: int):
+        while self._running:
+            try:
+                job = await asyncio.to_thread(claim_job, f"{self.worker_id}/{n}")
+            except Exception as e:
+                print(f"⚠️ Ingest worker {n} could not claim a job: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict):
+        job_id, file_id = str(job["id"]), str(job["file_id"])
+        tracker = JobTracker(job_id)
+        heartbeat = asyncio.create_task(self._heartbeat(tracker))
+        self.active += 1
+        try:
+            await asyncio.to_thread(set_file_status, file_id, "processing")
+            result = await self.handler(job["payload"], tracker)
+            snapshot = tracker.snapshot()
+            chunks_total = int(result.get("vectors", 0)) + int(result.get("chunks_reused", 0))
+            await asyncio.to_thread(set_chunks_count, file_id, chunks_total)
+            await asyncio.to_thread(complete_job, job_id, result, snapshot)
+            await asyncio.to_thread(set_file_status, file_id, "completed")
+            print(f"✅ Ingest job {job_id} done: {result.get('chunks')} chunks")
+        except Exception as e:
+            traceback.print_exc()
+            backoff = RETRY_BACKOFF_S * (2 ** max(0, job["attempts"] - 1))
+            try:
+                final = await asyncio.to_thread(fail_job, job_id, str(e), tracker.snapshot(), backoff)
+                if final:
+                    await asyncio.to_thread(set_file_status, file_id, "error")
+                print(f"❌ Ingest job {job_id} failed (attempt {job['attempts']}/{job['max_attempts']}): {e}")
+            except Exception as db_error:
+                print(f"⚠️ Could not record failure for job {job_id}: {db_error}")
+        finally:
+            self.active -= 1
+            heartbeat.cancel()
+
+    async def _heartbeat(self, tracker: JobTracker):
+        # Keeps locked_at fresh during long stages so the job is not seen as stale
+        while True:
+            await asyncio.sleep(HEARTBEAT_S)
+            await tracker.flush(force=True)
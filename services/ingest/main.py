@@ -1,17 +1,26 @@
-import os, httpx, io, mimetypes, re, math
+import os, httpx, io, mimetypes, re, math, hashlib, time
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from .chunker import chunk_markdown
-from .pg_client import upsert_chunks
+from .chunker import chunk_markdown, chunk_markdown_sections
+from .cleanup import CleanupEngine
+from .pdf_classify import ClassificationCache, classify_document, route_summary
+from .ocr_prep import TARGET_PX, THRESHOLD, preprocess_gray, render_page_gray
+from .ocr_workers import DEFAULT_PSM, OcrWorkerPool
+from .ocr_cache import OcrCache, ocr_key
+from .workbook import workbook_chunks, shutdown as shutdown_workbook_pool
+from .pg_client import ping, upsert_chunks, enqueue_job, get_job, queue_summary, chunk_checksums, delete_chunks_except, delete_sections_except
+from .jobs import IngestWorkerPool, JobTracker, MAX_ATTEMPTS, STAGE_LIMITS, stage_limiter
+from .pipeline import Pipeline, Stage
+from ..common.health import HealthMonitor, http_probe
 import asyncio
 
 # OCR and image processing imports
 try:
     import fitz  # PyMuPDF
     import pytesseract
-    from PIL import Image, ImageOps, ImageFilter
+    from PIL import Image
     import numpy as np
     PYTESSERACT_AVAILABLE = True
     print("✅ Pytesseract and image processing libraries loaded successfully")
@@ -19,8 +28,6 @@ except ImportError as e:
     fitz = None
     pytesseract = None
     Image = None
-    ImageOps = None
-    ImageFilter = None
     np = None
     PYTESSERACT_AVAILABLE = False
     print(f"⚠️  OCR libraries not available: {e}")
@@ -96,60 +103,30 @@ def normalize_whitespace(s: str) -> str:
     s = re.sub(r"\n{3,}", "\n\n", s)  # Limit consecutive newlines
     return s.strip()
 
-def is_text_page(page, min_chars: int = 40, min_density: float = 0.002) -> bool:
-    """Check if PDF page has extractable text"""
-    if not fitz:
-        return False
-    
-    txt = page.get_text("text") or ""
-    if not txt.strip():
-        return False
-    
-    area = page.rect.width * page.rect.height
-    density = len(txt) / max(area, 1)
-    return (len(txt) >= min_chars) and (density >= min_density)
-
 def extract_text_from_page(page) -> str:
     """Extract text from PDF page"""
     if not fitz:
         return ""
     return page.get_text("text") or ""
 
-def render_page_to_image(page, zoom: float = 2.0):
-    """Render PDF page to PIL Image"""
-    if not fitz or not Image:
-        return None
-    
-    mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat, alpha=False)
-    img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-    return img
-
-def preprocess_for_ocr(img):
-    """Preprocess image for better OCR results"""
-    if not Image or not ImageOps or not ImageFilter or not np:
+def preprocess_for_ocr(img, timings: dict | None = None):
+    """Preprocess an uploaded image for better OCR results (grayscale → autocontrast → Otsu/Sauvola threshold)"""
+    if not Image or not np:
         return img
     
-    # Convert to grayscale
-    g = ImageOps.grayscale(img)
-    g = ImageOps.autocontrast(g)
-    
-    # Upscale if image is small
+    t0 = time.perf_counter()
+    g = img if img.mode == "L" else img.convert("L")
+    # Uploaded images only: PDF pages are already rendered at the target size
     max_side = max(g.size)
-    if max_side < 1800:
-        scale = 1800 / max_side
-        new_size = (int(g.width * scale), int(g.height * scale))
-        g = g.resize(new_size, Image.Resampling.LANCZOS)
-    
-    # Sharpen
-    g = g.filter(ImageFilter.UnsharpMask(radius=1, percent=120, threshold=8))
-    
-    # Threshold to binary
-    arr = np.array(g)
-    thr = 180
-    bw = (arr > thr) * 255
-    g2 = Image.fromarray(bw.astype(np.uint8), mode="L")
-    return g2
+    if max_side < TARGET_PX:
+        scale = TARGET_PX / max_side
+        g = g.resize((int(g.width * scale), int(g.height * scale)), Image.Resampling.BILINEAR)
+    arr = np.array(g, dtype=np.uint8)  # writable copy, processed in place
+    t1 = time.perf_counter()
+    bw = preprocess_gray(arr, timings=timings)
+    if timings is not None:
+        timings["load_ms"] = round((t1 - t0) * 1000, 2)
+    return bw  # 2-D uint8 array, accepted by both OCR backends
 
 def ocr_image(img, lang: str = "eng") -> str:
     """Perform OCR on image using pytesseract"""
@@ -173,15 +150,10 @@ def is_pdf_ext(filename: str) -> bool:
 
 # === Ollama Content Cleanup Functions ===
 
-async def cleanup_with_ollama(content: str, content_type: str = "markdown") -> str:
-    """Clean up and format content using Ollama LLM"""
-    if not OLLAMA_BASE:
-        print("⚠️ Ollama not configured, returning original content")
-        return content
-    
-    try:
-        if content_type == "ocr":
-            system_prompt = """You are a document processing expert. Clean up this OCR text by:
+def cleanup_prompt(content_type: str) -> str:
+    """System prompt for one cleanup window"""
+    if content_type == "ocr":
+        system_prompt = """You are a document processing expert. Clean up this OCR text by:
 1. Fixing obvious OCR errors and typos
 2. Properly formatting the text with appropriate headings
 3. Converting to well-structured markdown format
@@ -189,8 +161,8 @@ async def cleanup_with_ollama(content: str, content_type: str = "markdown") -> s
 5. Do not summarize - keep all content
 
 Return clean, well-formatted markdown."""
-        elif content_type == "csv":
-            system_prompt = """You are a data processing expert. Clean up this CSV/table content by:
+    elif content_type == "csv":
+        system_prompt = """You are a data processing expert. Clean up this CSV/table content by:
 1. Ensuring proper structure and formatting
 2. Fixing any parsing errors
 3. Maintaining all data integrity
@@ -198,8 +170,8 @@ Return clean, well-formatted markdown."""
 5. Do not remove any rows or columns
 
 Return clean, properly formatted CSV data."""
-        else:  # markdown
-            system_prompt = """You are a document formatting expert. Improve this markdown by:
+    else:  # markdown
+        system_prompt = """You are a document formatting expert. Improve this markdown by:
 1. Better heading structure and organization
 2. Proper formatting of lists, tables, and sections
 3. Fixing any formatting issues
@@ -207,73 +179,54 @@ Return clean, properly formatted CSV data."""
 5. Do not summarize - keep all information
 
 Return improved, well-structured markdown."""
-        
-        async with httpx.AsyncClient(timeout=120) as cli:
-            payload = {
-                "model": CLEANUP_MODEL,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": content}
-                ],
-                "stream": False,
-                "options": {"temperature": 0.1}
-            }
-            
-            response = await cli.post(f"{OLLAMA_BASE}/api/chat", json=payload)
-            
-            if response.status_code == 200:
-                data = response.json()
-                cleaned_content = data.get("message", {}).get("content", content)
-                print(f"✅ Ollama cleanup successful: {len(cleaned_content)} characters")
-                return cleaned_content
-            else:
-                print(f"⚠️ Ollama cleanup failed: {response.status_code} {response.text}")
-                return content
-                
-    except Exception as e:
-        print(f"⚠️ Ollama cleanup error: {e}")
-        return content
+    return system_prompt
 
-async def detect_pdf_content_type(url: str, filename: str) -> str:
-    """Detect if PDF is text-dominated or image-dominated"""
-    if not TESSERACT_READY or not fitz:
-        return "text"  # Assume text if OCR not available
-    
-    try:
-        # Download and analyze first few pages
-        async with httpx.AsyncClient(timeout=60) as cli:
-            response = await cli.get(url)
-            response.raise_for_status()
-            pdf_data = response.content
-        
-        doc = fitz.open(stream=pdf_data, filetype="pdf")
-        
-        # Sample first 3 pages or all pages if less
-        sample_pages = min(3, len(doc))
-        text_pages = 0
-        
-        for page_num in range(sample_pages):
-            page = doc.load_page(page_num)
-            if is_text_page(page):
-                text_pages += 1
-        
-        doc.close()
-        
-        # If majority of sampled pages have text, classify as text-dominated
-        if text_pages >= sample_pages * 0.6:
-            return "text"
-        else:
-            return "image"
-            
-    except Exception as e:
-        print(f"⚠️ PDF content detection error: {e}")
-        return "text"  # Default fallback
+async def ollama_cleanup_window(content: str, content_type: str) -> str:
+    """One Ollama chat call for a single cleanup window; raises on failure"""
+    payload = {
+        "model": CLEANUP_MODEL,
+        "messages": [
+            {"role": "system", "content": cleanup_prompt(content_type)},
+            {"role": "user", "content": content}
+        ],
+        "stream": False,
+        "options": {"temperature": 0.1}
+    }
+    async with httpx.AsyncClient(timeout=CLEANUP_TIMEOUT) as cli:
+        response = await cli.post(f"{OLLAMA_BASE}/api/chat", json=payload)
+    if response.status_code != 200:
+        raise RuntimeError(f"Ollama cleanup failed: {response.status_code} {response.text[:200]}")
+    return response.json().get("message", {}).get("content", "")
+
+async def cleanup_with_ollama(content: str, content_type: str = "markdown") -> str:
+    """Clean up and format content using Ollama LLM (windowed, parallel, cached)"""
+    if not OLLAMA_BASE:
+        print("⚠️ Ollama not configured, returning original content")
+        return content
+    cleaned_content = await cleaner.clean(content, content_type)
+    print(f"✅ Ollama cleanup done: {len(cleaned_content)} characters")
+    return cleaned_content
 
 # Add test endpoints for debugging
 @app.get("/")
 async def root():
   return {"service": "know-ai-ingest", "status": "running", "version": "1.0.0"}
 
+@app.get("/ocr/cache")
+async def ocr_cache_stats():
+  """On-disk OCR cache: hit rate, size, evictions"""
+  return ocr_cache.info()
+
+@app.get("/classify/stats")
+async def classify_stats():
+  """Per-checksum page classification cache"""
+  return page_routes.info()
+
+@app.get("/cleanup/stats")
+async def cleanup_stats():
+  """Windowed cleanup engine: cache hits, skipped second passes, model calls"""
+  return cleaner.info()
+
 @app.get("/test/embed")
 async def test_embeddings():
   """Test embedding functionality with different strategies"""
@@ -322,29 +275,35 @@ async def test_processing():
   if AGNO_BASE:
     try:
       async with httpx.AsyncClient(timeout=5) as cli:
-        response = await cli.get(f"{AGNO_BASE}/health")
+        response = await cli.get(f"{AGNO_BASE}/health/ready")
         agno_status = f"available ({response.status_code})"
     except Exception as e:
       agno_status = f"error: {e}"
   
   return {
     "available_flows": {
-      "csv_excel": {
-        "description": "CSV/Excel files use Ollama cleanup + Agno row-based chunking for enhanced data processing",
-        "supported_types": [".csv", ".xlsx", ".xls"],
+      "csv": {
+        "description": "CSV files use Ollama cleanup + Agno row-based chunking for enhanced data processing",
+        "supported_types": [".csv"],
         "flow": "File → CSV Content → Ollama Data Cleanup → Agno Row Chunking → Embeddings → Vector Storage",
         "status": "ready"
       },
+      "excel": {
+        "description": "Workbooks are parsed once per worker process, sheets in parallel; unchanged sheets (same content hash) are skipped on re-ingest",
+        "supported_types": [".xlsx", ".xls"],
+        "flow": "Workbook → Parallel Sheet Parsing → Sheet Hash Check → Per-Sheet Row Chunks → Embeddings → Vector Storage",
+        "status": "ready"
+      },
       "pdf": {
-        "description": "PDF files use smart content detection: text-dominated use simple extraction + Ollama formatting, image-dominated use OCR + Ollama cleanup", 
+        "description": "PDF pages stream through the pipeline one at a time: text pages use simple extraction, scanned pages use OCR, each page is cleaned up by Ollama and stored as soon as it is embedded", 
         "supported_types": [".pdf"],
-        "flow": "PDF → Content Analysis → [Text Extraction OR OCR] → Ollama Enhancement → Agno Semantic Chunking → Embeddings → Vector Storage",
+        "flow": "PDF → Per-page [Text Extraction OR OCR] → Ollama Enhancement → Section Chunking → Batched Embeddings → Vector Storage (stages overlap)",
         "status": "ready" if tesseract_status == "ready" else "degraded - OCR unavailable for scanned PDFs"
       },
       "images": {
         "description": "Image files use OCR + Ollama cleanup for enhanced accuracy",
         "supported_types": [".png", ".jpg", ".jpeg", ".webp", ".tif", ".tiff", ".bmp"],
-        "flow": "Image → Pytesseract OCR → Ollama Text Cleanup → Agno Semantic Chunking → Embeddings → Vector Storage",
+        "flow": "Image → Pytesseract OCR → Ollama Text Cleanup → Section Chunking → Embeddings → Vector Storage",
         "status": "ready" if tesseract_status == "ready" else "degraded - OCR unavailable"
       },
       "other": {
@@ -360,6 +319,10 @@ async def test_processing():
         "details": tesseract_details,
         "description": "Local OCR engine for PDF and image processing"
       },
+      "ocr_workers": {
+        **ocr_pool.info(),
+        "description": "Persistent tesserocr worker processes (falls back to pytesseract per page)"
+      },
       "agno_ai": {
         "status": "available" if AGNO_AVAILABLE else "not installed",
         "description": "Direct Agno library integration for advanced chunking",
@@ -391,170 +354,126 @@ async def test_processing():
 LITELLM_BASE = os.environ["LITELLM_BASE"]
 LITELLM_API_KEY = os.getenv("LITELLM_API_KEY","sk")
 EMBED_MODEL = os.getenv("RAG_EMBED_MODEL","mxbai-embed-large:latest")
+EMBED_DIM = int(os.getenv("EMBED_DIM", 1024))  # must match doc_chunks.embedding vector(N)
 OLLAMA_BASE = os.getenv("OLLAMA_BASE", "http://117.54.250.177:5162")
 CLEANUP_MODEL = os.getenv("RAG_GENERATION_MODEL", "deepseek-r1:14b")
+CLEANUP_TIMEOUT = float(os.getenv("INGEST_CLEANUP_TIMEOUT", 120))  # per window, not per document
+OCR_LANG = os.getenv("INGEST_OCR_LANG", "eng")
+ocr_pool = OcrWorkerPool()
+ocr_cache = OcrCache()
+page_routes = ClassificationCache(
+    size=int(os.getenv("INGEST_CLASSIFY_CACHE_SIZE", 500)),
+    cache_dir=os.getenv("INGEST_CLASSIFY_CACHE_DIR") or None,
+)
+cleaner = CleanupEngine(
+    ollama_cleanup_window,
+    model=CLEANUP_MODEL,
+    parallelism=STAGE_LIMITS["cleanup"],  # concurrent Ollama calls for the whole process
+    window_chars=int(os.getenv("INGEST_CLEANUP_WINDOW_CHARS", 6000)),
+    timeout=CLEANUP_TIMEOUT,
+    cache_size=int(os.getenv("INGEST_CLEANUP_CACHE_SIZE", 2000)),
+    cache_dir=os.getenv("INGEST_CLEANUP_CACHE_DIR") or None,
+)
 AGNO_BASE = os.getenv("AGNO_BASE")
+API_BASE = os.getenv("API_BASE", "http://127.0.0.1:4000")  # re-signs S3 URLs for queued jobs
+PARSERS_BASE = os.getenv("PARSERS_BASE")  # LAS files go to the parsers' columnar well store when set
+EMBED_BASE = os.getenv("EMBED_BASE", "http://127.0.0.1:9011")  # shared embedding gateway (services/embed)
+EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", 32))
+EMBED_LINGER_MS = float(os.getenv("INGEST_EMBED_LINGER_MS", 50))  # wait this long to fill an embed batch
+PAGE_QUEUE = int(os.getenv("INGEST_PAGE_QUEUE", 4))  # pages buffered between stages (bounds memory)
 
 class Req(BaseModel):
   file_id: str
-  s3_signed_url: str
+  s3_signed_url: str | None = None  # signed for 10 minutes; not kept in the job queue
+  s3_key: str | None = None
   filename: str
   checksum: str | None = None
   tenant_id: str = "demo"
   mime_type: str | None = None
 
-async def process_pdf_with_ocr(url: str, filename: str) -> str:
-    """Process PDF with mixed text extraction and OCR using pytesseract"""
-    if not TESSERACT_READY or not fitz:
-        return f"# OCR Not Available\n\nDocument: {filename}\nError: Pytesseract or PyMuPDF not configured\n\nPlease install: pip install PyMuPDF pytesseract pillow numpy"
-    
+def job_payload(r: Req) -> dict:
+  """What the durable queue keeps: a retried or requeued job runs long after the URL expired"""
+  return r.model_dump(exclude={"s3_signed_url"})
+
+async def download_url(r: Req) -> str:
+  """The request's signed URL, or a fresh one from the API for queued jobs"""
+  if r.s3_signed_url:
+    return r.s3_signed_url
+  async with httpx.AsyncClient(timeout=30) as cli:
+    resp = await cli.get(f"{API_BASE}/api/files/{r.file_id}/signed-get")
+    resp.raise_for_status()
+    return resp.json()["url"]
+
+async def download_file(url: str, timeout: int = 120) -> bytes:
+    """Fetch the raw file once; every later stage works on these bytes"""
+    async with httpx.AsyncClient(timeout=timeout) as cli:
+        response = await cli.get(url)
+        response.raise_for_status()
+        return response.content
+
+def extract_pdf_page(doc, info: dict) -> dict:
+    """Text-extract one classified PDF page, or render + preprocess it for OCR (runs in a worker thread)"""
+    page_no = info["page"]
+    page = doc.load_page(page_no - 1)
+    if info["route"] == "text":
+        return {"page": page_no, "method": "text", "text": extract_text_from_page(page)}
+    if not np:
+        return {"page": page_no, "method": "failed", "text": f"[Page {page_no}: Image processing failed]"}
+    timings = {}
+    t0 = time.perf_counter()
+    # grayscale pixmap wrapped as a NumPy view: hashed, preprocessed and OCR'd without PIL round-trips
+    gray, pix = render_page_gray(page)
+    timings["render_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    h, w = gray.shape
+    key = ocr_key(np.ascontiguousarray(gray).data, w, h, OCR_LANG, DEFAULT_PSM, prep=THRESHOLD) if ocr_cache.enabled else None
+    cached = ocr_cache.get(key) if key else None
+    if cached is not None:
+        return {"page": page_no, "method": "ocr", "text": cached, "cached": True, "timings": timings}
+    bw = preprocess_gray(gray, timings=timings)
+    if not np.shares_memory(bw, gray):
+        pix = None  # the preprocessed copy no longer needs the pixmap
+    return {"page": page_no, "method": "ocr", "image": bw, "pixmap": pix, "timings": timings, "cache_key": key}
+
+def prepare_image(image_data: bytes) -> dict:
+    """Decode + preprocess an uploaded image for OCR (runs in a worker thread)"""
+    key = ocr_key(image_data, 0, 0, OCR_LANG, DEFAULT_PSM, prep=f"upload|{TARGET_PX}|{THRESHOLD}") if ocr_cache.enabled else None
+    cached = ocr_cache.get(key) if key else None
+    if cached is not None:
+        return {"page": 1, "method": "ocr", "text": cached, "cached": True}
+    timings = {}
+    img = Image.open(io.BytesIO(image_data))
+    return {"page": 1, "method": "ocr", "image": preprocess_for_ocr(img, timings), "timings": timings, "cache_key": key}
+
+async def ocr_item(item: dict) -> dict:
+    """OCR a prepared page on the persistent worker pool, or pytesseract in a thread"""
+    if not ocr_pool.available:
+        return await asyncio.to_thread(ocr_page, item)
+    pix = item.pop("pixmap", None)  # backs item["image"]; held until OCR returns
+    t0 = time.perf_counter()
     try:
-        print(f"📄 Processing PDF with pytesseract OCR: {filename}")
-        
-        # Download PDF
-        async with httpx.AsyncClient(timeout=120) as cli:
-            response = await cli.get(url)
-            response.raise_for_status()
-            pdf_data = response.content
-        
-        # Process PDF
-        doc = fitz.open(stream=pdf_data, filetype="pdf")
-        pages_content = []
-        total_pages = len(doc)
-        
-        print(f"  → Processing {total_pages} pages...")
-        
-        for page_num in range(total_pages):
-            page = doc.load_page(page_num)
-            page_text = ""
-            
-            # Try text extraction first
-            if is_text_page(page):
-                page_text = extract_text_from_page(page)
-                print(f"    Page {page_num + 1}: Text extracted ({len(page_text)} chars)")
-                method = "text"
-            else:
-                # Use OCR for image-based pages
-                try:
-                    img = render_page_to_image(page, zoom=2.0)
-                    if img:
-                        preprocessed = preprocess_for_ocr(img)
-                        page_text = ocr_image(preprocessed, lang="eng")
-                        page_text = normalize_whitespace(page_text)
-                        print(f"    Page {page_num + 1}: OCR processed ({len(page_text)} chars)")
-                        method = "ocr"
-                    else:
-                        page_text = f"[Page {page_num + 1}: Image processing failed]"
-                        method = "failed"
-                except Exception as ocr_error:
-                    page_text = f"[Page {page_num + 1}: OCR failed - {ocr_error}]"
-                    method = "failed"
-                    print(f"    Page {page_num + 1}: OCR failed - {ocr_error}")
-            
-            # Add page content with header
-            if page_text.strip():
-                pages_content.append(f"\n\n---\n\n### Page {page_num + 1} ({method.upper()})\n\n{page_text}")
-        
-        doc.close()
-        
-        # Combine all pages
-        markdown_content = f"# {filename}\n" + "".join(pages_content)
-        
-        if not markdown_content.strip() or len(markdown_content) < 50:
-            markdown_content = f"# Document Processing\n\nDocument: {filename}\nSource: {url}\n\nNote: No content could be extracted from this document."
-        
-        print(f"✅ PDF processing complete: {len(markdown_content)} characters total")
-        return markdown_content
-        
-    except Exception as e:
-        print(f"❌ PDF processing error: {e}")
-        return f"# Document Processing Error\n\nDocument: {filename}\nSource: {url}\nError: {e}\n\n*Note: This document could not be processed due to an error.*"
-
-async def process_image_with_ocr(url: str, filename: str) -> str:
-    """Process image file with pytesseract OCR"""
-    if not TESSERACT_READY or not Image:
-        return f"# OCR Not Available\n\nImage: {filename}\nError: Pytesseract not configured\n\nPlease install Tesseract-OCR and pytesseract"
-    
-    try:
-        print(f"🖼️ Processing image with pytesseract OCR: {filename}")
-        
-        # Download image
-        async with httpx.AsyncClient(timeout=60) as cli:
-            response = await cli.get(url)
-            response.raise_for_status()
-            image_data = response.content
-        
-        # Process image
-        img = Image.open(io.BytesIO(image_data)).convert("RGB")
-        preprocessed = preprocess_for_ocr(img)
-        extracted_text = ocr_image(preprocessed, lang="eng")
-        cleaned_text = normalize_whitespace(extracted_text)
-        
-        # Create markdown
-        markdown_content = f"# {filename}\n\n## OCR Content\n\n{cleaned_text}"
-        
-        if not cleaned_text.strip() or len(cleaned_text) < 10:
-            markdown_content = f"# Image Processing\n\nImage: {filename}\n\nNote: No text could be extracted from this image."
-        
-        print(f"✅ Image OCR complete: {len(cleaned_text)} characters extracted")
-        return markdown_content
-        
-    except Exception as e:
-        print(f"❌ Image processing error: {e}")
-async def process_text_pdf_to_md(url: str, filename: str) -> str:
-    """Process text-dominated PDF by extracting text and formatting with Ollama"""
+        text = await ocr_pool.ocr(item.pop("image"), lang=OCR_LANG)
+        item["text"] = normalize_whitespace(text)
+        item.setdefault("timings", {})["ocr_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        if item.get("cache_key"):
+            await asyncio.to_thread(ocr_cache.put, item["cache_key"], item["text"])
+    except Exception as ocr_error:
+        item["text"] = f"[Page {item['page']}: OCR failed - {ocr_error}]"
+        item["method"] = "failed"
+    return item
+
+def ocr_page(item: dict) -> dict:
+    """OCR a prepared page in place (runs in a worker thread)"""
+    pix = item.pop("pixmap", None)  # backs item["image"]; held until OCR returns
+    t0 = time.perf_counter()
     try:
-        print(f"📄 Processing text-dominated PDF: {filename}")
-        
-        # Download PDF
-        async with httpx.AsyncClient(timeout=120) as cli:
-            response = await cli.get(url)
-            response.raise_for_status()
-            pdf_data = response.content
-        
-        if not fitz:
-            return f"# PDF Processing Error\n\nDocument: {filename}\nError: PyMuPDF not available\n\nPlease install: pip install PyMuPDF"
-        
-        # Extract text from PDF
-        doc = fitz.open(stream=pdf_data, filetype="pdf")
-        all_text = ""
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            page_text = page.get_text("text")
-            if page_text.strip():
-                all_text += f"\n\n## Page {page_num + 1}\n\n{page_text}"
-        
-        doc.close()
-        
-        if not all_text.strip():
-            return f"# Text Extraction Failed\n\nDocument: {filename}\nError: No text could be extracted\n\nNote: This may be a scanned document that requires OCR processing."
-        
-        # Clean up and format with Ollama
-        markdown_content = f"# {filename}\n{all_text}"
-        cleaned_markdown = await cleanup_with_ollama(markdown_content, "markdown")
-        
-        print(f"✅ Text PDF processing complete: {len(cleaned_markdown)} characters")
-        return cleaned_markdown
-        
-    except Exception as e:
-        print(f"❌ Text PDF processing error: {e}")
-        return f"# Text PDF Processing Error\n\nDocument: {filename}\nError: {e}\n\n*Note: This document could not be processed due to an error.*"
-
-async def xlsx_to_md(url:str)->str:
-  async with httpx.AsyncClient(timeout=120) as cli:
-    f = await cli.get(url); f.raise_for_status()
-  import io, pandas as pd
-  buf = io.BytesIO(f.content)
-  xls = pd.ExcelFile(buf)
-  md=[]
-  for sh in xls.sheet_names:
-    df = pd.read_excel(buf, sheet_name=sh)
-    df_limited = df.head(2000)
-    md.append(f"## Sheet: {sh}\n")
-    markdown_table = df_limited.to_markdown(index=False) or "No data available"
-    md.append(markdown_table)
-  return "\n\n".join(md)
+        item["text"] = normalize_whitespace(ocr_image(item.pop("image"), lang=OCR_LANG))
+        item.setdefault("timings", {})["ocr_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        if item.get("cache_key") and not item["text"].startswith(("OCR failed", "OCR not available")):
+            ocr_cache.put(item["cache_key"], item["text"])
+    except Exception as ocr_error:
+        item["text"] = f"[Page {item['page']}: OCR failed - {ocr_error}]"
+        item["method"] = "failed"
+    return item
 
 async def csv_to_md(url:str)->str:
   async with httpx.AsyncClient(timeout=120) as cli:
@@ -570,13 +489,16 @@ async def agno_chunk_csv(csv_content: str, filename: str) -> list[dict]:
     print(f"📈 Processing CSV with fallback chunking: {filename}")
     return await fallback_csv_chunking(csv_content)
 
-async def agno_chunk_markdown(md: str, filename: str) -> list[dict]:
-    """Markdown-specific chunking using enhanced fallback method (Agno integration disabled for stability)"""
+async def agno_chunk_markdown(md: str, filename: str, cleaned: bool = False) -> list[dict]:
+    """Markdown-specific chunking using enhanced fallback method (Agno integration disabled for stability)
+    
+    Pass ``cleaned=True`` when ``md`` already went through cleanup_with_ollama.
+    """
     print(f"📝 Processing markdown with enhanced chunking: {filename}")
     
     try:
         # Clean up markdown content with Ollama first for better results
-        cleaned_md = await cleanup_with_ollama(md, "markdown")
+        cleaned_md = md if cleaned else await cleanup_with_ollama(md, "markdown")
         if not cleaned_md.strip():
             cleaned_md = md  # Fallback to original if cleanup fails
         
@@ -662,233 +584,399 @@ async def fallback_csv_chunking(csv_content: str) -> list[dict]:
         print(f"Fallback CSV chunking error: {e}")
         return []
 
+def check_embedding_dims(vectors:list[list[float]], source:str)->list[list[float]]:
+  """Refuse vectors that would not fit doc_chunks.embedding (vector(EMBED_DIM))"""
+  bad = {len(v) for v in vectors if len(v) != EMBED_DIM}
+  if bad:
+    raise ValueError(f"{source} returned {sorted(bad)}-d vectors, expected {EMBED_DIM}")
+  return vectors
+
 async def embed_texts(texts:list[str])->list[list[float]]:
-  """Get embeddings with fallback strategy: LiteLLM -> OpenAI -> Mock"""
-  # Strategy 1: Try LiteLLM with Ollama
+  """Embed through the shared gateway.
+
+  The gateway falls back from remote LiteLLM to the local ONNX backend, so a
+  saturated or unreachable Ollama host does not stop ingestion, and it only
+  uses providers embedding with EMBED_MODEL: a hosted model of the same
+  dimension would still be a different vector space. Raises if it fails or
+  returns vectors of the wrong dimension.
+  """
+  async with httpx.AsyncClient(timeout=120) as cli:
+    r = await cli.post(f"{EMBED_BASE}/embeddings",
+      headers={"Authorization": f"Bearer {LITELLM_API_KEY}"},
+      json={"model": EMBED_MODEL, "input": texts})
+  if r.status_code != 200:
+    raise RuntimeError(f"Embedding gateway failed with status {r.status_code}: {r.text[:200]}")
+  # No mock vectors: zero vectors of the wrong size would silently poison doc_chunks
+  return check_embedding_dims([e["embedding"] for e in r.json()["data"]], "Embedding gateway")
+  
+def file_kind(r: Req) -> str:
+  """csv | excel | las | pdf | image | other"""
+  if r.filename.lower().endswith(".csv") or (r.mime_type == "text/csv"):
+    return "csv"
+  if r.filename.lower().endswith(".las"):
+    return "las"
+  if (r.filename.lower().endswith((".xlsx", ".xls")) or 
+      (r.mime_type or "").startswith("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet") or
+      (r.mime_type or "").startswith("application/vnd.ms-excel")):
+    return "excel"
+  if (r.mime_type == "application/pdf") or r.filename.lower().endswith(".pdf"):
+    return "pdf"
+  if is_image_ext(r.filename) or (r.mime_type and r.mime_type.startswith("image/")):
+    return "image"
+  return "other"
+
+def page_stages(r: Req, job: JobTracker, stats: dict, doc=None) -> list[Stage]:
+  """render → extract (OCR) → cleanup → chunk, one page at a time"""
+  next_idx = 0
+
+  async def render(src, emit):
+    # PyMuPDF documents are not thread-safe, so rendering stays on one worker
+    item = await asyncio.to_thread(extract_pdf_page, doc, src) if doc is not None else \
+           await asyncio.to_thread(prepare_image, src)
+    await emit(item)
+
+  async def extract(item, emit):
+    if item.get("cached"):
+      stats["ocr_cache_hits"] += 1
+    elif item["method"] == "ocr":
+      async with stage_limiter("ocr"):
+        item = await ocr_item(item)
+    for k, ms in item.pop("timings", {}).items():
+      stats["ocr_ms"][k] = round(stats["ocr_ms"].get(k, 0) + ms, 2)
+    print(f"    Page {item['page']}: {item['method']} ({len(item['text'])} chars)")
+    job.advance("extract")
+    await job.flush()
+    await emit(item)
+
+  async def cleanup(item, emit):
+    text = item["text"]
+    if text.strip():
+      page_md = f"## Page {item['page']} ({item['method'].upper()})\n\n{text}"
+      item["markdown"] = await cleanup_with_ollama(page_md, "ocr" if item["method"] == "ocr" else "markdown")
+      await emit(item)
+    job.advance("cleanup")
+    await job.flush()
+
+  async def chunk(item, emit):
+    nonlocal next_idx
+    chunks = chunk_markdown_sections(item["markdown"] or item["text"], page=item["page"], start_idx=next_idx)
+    next_idx += len(chunks)
+    job.advance("chunk", len(chunks))
+    for c in chunks:
+      await emit(c)
+
+  return [
+    Stage("render", render, workers=1, queue_size=PAGE_QUEUE),
+    Stage("extract", extract, workers=STAGE_LIMITS["ocr"], queue_size=PAGE_QUEUE),
+    Stage("cleanup", cleanup, workers=STAGE_LIMITS["cleanup"], queue_size=PAGE_QUEUE),
+    Stage("chunk", chunk, workers=1, queue_size=PAGE_QUEUE),
+  ]
+
+def vector_stages(r: Req, job: JobTracker, stats: dict) -> list[Stage]:
+  """embed (dynamic batches) → store, as soon as chunks are available"""
+  async def embed(batch, emit):
+    async with stage_limiter("embed"):
+      vecs = await embed_texts([c["text"] for c in batch])
+    job.advance("embed", len(batch))
+    await job.flush()
+    await emit((batch, vecs))
+
+  async def store(item, emit):
+    chunks, vecs = item
+    if len(vecs) != len(chunks):
+      raise ValueError(f"{len(vecs)} vectors for {len(chunks)} chunks")
+    async with stage_limiter("store"):
+      await asyncio.to_thread(upsert_chunks, r.file_id, r.tenant_id, r.checksum, chunks, vecs)
+    if stats["first_chunk_s"] is None:
+      stats["first_chunk_s"] = round(time.monotonic() - stats["started"], 3)
+      print(f"  → First chunks searchable after {stats['first_chunk_s']}s")
+    stats["chunks"] += len(chunks)
+    stats["vectors"] += len(vecs)
+    stats["sections"].update(c["section"] for c in chunks if c.get("section"))
+    job.advance("store", len(chunks))
+    await job.flush()
+
+  return [
+    Stage("embed", embed, workers=STAGE_LIMITS["embed"], batch=EMBED_BATCH, linger_ms=EMBED_LINGER_MS, queue_size=EMBED_BATCH * 2),
+    Stage("store", store, workers=STAGE_LIMITS["store"], queue_size=STAGE_LIMITS["embed"] * 2),
+  ]
+
+async def store_well_logs(data: bytes, r: Req) -> dict | None:
+  """Hand a LAS file to the parsers service, which keeps it as per-well columns for plotting"""
+  if not PARSERS_BASE:
+    return None
   try:
     async with httpx.AsyncClient(timeout=120) as cli:
-      r = await cli.post(f"{LITELLM_BASE}/embeddings",
-        headers={"Authorization": f"Bearer {LITELLM_API_KEY}"},
-        json={"model": EMBED_MODEL, "input": texts})
-      
-      if r.status_code == 200:
-        data = r.json()
-        return [e["embedding"] for e in data["data"]]
-      else:
-        print(f"LiteLLM embeddings failed with status {r.status_code}: {r.text}")
-        raise Exception(f"LiteLLM failed: {r.status_code}")
-        
+      resp = await cli.post(f"{PARSERS_BASE}/wells/ingest", content=data,
+                            params={"file_id": r.file_id, "checksum": r.checksum or hashlib.sha256(data).hexdigest()})
+      resp.raise_for_status()
+      return resp.json()
   except Exception as e:
-    print(f"LiteLLM embedding attempt failed: {e}")
-    
-    # Strategy 2: Try OpenAI directly as fallback
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    if openai_api_key and openai_api_key != "sk-your-openai-api-key-here":
-      try:
-        print("Attempting OpenAI fallback for embeddings...")
-        async with httpx.AsyncClient(timeout=120) as cli:
-          r = await cli.post("https://api.openai.com/v1/embeddings",
-            headers={"Authorization": f"Bearer {openai_api_key}"},
-            json={"model": "text-embedding-3-small", "input": texts})
-          
-          if r.status_code == 200:
-            data = r.json()
-            print(f"✅ OpenAI fallback successful for {len(texts)} texts")
-            return [e["embedding"] for e in data["data"]]
-          else:
-            print(f"OpenAI embeddings failed: {r.status_code} {r.text}")
-            
-      except Exception as openai_error:
-        print(f"OpenAI fallback failed: {openai_error}")
-    
-    # Strategy 3: Return mock embeddings for development
-    print(f"All embedding strategies failed, returning mock embeddings for {len(texts)} texts")
-    return [[0.0] * 384 for _ in texts]  # Mock embeddings with consistent dimension
+    print(f"⚠️ Well log store failed for {r.filename}: {e}")
+    return None
+
+def well_summary_markdown(meta: dict, filename: str) -> str:
+  """What is worth embedding from a LAS: the header and per-curve ranges, not the data block"""
+  lines = [f"# Well log: {meta['well']} ({filename})", "",
+           f"Depth {meta['depth_min']} to {meta['depth_max']} {meta.get('depth_unit', '')}, {meta['rows']} samples.", "",
+           "## Well header", ""]
+  lines += [f"- {k}: {v}" for k, v in meta.get("header", {}).items() if v not in ("", None)]
+  lines += ["", "## Curves", "", "| curve | unit | min | max | valid samples |", "|---|---|---|---|---|"]
+  for c in meta["curves"]:
+    st = meta["stats"].get(c, {})
+    lines.append(f"| {c} | {meta['units'].get(c, '')} | {st.get('min')} | {st.get('max')} | {st.get('valid')} |")
+  return "\n".join(lines)
+
+async def whole_file_chunks(kind: str, data: bytes, r: Req, job: JobTracker) -> list[dict]:
+  """Chunk files that are not paged (CSV, text) before streaming them to embed/store"""
+  if kind == "csv":
+    print(f"📈 Processing CSV file: Content cleanup → Row-based chunking")
+    async with job.stage("extract", limit=None):
+      csv_content = data.decode("utf-8", errors="replace")
+    async with job.stage("chunk"):
+      return await agno_chunk_csv(csv_content, r.filename)
+
+  if kind == "las":
+    async with job.stage("extract", limit=None):
+      meta = await store_well_logs(data, r)
+    if meta is not None:
+      print(f"🛢️ Stored well {meta['well']}: {len(meta['curves'])} curves, {meta['rows']} samples")
+      async with job.stage("chunk"):
+        return chunk_markdown_sections(well_summary_markdown(meta, r.filename))
+
+  print(f"📄 Processing other file type with basic strategy")
+  md = f"# {r.filename}\n\n{data.decode('utf-8', errors='replace')}"
+  async with job.stage("chunk"):
+    return await agno_chunk_markdown(md, r.filename)
+
+async def process_file(r: Req, job: JobTracker | None = None) -> dict:
+  """Run the ingest pipeline for one file, reporting per-stage progress to ``job``.
   
+  PDFs and images stream page by page through render → OCR → cleanup →
+  chunk → embed → store over bounded queues, so the first chunks are
+  searchable long before the last page is OCR'd. Raises on embedding/storage
+  failure so queued jobs are retried.
+  """
+  job = job or JobTracker()
+  kind = file_kind(r)
+  stats = {"started": time.monotonic(), "chunks": 0, "vectors": 0, "first_chunk_s": None, "ocr_ms": {}, "ocr_cache_hits": 0,
+           "sections": set()}
+  print(f"📁 Processing file: {r.filename} (type: {r.mime_type}, kind: {kind})")
+
+  async with job.stage("download"):
+    data = await download_file(await download_url(r))
+
+  doc = None
+  pages = 0
+  routes = None
+  sheets = None
+  reused = 0
+  if kind == "excel":
+    # one parse per worker process; sheets fully stored under the same content hash are skipped
+    print(f"📊 Processing Excel workbook: per-sheet parallel parsing → row chunks")
+    stored = await asyncio.to_thread(chunk_checksums, r.file_id)
+    async with job.stage("extract", limit=None):
+      source, sheets = await workbook_chunks(data, stored)
+    reused = sum(stored[s["hash"]] for s in sheets if s["skipped"])
+    job.advance("chunk", len(source), total=len(source))
+    print(f"  → {len(sheets)} sheet(s), {sum(s['skipped'] for s in sheets)} unchanged, {len(source)} new chunks")
+  elif kind == "pdf" and fitz:
+    doc = fitz.open(stream=data, filetype="pdf")
+    checksum = r.checksum or hashlib.sha256(data).hexdigest()
+    classified = page_routes.get(checksum)
+    if classified is None or len(classified) != len(doc):
+      async with job.stage("classify", limit=None):
+        classified = await asyncio.to_thread(classify_document, doc)
+      page_routes.put(checksum, classified)
+    routes = route_summary(classified)
+    print(f"  → Page routes: {routes}")
+    source = [p for p in classified if p["route"] != "empty"]
+    pages = len(source)
+  elif kind == "image" and Image:
+    pages = 1
+    source = [data]
+  else:
+    if kind in ("pdf", "image"):
+      md = f"# Document Processing Error\n\nDocument: {r.filename}\nError: PyMuPDF/Pillow not available\n\nPlease install: pip install PyMuPDF pytesseract pillow numpy"
+      source = chunk_markdown(md)
+    else:
+      source = await whole_file_chunks(kind, data, r, job)
+
+  if pages:
+    print(f"  → Streaming {pages} page(s) through the pipeline...")
+    for name in ("extract", "cleanup"):
+      job.stages[name] = {"state": "waiting", "done": 0, "total": pages}
+    stages = page_stages(r, job, stats, doc) + vector_stages(r, job, stats)
+  else:
+    stages = vector_stages(r, job, stats)
+
+  pipe = Pipeline(stages, on_stage=job.mark)
+  try:
+    await pipe.run(source)
+  finally:
+    if doc is not None:
+      doc.close()
+
+  if sheets is not None:
+    removed = await asyncio.to_thread(delete_chunks_except, r.file_id, [s["hash"] for s in sheets])
+    if removed:
+      print(f"  → Removed {removed} chunks of changed or deleted sheets")
+  elif pages and stats["sections"]:
+    # page-keyed sections are stable across runs; anything else is from an older run
+    removed = await asyncio.to_thread(delete_sections_except, r.file_id, r.checksum, sorted(stats["sections"]))
+    if removed:
+      print(f"  → Removed {removed} stale chunks from a previous ingest")
+
+  # Fallback if no chunks were generated
+  if not stats["chunks"] and not reused:
+    print("\u26a0\ufe0f  No chunks generated, creating fallback chunk")
+    await Pipeline(vector_stages(r, job, stats)).run([{
+      "idx": 0,
+      "text": f"Document: {r.filename}\nProcessed but no content extracted.",
+      "page": 0,
+      "section": "fallback",
+      "chunk_type": "fallback"
+    }])
+  
+  result = {
+    "ok": True, 
+    "filename": r.filename,
+    "file_type": kind,
+    "pages": pages,
+    "page_routes": routes,
+    "ocr_ms": stats["ocr_ms"] or None,  # summed per step: render, load, contrast, threshold, ocr
+    "ocr_cache_hits": stats["ocr_cache_hits"],
+    "sheets": sheets,
+    "chunks": stats["chunks"], 
+    "vectors": stats["vectors"],
+    "chunks_reused": reused,  # unchanged sheets kept from the previous ingest
+    "first_chunk_s": stats["first_chunk_s"],
+    "total_s": round(time.monotonic() - stats["started"], 3),
+    "pipeline": pipe.report(),
+    "processing_flow": (
+      "csv_ollama_agno_chunking" if kind == "csv" else
+      "excel_parallel_sheet_chunking" if kind == "excel" else
+      "las_columnar_well_store" if kind == "las" and PARSERS_BASE else
+      "pdf_per_page_streaming_pipeline" if kind == "pdf" else
+      "image_ocr_streaming_pipeline" if kind == "image" else
+      "basic_chunking"
+    ),
+    "ocr_engine": ocr_pool.info()["backend"] if kind in ("pdf", "image") and (TESSERACT_READY or ocr_pool.available) else None,
+    "ai_enhancement": "ollama" if OLLAMA_BASE else None,
+    "chunking_engine": "agno" if AGNO_AVAILABLE else "fallback"
+  }
+  
+  print(f"🎉 Ingestion complete: {result}")
+  return result
+
+async def run_ingest_job(payload: dict, job: JobTracker) -> dict:
+  # jobs queued before job_payload() may still carry an expired URL: always re-sign
+  return await process_file(Req(**{**payload, "s3_signed_url": None}), job)
+
+worker_pool = IngestWorkerPool(run_ingest_job)
+
+# Health: /health/live (no upstream calls), /health/ready (cached background probes),
+# /health/deep (a real embedding and a tesseract call, rate-limited)
+async def _tesseract_probe():
+  if not TESSERACT_READY:
+    raise RuntimeError("tesseract not configured")
+
+async def _embedding_check() -> dict:
+  return {"dimension": len((await embed_texts(["health check"]))[0])}
+
+async def _ocr_check() -> dict:
+  return {"version": str(await asyncio.to_thread(pytesseract.get_tesseract_version))}
+
+health = HealthMonitor("ingest", details=lambda: {"version": "1.0.0"})
+health.probe("postgres", lambda: asyncio.to_thread(ping))
+health.probe("embed_gateway", http_probe(f"{EMBED_BASE}/"))
+health.probe("tesseract", _tesseract_probe, required=False)
+if OLLAMA_BASE:
+  health.probe("ollama", http_probe(f"{OLLAMA_BASE}/api/tags"), required=False)
+if AGNO_BASE:
+  health.probe("agno", http_probe(f"{AGNO_BASE}/health/live"), required=False)
+health.deep("embedding", _embedding_check)
+if TESSERACT_READY:
+  health.deep("ocr", _ocr_check)
+health.install(app)
+
+@app.on_event("startup")
+async def start_workers():
+  await asyncio.to_thread(ocr_pool.start)
+  await worker_pool.start()
+
+@app.on_event("shutdown")
+async def stop_workers():
+  await worker_pool.stop()
+  ocr_pool.shutdown()
+  shutdown_workbook_pool()
+
 @app.post("/ingest/file")
 async def ingest_file(r: Req):
+  """Enqueue a file for background ingestion and return the job id"""
   try:
-    print(f"📁 Processing file: {r.filename} (type: {r.mime_type})")
-    
-    # Determine file type and processing strategy
-    is_csv = r.filename.lower().endswith(".csv") or (r.mime_type == "text/csv")
-    is_excel = (
-      r.filename.lower().endswith((".xlsx", ".xls")) or 
-      (r.mime_type or "").startswith("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet") or
-      (r.mime_type or "").startswith("application/vnd.ms-excel")
-    )
-    is_pdf = (r.mime_type == "application/pdf") or r.filename.lower().endswith(".pdf")
-    is_image = (is_image_ext(r.filename) or 
-               (r.mime_type and r.mime_type.startswith("image/")))
-    
-    # FLOW 1: Excel/CSV → Ollama cleanup → Agno CSV chunking
-    if is_csv or is_excel:
-      print(f"📈 Processing {'CSV' if is_csv else 'Excel'} file: Content cleanup → Row-based chunking")
-      
-      if is_excel:
-        # Convert Excel to CSV format first
-        csv_content = await xlsx_to_md(r.s3_signed_url)  # This returns markdown table
-        # Convert markdown table back to CSV-like format
-        import pandas as pd
-        import io
-        # Extract just the table data for CSV processing
-        lines = csv_content.split('\n')
-        csv_lines = []
-        for line in lines:
-          if '|' in line and not line.startswith('|---'):
-            # Convert markdown table row to CSV
-            cells = [cell.strip() for cell in line.split('|')[1:-1]]  # Remove empty first/last
-            csv_lines.append(','.join(cells))
-        csv_content = '\n'.join(csv_lines)
-      else:
-        # Download CSV content directly
-        async with httpx.AsyncClient(timeout=120) as cli:
-          csv_response = await cli.get(r.s3_signed_url)
-          csv_response.raise_for_status()
-          csv_content = csv_response.text
-      
-      # Process with Agno CSV chunking (includes Ollama cleanup)
-      chunks = await agno_chunk_csv(csv_content, r.filename)
-      
-      print(f"✅ CSV/Excel processing complete: {len(chunks)} row-based chunks")
-    
-    # FLOW 2: PDF → Detect content type → Different processing paths
-    elif is_pdf:
-      print(f"📄 Processing PDF file: Analyzing content type...")
-      
-      # Detect if PDF is text-dominated or image-dominated
-      pdf_type = await detect_pdf_content_type(r.s3_signed_url, r.filename)
-      
-      if pdf_type == "text":
-        # FLOW 2A: Text-dominated PDF → Simple text extraction → Ollama formatting → Agno markdown chunking
-        print("  → Text-dominated PDF: Text extraction → Ollama formatting → Markdown chunking")
-        md = await process_text_pdf_to_md(r.s3_signed_url, r.filename)
-      else:
-        # FLOW 2B: Image-dominated PDF → OCR → Ollama cleanup → Agno markdown chunking
-        print("  → Image-dominated PDF: OCR → Ollama cleanup → Markdown chunking")
-        ocr_md = await process_pdf_with_ocr(r.s3_signed_url, r.filename)
-        md = await cleanup_with_ollama(ocr_md, "ocr")
-      
-      if not md.strip():
-        md = f"# Document Processing Failed\n\nFilename: {r.filename}\nError: No content could be extracted"
-      
-      # Process with Agno markdown chunking
-      print("  → Chunking markdown content via Agno...")
-      chunks = await agno_chunk_markdown(md, r.filename)
-      
-      print(f"✅ PDF processing complete: {len(chunks)} semantic chunks")
-    
-    # FLOW 3: Images → OCR → Ollama cleanup → Agno markdown chunking
-    elif is_image:
-      print(f"🖼️ Processing image file: OCR → Ollama cleanup → Markdown chunking")
-      
-      # Step 1: Image → OCR
-      print("  → Converting image to text via Pytesseract OCR...")
-      ocr_md = await process_image_with_ocr(r.s3_signed_url, r.filename)
-      
-      # Step 2: Ollama cleanup
-      print("  → Cleaning up OCR text with Ollama...")
-      md = await cleanup_with_ollama(ocr_md, "ocr")
-      
-      if not md.strip():
-        md = f"# Image Processing Failed\n\nFilename: {r.filename}\nError: OCR returned empty content"
-      
-      # Step 3: Agno markdown chunking
-      print("  → Chunking markdown content via Agno...")
-      chunks = await agno_chunk_markdown(md, r.filename)
-      
-      print(f"✅ Image processing complete: {len(chunks)} semantic chunks")
-    
-    # FLOW 4: Other files → Basic processing
-    else:
-      print(f"📄 Processing other file type with basic strategy")
-      
-      try:
-        async with httpx.AsyncClient(timeout=60) as cli:
-          t = await cli.get(r.s3_signed_url)
-          t.raise_for_status()
-          content = t.text
-        
-        # Treat as markdown and chunk
-        md = f"# {r.filename}\n\n{content}"
-        chunks = await agno_chunk_markdown(md, r.filename)
-        
-      except Exception as e:
-        md = f"# File Processing Error\n\nFilename: {r.filename}\nError: Could not process file - {e}"
-        chunks = chunk_markdown(md)  # Fallback to basic chunking
-    
-    # Fallback if no chunks were generated
-    if not chunks:
-      print("\u26a0\ufe0f  No chunks generated, creating fallback chunk")
-      chunks = [{
-        "idx": 0,
-        "text": f"Document: {r.filename}\nProcessed but no content extracted.",
-        "page": 0,
-        "section": "fallback",
-        "chunk_type": "fallback"
-      }]
-
-    # 3) Embedding generation
-    print(f"🌐 Generating embeddings for {len(chunks)} chunks...")
-    try:
-      texts = [c["text"] for c in chunks]
-      vecs = []
-      batch_size = 32
-      
-      for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        batch_vecs = await embed_texts(batch)
-        vecs.extend(batch_vecs)
-        print(f"  → Embedded batch {i//batch_size + 1}/{(len(texts) + batch_size - 1)//batch_size}")
-      
-      print(f"✅ Embedding complete: {len(vecs)} vectors generated")
-      
-    except Exception as e:
-      print(f"\u26a0\ufe0f  Embedding failed ({e}), skipping vector storage")
-      vecs = []
-
-    # 4) Vector storage
-    print(f"💾 Storing chunks and vectors...")
-    try:
-      upsert_chunks(r.file_id, r.tenant_id, r.checksum, chunks, vecs)
-      print(f"✅ Vector storage complete")
-    except Exception as e:
-      print(f"\u26a0\ufe0f  Vector storage failed ({e}), file processed but not stored")
-    
-    result = {
-      "ok": True, 
-      "filename": r.filename,
-      "file_type": (
-        "csv" if is_csv else 
-        "excel" if is_excel else 
-        "pdf" if is_pdf else 
-        "image" if is_image else 
-        "other"
-      ),
-      "chunks": len(chunks), 
-      "vectors": len(vecs),
-      "processing_flow": (
-        "csv_ollama_agno_chunking" if is_csv or is_excel else
-        "pdf_smart_detection_ollama_agno_chunking" if is_pdf else
-        "image_ocr_ollama_agno_chunking" if is_image else
-        "basic_chunking"
-      ),
-      "ocr_engine": "pytesseract" if (is_pdf or is_image) and TESSERACT_READY else None,
-      "ai_enhancement": "ollama" if OLLAMA_BASE else None,
-      "chunking_engine": "agno" if AGNO_AVAILABLE else "fallback"
-    }
-    
-    print(f"🎉 Ingestion complete: {result}")
-    return result
-    
+    job = await asyncio.to_thread(enqueue_job, r.file_id, r.tenant_id, r.checksum, job_payload(r), MAX_ATTEMPTS)
+  except Exception as e:
+    print(f"❌ Could not enqueue {r.filename}: {e}")
+    raise HTTPException(503, f"Ingest queue unavailable: {e}")
+  worker_pool.notify()
+  print(f"📥 Queued ingest job {job['id']} for {r.filename} ({job['status']})")
+  return {"ok": True, "job_id": str(job["id"]), "status": job["status"], "file_id": r.file_id, "filename": r.filename}
+
+@app.post("/ingest/file/sync")
+async def ingest_file_sync(r: Req):
+  """Run the pipeline inside the request (debugging; bypasses the queue)"""
+  try:
+    return await process_file(r)
   except Exception as e:
     print(f"❌ Ingestion error for {r.filename}: {e}")
-    # Return success with error info for development
     return {
-      "ok": True, 
+      "ok": False, 
       "filename": r.filename,
       "chunks": 0, 
       "vectors": 0, 
-      "error": str(e),
-      "note": "Development mode - error logged but processing continued"
+      "error": str(e)
     }
+
+@app.get("/ingest/jobs/{job_id}")
+async def ingest_job_status(job_id: str):
+  job = await asyncio.to_thread(get_job, job_id)
+  if not job:
+    raise HTTPException(404, "Job not found")
+  return {
+    "job_id": str(job["id"]),
+    "file_id": str(job["file_id"]),
+    "status": job["status"],
+    "stage": job["stage"],
+    "attempts": job["attempts"],
+    "max_attempts": job["max_attempts"],
+    "error": job["error"],
+    "result": job["result"],
+    "created_at": job["created_at"],
+    "started_at": job["started_at"],
+    "finished_at": job["finished_at"],
+  }
+
+@app.get("/ingest/jobs/{job_id}/progress")
+async def ingest_job_progress(job_id: str):
+  job = await asyncio.to_thread(get_job, job_id)
+  if not job:
+    raise HTTPException(404, "Job not found")
+  progress = job["progress"] or {}
+  return {
+    "job_id": str(job["id"]),
+    "status": job["status"],
+    "stage": job["stage"],
+    "percent": 100.0 if job["status"] == "done" else progress.get("percent", 0.0),
+    "stages": progress.get("stages", {}),
+    "updated_at": job["updated_at"],
+  }
+
+@app.get("/ingest/queue")
+async def ingest_queue():
+  """Queue depth by status plus this process's worker usage"""
+  return {
+    "jobs": await asyncio.to_thread(queue_summary),
+    "workers": {"total": worker_pool.workers, "active": worker_pool.active},
+    "stage_limits": STAGE_LIMITS,
+  }
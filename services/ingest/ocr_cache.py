@@ -0,0 +1,130 @@
+import hashlib, os, tempfile, threading
+from collections import OrderedDict
+from pathlib import Path
+
+OCR_CACHE_DIR = os.getenv("INGEST_OCR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "know-ai", "ocr-cache"))
+OCR_CACHE_MB = int(os.getenv("INGEST_OCR_CACHE_MB", 512))
+_VERSION = "1"  # bump when preprocessing changes in a way that changes OCR output
+
+def ocr_key(pixels: bytes, width: int, height: int, lang: str, psm: int, prep: str = "") -> str:
+    """Cache key for one page: its rendered pixels plus everything that changes the OCR text"""
+    h = hashlib.sha256()
+    h.update(f"{_VERSION}|{width}x{height}|{lang}|psm{psm}|{prep}|".encode())
+    h.update(pixels)
+    return h.hexdigest()
+
+class OcrCache:
+    """On-disk OCR text cache with size-bounded LRU eviction.
+
+    One small text file per page (``<dir>/<key[:2]>/<key>.txt``). The LRU index
+    lives in memory and is rebuilt from file mtimes at startup, so the cache
+    survives restarts and can be shared by several ingest processes on one
+    host. Thread-safe: lookups run in the page-render worker threads.
+    """
+
+    def __init__(self, cache_dir: str | None = OCR_CACHE_DIR, max_mb: int = OCR_CACHE_MB):
+        self.dir = Path(cache_dir) if cache_dir and cache_dir.lower() != "off" else None
+        self.max_bytes = max_mb * 1024 * 1024
+        self._index: OrderedDict[str, int] = OrderedDict()  # key -> size, oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        if self.dir:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.dir is not None
+
+    def _path(self, key: str) -> Path:
+        return self.dir / key[:2] / f"{key}.txt"
+
+    def _load_index(self):
+        entries = []
+        for path in self.dir.glob("*/*.txt"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, path.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        self._remove(self._evict())  # the cap may have shrunk, or other processes overfilled it
+
+    def get(self, key: str) -> str | None:
+        if not self.dir:
+            return None
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            with self._lock:
+                self.stats["misses"] += 1
+                if key in self._index:  # removed by another process
+                    self._bytes -= self._index.pop(key)
+            return None
+        try:
+            os.utime(path)  # recency survives restarts
+        except OSError:
+            pass
+        with self._lock:
+            self.stats["hits"] += 1
+            if key in self._index:
+                self._index.move_to_end(key)
+            else:
+                self._index[key] = len(text.encode("utf-8"))
+                self._bytes += self._index[key]
+        return text
+
+    def put(self, key: str, text: str):
+        if not self.dir:
+            return
+        path = self._path(key)
+        data = text.encode("utf-8")
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)  # readers never see a partial file
+        except OSError as e:
+            print(f"⚠️ Could not write OCR cache entry: {e}")
+            return
+        with self._lock:
+            self._bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._bytes += len(data)
+            self.stats["writes"] += 1
+            evict = self._evict()
+        self._remove(evict)
+
+    def _evict(self) -> list[str]:
+        """Drop the oldest entries from the index until it fits; call with the lock held"""
+        evict = []
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            old, size = self._index.popitem(last=False)
+            self._bytes -= size
+            evict.append(old)
+        self.stats["evictions"] += len(evict)
+        return evict
+
+    def _remove(self, keys: list[str]):
+        for key in keys:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def info(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "enabled": self.enabled,
+                "dir": str(self.dir) if self.dir else None,
+                "entries": len(self._index),
+                "size_mb": round(self._bytes / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else None,
+                **self.stats,
+            }
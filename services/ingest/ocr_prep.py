@@ -0,0 +1,159 @@
+import os, time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Render pages so the long side lands at about this many pixels (≈150–200 DPI
+# for office sizes), instead of rendering at 2x and resampling again.
+TARGET_PX = int(os.getenv("INGEST_OCR_TARGET_PX", 1800))
+MIN_ZOOM = float(os.getenv("INGEST_OCR_MIN_ZOOM", 1.0))
+MAX_ZOOM = float(os.getenv("INGEST_OCR_MAX_ZOOM", 4.0))
+THRESHOLD = os.getenv("INGEST_OCR_THRESHOLD", "otsu")  # otsu | sauvola | fixed
+SAUVOLA_WINDOW = int(os.getenv("INGEST_OCR_SAUVOLA_WINDOW", 31))
+SAUVOLA_K = float(os.getenv("INGEST_OCR_SAUVOLA_K", 0.2))
+
+def target_zoom(width_pt: float, height_pt: float, target_px: int = TARGET_PX) -> float:
+    """Zoom factor that renders a page straight to OCR resolution (1 pt = 1 px at zoom 1)"""
+    long_side = max(width_pt, height_pt, 1.0)
+    return min(MAX_ZOOM, max(MIN_ZOOM, target_px / long_side))
+
+def render_page_gray(page, zoom: float | None = None):
+    """Render a PyMuPDF page in 8-bit grayscale, returned as a 2-D uint8 view of the pixmap buffer.
+
+    Returns ``(array, pixmap)``: the array does not own its memory, so keep the
+    pixmap referenced until preprocessing and OCR are done with the array.
+    """
+    import fitz
+    if zoom is None:
+        zoom = target_zoom(page.rect.width, page.rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    buf = getattr(pix, "samples_mv", None)  # memoryview on PyMuPDF >= 1.18.17; bytes copy otherwise
+    if buf is None:
+        buf = pix.samples
+    arr = np.frombuffer(buf, dtype=np.uint8).reshape(pix.height, pix.stride)
+    if pix.stride != pix.width:
+        arr = arr[:, :pix.width]
+    return arr, pix
+
+def histogram(gray, rows: int = 256):
+    """256-bin histogram in row blocks (bincount upcasts to int64, 8x the page size at once)"""
+    hist = np.zeros(256, dtype=np.int64)
+    for y in range(0, gray.shape[0], rows):
+        hist += np.bincount(gray[y:y + rows].ravel(), minlength=256)
+    return hist
+
+def autocontrast(gray, cutoff: float = 0.5):
+    """Stretch the histogram with a 256-entry LUT (``cutoff`` % clipped at each end).
+
+    Works in place when ``gray`` is writable; otherwise the LUT pass itself
+    produces the copy.
+    """
+    hist = histogram(gray)
+    cdf = np.cumsum(hist)
+    total = cdf[-1]
+    clip = total * cutoff / 100.0
+    lo = int(np.searchsorted(cdf, clip, side="right"))
+    hi = int(np.searchsorted(cdf, total - clip, side="left"))
+    if hi <= lo:
+        return (gray if gray.flags.writeable else gray.copy()), hist
+    lut = np.clip((np.arange(256, dtype=np.float32) - lo) * (255.0 / (hi - lo)), 0, 255).astype(np.uint8)
+    out = gray if gray.flags.writeable else np.empty_like(gray)
+    # row blocks: take() casts the uint8 indices to intp, 8x the page size at once
+    # mode="clip": with the default mode NumPy buffers the whole output before writing it
+    for y in range(0, gray.shape[0], 256):
+        np.take(lut, gray[y:y + 256], out=out[y:y + 256], mode="clip")
+    gray = out
+    # remap the histogram instead of recounting the whole image
+    return gray, np.bincount(lut, weights=hist, minlength=256)
+
+def otsu_threshold(hist) -> int:
+    """Otsu's threshold from a 256-bin histogram"""
+    hist = np.asarray(hist, dtype=np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 127
+    levels = np.arange(256, dtype=np.float64)
+    w0 = np.cumsum(hist)
+    w1 = total - w0
+    m0 = np.cumsum(hist * levels)
+    mean_all = m0[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mean_all * w0 - m0 * total) ** 2 / (w0 * w1)
+    between[~np.isfinite(between)] = 0
+    return int(np.argmax(between))
+
+def _box_sum(a, half: int, axis: int):
+    """Sum over a (2*half+1) window along ``axis``, clipped at the borders"""
+    n = a.shape[axis]
+    shape = list(a.shape)
+    shape[axis] = n + 1
+    c = np.zeros(shape, dtype=a.dtype)
+    np.cumsum(a, axis=axis, out=c[(slice(None),) * axis + (slice(1, None),)])
+    idx = np.arange(n)
+    hi = np.minimum(idx + half + 1, n)
+    lo = np.maximum(idx - half, 0)
+    return np.take(c, hi, axis=axis) - np.take(c, lo, axis=axis)
+
+def sauvola_mask(gray, window: int = SAUVOLA_WINDOW, k: float = SAUVOLA_K, r: float = 128.0, block: int = 4):
+    """Boolean 'paper' mask using Sauvola's local threshold (separable box sums, no per-pixel loops).
+
+    Handles uneven lighting and shadows on phone scans better than a global
+    threshold. Local mean/std vary slowly, so they are computed on a grid
+    reduced ``block`` times per axis and expanded back, which keeps it within a
+    few times the cost of Otsu.
+    """
+    h, w = gray.shape
+    hb, wb = -(-h // block), -(-w // block)
+    g = gray.astype(np.float32)
+    if hb * block != h or wb * block != w:
+        g_pad = np.pad(g, ((0, hb * block - h), (0, wb * block - w)), mode="edge")
+    else:
+        g_pad = g
+    blocks = g_pad.reshape(hb, block, wb, block)
+    m1 = blocks.mean(axis=(1, 3))
+    m2 = (blocks * blocks).mean(axis=(1, 3))
+
+    half = max(1, window // (2 * block))
+    idx_h, idx_w = np.arange(hb), np.arange(wb)
+    area = ((np.minimum(idx_h + half + 1, hb) - np.maximum(idx_h - half, 0))[:, None] *
+            (np.minimum(idx_w + half + 1, wb) - np.maximum(idx_w - half, 0))[None, :]).astype(np.float32)
+    mean = _box_sum(_box_sum(m1, half, 1), half, 0) / area
+    var = _box_sum(_box_sum(m2, half, 1), half, 0) / area - mean * mean
+    np.maximum(var, 0, out=var)
+    thresh = mean * (1 + k * (np.sqrt(var) / r - 1))
+    thresh = np.repeat(np.repeat(thresh, block, axis=0), block, axis=1)[:h, :w]
+    return g > thresh
+
+def binarize(gray, method: str = THRESHOLD, hist=None, fixed: int = 180):
+    """Return a 0/255 uint8 image without int64 intermediates (in place for global thresholds)"""
+    if method == "sauvola":
+        out = sauvola_mask(gray).view(np.uint8)  # bool is one byte: 0/1
+    else:
+        if method == "otsu":
+            thr = otsu_threshold(hist if hist is not None else histogram(gray))
+        else:
+            thr = fixed
+        if gray.flags.writeable and gray.flags.c_contiguous:
+            np.greater(gray, thr, out=gray.view(np.bool_))
+            out = gray
+        else:
+            out = (gray > thr).view(np.uint8)
+    out *= 255
+    return out
+
+def preprocess_gray(gray, method: str = THRESHOLD, timings: dict | None = None):
+    """Autocontrast + adaptive threshold on a 2-D uint8 array, in place where possible.
+
+    A read-only input (e.g. a pixmap view) costs exactly one page-sized buffer.
+    """
+    t0 = time.perf_counter()
+    gray, hist = autocontrast(gray)
+    t1 = time.perf_counter()
+    out = binarize(gray, method, hist)
+    t2 = time.perf_counter()
+    if timings is not None:
+        timings["contrast_ms"] = round((t1 - t0) * 1000, 2)
+        timings["threshold_ms"] = round((t2 - t1) * 1000, 2)
+    return out
@@ -0,0 +1,137 @@
+import asyncio, multiprocessing, os, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    tesserocr = None
+    TESSEROCR_AVAILABLE = False
+
+OCR_BACKEND = os.getenv("INGEST_OCR_BACKEND", "auto")  # auto | tesserocr | pytesseract
+OCR_WORKERS = int(os.getenv("INGEST_OCR_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+TESSDATA_PREFIX = os.getenv("TESSDATA_PREFIX") or None
+DEFAULT_PSM = 6  # single uniform block of text, same as the pytesseract "--psm 6" config
+
+# --- runs inside the worker processes ---------------------------------------
+
+# one engine per process and language, created lazily and kept for the process lifetime
+_apis: dict = {}
+
+def _get_api(lang: str):
+    api = _apis.get(lang)
+    if api is None:
+        kwargs = {"lang": lang}
+        if TESSDATA_PREFIX:
+            kwargs["path"] = TESSDATA_PREFIX
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        _apis[lang] = api
+    return api
+
+def _recognize(data: bytes, width: int, height: int, lang: str, psm: int) -> str:
+    api = _get_api(lang)
+    api.SetPageSegMode(psm)
+    api.SetImageBytes(data, width, height, 1, width)  # 8-bit grayscale, no temp files
+    try:
+        return api.GetUTF8Text()
+    finally:
+        api.Clear()
+
+# --- event-loop side --------------------------------------------------------
+
+def image_bytes(img) -> tuple[bytes, int, int]:
+    """Raw 8-bit grayscale bytes + size from a PIL image or 2-D uint8 array"""
+    if hasattr(img, "mode"):  # PIL
+        if img.mode != "L":
+            img = img.convert("L")
+        return img.tobytes(), img.width, img.height
+    h, w = img.shape[:2]
+    return img.tobytes(), w, h
+
+class OcrWorkerPool:
+    """Long-lived Tesseract engines in worker processes.
+
+    Each worker loads the language model once and receives page images as raw
+    bytes over the pool's pipe, instead of pytesseract's per-page subprocess
+    + temp PNG + model load. Processes (not threads) so pages OCR in parallel
+    regardless of the GIL; the pool is restarted if a worker dies.
+    """
+
+    def __init__(self, workers: int = OCR_WORKERS, backend: str = OCR_BACKEND):
+        self.workers = max(1, workers)
+        self.backend = backend
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()  # start() runs in a thread while the loop submits pages
+        self.stats = {"pages": 0, "errors": 0, "restarts": 0, "busy_s": 0.0}
+
+    @property
+    def available(self) -> bool:
+        return TESSEROCR_AVAILABLE and self.backend in ("auto", "tesserocr")
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs an event loop and threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def _replace(self, broken: ProcessPoolExecutor):
+        """Drop a broken pool once, however many callers saw it break. Nothing is
+        cancelled: its pending futures already failed with BrokenProcessPool, and
+        each of those callers retries on the fresh pool."""
+        with self._lock:
+            if self._pool is not broken:
+                return  # another caller already swapped it
+            self._pool = None
+            self.stats["restarts"] += 1
+        broken.shutdown(wait=False)
+
+    def start(self):
+        """Start the workers and load the default model up front"""
+        if not self.available:
+            return
+        pool = self._ensure_pool()
+        blank = bytes(32 * 32)
+        for f in [pool.submit(_recognize, blank, 32, 32, "eng", DEFAULT_PSM) for _ in range(self.workers)]:
+            try:
+                f.result(timeout=60)
+            except Exception as e:
+                print(f"⚠️ OCR worker warm-up failed: {e}")
+        print(f"✅ Started {self.workers} tesserocr workers")
+
+    async def ocr(self, img, lang: str = "eng", psm: int = DEFAULT_PSM) -> str:
+        data, width, height = image_bytes(img)
+        loop = asyncio.get_running_loop()
+        t0 = time.monotonic()
+        pool = self._ensure_pool()
+        try:
+            try:
+                text = await loop.run_in_executor(pool, _recognize, data, width, height, lang, psm)
+            except BrokenProcessPool:
+                # a worker crashed (e.g. OOM on a huge page): replace the pool and retry once
+                self._replace(pool)
+                text = await loop.run_in_executor(self._ensure_pool(), _recognize, data, width, height, lang, psm)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        self.stats["pages"] += 1
+        self.stats["busy_s"] = round(self.stats["busy_s"] + time.monotonic() - t0, 3)
+        return text
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def info(self) -> dict:
+        return {
+            "backend": "tesserocr" if self.available else "pytesseract",
+            "workers": self.workers if self.available else None,
+            "running": self._pool is not None,
+            **self.stats,
+        }
@@ -0,0 +1,118 @@
+import json, os
+from collections import OrderedDict
+from pathlib import Path
+
+# Per-page routing thresholds
+MIN_CHARS = int(os.getenv("INGEST_TEXT_MIN_CHARS", 40))
+MIN_DENSITY = float(os.getenv("INGEST_TEXT_MIN_DENSITY", 0.002))       # chars per pt²
+OCR_IMAGE_COVERAGE = float(os.getenv("INGEST_OCR_IMAGE_COVERAGE", 0.5))  # share of the page covered by images
+RICH_TEXT_CHARS = int(os.getenv("INGEST_RICH_TEXT_CHARS", 800))        # this much text wins over any image
+MIN_DRAWINGS = int(os.getenv("INGEST_OCR_MIN_DRAWINGS", 8))            # vector paths that may be outlined text
+
+ROUTES = ("text", "ocr", "empty")
+_VERSION = 2  # bumped when routing changes, so pages classified by older rules are measured again
+
+def route_page(chars: int, area: float, image_coverage: float, drawings: int = 0) -> str:
+    """Decide how to read one page from cheap measurements.
+
+    - text: a real text layer and no large scan on the page
+    - ocr: no (or too little) text, or a large image with only a thin text
+      layer on top (scans with a header/footer, stamped pages), or no text
+      and no images but vector drawings (text converted to outlines)
+    - empty: nothing to read at all; a border or a rule or two doesn't count
+    """
+    density = chars / max(area, 1)
+    has_text = chars >= MIN_CHARS and density >= MIN_DENSITY
+    if has_text and (image_coverage < OCR_IMAGE_COVERAGE or chars >= RICH_TEXT_CHARS):
+        return "text"
+    if chars == 0 and image_coverage == 0 and drawings < MIN_DRAWINGS:
+        return "empty"
+    return "ocr"
+
+def image_coverage(page) -> float:
+    """Fraction of the page area covered by embedded images (bbox union, approximated by clipping)"""
+    area = page.rect.width * page.rect.height
+    if area <= 0:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        x0, y0, x1, y1 = info["bbox"]
+        x0, y0 = max(x0, page.rect.x0), max(y0, page.rect.y0)
+        x1, y1 = min(x1, page.rect.x1), min(y1, page.rect.y1)
+        if x1 > x0 and y1 > y0:
+            covered += (x1 - x0) * (y1 - y0)
+    return min(1.0, covered / area)
+
+def classify_page(page) -> dict:
+    """Measure and route one PyMuPDF page without rendering it"""
+    chars = len((page.get_text("text") or "").strip())
+    area = page.rect.width * page.rect.height
+    coverage = image_coverage(page)
+    # vector paths only decide between "empty" and "ocr", so they're only extracted then
+    drawings = len(page.get_drawings()) if chars == 0 and coverage == 0 else 0
+    return {
+        "route": route_page(chars, area, coverage, drawings),
+        "chars": chars,
+        "image_coverage": round(coverage, 3),
+        "drawings": drawings,
+    }
+
+def classify_document(doc) -> list[dict]:
+    """One cheap pass over every page (text layer + image bboxes, no rasterizing)"""
+    return [{"page": n + 1, **classify_page(doc.load_page(n))} for n in range(len(doc))]
+
+class ClassificationCache:
+    """Page routes per file checksum, in memory with optional JSON files on disk.
+
+    Re-ingesting the same file (retries, re-indexing, another tenant uploading
+    the same PDF) skips the classification pass entirely.
+    """
+
+    def __init__(self, size: int = 500, cache_dir: str | None = None):
+        self.size = size
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._mem: OrderedDict[str, list[dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, checksum: str) -> list[dict] | None:
+        if checksum in self._mem:
+            self._mem.move_to_end(checksum)
+            self.hits += 1
+            return self._mem[checksum]
+        if self.cache_dir:
+            try:
+                pages = json.loads((self.cache_dir / f"{checksum}.v{_VERSION}.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pages = None
+            if pages is not None:
+                self._remember(checksum, pages)
+                self.hits += 1
+                return pages
+        self.misses += 1
+        return None
+
+    def put(self, checksum: str, pages: list[dict]):
+        self._remember(checksum, pages)
+        if self.cache_dir:
+            try:
+                (self.cache_dir / f"{checksum}.v{_VERSION}.json").write_text(json.dumps(pages), encoding="utf-8")
+            except OSError as e:
+                print(f"⚠️ Could not persist page classification: {e}")
+
+    def _remember(self, checksum: str, pages: list[dict]):
+        self._mem[checksum] = pages
+        self._mem.move_to_end(checksum)
+        while len(self._mem) > self.size:
+            self._mem.popitem(last=False)
+
+    def info(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._mem), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "persistent": bool(self.cache_dir)}
+
+def route_summary(pages: list[dict]) -> dict:
+    return {route: sum(1 for p in pages if p["route"] == route) for route in ROUTES}
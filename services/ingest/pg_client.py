@@ -1,4 +1,5 @@
 import os, psycopg
+from psycopg.types.json import Jsonb
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -9,6 +10,11 @@ PG_URL = os.environ["POSTGRES_URL"]
 
 def get_conn(): return psycopg.connect(PG_URL)
 
+def ping():
+    """Readiness probe: one round trip, no table access"""
+    with get_conn() as conn:
+        conn.execute("select 1")
+
 def to_pgvector(v):
     # pgvector accepts string literal like '[0.1, 0.2, ...]'
     return "[" + ",".join(f"{float(x):.6f}" for x in v) + "]"
@@ -21,8 +27,166 @@ def upsert_chunks(file_id:str, tenant_id:str, checksum:str|None, chunks:list[dic
                 insert into doc_chunks(file_id, tenant_id, page, section, checksum, text, embedding)
                 values (%s,%s,%s,%s,%s,%s,%s::vector)
                 on conflict (file_id, checksum, section) do update
-                  set text=excluded.text, embedding=excluded.embedding
+                  set page=excluded.page, text=excluded.text, embedding=excluded.embedding
             """, (
                 file_id, tenant_id, ch.get("page",0), ch.get("section",f"chunk-{i}"),
-                checksum, ch["text"], vec
+                ch.get("checksum", checksum), ch["text"], vec
             ))
+
+def chunk_checksums(file_id:str) -> dict[str, int]:
+    """Stored chunk counts per checksum for a file (per-sheet content hashes for workbooks)"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            select checksum, count(*) from doc_chunks
+            where file_id = %s and checksum is not null
+            group by checksum
+        """, (file_id,))
+        return {row[0]: row[1] for row in cur.fetchall()}
+
+def delete_chunks_except(file_id:str, keep:list[str]) -> int:
+    """Drop a file's chunks whose checksum is not in ``keep`` (changed or removed sheets)"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            delete from doc_chunks
+            where file_id = %s and (checksum is null or not (checksum = any(%s)))
+        """, (file_id, keep))
+        return cur.rowcount
+
+def delete_sections_except(file_id:str, checksum:str|None, keep:list[str]) -> int:
+    """Drop a file's chunks for ``checksum`` whose section was not written by the latest run"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            delete from doc_chunks
+            where file_id = %s and checksum is not distinct from %s and not (section = any(%s))
+        """, (file_id, checksum, keep))
+        return cur.rowcount
+
+# === Ingest job queue ===
+
+JOB_COLUMNS = "id, file_id, tenant_id, checksum, payload, status, stage, progress, attempts, max_attempts, error, result, created_at, started_at, finished_at, updated_at"
+
+def _job_row(cur, row):
+    if row is None:
+        return None
+    return {d.name: row[i] for i, d in enumerate(cur.description)}
+
+def enqueue_job(file_id:str, tenant_id:str, checksum:str|None, payload:dict, max_attempts:int=3) -> dict:
+    """Insert a queued job, or return the live job already queued for this file version"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            insert into ingest_jobs(file_id, tenant_id, checksum, payload, max_attempts)
+            values (%s,%s,%s,%s,%s)
+            on conflict (file_id, (coalesce(checksum, ''))) where status in ('queued','running') do nothing
+            returning {JOB_COLUMNS}
+        """, (file_id, tenant_id, checksum, Jsonb(payload), max_attempts))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute(f"""
+                select {JOB_COLUMNS} from ingest_jobs
+                where file_id = %s and coalesce(checksum,'') = coalesce(%s,'') and status in ('queued','running')
+            """, (file_id, checksum))
+            row = cur.fetchone()
+        return _job_row(cur, row)
+
+def claim_job(worker_id:str) -> dict|None:
+    """Atomically take the oldest runnable job; concurrent workers skip each other's locks"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            update ingest_jobs j
+               set status='running', locked_by=%s, locked_at=now(), attempts=attempts+1,
+                   started_at=coalesce(started_at, now()), updated_at=now(), error=null
+             where id = (
+               select id from ingest_jobs
+                where status='queued' and run_after <= now()
+                order by run_after, created_at
+                for update skip locked
+                limit 1
+             )
+            returning {JOB_COLUMNS}
+        """, (worker_id,))
+        return _job_row(cur, cur.fetchone())
+
+def requeue_stale_jobs(stale_after_s:int) -> tuple[int, int]:
+    """Put back running jobs whose worker stopped heartbeating (crash, restart).
+
+    A job that has used all its attempts is failed instead (and its file marked
+    "error"), so a file that kills its worker every time isn't retried forever.
+    Returns ``(requeued, failed)``.
+    """
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            with stale as (
+              select id from ingest_jobs
+               where status='running' and locked_at < now() - make_interval(secs => %s)
+               for update skip locked
+            ), requeued as (
+              update ingest_jobs set status='queued', locked_by=null, locked_at=null, updated_at=now()
+               where id in (select id from stale) and attempts < max_attempts
+              returning id
+            ), failed as (
+              update ingest_jobs
+                 set status='failed', locked_by=null, locked_at=null, finished_at=now(), updated_at=now(),
+                     error=format('worker stopped heartbeating on attempt %%s of %%s', attempts, max_attempts)
+               where id in (select id from stale) and attempts >= max_attempts
+              returning file_id
+            ), errored as (
+              update files set processing_status='error' where id in (select file_id from failed)
+              returning id
+            )
+            select (select count(*) from requeued), (select count(*) from failed), (select count(*) from errored)
+        """, (stale_after_s,))
+        requeued, failed, _ = cur.fetchone()
+        return requeued, failed
+
+def update_job_progress(job_id:str, stage:str|None, progress:dict):
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            update ingest_jobs set stage=%s, progress=%s, locked_at=now(), updated_at=now()
+             where id=%s
+        """, (stage, Jsonb(progress), job_id))
+
+def complete_job(job_id:str, result:dict, progress:dict):
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            update ingest_jobs set status='done', stage='done', result=%s, progress=%s,
+                   finished_at=now(), updated_at=now(), locked_by=null
+             where id=%s
+        """, (Jsonb(result), Jsonb(progress), job_id))
+
+def fail_job(job_id:str, error:str, progress:dict, retry_in_s:int) -> bool:
+    """Record a failure; requeue with backoff while attempts remain. Returns True if final."""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            update ingest_jobs
+               set status = case when attempts < max_attempts then 'queued' else 'failed' end,
+                   run_after = now() + make_interval(secs => %s),
+                   finished_at = case when attempts < max_attempts then null else now() end,
+                   error=%s, progress=%s, locked_by=null, locked_at=null, updated_at=now()
+             where id=%s
+            returning status
+        """, (retry_in_s, error, Jsonb(progress), job_id))
+        row = cur.fetchone()
+        return bool(row) and row[0] == 'failed'
+
+def get_job(job_id:str) -> dict|None:
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(f"select {JOB_COLUMNS} from ingest_jobs where id=%s", (job_id,))
+        return _job_row(cur, cur.fetchone())
+
+def queue_summary() -> dict:
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("select status, count(*) from ingest_jobs group by status")
+        return {status: count for status, count in cur.fetchall()}
+
+def set_file_status(file_id:str, status:str):
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("update files set processing_status=%s where id=%s", (status, file_id))
+
+def set_chunks_count(file_id:str, chunks_count:int):
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            insert into file_metadata(file_id, chunks_count, indexed, updated_at)
+            values (%s,%s,%s,now())
+            on conflict (file_id) do update
+              set chunks_count=excluded.chunks_count, indexed=excluded.indexed, updated_at=now()
+        """, (file_id, chunks_count, chunks_count > 0))
@@ -0,0 +1,123 @@
+import asyncio, time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable
+
+Emit = Callable[[Any], Awaitable[None]]
+
+_DONE = object()
+
+@dataclass
+class Stage:
+    """One step of a streaming pipeline.
+
+    ``fn(item, emit)`` handles one input and calls ``emit`` zero or more times.
+    With ``batch > 1`` the stage receives lists: whatever is already queued, up
+    to ``batch`` items, waiting at most ``linger_ms`` for more after the first.
+    ``finish(emit)`` runs once after the last input (e.g. to flush a buffer).
+    """
+    name: str
+    fn: Callable[[Any, Emit], Awaitable[None]]
+    workers: int = 1
+    queue_size: int = 8
+    batch: int = 1
+    linger_ms: float = 0
+    finish: Callable[[Emit], Awaitable[None]] | None = None
+    stats: dict = field(default_factory=lambda: {"in": 0, "out": 0, "busy_s": 0.0, "first_out_s": None})
+
+class Pipeline:
+    """Stages connected by bounded asyncio queues.
+
+    Every stage starts work as soon as its first input arrives, so a long
+    document streams through extract → cleanup → chunk → embed → store instead
+    of finishing each step for the whole file first. Queue bounds keep memory
+    flat when a downstream stage (usually the model hosts) is the bottleneck.
+    """
+
+    def __init__(self, stages: list[Stage], on_stage: Callable[[str, str], Awaitable[None]] | None = None):
+        self.stages = stages
+        self.on_stage = on_stage
+        self.started = 0.0
+
+    async def run(self, source: AsyncIterable | Iterable):
+        self.started = time.monotonic()
+        queues = [asyncio.Queue(maxsize=s.queue_size) for s in self.stages]
+        tasks = [asyncio.create_task(self._feed(source, queues[0], self.stages[0].workers))]
+        for i, stage in enumerate(self.stages):
+            out = queues[i + 1] if i + 1 < len(self.stages) else None
+            next_workers = self.stages[i + 1].workers if out is not None else 0
+            tasks.append(asyncio.create_task(self._run_stage(stage, queues[i], out, next_workers)))
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    def report(self) -> dict:
+        return {s.name: dict(s.stats) for s in self.stages}
+
+    async def _feed(self, source, q: asyncio.Queue, workers: int):
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await q.put(item)
+        else:
+            for item in source:
+                await q.put(item)
+        for _ in range(workers):
+            await q.put(_DONE)
+
+    async def _run_stage(self, stage: Stage, inq: asyncio.Queue, outq: asyncio.Queue | None, next_workers: int):
+        async def emit(item):
+            stage.stats["out"] += 1
+            if stage.stats["first_out_s"] is None:
+                stage.stats["first_out_s"] = round(time.monotonic() - self.started, 3)
+            if outq is not None:
+                await outq.put(item)
+
+        if self.on_stage:
+            await self.on_stage(stage.name, "running")
+        await asyncio.gather(*(self._worker(stage, inq, emit) for _ in range(max(1, stage.workers))))
+        if stage.finish is not None:
+            await stage.finish(emit)
+        if self.on_stage:
+            await self.on_stage(stage.name, "done")
+        if outq is not None:
+            for _ in range(next_workers):
+                await outq.put(_DONE)
+
+    async def _worker(self, stage: Stage, inq: asyncio.Queue, emit: Emit):
+        while True:
+            item = await inq.get()
+            if item is _DONE:
+                return
+            done = False
+            if stage.batch > 1:
+                item, done = await self._collect(stage, inq, item)
+            stage.stats["in"] += len(item) if stage.batch > 1 else 1
+            t0 = time.monotonic()
+            await stage.fn(item, emit)
+            stage.stats["busy_s"] = round(stage.stats["busy_s"] + time.monotonic() - t0, 3)
+            if done:
+                return
+
+    async def _collect(self, stage: Stage, inq: asyncio.Queue, first) -> tuple[list, bool]:
+        """Gather a batch; returns (items, saw_done)"""
+        items = [first]
+        deadline = time.monotonic() + stage.linger_ms / 1000.0
+        while len(items) < stage.batch:
+            try:
+                nxt = inq.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = await asyncio.wait_for(inq.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if nxt is _DONE:
+                return items, True
+            items.append(nxt)
+        return items, False
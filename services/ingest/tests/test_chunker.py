@@ -1,6 +1,6 @@
 import pytest
 
-from services.ingest.chunker import chunk_markdown
+from services.ingest.chunker import chunk_markdown, chunk_markdown_sections
 
 
 def test_chunk_markdown_default_window_and_indices():
@@ -33,4 +33,30 @@ def test_chunk_markdown_single_chunk_for_short_input(text):
 
     assert len(chunks) == 1
     assert chunks[0]["idx"] == 0
-    assert chunks[0]["text"] == text.strip()
\ No newline at end of file
+    assert chunks[0]["text"] == text.strip()
+
+def test_chunk_markdown_sections_splits_on_headings():
+    md = "intro text\n# First\nalpha\n## Second\nbeta"
+    chunks = chunk_markdown_sections(md, page=3)
+
+    assert [c["text"] for c in chunks] == ["intro text", "# First\nalpha", "## Second\nbeta"]
+    assert [c["section"] for c in chunks] == ["p3:intro#0", "p3:First#1", "p3:Second#2"]
+    assert all(c["page"] == 3 for c in chunks)
+
+
+def test_chunk_markdown_sections_caps_size_and_continues_indices():
+    md = "# Big\n" + "\n".join(["x" * 40] * 10)
+    chunks = chunk_markdown_sections(md, max_chars=100, start_idx=7)
+
+    assert chunks[0]["idx"] == 7
+    assert all(len(c["text"]) <= 100 + 41 for c in chunks)
+    assert len({c["section"] for c in chunks}) == len(chunks)
+
+
+def test_chunk_sections_do_not_depend_on_page_order():
+    md = "# Heading\nsome text\n## Next\nmore"
+    first = chunk_markdown_sections(md, page=2, start_idx=0)
+    later = chunk_markdown_sections(md, page=2, start_idx=40)  # same page finishing after others
+
+    assert [c["section"] for c in first] == [c["section"] for c in later] == ["p2:Heading#0", "p2:Next#1"]
+    assert [c["idx"] for c in later] == [40, 41]
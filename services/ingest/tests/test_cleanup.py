@@ -0,0 +1,118 @@
+import asyncio
+
+from services.ingest.cleanup import CleanupEngine, split_windows
+
+
+def _doc(pages=6, size=900):
+    return "\n\n".join(f"## Page {i + 1}\n\n" + ("word " * (size // 5)) for i in range(pages))
+
+
+def test_split_windows_respects_limit_and_keeps_order():
+    doc = _doc()
+    windows = split_windows(doc, max_chars=2000)
+
+    assert len(windows) > 1
+    assert all(len(w) <= 2000 for w in windows)
+    assert "\n\n".join(windows).split() == doc.split()
+
+
+def test_windows_run_concurrently_within_limit():
+    running = 0
+    peak = 0
+
+    async def fake_cleanup(text, kind):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return text.upper()
+
+    engine = CleanupEngine(fake_cleanup, parallelism=2, window_chars=1000)
+    out = asyncio.run(engine.clean(_doc(), "ocr"))
+
+    assert out.startswith("## PAGE 1")
+    assert out.index("PAGE 2") < out.index("PAGE 6")
+    assert peak == 2
+    assert engine.stats["model_calls"] == 6
+
+
+def test_cache_and_already_clean_skip_model_calls():
+    calls = []
+
+    async def fake_cleanup(text, kind):
+        calls.append(text)
+        return "cleaned: " + text
+
+    engine = CleanupEngine(fake_cleanup)
+
+    async def run():
+        first = await engine.clean("## Page 1\n\nraw text", "markdown")
+        again = await engine.clean("## Page 1\n\nraw text", "markdown")
+        second_pass = await engine.clean(first, "markdown")
+        return first, again, second_pass
+
+    first, again, second_pass = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert again == first
+    assert second_pass == first
+    assert engine.stats["cache_hits"] == 1
+    assert engine.stats["already_clean"] == 1
+
+
+def test_failed_window_keeps_original_text():
+    async def flaky(text, kind):
+        if "Page 2" in text:
+            raise RuntimeError("timeout")
+        return text.replace("raw", "clean")
+
+    engine = CleanupEngine(flaky, window_chars=30)
+    out = asyncio.run(engine.clean("## Page 1\n\nraw one\n\n## Page 2\n\nraw two", "ocr"))
+
+    assert "clean one" in out and "raw two" in out
+    assert engine.stats["failures"] == 1
+
+
+def test_failed_cleanup_is_retried_on_the_next_ingest():
+    calls = []
+
+    async def down_then_up(text, kind):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RuntimeError("model unavailable")
+        return text.replace("raw", "clean")
+
+    engine = CleanupEngine(down_then_up)
+    assert asyncio.run(engine.clean("raw page", "ocr")) == "raw page"
+    assert asyncio.run(engine.clean("raw page", "ocr")) == "clean page"
+    assert engine.stats["already_clean"] == 0 and len(calls) == 2
+
+
+def test_cancelled_window_does_not_strand_waiters():
+    started = asyncio.Event()
+    calls = 0
+
+    async def slow_cleanup(text, kind):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            started.set()
+            await asyncio.sleep(10)
+        return text.upper()
+
+    async def run():
+        engine = CleanupEngine(slow_cleanup, parallelism=2)
+        first = asyncio.create_task(engine.clean("some text", "ocr"))
+        await started.wait()
+        waiter = asyncio.create_task(engine.clean("some text", "ocr"))  # shares the in-flight call
+        await asyncio.sleep(0)
+        first.cancel()  # e.g. the pipeline tearing down a failed job
+        out = await asyncio.wait_for(waiter, 1)
+        retry = await asyncio.wait_for(engine.clean("some text", "ocr"), 1)
+        return out, retry, engine
+
+    out, retry, engine = asyncio.run(run())
+    assert out == retry == "SOME TEXT"
+    assert engine._inflight == {}
+    assert calls == 2
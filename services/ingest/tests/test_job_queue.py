@@ -0,0 +1,120 @@
+import os
+import threading
+import uuid
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+pytest.importorskip("dotenv")
+
+TEST_URL = os.getenv("INGEST_TEST_POSTGRES_URL")
+pytestmark = pytest.mark.skipif(not TEST_URL, reason="set INGEST_TEST_POSTGRES_URL to run the job queue tests")
+
+MIGRATION = Path(__file__).resolve().parents[3] / "apps" / "api" / "src" / "sql" / "005_ingest_jobs.sql"
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    """pg_client pointed at a scratch schema holding files + ingest_jobs"""
+    os.environ.setdefault("POSTGRES_URL", TEST_URL)
+    from services.ingest import pg_client
+
+    schema = f"ingest_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(TEST_URL, autocommit=True) as conn:
+        conn.execute(f"create schema {schema}")
+    url = psycopg.conninfo.make_conninfo(TEST_URL, options=f"-c search_path={schema}")
+    monkeypatch.setattr(pg_client, "PG_URL", url)
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute("create table files (id uuid primary key, processing_status text)")
+        conn.execute(MIGRATION.read_text())
+    yield pg_client
+    with psycopg.connect(TEST_URL, autocommit=True) as conn:
+        conn.execute(f"drop schema {schema} cascade")
+
+
+def _file(pg_client) -> str:
+    file_id = str(uuid.uuid4())
+    with pg_client.get_conn() as conn:
+        conn.execute("insert into files(id) values (%s)", (file_id,))
+    return file_id
+
+
+def _set(pg_client, job_id, sql):
+    with pg_client.get_conn() as conn:
+        conn.execute(f"update ingest_jobs set {sql} where id = %s", (job_id,))
+
+
+def test_enqueue_is_idempotent_and_claim_takes_it_once(queue):
+    file_id = _file(queue)
+    job = queue.enqueue_job(file_id, "demo", "abc", {"file_id": file_id, "s3_key": "k"})
+    again = queue.enqueue_job(file_id, "demo", "abc", {"file_id": file_id})
+
+    assert again["id"] == job["id"]
+    claimed = queue.claim_job("w/0")
+    assert claimed["id"] == job["id"] and claimed["status"] == "running" and claimed["attempts"] == 1
+    assert claimed["payload"] == {"file_id": file_id, "s3_key": "k"}
+    assert queue.claim_job("w/1") is None
+
+
+def test_concurrent_workers_claim_different_jobs(queue):
+    jobs = {str(queue.enqueue_job(_file(queue), "demo", None, {})["id"]) for _ in range(4)}
+    claimed, lock = [], threading.Lock()
+
+    def worker(n):
+        while (job := queue.claim_job(f"w/{n}")) is not None:
+            with lock:
+                claimed.append(str(job["id"]))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(jobs)
+
+
+def test_failed_job_retries_after_backoff_then_fails_for_good(queue):
+    job = queue.enqueue_job(_file(queue), "demo", None, {}, max_attempts=2)
+    queue.claim_job("w/0")
+
+    assert queue.fail_job(job["id"], "boom", {}, retry_in_s=60) is False
+    assert queue.get_job(job["id"])["status"] == "queued"
+    assert queue.claim_job("w/0") is None  # still backing off
+
+    _set(queue, job["id"], "run_after = now()")
+    retry = queue.claim_job("w/0")
+    assert retry["attempts"] == 2 and retry["error"] is None
+
+    assert queue.fail_job(job["id"], "boom again", {}, retry_in_s=0) is True
+    final = queue.get_job(job["id"])
+    assert final["status"] == "failed" and final["error"] == "boom again"
+    assert queue.claim_job("w/0") is None
+
+
+def test_stale_running_jobs_are_requeued(queue):
+    stale = queue.enqueue_job(_file(queue), "demo", None, {})
+    queue.claim_job("crashed/0")
+    live = queue.enqueue_job(_file(queue), "demo", None, {})
+    queue.claim_job("alive/0")
+    _set(queue, stale["id"], "locked_at = now() - interval '1 hour'")
+
+    assert queue.requeue_stale_jobs(900) == (1, 0)
+    assert queue.get_job(live["id"])["status"] == "running"
+    again = queue.claim_job("w/0")
+    assert again["id"] == stale["id"] and again["attempts"] == 2
+
+
+def test_stale_job_out_of_attempts_fails_instead_of_requeueing(queue):
+    file_id = _file(queue)
+    job = queue.enqueue_job(file_id, "demo", None, {}, max_attempts=2)
+    for attempt in (1, 2):  # the file kills its worker every time
+        assert queue.claim_job(f"w/{attempt}")["attempts"] == attempt
+        _set(queue, job["id"], "locked_at = now() - interval '1 hour'")
+        assert queue.requeue_stale_jobs(900) == ((1, 0) if attempt == 1 else (0, 1))
+
+    final = queue.get_job(job["id"])
+    assert final["status"] == "failed" and "attempt 2 of 2" in final["error"]
+    assert queue.claim_job("w/3") is None
+    with queue.get_conn() as conn:
+        assert conn.execute("select processing_status from files where id = %s", (file_id,)).fetchone()[0] == "error"
@@ -0,0 +1,55 @@
+import os
+
+from services.ingest.ocr_cache import OcrCache, ocr_key
+
+
+def test_key_depends_on_pixels_and_ocr_config():
+    base = ocr_key(b"\x00" * 16, 4, 4, "eng", 6)
+    assert base == ocr_key(b"\x00" * 16, 4, 4, "eng", 6)
+    assert base != ocr_key(b"\x01" * 16, 4, 4, "eng", 6)
+    assert base != ocr_key(b"\x00" * 16, 4, 4, "ind", 6)
+    assert base != ocr_key(b"\x00" * 16, 4, 4, "eng", 3)
+
+
+def test_hits_survive_restart(tmp_path):
+    cache = OcrCache(str(tmp_path), max_mb=1)
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, "page text")
+
+    fresh = OcrCache(str(tmp_path), max_mb=1)
+    assert fresh.get("ab" * 32) == "page text"
+    assert fresh.info()["entries"] == 1
+    assert fresh.info()["hit_rate"] == 1.0
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = OcrCache(str(tmp_path), max_mb=1)
+    cache.max_bytes = 250
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    cache.put(keys[0], "a" * 100)
+    cache.put(keys[1], "b" * 100)
+    cache.get(keys[0])
+    cache.put(keys[2], "c" * 100)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "a" * 100
+    assert cache.stats["evictions"] == 1
+
+
+def test_restart_with_a_smaller_cap_evicts_oldest_first(tmp_path):
+    cache = OcrCache(str(tmp_path), max_mb=1)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, "x" * 100)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+
+    fresh = OcrCache(str(tmp_path), max_mb=0)  # never below one entry
+    assert fresh.info()["entries"] == 1 and fresh.stats["evictions"] == 2
+    assert not cache._path(keys[0]).exists() and not cache._path(keys[1]).exists()
+    assert fresh.get(keys[2]) == "x" * 100
+
+
+def test_disabled_cache_is_a_no_op():
+    cache = OcrCache("off")
+    cache.put("ab" * 32, "x")
+    assert not cache.enabled and cache.get("ab" * 32) is None
@@ -0,0 +1,53 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.ingest.ocr_prep import binarize, otsu_threshold, preprocess_gray, target_zoom
+
+
+def _page(h=200, w=160):
+    rng = np.random.default_rng(0)
+    page = np.full((h, w), 200, dtype=np.uint8)
+    page[40:60, 20:140] = 30  # a line of "text"
+    page += rng.integers(0, 20, size=page.shape, dtype=np.uint8)
+    return page
+
+
+def test_target_zoom_renders_long_side_to_target():
+    assert target_zoom(595, 842, target_px=1800) == pytest.approx(1800 / 842)
+    assert target_zoom(100, 100, target_px=1800) == 4.0  # clamped
+
+
+def test_otsu_splits_bimodal_histogram():
+    hist = np.zeros(256)
+    hist[30] = 100
+    hist[200] = 900
+    assert 30 <= otsu_threshold(hist) < 200
+
+
+@pytest.mark.parametrize("method", ["otsu", "sauvola", "fixed"])
+def test_preprocess_gray_returns_binary_uint8(method):
+    out = preprocess_gray(_page(), method=method)
+
+    assert out.dtype == np.uint8
+    assert set(np.unique(out)) <= {0, 255}
+    assert (out[45:55, 30:130] == 0).mean() > 0.9
+    assert (out[100:, :] == 255).mean() > 0.9
+
+
+def test_binarize_reuses_input_buffer():
+    page = _page()
+    out = binarize(page, "fixed", fixed=128)
+    assert np.shares_memory(out, page)
+
+
+def test_read_only_view_is_left_untouched():
+    page = _page()
+    view = np.frombuffer(page.tobytes(), dtype=np.uint8).reshape(page.shape)
+    assert not view.flags.writeable
+
+    out = preprocess_gray(view, method="otsu")
+
+    assert not np.shares_memory(out, view)
+    assert (view == page).all()
+    assert set(np.unique(out)) <= {0, 255}
@@ -0,0 +1,74 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.ingest import ocr_workers
+from services.ingest.ocr_workers import OcrWorkerPool, image_bytes
+
+
+def test_image_bytes_from_array_is_raw_grayscale():
+    arr = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    data, w, h = image_bytes(arr)
+    assert (w, h) == (4, 3)
+    assert data == bytes(range(12))
+
+
+def test_image_bytes_from_pil_converts_to_grayscale():
+    Image = pytest.importorskip("PIL.Image")
+    data, w, h = image_bytes(Image.new("RGB", (5, 2), (255, 255, 255)))
+    assert (w, h) == (5, 2)
+    assert data == b"\xff" * 10
+
+
+def test_pytesseract_backend_disables_pool():
+    pool = OcrWorkerPool(workers=2, backend="pytesseract")
+    assert not pool.available
+    assert pool.info()["backend"] == "pytesseract"
+
+
+class _FakeProcessPool(Executor):
+    """Holds every submitted page until the test resolves or breaks it"""
+    made = []
+
+    def __init__(self, max_workers, mp_context):
+        self.pending, self.cancelled_on_shutdown = [], None
+        _FakeProcessPool.made.append(self)
+
+    def submit(self, fn, *args):
+        f = Future()
+        self.pending.append(f)
+        return f
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.cancelled_on_shutdown = cancel_futures
+        if cancel_futures:
+            for f in self.pending:
+                f.cancel()
+
+
+def test_broken_pool_is_replaced_once_and_every_caller_retries(monkeypatch):
+    monkeypatch.setattr(ocr_workers, "ProcessPoolExecutor", _FakeProcessPool)
+    _FakeProcessPool.made = []
+    pool = OcrWorkerPool(workers=2, backend="tesserocr")
+    page = np.zeros((4, 4), dtype=np.uint8)
+
+    async def go():
+        calls = [asyncio.ensure_future(pool.ocr(page)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        broken = _FakeProcessPool.made[0]
+        for f in broken.pending:  # a worker died: the pool fails everything in flight
+            f.set_exception(BrokenProcessPool("worker died"))
+        await asyncio.sleep(0.01)
+        for f in _FakeProcessPool.made[-1].pending:
+            if not f.cancelled():
+                f.set_result("text")
+        return await asyncio.gather(*calls)
+
+    assert asyncio.run(go()) == ["text"] * 3
+    assert len(_FakeProcessPool.made) == 2
+    assert _FakeProcessPool.made[0].cancelled_on_shutdown is False
+    assert pool.info()["restarts"] == 1 and pool.info()["pages"] == 3
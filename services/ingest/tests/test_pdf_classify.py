@@ -0,0 +1,49 @@
+import pytest
+
+from services.ingest.pdf_classify import ClassificationCache, classify_document, route_page, route_summary
+
+A4 = 595 * 842
+
+
+def test_route_page_text_ocr_and_empty():
+    assert route_page(2500, A4, 0.0) == "text"
+    assert route_page(0, A4, 0.95) == "ocr"
+    assert route_page(0, A4, 0.0) == "empty"
+
+
+def test_thin_text_layer_over_scan_goes_to_ocr():
+    # e.g. a scanned page with a printed footer
+    assert route_page(120, A4, 0.9) == "ocr"
+    assert route_page(3000, A4, 0.9) == "text"
+
+
+def test_vector_outlined_text_goes_to_ocr():
+    assert route_page(0, A4, 0.0, drawings=400) == "ocr"
+    assert route_page(0, A4, 0.0, drawings=1) == "empty"  # a page border
+
+
+def test_classify_document_counts_drawings_on_pages_without_text_or_images():
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.new_page()
+    doc.new_page().draw_rect(fitz.Rect(20, 20, 575, 822))
+    outlined = doc.new_page()
+    for i in range(40):  # glyph-like paths, one per "letter"
+        outlined.draw_rect(fitz.Rect(50 + 12 * i, 100, 58 + 12 * i, 112), fill=(0, 0, 0))
+    doc.new_page().insert_text((72, 72), ["Well ACEH-01 completion report, perforated 2110-2125 m."] * 30)
+
+    pages = classify_document(doc)
+    assert [p["route"] for p in pages] == ["empty", "empty", "ocr", "text"]
+    assert [p["drawings"] for p in pages] == [0, 1, 40, 0]
+
+
+def test_cache_roundtrips_through_disk(tmp_path):
+    pages = [{"page": 1, "route": "text", "chars": 900, "image_coverage": 0.0},
+             {"page": 2, "route": "ocr", "chars": 0, "image_coverage": 1.0}]
+    ClassificationCache(cache_dir=str(tmp_path)).put("abc", pages)
+
+    fresh = ClassificationCache(cache_dir=str(tmp_path))
+    assert fresh.get("missing") is None
+    assert fresh.get("abc") == pages
+    assert fresh.info()["hits"] == 1
+    assert route_summary(pages) == {"text": 1, "ocr": 1, "empty": 0}
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from services.ingest.pipeline import Pipeline, Stage
+
+
+def test_items_flow_through_all_stages():
+    stored = []
+
+    async def double(x, emit):
+        await emit(x)
+        await emit(x * 10)
+
+    async def store(batch, emit):
+        stored.extend(batch)
+
+    pipe = Pipeline([
+        Stage("split", double, workers=2),
+        Stage("store", store, batch=4, linger_ms=5),
+    ])
+    asyncio.run(pipe.run(range(5)))
+
+    assert sorted(stored) == [0, 0, 1, 2, 3, 4, 10, 20, 30, 40]
+    report = pipe.report()
+    assert report["split"]["in"] == 5
+    assert report["store"]["in"] == 10
+
+
+def test_downstream_starts_before_source_is_exhausted():
+    seen = []
+
+    async def source():
+        for i in range(3):
+            yield i
+            await asyncio.sleep(0.01)
+            seen.append(("source", i))
+
+    async def sink(x, emit):
+        seen.append(("sink", x))
+
+    asyncio.run(Pipeline([Stage("sink", sink)]).run(source()))
+
+    assert seen.index(("sink", 0)) < seen.index(("source", 2))
+
+
+def test_finish_flushes_buffered_items():
+    out = []
+    buf = []
+
+    async def buffer(x, emit):
+        buf.append(x)
+
+    async def flush(emit):
+        await emit(list(buf))
+
+    async def sink(x, emit):
+        out.append(x)
+
+    asyncio.run(Pipeline([Stage("buf", buffer, finish=flush), Stage("sink", sink)]).run([1, 2]))
+
+    assert out == [[1, 2]]
+
+
+def test_stage_error_cancels_pipeline():
+    async def boom(x, emit):
+        raise RuntimeError("stage failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(Pipeline([Stage("boom", boom, queue_size=1)]).run(range(100)))
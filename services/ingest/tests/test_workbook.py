@@ -0,0 +1,72 @@
+import asyncio
+import io
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from services.ingest import workbook
+from services.ingest.workbook import read_workbook, workbook_chunks
+
+
+def _xlsx(sheets):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        for r in rows:
+            ws.append(r)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+SHEETS = {
+    "Jan": [["well", "oil_bbl"]] + [[f"A-{i}", i * 10] for i in range(25)],
+    "Feb": [["well", "oil_bbl"], ["A-1", 12.5], [None, None]],
+    "Notes": [["remark"], ["choke change | A-3"]],
+}
+
+
+def test_sheets_read_in_parallel_keep_order_and_metadata():
+    sheets = asyncio.run(read_workbook(_xlsx(SHEETS), workers=2))
+    workbook.shutdown()
+
+    assert [s["name"] for s in sheets] == ["Jan", "Feb", "Notes"]
+    assert sheets[0]["header"] == ["well", "oil_bbl"]
+    assert sheets[0]["total_rows"] == 25
+    assert sheets[1]["rows"] == [["A-1", "12.5"]]
+
+
+def test_chunks_carry_sheet_metadata():
+    chunks, sheets = asyncio.run(workbook_chunks(_xlsx(SHEETS)))
+
+    jan = [c for c in chunks if c["sheet"] == "Jan"]
+    assert len(jan) == 3  # 25 rows in windows of 10
+    assert jan[0]["section"] == "Jan!rows-1-10"
+    assert jan[0]["checksum"] == sheets[0]["hash"]
+    assert "| well | oil_bbl |" in jan[0]["text"]
+    assert "choke change \\| A-3" in chunks[-1]["text"]
+    assert [c["idx"] for c in chunks] == list(range(len(chunks)))
+
+
+def test_unchanged_sheets_are_skipped():
+    _, first = asyncio.run(workbook_chunks(_xlsx(SHEETS)))
+    changed = dict(SHEETS, Feb=[["well", "oil_bbl"], ["A-1", 13.0]])
+    known = {s["hash"]: s["chunks"] for s in first}
+
+    chunks, second = asyncio.run(workbook_chunks(_xlsx(changed), known))
+
+    assert [s["skipped"] for s in second] == [True, False, True]
+    assert {c["sheet"] for c in chunks} == {"Feb"}
+
+
+def test_partially_stored_sheet_is_chunked_again():
+    _, first = asyncio.run(workbook_chunks(_xlsx(SHEETS)))
+    stored = {s["hash"]: s["chunks"] for s in first}
+    stored[first[0]["hash"]] -= 1  # a run that died after storing part of Jan
+
+    chunks, second = asyncio.run(workbook_chunks(_xlsx(SHEETS), stored))
+
+    assert [s["skipped"] for s in second] == [False, True, True]
+    assert len([c for c in chunks if c["sheet"] == "Jan"]) == 3
@@ -0,0 +1,158 @@
+import asyncio, hashlib, io, math, multiprocessing, os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+EXCEL_WORKERS = int(os.getenv("INGEST_EXCEL_WORKERS", max(1, min(4, (os.cpu_count() or 2) // 2))))
+SHEET_MAX_ROWS = int(os.getenv("INGEST_SHEET_MAX_ROWS", 2000))
+ROWS_PER_CHUNK = int(os.getenv("INGEST_SHEET_ROWS_PER_CHUNK", 10))
+
+_pool: ProcessPoolExecutor | None = None
+
+def _cell(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, float):
+        if math.isnan(v):
+            return ""
+        return str(int(v)) if v.is_integer() else repr(v)
+    if isinstance(v, datetime):
+        return v.isoformat(sep=" ") if (v.hour, v.minute, v.second) != (0, 0, 0) else v.date().isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    return str(v).replace("|", "\\|").replace("\n", " ").strip()
+
+def _trim(rows: list[list[str]]) -> list[list[str]]:
+    """Drop empty rows and trailing empty columns"""
+    rows = [r for r in rows if any(r)]
+    width = max((max((i + 1 for i, c in enumerate(r) if c), default=0) for r in rows), default=0)
+    return [(r + [""] * width)[:width] for r in rows]
+
+def sheet_hash(name: str, rows: list[list[str]]) -> str:
+    """Content hash of one sheet (name + cell text), stable across workbook saves"""
+    h = hashlib.sha256(name.encode())
+    for r in rows:
+        h.update(b"\x1e" + "\x1f".join(r).encode())
+    return h.hexdigest()
+
+def markdown_table(header: list[str], rows: list[list[str]]) -> str:
+    header = [h or f"col{i + 1}" for i, h in enumerate(header)]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    lines += ["| " + " | ".join(r) + " |" for r in rows]
+    return "\n".join(lines)
+
+def sheet_chunks(sheet: dict, rows_per_chunk: int = ROWS_PER_CHUNK) -> list[dict]:
+    """Row-window chunks for one sheet; the header row is repeated in every chunk"""
+    name, header, body = sheet["name"], sheet["header"], sheet["rows"]
+    chunks = []
+    for n, start in enumerate(range(0, len(body), rows_per_chunk)):
+        part = body[start:start + rows_per_chunk]
+        a, b = start + 1, start + len(part)
+        chunks.append({
+            "idx": n,
+            "text": f"## Sheet: {name} (rows {a}-{b} of {sheet['total_rows']})\n\n{markdown_table(header, part)}",
+            "page": sheet["index"] + 1,
+            "section": f"{name}!rows-{a}-{b}",
+            "chunk_type": "sheet_rows",
+            "checksum": sheet["hash"],
+            "sheet": name,
+            "sheet_index": sheet["index"],
+            "columns": header,
+            "rows": [a, b],
+        })
+    return chunks
+
+def _sheet(index: int, name: str, rows: list[list[str]], total_rows: int) -> dict:
+    rows = _trim(rows)
+    header, body = (rows[0], rows[1:]) if rows else ([], [])
+    return {"index": index, "name": name, "header": header, "rows": body,
+            "total_rows": max(0, total_rows - 1) if rows else 0, "hash": sheet_hash(name, rows)}
+
+def _read_xlsx(content: bytes, wanted: list[tuple[int, str]], max_rows: int) -> list[dict]:
+    """Read some sheets of an .xlsx (runs in a worker process).
+
+    read_only mode parses a worksheet's XML only when it is iterated, so each
+    worker pays for the shared strings once plus its own sheets.
+    """
+    import openpyxl
+    wb = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    out = []
+    try:
+        for index, name in wanted:
+            rows, total = [], 0
+            for values in wb[name].iter_rows(values_only=True):
+                total += 1
+                if len(rows) <= max_rows:  # header + max_rows data rows
+                    rows.append([_cell(v) for v in values])
+            out.append(_sheet(index, name, rows, total))
+    finally:
+        wb.close()
+    return out
+
+def _read_xls(content: bytes, max_rows: int) -> list[dict]:
+    """Legacy .xls: pandas parses every sheet in one call"""
+    import pandas as pd
+    frames = pd.read_excel(io.BytesIO(content), sheet_name=None, header=None)
+    out = []
+    for index, (name, df) in enumerate(frames.items()):
+        rows = [[_cell(v) for v in r] for r in df.head(max_rows + 1).itertuples(index=False)]
+        out.append(_sheet(index, str(name), rows, len(df)))
+    return out
+
+def _sheet_names(content: bytes) -> list[str]:
+    import openpyxl
+    wb = openpyxl.load_workbook(io.BytesIO(content), read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+async def read_workbook(content: bytes, workers: int = EXCEL_WORKERS, max_rows: int = SHEET_MAX_ROWS) -> list[dict]:
+    """Parse every sheet of a workbook, spreading sheets over worker processes"""
+    if not content.startswith(b"PK"):  # not a zip container -> legacy .xls
+        return await asyncio.to_thread(_read_xls, content, max_rows)
+
+    names = await asyncio.to_thread(_sheet_names, content)
+    indexed = list(enumerate(names))
+    if workers <= 1 or len(names) <= 1:
+        return await asyncio.to_thread(_read_xlsx, content, indexed, max_rows)
+
+    groups = [indexed[i::workers] for i in range(min(workers, len(indexed)))]
+    loop = asyncio.get_running_loop()
+    pool = _get_pool(workers)
+    parts = await asyncio.gather(*(loop.run_in_executor(pool, _read_xlsx, content, g, max_rows) for g in groups))
+    return sorted((s for part in parts for s in part), key=lambda s: s["index"])
+
+async def workbook_chunks(content: bytes, stored: dict[str, int] | None = None) -> tuple[list[dict], list[dict]]:
+    """Per-sheet chunks for a workbook, skipping sheets that are already fully stored.
+
+    ``stored`` maps content hash -> chunks stored under it. A sheet is skipped
+    only when that count equals its own chunk count, so a sheet left half
+    written by an interrupted run is chunked again. Returns ``(chunks, sheets)``
+    where each sheet summary carries its hash and whether it was skipped.
+    """
+    stored = stored or {}
+    chunks, sheets = [], []
+    for sheet in await read_workbook(content):
+        new = sheet_chunks(sheet) if sheet["rows"] else []
+        skipped = bool(new) and stored.get(sheet["hash"]) == len(new)
+        if skipped:
+            new = []
+        chunks.extend(new)
+        sheets.append({"name": sheet["name"], "index": sheet["index"], "rows": sheet["total_rows"],
+                       "columns": len(sheet["header"]), "hash": sheet["hash"], "skipped": skipped,
+                       "chunks": len(new)})
+    for i, ch in enumerate(chunks):
+        ch["idx"] = i
+    return chunks, sheets
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
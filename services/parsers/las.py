@@ -0,0 +1,140 @@
+import io, os, re, threading, time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+LAS_CACHE_MB = int(os.getenv("PARSERS_LAS_CACHE_MB", 256))
+LAS_CACHE_TTL = int(os.getenv("PARSERS_LAS_CACHE_TTL", 3600))
+
+_SECTION = re.compile(r"^~([A-Za-z])", re.M)
+_HEADER_LINE = re.compile(r"^\s*([^.\s]+)\s*\.(\S*)\s*(.*?)\s*:(.*)$")
+
+@dataclass
+class LasData:
+    """A parsed LAS file: depth index + one float64 array per curve"""
+    depth: np.ndarray
+    curves: dict[str, np.ndarray]
+    units: dict[str, str] = field(default_factory=dict)
+    well: dict[str, str] = field(default_factory=dict)
+    parse_ms: float = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.depth.nbytes + sum(v.nbytes for v in self.curves.values())
+
+def _sections(text: str) -> dict[str, str]:
+    out = {}
+    marks = list(_SECTION.finditer(text))
+    for i, m in enumerate(marks):
+        body_start = text.find("\n", m.start())
+        end = marks[i + 1].start() if i + 1 < len(marks) else len(text)
+        out.setdefault(m.group(1).upper(), text[body_start + 1:end] if body_start != -1 else "")
+    return out
+
+def _header(body: str) -> list[tuple[str, str, str, str]]:
+    rows = []
+    for line in body.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        m = _HEADER_LINE.match(line)
+        if m:
+            rows.append(tuple(g.strip() for g in m.groups()))
+    return rows
+
+def parse_las(text: str) -> LasData:
+    """Parse a LAS 2.0 file: headers line by line, the ~A block with NumPy's C reader.
+
+    Wrapped files and anything this fast path does not understand go through
+    lasio instead.
+    """
+    t0 = time.perf_counter()
+    sec = _sections(text)
+    version = {m.upper(): v for m, _, v, _ in _header(sec.get("V", ""))}
+    curves_hdr = _header(sec.get("C", ""))
+    if version.get("WRAP", "NO").upper().startswith("Y") or not curves_hdr or "A" not in sec:
+        return _parse_lasio(text, t0)
+
+    well = {m.upper(): v for m, _, v, _ in _header(sec.get("W", ""))}
+    names = [m for m, _, _, _ in curves_hdr]
+    units = {m: u for m, u, _, _ in curves_hdr}
+    try:
+        data = np.loadtxt(io.StringIO(sec["A"]), dtype=np.float64, ndmin=2, comments="#")
+    except ValueError:  # text values or ragged rows in the data block
+        return _parse_lasio(text, t0)
+    if data.shape[1] != len(names):
+        return _parse_lasio(text, t0)
+
+    null = well.get("NULL")
+    if null:
+        try:
+            data[data == float(null)] = np.nan
+        except ValueError:
+            pass
+    curves = {name: np.ascontiguousarray(data[:, i]) for i, name in enumerate(names)}
+    return LasData(depth=curves[names[0]], curves=curves, units=units, well=well,
+                   parse_ms=round((time.perf_counter() - t0) * 1000, 2))
+
+def _parse_lasio(text: str, t0: float) -> LasData:
+    import lasio
+    las = lasio.read(io.StringIO(text))
+    curves = {c.mnemonic: np.asarray(c.data, dtype=np.float64) for c in las.curves}
+    units = {c.mnemonic: c.unit for c in las.curves}
+    well = {item.mnemonic: str(item.value) for item in las.well}
+    return LasData(depth=np.asarray(las.index, dtype=np.float64), curves=curves, units=units, well=well,
+                   parse_ms=round((time.perf_counter() - t0) * 1000, 2))
+
+class LasCache:
+    """Parsed LAS files keyed by checksum (or object path, ETag and size), LRU-bounded by array bytes, with a TTL"""
+
+    def __init__(self, max_mb: int = LAS_CACHE_MB, ttl_s: int = LAS_CACHE_TTL):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.ttl_s = ttl_s
+        self._items: OrderedDict[str, tuple[float, LasData]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> LasData | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl_s:
+                if item is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: str, las: LasData):
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (time.monotonic(), las)
+            self._bytes += las.nbytes
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                self._drop(next(iter(self._items)))
+
+    def _drop(self, key: str):
+        _, las = self._items.pop(key)
+        self._bytes -= las.nbytes
+
+    def info(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._items), "size_mb": round(self._bytes / 2**20, 2),
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None}
+
+def depth_slice(las: LasData, start: float | None, end: float | None) -> slice | np.ndarray:
+    """Rows inside [start, end] (depth may run up or down the hole)"""
+    d = las.depth
+    if start is None and end is None:
+        return slice(None)
+    lo = -np.inf if start is None else start
+    hi = np.inf if end is None else end
+    if len(d) > 1 and d[0] <= d[-1] and np.all(np.diff(d[:: max(1, len(d) // 64)]) >= 0):
+        # increasing index (the usual case): binary search, no mask over every sample
+        return slice(int(np.searchsorted(d, lo, "left")), int(np.searchsorted(d, hi, "right")))
+    return np.flatnonzero((d >= lo) & (d <= hi))
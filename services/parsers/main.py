@@ -1,48 +1,348 @@
-import io, os, httpx, numpy as np, matplotlib.pyplot as plt
-from fastapi import FastAPI, HTTPException, Response
-import lasio
-from obspy import read
+import os, re, time, asyncio, hashlib, tempfile, httpx, numpy as np
+from urllib.parse import urlsplit
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from .decimate import METHODS, decimate, minmax_indices, to_json_list
+from .las import LasCache, LasData, depth_slice, parse_las
+from .segy import HEAD_BYTES, SEGY_MAX_TRACES, SegyLayout, parse_layout, read_traces, text_header, trace_window
+from .tiles import PALETTES, PIL_AVAILABLE, TileStore, encode_png, quantize
+from .wellstore import WellStore, well_key
+from ..common.health import HealthMonitor
 
 app = FastAPI()
 
+las_cache = LasCache()
+tile_store = TileStore()
+well_store = WellStore()
+_pyramid_builds: dict[str, asyncio.Task] = {}
+
+# Health: parsers has no upstream dependency, so readiness is whether the on-disk
+# stores are usable and the deep check writes to them
+def store_probe(root):
+  async def check():
+    if not os.access(root, os.W_OK):
+      raise RuntimeError(f"{root} is not writable")
+    return {"path": str(root)}
+  return check
+
+def store_write_check(root):
+  async def check():
+    def roundtrip():
+      with tempfile.NamedTemporaryFile(dir=root, prefix=".health-") as f:
+        f.write(b"ok")
+        f.flush()
+    await asyncio.to_thread(roundtrip)
+  return check
+
+health = HealthMonitor("parsers", details=lambda: {"las_cache": las_cache.info(), "webp_tiles": PIL_AVAILABLE})
+for name, store in (("well_store", well_store), ("tile_store", tile_store)):
+  health.probe(name, store_probe(store.root))
+  health.deep(f"{name}_write", store_write_check(store.root))
+health.install(app)
+
+async def fetch_bytes(url:str, what:str, timeout:int=60) -> bytes:
+  """Stream a signed/public URL into memory"""
+  buf = bytearray()
+  async with httpx.AsyncClient(timeout=timeout) as cli:
+    async with cli.stream("GET", url) as r:
+      if r.status_code!=200:
+        await r.aread()
+        raise HTTPException(502, f"{what} GET failed: {r.text}")
+      async for part in r.aiter_bytes():
+        buf.extend(part)
+  return bytes(buf)
+
+async def las_key(url:str, checksum:str|None, timeout:int=30) -> str:
+  """``c-<checksum>`` when the caller has one; otherwise the object path plus its ETag and
+  size, since the query string of a signed URL changes on every signing"""
+  if checksum:
+    return "c-" + checksum
+  async with httpx.AsyncClient(timeout=timeout) as cli:
+    r = await cli.head(url)
+    if r.status_code!=200:
+      # URLs signed for GET reject HEAD; a one-byte Range GET carries the same headers
+      r = await cli.get(url, headers={"Range": "bytes=0-0"})
+  if r.status_code==206:
+    size = r.headers.get("content-range", "").rpartition("/")[2]
+  elif r.status_code==200:
+    size = r.headers.get("content-length", "")
+  else:
+    raise HTTPException(502, f"LAS HEAD failed: {r.status_code}")
+  etag = r.headers.get("etag", "")
+  if not etag and not size.isdigit():
+    return url  # nothing identifies the content, so only this exact URL may reuse it
+  u = urlsplit(url)
+  return f"u-{u.netloc}{u.path}:{etag}:{size}"
+
+async def load_las(url:str, checksum:str|None=None) -> LasData:
+  key = await las_key(url, checksum)
+  las = las_cache.get(key)
+  if las is None:
+    raw = await fetch_bytes(url, "LAS")
+    las = await asyncio.to_thread(parse_las, raw.decode("utf-8", errors="replace"))
+    las_cache.put(key, las)
+  return las
+
+def las_series(las:LasData, curves:list[str], start:float|None, end:float|None, points:int, method:str) -> dict:
+  rows = depth_slice(las, start, end)
+  depth = las.depth[rows]
+  series = {}
+  for k in curves:
+    y = las.curves[k][rows]
+    keep = decimate(depth, y, points, method)
+    series[k] = {"depth": to_json_list(depth[keep], 4), "values": to_json_list(y[keep], 5), "unit": las.units.get(k, "")}
+  return {"series": series, "source_points": int(len(depth)),
+          "depth_range": to_json_list([depth.min(), depth.max()] if len(depth) else [], 4)}
+
+async def fetch_range(url:str, start:int, end:int, what:str, timeout:int=120) -> tuple[bytes, int, int]:
+  """Bytes [start, end] of a URL as ``(data, offset_of_data, total_size)``.
+
+  Storage URLs answer Range requests with 206; a server that ignores the
+  header sends the whole file (offset 0), which the callers handle the same way.
+  """
+  async with httpx.AsyncClient(timeout=timeout) as cli:
+    r = await cli.get(url, headers={"Range": f"bytes={start}-{end}"})
+  if r.status_code==206:
+    m = re.match(r"bytes (\d+)-\d+/(\d+|\*)", r.headers.get("content-range",""))
+    if m and m.group(2)!="*":
+      return r.content, int(m.group(1)), int(m.group(2))
+    raise HTTPException(502, f"{what} GET: unusable Content-Range {r.headers.get('content-range')!r}")
+  if r.status_code==416:
+    raise HTTPException(400, f"{what}: file is smaller than the requested range")
+  if r.status_code!=200:
+    raise HTTPException(502, f"{what} GET failed: {r.text}")
+  return r.content, 0, len(r.content)
+
+@app.get("/las/curves")
+async def las_curves(url:str, curves:str|None=None, start:float|None=None, end:float|None=None,
+                     points:int=Query(2000, ge=3, le=50000), method:str="lttb", checksum:str|None=None):
+  """Decimated LAS curves: ``curves`` is a comma list (default: first two logs), depth window [start, end]"""
+  if method not in METHODS:
+    raise HTTPException(400, f"method must be one of {METHODS}")
+  t0 = time.perf_counter()
+  las = await load_las(url, checksum)
+  names = list(las.curves)
+  wanted = [c.strip() for c in curves.split(",") if c.strip()] if curves else names[1:3]
+  missing = [c for c in wanted if c not in las.curves]
+  if missing:
+    raise HTTPException(404, f"unknown curves {missing}; available: {names}")
+  out = await asyncio.to_thread(las_series, las, wanted, start, end, points, method)
+  return {
+    "curves": names,
+    "units": las.units,
+    "well": las.well,
+    "method": method,
+    "points": points,
+    **out,
+    "timing_ms": {"parse": las.parse_ms, "total": round((time.perf_counter() - t0) * 1000, 2)},
+  }
+
 @app.get("/las/curve-json")
-async def las_curve_json(url:str):
-  # Download LAS from signed URL / public URL
-  async with httpx.AsyncClient(timeout=60) as cli:
-    r = await cli.get(url)
-    if r.status_code!=200: raise HTTPException(502, f"LAS GET failed: {r.text}")
-    content = r.text
-  las = lasio.read(io.StringIO(content))
-  # Return top 3 curves (depth + first 2 logs) as arrays
-  curves = [c.mnemonic for c in las.curves]
-  depth = las.index if hasattr(las,'index') else las.depth_m
-  result = { "curves": curves, "sampled": {} }
+async def las_curve_json(url:str, points:int=Query(2000, ge=3, le=50000), checksum:str|None=None):
+  """Legacy shape (first 3 curves); now decimated over the whole log instead of truncated"""
+  las = await load_las(url, checksum)
+  curves = list(las.curves)
   keep = curves[:3]
+  # min/max buckets are aligned across curves, so one depth axis serves every curve
+  idx = np.unique(np.concatenate([minmax_indices(las.curves[k], points) for k in keep]))
+  if len(idx) > points:
+    idx = idx[np.linspace(0, len(idx) - 1, points).astype(int)]
+  result = { "curves": curves, "sampled": {} }
   for k in keep:
-    v = np.asarray(las[k]).astype(float).tolist()
-    result["sampled"][k] = v[:2000]  # limit payload
-  result["depth"] = np.asarray(depth).astype(float).tolist()[:2000]
+    result["sampled"][k] = to_json_list(las.curves[k][idx], 5)
+  result["depth"] = to_json_list(las.depth[idx], 4)
   return result
 
+@app.get("/las/cache")
+async def las_cache_stats():
+  return las_cache.info()
+
+# ---------- columnar well log store ----------
+
+@app.post("/wells/ingest")
+async def wells_ingest(request:Request, url:str|None=None, well:str|None=None, file_id:str|None=None,
+                       checksum:str|None=None):
+  """Convert a LAS file (raw request body, or ``url``) into the well's columnar store"""
+  t0 = time.perf_counter()
+  if url:
+    las = await load_las(url, checksum)
+  else:
+    raw = await request.body()
+    if not raw:
+      raise HTTPException(400, "send the LAS file as the request body or pass url=")
+    las = await asyncio.to_thread(parse_las, raw.decode("utf-8", errors="replace"))
+  try:
+    meta = await asyncio.to_thread(well_store.put, las, well, {"file_id": file_id, "checksum": checksum})
+  except ValueError as e:
+    raise HTTPException(422, str(e))
+  return {**meta, "timing_ms": {"parse": las.parse_ms, "total": round((time.perf_counter() - t0) * 1000, 2)}}
+
+@app.get("/wells")
+async def wells_list():
+  return {"wells": await asyncio.to_thread(well_store.wells)}
+
+def read_well(well:str, curves:list[str]|None, start:float|None, end:float|None, points:int, method:str) -> dict:
+  meta = well_store.meta(well_key(well))
+  if meta is None:
+    return {"well": well, "error": "not in store"}
+  have = [c for c in curves if c in meta["curves"]] if curves else meta["curves"]
+  w = well_store.read(well, have, start, end, points, method)
+  out = {"well": w["well"], "key": w["key"], "depth": to_json_list(w["depth"], 4),
+         "curves": {c: to_json_list(v, 5) for c, v in w["curves"].items()}, "units": w["units"],
+         "source_rows": w["source_rows"]}
+  if curves and len(have) < len(curves):
+    out["missing_curves"] = [c for c in curves if c not in have]
+  return out
+
+@app.get("/wells/logs")
+async def wells_logs(wells:str, curves:str|None=None, start:float|None=None, end:float|None=None,
+                     points:int=Query(1000, ge=3, le=50000), method:str="minmax"):
+  """Depth window of some curves for many wells in one call (log correlation).
+
+  ``wells`` and ``curves`` are comma lists; each well comes back on its own
+  decimated depth axis. Wells missing a curve just omit it.
+  """
+  if method not in METHODS:
+    raise HTTPException(400, f"method must be one of {METHODS}")
+  t0 = time.perf_counter()
+  names = [w.strip() for w in wells.split(",") if w.strip()]
+  wanted = [c.strip() for c in curves.split(",") if c.strip()] if curves else None
+  try:
+    results = await asyncio.gather(*(asyncio.to_thread(read_well, w, wanted, start, end, points, method) for w in names))
+  except ValueError as e:
+    raise HTTPException(400, str(e))
+  return {"wells": [r for r in results if "error" not in r],
+          "missing": [r["well"] for r in results if "error" in r],
+          "timing_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+@app.delete("/wells/{well}")
+async def wells_delete(well:str):
+  if not await asyncio.to_thread(well_store.delete, well):
+    raise HTTPException(404, "well not in store")
+  return {"ok": True}
+
+async def segy_layout(url:str) -> tuple[SegyLayout, bytes, int, bytes]:
+  """Layout from the headers alone; returns ``(layout, head, offset, data)`` where
+  ``data`` is the whole file when the server ignored the Range request"""
+  data, offset, total = await fetch_range(url, 0, HEAD_BYTES - 1, "SEG-Y")
+  try:
+    layout = parse_layout(data, total)
+  except ValueError as e:
+    raise HTTPException(422, str(e))
+  return layout, data[:HEAD_BYTES], offset, data if len(data)==total else b""
+
+async def load_segy_window(url:str, first:int, count:int, stride:int, sample_start:int,
+                           sample_end:int|None, decimate:int) -> tuple[SegyLayout, np.ndarray]:
+  """Download only the bytes of the requested traces and slice them without copying the file"""
+  layout, _, _, whole = await segy_layout(url)
+  try:
+    first, count, last = trace_window(layout, first, min(count, SEGY_MAX_TRACES), stride)
+    if whole:
+      buf, offset = whole, 0
+    else:
+      buf, offset, _ = await fetch_range(url, layout.trace_offset(first), layout.trace_offset(last + 1) - 1, "SEG-Y")
+    data = await asyncio.to_thread(read_traces, layout, buf, first, count, stride,
+                                   sample_start, sample_end, decimate, offset)
+  except ValueError as e:
+    raise HTTPException(400, str(e))
+  return layout, data
+
+@app.get("/segy/info")
+async def segy_info(url:str):
+  layout, head, _, _ = await segy_layout(url)
+  return {**layout.info(), "text_header": text_header(head)}
+
 @app.get("/segy/quicklook.png")
-async def segy_quicklook(url:str):
-  # Download SEG-Y to memory -> write to tmpfile for obspy
-  async with httpx.AsyncClient(timeout=120) as cli:
-    r = await cli.get(url)
-    if r.status_code!=200: raise HTTPException(502,f"SEGY GET failed: {r.text}")
-    raw = r.content
-  buf = io.BytesIO(raw)
-  # Obspy needs a file-like with name or on disk
-  with open("tmp.segy","wb") as f: f.write(buf.getbuffer())
-  st = read("tmp.segy", format="SEGY")
-  os.remove("tmp.segy")
-  tr = st.traces[:200]  # sample
-  data = np.stack([t.data for t in tr]).T  # samples x traces
-
-  # Quicklook: variable density image
-  fig, ax = plt.subplots(figsize=(6,4), dpi=150)
-  ax.imshow(data, cmap="gray", aspect="auto", interpolation="nearest")
-  ax.set_title("SEG-Y Quicklook")
-  ax.set_xlabel("Traces"); ax.set_ylabel("Samples")
-  out = io.BytesIO(); plt.tight_layout(); plt.savefig(out, format="png"); plt.close(fig); out.seek(0)
-  return Response(out.read(), media_type="image/png")
+async def segy_quicklook(url:str, first:int=Query(0, ge=0), count:int=Query(200, ge=1), stride:int=Query(1, ge=1),
+                         sample_start:int=Query(0, ge=0), sample_end:int|None=None, decimate:int=Query(1, ge=1),
+                         cmap:str="gray"):
+  """Variable-density image of traces ``first, first+stride, ...`` (at most ``count``),
+  samples [sample_start, sample_end) taking every ``decimate``-th sample; one pixel per sample"""
+  if cmap not in PALETTES:
+    raise HTTPException(400, f"cmap must be one of {list(PALETTES)}")
+  _, data = await load_segy_window(url, first, count, stride, sample_start, sample_end, decimate)
+  finite = np.abs(data[np.isfinite(data)])
+  clip = float(np.percentile(finite, 99)) if finite.size else 1.0
+  png = encode_png(quantize(data, clip or 1.0).T, PALETTES[cmap])
+  return Response(png, media_type="image/png")
+
+# ---------- tiled viewer ----------
+
+async def fetch_to_file(url:str, path:str, what:str, timeout:int=600):
+  async with httpx.AsyncClient(timeout=timeout) as cli:
+    async with cli.stream("GET", url) as r:
+      if r.status_code!=200:
+        await r.aread()
+        raise HTTPException(502, f"{what} GET failed: {r.text}")
+      with open(path, "wb") as f:
+        async for part in r.aiter_bytes(1 << 20):
+          f.write(part)
+
+def build_from_file(key:str, path:str) -> dict:
+  raw = np.memmap(path, dtype=np.uint8, mode="r")
+  try:
+    layout = parse_layout(raw[:HEAD_BYTES], len(raw))
+    return tile_store.build(key, layout, raw)
+  finally:
+    del raw
+
+async def build_pyramid(url:str, key:str) -> dict:
+  fd, path = tempfile.mkstemp(suffix=".segy", dir=tile_store.root)
+  os.close(fd)
+  try:
+    await fetch_to_file(url, path, "SEG-Y")
+    return await asyncio.to_thread(build_from_file, key, path)
+  finally:
+    os.remove(path)
+
+async def pyramid_key(url:str, checksum:str|None) -> str:
+  """``c-<checksum>`` is content-addressed; without one, the object path plus its size
+  (signed URLs change on every signing, the path does not)"""
+  if checksum:
+    return "c-" + re.sub(r"[^A-Za-z0-9_-]", "", checksum)[:128]
+  _, _, total = await fetch_range(url, 0, 0, "SEG-Y")
+  u = urlsplit(url)
+  return "u-" + hashlib.sha256(f"{u.netloc}{u.path}:{total}".encode()).hexdigest()[:40]
+
+@app.get("/segy/tiles/meta")
+async def segy_tiles_meta(url:str, checksum:str|None=None):
+  """Pyramid description for a SEG-Y, building it on first request (one build per file at a time)"""
+  key = await pyramid_key(url, checksum)
+  meta = tile_store.meta(key)
+  if meta is None:
+    task = _pyramid_builds.get(key)
+    if task is None:
+      task = asyncio.create_task(build_pyramid(url, key))
+      _pyramid_builds[key] = task
+      task.add_done_callback(lambda _t, k=key: _pyramid_builds.pop(k, None))
+    try:
+      meta = await asyncio.shield(task)
+    except ValueError as e:
+      raise HTTPException(422, str(e))
+  return {**meta, "key": key, "formats": ["png", "webp"] if PIL_AVAILABLE else ["png"],
+          "cmaps": list(PALETTES), "url": f"/segy/tiles/{key}/{{level}}/{{tx}}/{{ty}}.png"}
+
+@app.get("/segy/tiles/{key}/{level}/{tx}/{ty}.{fmt}")
+async def segy_tile(key:str, level:int, tx:int, ty:int, fmt:str, request:Request, cmap:str="gray"):
+  """One tile: columns are traces ``tx*tile...``, rows samples ``ty*tile...`` at 2**level decimation"""
+  if fmt not in ("png", "webp") or (fmt=="webp" and not PIL_AVAILABLE):
+    raise HTTPException(404, f"unsupported tile format {fmt}")
+  if cmap not in PALETTES:
+    raise HTTPException(400, f"cmap must be one of {list(PALETTES)}")
+  meta = tile_store.meta(key)
+  if meta is None or not 0 <= level < len(meta["levels"]):
+    raise HTTPException(404, "unknown pyramid or level; request /segy/tiles/meta first")
+  nx, ny = meta["tiles"][level]
+  if not (0 <= tx < nx and 0 <= ty < ny):
+    raise HTTPException(404, "tile outside the survey")
+  etag = f'"{key}-{meta["version"]}-{level}-{tx}-{ty}-{cmap}.{fmt}"'
+  # content-addressed pyramids never change; path-keyed ones are re-keyed when the file size changes
+  headers = {"ETag": etag,
+             "Cache-Control": "public, max-age=31536000, immutable" if key.startswith("c-") else "public, max-age=3600"}
+  if request.headers.get("if-none-match") == etag:
+    return Response(status_code=304, headers=headers)
+  data = await asyncio.to_thread(tile_store.encoded, key, level, tx, ty, fmt, cmap)
+  return Response(data, media_type=f"image/{fmt}", headers=headers)
+
+@app.get("/segy/tiles/stats")
+async def segy_tiles_stats():
+  return tile_store.info()
@@ -0,0 +1,143 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+TEXT_HEADER = 3200
+BINARY_HEADER = 400
+TRACE_HEADER = 240
+# textual + binary header + first trace header: enough to lay out the whole file
+HEAD_BYTES = TEXT_HEADER + BINARY_HEADER + TRACE_HEADER
+
+SEGY_MAX_TRACES = int(os.getenv("PARSERS_SEGY_MAX_TRACES", 4000))
+
+# data sample format code -> (sample dtype without byte order, bytes per sample)
+FORMATS = {
+    1: ("u4", 4),  # IBM float32, converted after the read
+    2: ("i4", 4),
+    3: ("i2", 2),
+    5: ("f4", 4),
+    8: ("i1", 1),
+}
+
+@dataclass
+class SegyLayout:
+    """Where every trace lives in a fixed-length SEG-Y file"""
+    endian: str          # ">" (standard) or "<"
+    fmt: int             # data sample format code
+    ns: int              # samples per trace
+    dt_us: int           # sample interval, microseconds
+    ext_headers: int     # extended textual headers
+    n_traces: int | None = None
+
+    @property
+    def itemsize(self) -> int:
+        return FORMATS[self.fmt][1]
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self.endian + FORMATS[self.fmt][0])
+
+    @property
+    def data_offset(self) -> int:
+        return TEXT_HEADER + BINARY_HEADER + self.ext_headers * TEXT_HEADER
+
+    @property
+    def trace_bytes(self) -> int:
+        return TRACE_HEADER + self.ns * self.itemsize
+
+    def trace_offset(self, i: int) -> int:
+        return self.data_offset + i * self.trace_bytes
+
+    def info(self) -> dict:
+        return {"format": self.fmt, "endian": "big" if self.endian == ">" else "little",
+                "samples": self.ns, "dt_us": self.dt_us, "traces": self.n_traces,
+                "trace_bytes": self.trace_bytes, "data_offset": self.data_offset}
+
+def _u16(buf, offset: int, endian: str) -> int:
+    return int(np.frombuffer(buf, dtype=endian + "u2", count=1, offset=offset)[0])
+
+def _i16(buf, offset: int, endian: str) -> int:
+    return int(np.frombuffer(buf, dtype=endian + "i2", count=1, offset=offset)[0])
+
+def parse_layout(head: bytes, size: int | None = None) -> SegyLayout:
+    """Read the binary header (and the first trace header when it has to).
+
+    ``head`` is at least the first ``HEAD_BYTES`` of the file (with no extended
+    headers); ``size`` is the total file length, used to count traces.
+    """
+    if len(head) < TEXT_HEADER + BINARY_HEADER:
+        raise ValueError("not a SEG-Y file: shorter than the textual + binary headers")
+    b = TEXT_HEADER
+    for endian in (">", "<"):
+        fmt = _u16(head, b + 24, endian)
+        if fmt in FORMATS:
+            break
+    else:
+        raise ValueError(f"unsupported SEG-Y sample format {_u16(head, b + 24, '>')}")
+    dt = _u16(head, b + 16, endian)
+    ns = _u16(head, b + 20, endian)
+    ext = _i16(head, b + 304, endian)  # signed: -1 means a variable number of extended headers
+    if ext < 0 or ext > 100:
+        raise ValueError("variable-length extended textual headers are not supported")
+    if ns == 0 and ext == 0 and len(head) >= HEAD_BYTES:
+        # some writers leave the binary header count empty; trace header bytes 115-116 hold it
+        ns = _u16(head, b + BINARY_HEADER + 114, endian)
+    if ns == 0:
+        raise ValueError("SEG-Y samples per trace is not set")
+    layout = SegyLayout(endian=endian, fmt=fmt, ns=ns, dt_us=dt, ext_headers=ext)
+    if size is not None:
+        layout.n_traces = max(0, (size - layout.data_offset) // layout.trace_bytes)
+    return layout
+
+def text_header(head: bytes) -> str:
+    """The 3200-byte card-image header as 40 lines (EBCDIC or ASCII)"""
+    raw = bytes(head[:TEXT_HEADER])
+    text = raw.decode("cp500" if raw[:1] == b"\xc3" else "ascii", errors="replace")
+    return "\n".join(text[i:i + 80].rstrip() for i in range(0, len(text), 80))
+
+def ibm_to_float32(words: np.ndarray) -> np.ndarray:
+    """IBM System/360 single precision (as uint32 words) to IEEE float32"""
+    w = words.astype(np.uint32, copy=False)
+    mant = (w & 0x00FFFFFF).astype(np.float64)
+    exp = ((w >> 24) & 0x7F).astype(np.int32)
+    out = np.ldexp(mant, 4 * (exp - 64) - 24)
+    out[(w >> 31).astype(bool)] *= -1
+    return out.astype(np.float32)
+
+def trace_window(layout: SegyLayout, first: int, count: int, stride: int = 1) -> tuple[int, int, int]:
+    """Clip a trace request to the file: ``(first, count, last)``"""
+    n = layout.n_traces
+    if first < 0 or stride < 1 or count < 1:
+        raise ValueError("first must be >= 0, stride and count >= 1")
+    if n is not None:
+        if first >= n:
+            raise ValueError(f"first trace {first} is past the end ({n} traces)")
+        count = min(count, (n - 1 - first) // stride + 1)
+    return first, count, first + (count - 1) * stride
+
+def read_traces(layout: SegyLayout, buf, first: int = 0, count: int = 200, stride: int = 1,
+                sample_start: int = 0, sample_end: int | None = None, decimate: int = 1,
+                buf_offset: int = 0) -> np.ndarray:
+    """Samples of traces ``first, first+stride, ...`` as a ``(traces, samples)`` float32 array.
+
+    ``buf`` is any buffer (bytes, mmap, np.memmap) holding the file from byte
+    ``buf_offset`` on, so a ranged download of just the requested traces
+    works as well as the whole file. The trace/sample selection is a strided
+    view straight over the buffer: only the window is ever copied or
+    converted, never the whole survey.
+    """
+    first, count, _ = trace_window(layout, first, count, stride)
+    sample_end = layout.ns if sample_end is None else min(sample_end, layout.ns)
+    if not 0 <= sample_start < sample_end or decimate < 1:
+        raise ValueError("need 0 <= sample_start < sample_end and decimate >= 1")
+    n_samples = len(range(sample_start, sample_end, decimate))
+    offset = layout.trace_offset(first) - buf_offset + TRACE_HEADER + sample_start * layout.itemsize
+    end = offset + (count - 1) * stride * layout.trace_bytes + ((n_samples - 1) * decimate + 1) * layout.itemsize
+    if offset < 0 or end > memoryview(buf).nbytes:
+        raise ValueError("requested traces are outside the buffer")
+    view = np.ndarray(shape=(count, n_samples), dtype=layout.dtype, buffer=buf, offset=offset,
+                      strides=(stride * layout.trace_bytes, decimate * layout.itemsize))
+    if layout.fmt == 1:
+        return ibm_to_float32(view)
+    return view.astype(np.float32)
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.parsers.decimate import decimate, lttb_indices, minmax_indices, to_json_list
+
+
+def _log(n=100_000):
+    x = np.linspace(1000, 3000, n)
+    y = np.sin(x / 50) * 40 + 80
+    y[54_321] = 400  # a single-sample spike
+    y[70_000:70_500] = np.nan  # null interval
+    return x, y
+
+
+def test_minmax_keeps_spikes_and_gaps():
+    x, y = _log()
+    idx = minmax_indices(y, 1000)
+
+    assert len(idx) <= 1000
+    assert np.all(np.diff(idx) > 0)
+    assert 54_321 in idx
+    assert np.isnan(y[idx]).any()
+
+
+def test_lttb_returns_target_count_with_endpoints_and_spike():
+    x, y = _log()
+    idx = lttb_indices(x, y, 500)
+
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert 54_321 in idx
+    assert np.isfinite(y[idx]).all()
+
+
+def test_short_series_is_returned_whole():
+    x = np.arange(10.0)
+    assert list(decimate(x, x, 100, "lttb")) == list(range(10))
+    assert list(decimate(x, x, 100, "minmax")) == list(range(10))
+
+
+def test_json_list_nulls_non_finite():
+    assert to_json_list(np.array([1.23456, np.nan, np.inf]), 2) == [1.23, None, None]
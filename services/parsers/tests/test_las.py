@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.parsers.las import LasCache, depth_slice, parse_las
+
+LAS = """~Version Information
+ VERS.                 2.0 :   CWLS LOG ASCII STANDARD -VERSION 2.0
+ WRAP.                  NO :   ONE LINE PER DEPTH STEP
+~Well Information
+ STRT.M              1670.0 :
+ STOP.M              1669.5 :
+ NULL.             -999.25 :
+ WELL.           ACEH-01   :   WELL
+~Curve Information
+ DEPT.M                    :   1  DEPTH
+ GR  .GAPI                 :   2  GAMMA RAY
+ RHOB.K/M3                 :   3  BULK DENSITY
+~A  DEPT     GR      RHOB
+1670.000   45.1   2550.0
+1670.125 -999.25  2551.0
+1670.250   47.3   2552.0
+1670.375   48.0   2553.5
+"""
+
+
+def test_fast_path_parses_curves_units_and_nulls():
+    las = parse_las(LAS)
+
+    assert list(las.curves) == ["DEPT", "GR", "RHOB"]
+    assert las.units["RHOB"] == "K/M3"
+    assert las.well["WELL"] == "ACEH-01"
+    assert np.isnan(las.curves["GR"][1])
+    assert las.depth[-1] == pytest.approx(1670.375)
+
+
+def test_depth_slice_selects_window():
+    las = parse_las(LAS)
+    rows = depth_slice(las, 1670.1, 1670.3)
+    assert las.depth[rows].tolist() == [1670.125, 1670.25]
+
+
+def test_cache_evicts_by_bytes():
+    las = parse_las(LAS)
+    cache = LasCache(max_mb=1)
+    cache.max_bytes = las.nbytes + 1
+    cache.put("a", las)
+    cache.put("b", las)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is las
+    assert cache.info()["hit_rate"] == 0.5
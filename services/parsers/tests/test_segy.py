@@ -0,0 +1,99 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.parsers.segy import (HEAD_BYTES, TRACE_HEADER, ibm_to_float32, parse_layout, read_traces,
+                                   text_header, trace_window)
+
+
+def _float_to_ibm(v: np.ndarray) -> np.ndarray:
+    """Reference encoder (slow, exact for the values used here)"""
+    out = []
+    for x in v.astype(np.float64):
+        if x == 0:
+            out.append(0)
+            continue
+        sign = 0x80000000 if x < 0 else 0
+        x = abs(x)
+        exp = 64
+        while x >= 1:
+            x /= 16
+            exp += 1
+        while x < 1 / 16:
+            x *= 16
+            exp -= 1
+        out.append(sign | (exp << 24) | int(round(x * 2**24)))
+    return np.array(out, dtype=np.uint32)
+
+
+def _segy(data: np.ndarray, fmt: int = 5, endian: str = ">", ns_in_binary: bool = True, dt: int = 2000) -> bytes:
+    """A minimal fixed-length SEG-Y: traces x samples; trace i's header carries i+1 in bytes 1-4"""
+    n, ns = data.shape
+    text = "".join(f"C{i + 1:2d} SYNTHETIC".ljust(80) for i in range(40)).encode("cp500")
+    binary = np.zeros(200, dtype=endian + "u2")
+    binary[8] = dt                        # bytes 3217-3218: sample interval
+    binary[10] = ns if ns_in_binary else 0  # bytes 3221-3222: samples per trace
+    binary[12] = fmt                       # bytes 3225-3226: format code
+    if fmt == 1:
+        samples = _float_to_ibm(data.ravel()).astype(endian + "u4").reshape(n, ns)
+    else:
+        samples = data.astype(endian + {5: "f4", 3: "i2", 2: "i4"}[fmt])
+    traces = []
+    for i in range(n):
+        hdr = np.zeros(TRACE_HEADER // 2, dtype=endian + "u2")
+        hdr[57] = ns                       # bytes 115-116: samples in this trace
+        hdr = bytearray(hdr.tobytes())
+        hdr[0:4] = np.array([i + 1], dtype=endian + "i4").tobytes()
+        traces.append(bytes(hdr) + samples[i].tobytes())
+    return text + binary.tobytes() + b"".join(traces)
+
+
+def _data(n=50, ns=120):
+    return (np.arange(n)[:, None] * 1000 + np.arange(ns)[None, :]).astype(np.float32) - 3000
+
+
+def test_ibm_conversion_known_values():
+    words = np.array([0x42640000, 0xC276A000, 0x00000000, 0x41100000], dtype=np.uint32)
+    assert ibm_to_float32(words).tolist() == [100.0, -118.625, 0.0, 1.0]
+
+
+@pytest.mark.parametrize("fmt,endian", [(5, ">"), (5, "<"), (1, ">"), (3, ">"), (2, ">")])
+def test_layout_and_window(fmt, endian):
+    data = _data()
+    raw = _segy(data, fmt, endian)
+    layout = parse_layout(raw[:HEAD_BYTES], len(raw))
+    assert (layout.fmt, layout.ns, layout.dt_us, layout.n_traces) == (fmt, 120, 2000, 50)
+    got = read_traces(layout, raw, first=5, count=10, stride=3, sample_start=7, sample_end=100, decimate=4)
+    np.testing.assert_array_equal(got, data[5:35:3, 7:100:4])
+    assert got.dtype == np.float32
+
+
+def test_reads_from_a_ranged_buffer_and_clips_count():
+    data = _data()
+    raw = _segy(data)
+    layout = parse_layout(raw[:HEAD_BYTES], len(raw))
+    first, count, last = trace_window(layout, 40, 100, 2)
+    assert (count, last) == (5, 48)
+    start, end = layout.trace_offset(first), layout.trace_offset(last + 1)
+    got = read_traces(layout, raw[start:end], first, count, 2, buf_offset=start)
+    np.testing.assert_array_equal(got, data[40:50:2])
+    with pytest.raises(ValueError):
+        read_traces(layout, raw[start:end], 0, 5, buf_offset=start)
+
+
+def test_samples_from_trace_header_and_text_header():
+    raw = _segy(_data(4, 16), ns_in_binary=False)
+    layout = parse_layout(raw[:HEAD_BYTES], len(raw))
+    assert (layout.ns, layout.n_traces) == (16, 4)
+    assert text_header(raw).splitlines()[0] == "C 1 SYNTHETIC"
+    with pytest.raises(ValueError):
+        parse_layout(b"\0" * 3600)
+
+
+@pytest.mark.parametrize("ns_in_binary", [True, False])
+def test_header_counts_above_32767_are_unsigned(ns_in_binary):
+    data = _data(2, 40000)
+    raw = _segy(data, ns_in_binary=ns_in_binary, dt=50000)
+    layout = parse_layout(raw[:HEAD_BYTES], len(raw))
+    assert (layout.ns, layout.dt_us, layout.n_traces) == (40000, 50000, 2)
+    np.testing.assert_array_equal(read_traces(layout, raw, first=1, count=1, sample_start=39990), data[1:2, 39990:])
@@ -0,0 +1,83 @@
+import struct, zlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.parsers.segy import HEAD_BYTES, parse_layout
+from services.parsers.tiles import PALETTES, TileStore, encode_png, halve, quantize
+from test_segy import _segy
+
+
+def _decode_png(data: bytes) -> tuple[np.ndarray, bytes]:
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos, idat, plte, ihdr = 8, b"", b"", None
+    while pos < len(data):
+        (n,) = struct.unpack(">I", data[pos:pos + 4])
+        kind, body = data[pos + 4:pos + 8], data[pos + 8:pos + 8 + n]
+        assert struct.unpack(">I", data[pos + 8 + n:pos + 12 + n])[0] == zlib.crc32(kind + body)
+        if kind == b"IHDR":
+            ihdr = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT":
+            idat += body
+        elif kind == b"PLTE":
+            plte = body
+        pos += 12 + n
+    w, h = ihdr[:2]
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(h, w + 1)
+    assert (rows[:, 0] == 0).all()
+    return rows[:, 1:], plte
+
+
+def test_png_roundtrip_gray_and_palette():
+    img = (np.arange(30 * 17) % 256).astype(np.uint8).reshape(30, 17)
+    got, plte = _decode_png(encode_png(img))
+    np.testing.assert_array_equal(got, img)
+    assert plte == b""
+    got, plte = _decode_png(encode_png(img, PALETTES["seismic"]))
+    np.testing.assert_array_equal(got, img)
+    assert len(plte) == 768
+
+
+def test_quantize_and_halve():
+    q = quantize(np.array([-10, -1, 0, 1, np.nan, 10], dtype=np.float32), clip=1.0)
+    assert q.tolist() == [0, 0, 128, 255, 128, 255]
+    a = np.arange(15, dtype=np.uint8).reshape(5, 3)
+    h = halve(a)
+    assert h.shape == (3, 2)
+    assert h[0, 0] == round((0 + 1 + 3 + 4) / 4)
+    assert h[2, 1] == 14  # padded corner averages with itself
+
+
+def test_pyramid_levels_and_tiles(tmp_path):
+    data = np.sin(np.arange(300)[:, None] / 7 + np.arange(90)[None, :] / 5).astype(np.float32)
+    raw = _segy(data)
+    layout = parse_layout(raw[:HEAD_BYTES], len(raw))
+    store = TileStore(root=str(tmp_path), tile=64)
+    meta = store.build("c-abc", layout, raw)
+    assert meta["levels"] == [[300, 90], [150, 45], [75, 23], [38, 12]]
+    assert meta["tiles"][0] == [5, 2]
+    assert store.meta("c-abc")["levels"] == meta["levels"]
+
+    tile = store.tile("c-abc", 0, 4, 1)  # last trace tile, second sample tile
+    assert tile.shape == (90 - 64, 300 - 256)  # rows are samples
+    expected = quantize(data[256:300, 64:90], meta["clip"]).T
+    np.testing.assert_array_equal(tile, expected)
+
+    png = store.encoded("c-abc", 3, 0, 0, "png", "gray")
+    assert store.encoded("c-abc", 3, 0, 0, "png", "gray") is png
+    img, _ = _decode_png(png)
+    assert img.shape == (12, 38)
+    assert store.info()["pyramids"] == 1
+    with pytest.raises(IndexError):
+        store.tile("c-abc", 0, 9, 0)
+
+
+def test_prune_keeps_newest(tmp_path):
+    raw = _segy(np.ones((64, 64), dtype=np.float32))
+    layout = parse_layout(raw[:HEAD_BYTES], len(raw))
+    store = TileStore(root=str(tmp_path), tile=32, max_mb=0)
+    store.build("c-one", layout, raw)
+    store.build("c-two", layout, raw)
+    assert store.meta("c-one") is None
+    assert store.meta("c-two") is not None
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.parsers.las import LasData
+from services.parsers.wellstore import WellStore, well_key
+
+
+def _las(well="ACEH-01", n=5000, curves=("GR", "RHOB"), reverse=False):
+    depth = np.linspace(1000, 1000 + (n - 1) * 0.5, n)
+    data = {"DEPT": depth}
+    for i, c in enumerate(curves):
+        data[c] = np.sin(depth / (10 + i)) * 50 + 100
+    data[curves[0]][100:110] = np.nan
+    if reverse:
+        data = {k: v[::-1].copy() for k, v in data.items()}
+    return LasData(depth=data["DEPT"], curves=data, units={"DEPT": "M", **{c: "API" for c in curves}},
+                   well={"WELL": well, "NULL": "-999.25"})
+
+
+def test_well_key():
+    assert well_key(" ACEH-01 ST1 ") == "aceh-01_st1"
+    with pytest.raises(ValueError):
+        well_key("  ")
+
+
+def test_put_and_read_window(tmp_path):
+    store = WellStore(str(tmp_path))
+    meta = store.put(_las(), source={"file_id": "f1"})
+    assert meta["curves"] == ["GR", "RHOB"]
+    assert (meta["rows"], meta["depth_min"], meta["depth_unit"]) == (5000, 1000.0, "M")
+    assert meta["stats"]["GR"]["valid"] == 4990
+
+    w = store.read("aceh-01", ["RHOB"], start=1100, end=1200)
+    assert w["depth"][0] == 1100 and w["depth"][-1] == 1200
+    assert list(w["curves"]) == ["RHOB"] and w["curves"]["RHOB"].dtype == np.float32
+    assert w["source_rows"] == 201
+
+    d = store.read("ACEH-01", None, points=100)
+    assert len(d["depth"]) <= 2 * 100 + 2 and d["source_rows"] == 5000
+    assert all(len(v) == len(d["depth"]) for v in d["curves"].values())
+    assert store.wells()[0]["well"] == "ACEH-01"
+    with pytest.raises(KeyError):
+        store.read("ACEH-01", ["NPHI"])
+
+
+def test_reversed_depth_and_merge_runs(tmp_path):
+    store = WellStore(str(tmp_path))
+    store.put(_las(reverse=True))
+    w = store.read("ACEH-01", ["GR"], start=1000, end=1001)
+    assert w["depth"].tolist() == [1000.0, 1000.5, 1001.0]
+
+    meta = store.put(_las(curves=("NPHI",)), source={"file_id": "f2"})  # same depth axis -> merged
+    assert set(meta["curves"]) == {"GR", "RHOB", "NPHI"}
+    meta = store.put(_las(n=100, curves=("DT",)))  # different axis -> replaced
+    assert meta["curves"] == ["DT"]
+    assert store.delete("ACEH-01") and not store.delete("ACEH-01")
+
+
+def test_concurrent_runs_of_one_well_keep_every_curve(tmp_path):
+    store = WellStore(str(tmp_path))
+    store.put(_las(curves=("GR",)))
+    meta, read = store.meta, threading.Barrier(2, timeout=0.5)
+
+    def slow_meta(key):
+        # without the well lock both writers read the old curve set here, then the last swap wins
+        out = meta(key)
+        try:
+            read.wait()
+        except threading.BrokenBarrierError:
+            pass
+        time.sleep(0.05)
+        return out
+
+    store.meta = slow_meta
+    threads = [threading.Thread(target=store.put, args=(_las(curves=(c,)),)) for c in ("NPHI", "DT")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.meta = meta
+    assert set(store.meta("aceh-01")["curves"]) == {"GR", "NPHI", "DT"}
@@ -0,0 +1,243 @@
+import io, json, os, shutil, struct, tempfile, threading, time, zlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from .segy import SegyLayout, read_traces
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:  # WebP tiles need Pillow; PNG is encoded here
+    PIL_AVAILABLE = False
+
+TILE_SIZE = int(os.getenv("PARSERS_TILE_SIZE", 256))
+TILE_DIR = os.getenv("PARSERS_TILE_DIR", os.path.join(tempfile.gettempdir(), "know-ai", "segy-tiles"))
+TILE_CACHE_MB = int(os.getenv("PARSERS_TILE_CACHE_MB", 2048))
+TILE_MEMORY_MB = int(os.getenv("PARSERS_TILE_MEMORY_MB", 64))
+CLIP_PERCENTILE = float(os.getenv("PARSERS_TILE_CLIP_PERCENTILE", 99.0))
+_VERSION = 1  # bump when quantization or level building changes
+_CHUNK_TRACES = 2048  # traces quantized per pass while building level 0
+
+def _ramp(lo: tuple, mid: tuple, hi: tuple) -> bytes:
+    t = np.linspace(-1, 1, 256)[:, None]
+    lo, mid, hi = (np.array(c, dtype=np.float64) for c in (lo, mid, hi))
+    rgb = np.where(t < 0, mid + (mid - lo) * t, mid + (hi - mid) * t)
+    return np.round(rgb).astype(np.uint8).tobytes()
+
+# 8-bit tiles hold quantized amplitude (128 = zero); a palette turns them into colours
+PALETTES = {
+    "gray": None,
+    "seismic": _ramp((0, 0, 160), (255, 255, 255), (180, 0, 0)),
+}
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def encode_png(img: np.ndarray, palette: bytes | None = None, level: int = 3) -> bytes:
+    """8-bit grayscale (or paletted) PNG straight from a 2-D uint8 array"""
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+    h, w = img.shape
+    raw = np.empty((h, w + 1), dtype=np.uint8)
+    raw[:, 0] = 0  # filter type "none" per row
+    raw[:, 1:] = img
+    out = [b"\x89PNG\r\n\x1a\n", _chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 3 if palette else 0, 0, 0, 0))]
+    if palette:
+        out.append(_chunk(b"PLTE", palette))
+    out += [_chunk(b"IDAT", zlib.compress(raw.tobytes(), level)), _chunk(b"IEND", b"")]
+    return b"".join(out)
+
+def encode_webp(img: np.ndarray, palette: bytes | None = None, quality: int = 80) -> bytes:
+    if not PIL_AVAILABLE:
+        raise RuntimeError("WebP tiles need Pillow")
+    im = Image.fromarray(np.ascontiguousarray(img, dtype=np.uint8), "L")
+    if palette:
+        im.putpalette(palette)
+        im = im.convert("RGB")
+    out = io.BytesIO()
+    im.save(out, format="WEBP", quality=quality, method=2)
+    return out.getvalue()
+
+def clip_value(layout: SegyLayout, buf, percentile: float = CLIP_PERCENTILE, sample_traces: int = 512) -> float:
+    """Amplitude that maps to full black/white, from an evenly strided subset of traces"""
+    stride = max(1, layout.n_traces // sample_traces)
+    sample = read_traces(layout, buf, 0, sample_traces, stride)
+    finite = np.abs(sample[np.isfinite(sample)])
+    clip = float(np.percentile(finite, percentile)) if finite.size else 0.0
+    return clip if clip > 0 else 1.0
+
+def quantize(data: np.ndarray, clip: float) -> np.ndarray:
+    """float amplitudes -> uint8 with 128 at zero, clipped at +-clip"""
+    q = np.nan_to_num(data, nan=0.0, posinf=clip, neginf=-clip) * np.float32(127.5 / clip)
+    q += np.float32(128.0)
+    np.clip(q, 0, 255, out=q)
+    return q.astype(np.uint8)
+
+def halve(a: np.ndarray) -> np.ndarray:
+    """2x2 box average (odd edges repeat their last row/column)"""
+    if a.shape[0] % 2:
+        a = np.concatenate([a, a[-1:]], axis=0)
+    if a.shape[1] % 2:
+        a = np.concatenate([a, a[:, -1:]], axis=1)
+    s = a[0::2, 0::2].astype(np.uint16) + a[1::2, 0::2] + a[0::2, 1::2] + a[1::2, 1::2]
+    return ((s + 2) >> 2).astype(np.uint8)
+
+def build_pyramid(layout: SegyLayout, buf, out_dir: Path, tile: int = TILE_SIZE) -> dict:
+    """Quantize every trace into ``L0.npy`` (traces x samples, uint8), then halve
+    into ``L1.npy``, ``L2.npy``... until one tile covers the survey.
+
+    Works chunk by chunk over memory-mapped arrays, so memory stays flat for
+    surveys far larger than RAM.
+    """
+    t0 = time.perf_counter()
+    clip = clip_value(layout, buf)
+    shape = (layout.n_traces, layout.ns)
+    level = np.lib.format.open_memmap(out_dir / "L0.npy", mode="w+", dtype=np.uint8, shape=shape)
+    for first in range(0, layout.n_traces, _CHUNK_TRACES):
+        count = min(_CHUNK_TRACES, layout.n_traces - first)
+        level[first:first + count] = quantize(read_traces(layout, buf, first, count), clip)
+    level.flush()
+    levels = [list(shape)]
+    while max(level.shape) > tile:
+        n = len(levels)
+        nxt_shape = ((level.shape[0] + 1) // 2, (level.shape[1] + 1) // 2)
+        nxt = np.lib.format.open_memmap(out_dir / f"L{n}.npy", mode="w+", dtype=np.uint8, shape=nxt_shape)
+        for first in range(0, level.shape[0], _CHUNK_TRACES):  # even chunk -> aligned halves
+            nxt[first // 2:(first + _CHUNK_TRACES) // 2] = halve(np.asarray(level[first:first + _CHUNK_TRACES]))
+        nxt.flush()
+        del level
+        level = nxt
+        levels.append(list(nxt_shape))
+    del level
+    return {"version": _VERSION, "tile": tile, "clip": clip, "levels": levels,
+            "tiles": [[-(-t // tile), -(-s // tile)] for t, s in levels], **layout.info(),
+            "build_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+class TileStore:
+    """SEG-Y tile pyramids on disk (``<dir>/<key>/L<n>.npy`` + ``meta.json``), memory-mapped
+    for reads, plus a small in-memory LRU of encoded tiles.
+
+    Whole pyramids are evicted oldest-first (by ``meta.json`` mtime) once the
+    directory grows past ``max_mb``.
+    """
+
+    def __init__(self, root: str = TILE_DIR, max_mb: int = TILE_CACHE_MB, memory_mb: int = TILE_MEMORY_MB,
+                 tile: int = TILE_SIZE):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.tile_size = tile
+        self._levels: dict[tuple[str, int], np.ndarray] = {}
+        self._encoded: OrderedDict[tuple, bytes] = OrderedDict()
+        self._encoded_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"tiles": 0, "encoded_hits": 0, "builds": 0, "evictions": 0}
+
+    def meta(self, key: str) -> dict | None:
+        path = self.root / key / "meta.json"
+        try:
+            meta = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != _VERSION or meta.get("tile") != self.tile_size:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return meta
+
+    def build(self, key: str, layout: SegyLayout, buf) -> dict:
+        """Build a pyramid into a scratch directory and move it into place atomically"""
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key[:16]}-", dir=self.root))
+        try:
+            meta = build_pyramid(layout, buf, tmp, self.tile_size)
+            (tmp / "meta.json").write_text(json.dumps(meta))
+            dest = self.root / key
+            with self._lock:
+                self._forget(key)
+                if dest.exists():
+                    shutil.rmtree(dest, ignore_errors=True)
+                os.replace(tmp, dest)
+                self.stats["builds"] += 1
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._prune(keep=key)
+        return meta
+
+    def _level(self, key: str, n: int) -> np.ndarray:
+        with self._lock:
+            arr = self._levels.get((key, n))
+            if arr is None:
+                arr = np.load(self.root / key / f"L{n}.npy", mmap_mode="r")
+                self._levels[(key, n)] = arr
+            return arr
+
+    def tile(self, key: str, level: int, tx: int, ty: int) -> np.ndarray:
+        """Tile ``(tx, ty)`` of a level as an image: rows are samples, columns traces"""
+        arr = self._level(key, level)
+        t = self.tile_size
+        block = arr[tx * t:(tx + 1) * t, ty * t:(ty + 1) * t]
+        if block.size == 0:
+            raise IndexError(f"tile {tx},{ty} is outside level {level}")
+        return np.ascontiguousarray(block.T)
+
+    def encoded(self, key: str, level: int, tx: int, ty: int, fmt: str, cmap: str) -> bytes:
+        ek = (key, level, tx, ty, fmt, cmap)
+        with self._lock:
+            self.stats["tiles"] += 1
+            data = self._encoded.get(ek)
+            if data is not None:
+                self._encoded.move_to_end(ek)
+                self.stats["encoded_hits"] += 1
+                return data
+        img = self.tile(key, level, tx, ty)
+        data = encode_webp(img, PALETTES[cmap]) if fmt == "webp" else encode_png(img, PALETTES[cmap])
+        with self._lock:
+            self._encoded[ek] = data
+            self._encoded_bytes += len(data)
+            while self._encoded_bytes > self.memory_bytes and len(self._encoded) > 1:
+                _, old = self._encoded.popitem(last=False)
+                self._encoded_bytes -= len(old)
+        return data
+
+    def _forget(self, key: str):
+        for k in [k for k in self._levels if k[0] == key]:
+            del self._levels[k]
+        for k in [k for k in self._encoded if k[0] == key]:
+            self._encoded_bytes -= len(self._encoded.pop(k))
+
+    def _pyramids(self) -> list[tuple[float, str, int]]:
+        out = []
+        for d in self.root.iterdir():
+            meta = d / "meta.json"
+            if d.name.startswith(".") or not meta.exists():
+                continue
+            size = sum(f.stat().st_size for f in d.iterdir())
+            out.append((meta.stat().st_mtime, d.name, size))
+        return sorted(out)
+
+    def _prune(self, keep: str):
+        pyramids = self._pyramids()
+        total = sum(size for _, _, size in pyramids)
+        for _, key, size in pyramids:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            with self._lock:
+                self._forget(key)
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def info(self) -> dict:
+        pyramids = self._pyramids()
+        with self._lock:
+            return {"dir": str(self.root), "pyramids": len(pyramids),
+                    "size_mb": round(sum(s for _, _, s in pyramids) / 2**20, 2),
+                    "max_mb": round(self.max_bytes / 2**20, 2),
+                    "encoded_mb": round(self._encoded_bytes / 2**20, 2),
+                    "webp": PIL_AVAILABLE, **self.stats}
@@ -0,0 +1,172 @@
+import json, os, re, shutil, tempfile, threading, time
+from pathlib import Path
+
+import numpy as np
+
+from .decimate import decimate
+from .las import LasData
+
+WELL_DIR = os.getenv("PARSERS_WELL_DIR", os.path.join(tempfile.gettempdir(), "know-ai", "wells"))
+_VERSION = 1
+
+def well_key(name: str) -> str:
+    """Directory-safe, case-insensitive well id ("ACEH-01 ST1" -> "aceh-01_st1")"""
+    key = re.sub(r"[^a-z0-9._-]+", "_", name.strip().lower()).strip("._")
+    if not key:
+        raise ValueError("empty well name")
+    return key[:120]
+
+def _curve_file(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name) + ".npy"
+
+class WellStore:
+    """Columnar per-well log store: ``<dir>/<well>/depth.npy`` plus one ``.npy``
+    per curve, read back memory-mapped.
+
+    Depth stays float64; curves are float32 (half the bytes, plenty for log
+    values). A read touches only the requested curves and the depth rows in
+    range, so loading a window of a few curves across dozens of wells costs
+    a few page faults per well instead of a parse or a table scan.
+    """
+
+    def __init__(self, root: str = WELL_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._arrays: dict[tuple[str, str], np.ndarray] = {}
+        self._metas: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._well_locks: dict[str, threading.Lock] = {}
+
+    def _well_lock(self, key: str) -> threading.Lock:
+        """Serialises writers of one well across the read, merge and swap in ``put``"""
+        with self._lock:
+            return self._well_locks.setdefault(key, threading.Lock())
+
+    def put(self, las: LasData, well: str | None = None, source: dict | None = None) -> dict:
+        """Store (or replace) a well's logs.
+
+        Curves of a new file that shares the stored depth axis are merged into
+        the well (another logging run over the same interval); a different
+        depth axis replaces the well's data.
+        """
+        name = well or las.well.get("WELL") or las.well.get("UWI")
+        if not name:
+            raise ValueError("LAS has no WELL/UWI header; pass the well name explicitly")
+        key = well_key(name)
+        depth = np.asarray(las.depth, dtype=np.float64)
+        order = slice(None, None, -1) if len(depth) > 1 and depth[0] > depth[-1] else slice(None)
+        depth = depth[order]  # stored increasing so reads can binary-search
+        curves = {k: v[order] for k, v in las.curves.items()
+                  if v is not las.depth and k.upper() not in ("DEPT", "DEPTH", "MD")}
+        units = {k: las.units.get(k, "") for k in curves}
+        sources = [source or {}]
+
+        with self._well_lock(key):
+            old = self.meta(key)
+            if old is not None:
+                old_depth = self._array(key, "depth")
+                if len(old_depth) == len(depth) and np.array_equal(old_depth, depth):
+                    for k in old["curves"]:
+                        if k not in curves:
+                            curves[k] = self._array(key, k)
+                            units[k] = old["units"].get(k, "")
+                    sources = old.get("sources", []) + sources
+
+            tmp = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=self.root))
+            try:
+                np.save(tmp / "depth.npy", depth)
+                stats = {}
+                for k, v in curves.items():
+                    v = np.asarray(v, dtype=np.float32)
+                    np.save(tmp / _curve_file(k), v)
+                    finite = v[np.isfinite(v)]
+                    stats[k] = {"min": float(finite.min()), "max": float(finite.max()), "valid": int(finite.size)} if finite.size else \
+                               {"min": None, "max": None, "valid": 0}
+                meta = {"version": _VERSION, "key": key, "well": name, "header": las.well,
+                        "curves": list(curves), "units": units, "stats": stats, "rows": int(len(depth)),
+                        "depth_min": float(depth[0]) if len(depth) else None,
+                        "depth_max": float(depth[-1]) if len(depth) else None,
+                        "depth_unit": las.units.get(next(iter(las.curves), ""), ""),
+                        "sources": sources, "updated": time.time()}
+                (tmp / "meta.json").write_text(json.dumps(meta))
+                dest = self.root / key
+                with self._lock:
+                    for k in [k for k in self._arrays if k[0] == key]:
+                        del self._arrays[k]
+                    self._metas.pop(key, None)
+                    if dest.exists():
+                        shutil.rmtree(dest, ignore_errors=True)
+                    os.replace(tmp, dest)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        return meta
+
+    def meta(self, key: str) -> dict | None:
+        with self._lock:
+            if key in self._metas:
+                return self._metas[key]
+        try:
+            meta = json.loads((self.root / key / "meta.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != _VERSION:
+            return None
+        with self._lock:
+            self._metas[key] = meta
+        return meta
+
+    def wells(self) -> list[dict]:
+        out = []
+        for d in sorted(self.root.iterdir()):
+            if d.is_dir() and not d.name.startswith("."):
+                meta = self.meta(d.name)
+                if meta:
+                    out.append({k: meta[k] for k in ("key", "well", "curves", "units", "rows", "depth_min", "depth_max")})
+        return out
+
+    def _array(self, key: str, curve: str) -> np.ndarray:
+        with self._lock:
+            arr = self._arrays.get((key, curve))
+            if arr is None:
+                name = "depth.npy" if curve == "depth" else _curve_file(curve)
+                arr = np.load(self.root / key / name, mmap_mode="r")
+                self._arrays[(key, curve)] = arr
+            return arr
+
+    def read(self, well: str, curves: list[str] | None = None, start: float | None = None, end: float | None = None,
+             points: int | None = None, method: str = "minmax") -> dict:
+        """Depth window of some curves for one well, optionally decimated to about
+        ``points`` rows per curve on one shared depth axis"""
+        key = well_key(well)
+        meta = self.meta(key)
+        if meta is None:
+            raise KeyError(well)
+        curves = curves or meta["curves"]
+        missing = [c for c in curves if c not in meta["curves"]]
+        if missing:
+            raise KeyError(f"{well}: unknown curves {missing}")
+        depth = self._array(key, "depth")
+        lo = 0 if start is None else int(np.searchsorted(depth, start, "left"))
+        hi = len(depth) if end is None else int(np.searchsorted(depth, end, "right"))
+        d = np.asarray(depth[lo:hi])
+        values = {c: np.asarray(self._array(key, c)[lo:hi]) for c in curves}
+        if points and len(d) > points:
+            # the union of every curve's picks keeps each curve's shape on one depth axis
+            keep = np.unique(np.concatenate([decimate(d, v, points, method) for v in values.values()]))
+            d = d[keep]
+            values = {c: v[keep] for c, v in values.items()}
+        return {"well": meta["well"], "key": key, "depth": d, "curves": values,
+                "units": {c: meta["units"].get(c, "") for c in curves}, "source_rows": hi - lo}
+
+    def delete(self, well: str) -> bool:
+        key = well_key(well)
+        with self._well_lock(key):
+            with self._lock:
+                for k in [k for k in self._arrays if k[0] == key]:
+                    del self._arrays[k]
+                self._metas.pop(key, None)
+            path = self.root / key
+            if not path.exists():
+                return False
+            shutil.rmtree(path, ignore_errors=True)
+            return True
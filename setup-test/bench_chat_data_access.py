@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: chat tool reads through the Node API (HTTP) vs in-process pooled SQL
+
+Usage (from the repo root): PYTHONPATH=. POSTGRES_URL=... python setup-test/bench_chat_data_access.py
+    [--api http://127.0.0.1:4000] [--n 50] [--concurrency 8]
+Needs Postgres with the 006 rollups; the HTTP side is skipped when the API is not reachable.
+Each case runs the same query both ways (one httpx client per call, as the chat tools do) and
+checks the answers match before timing.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from services.chat.data_access import DirectData
+
+CASES = [
+    ("aceh month, all blocks, 2007-2025", "/api/metrics/aceh/production", "aceh_production",
+     {"start": "2007-01-01", "end": "2025-12-31", "groupby": "month"}),
+    ("aceh week, one block, ragged range", "/api/metrics/aceh/production", "aceh_production",
+     {"start": "2009-03-17", "end": "2014-11-05", "groupby": "week", "block": None}),
+    ("aceh day, one year", "/api/metrics/aceh/production", "aceh_production",
+     {"start": "2012-01-01", "end": "2013-01-01", "groupby": "day"}),
+    ("production month", "/api/metrics/production", "production",
+     {"start": "2024-01-01", "end": "2025-12-31", "groupby": "month"}),
+]
+
+
+async def via_http(api, path, params):
+    async with httpx.AsyncClient(timeout=60) as cli:
+        r = await cli.get(f"{api}{path}", params={k: v for k, v in params.items() if v is not None})
+        r.raise_for_status()
+        return r.json()
+
+
+async def timed(fn, n, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    lat = []
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            await fn()
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    wall = time.perf_counter() - t0
+    lat.sort()
+    return statistics.median(lat), lat[int(len(lat) * 0.95) - 1], n / wall
+
+
+def same(a, b):
+    if a["dates"] != b["dates"]:
+        return False
+    return all(abs((x or 0) - (y or 0)) <= 1e-6 * max(1.0, abs(x or 0))
+               for f in ("oil", "gas") for x, y in zip(a[f], b[f]))
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--api", default=os.getenv("API_BASE", "http://127.0.0.1:4000"))
+    ap.add_argument("--n", type=int, default=50)
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+
+    direct = DirectData(os.environ["POSTGRES_URL"], max_size=args.concurrency)
+    await direct.pool.open(wait=True)
+    try:
+        await via_http(args.api, "/api/metrics/production", {"start": "2024-01-01", "end": "2024-01-02"})
+        http_up = True
+    except httpx.HTTPError as e:
+        print(f"   API at {args.api} not reachable ({e.__class__.__name__}) - timing the SQL path only")
+        http_up = False
+
+    # a real block for the filtered case
+    async with direct.pool.connection() as conn:
+        row = await (await conn.execute("select block from well_rollup where grain = 'month' limit 1")).fetchone()
+    print(f"=== chat tool reads, {args.n} calls per case, concurrency {args.concurrency} ===")
+    print(f"   {'case':36s} {'path':5s} {'p50 ms':>8s} {'p95 ms':>8s} {'calls/s':>8s}")
+    for name, path, query, params in CASES:
+        if "block" in params:
+            params = {**params, "block": row[0] if row else None}
+        fn = getattr(direct, query)
+        await fn(params)  # prepare on a connection
+        if http_up:
+            api_data = await via_http(args.api, path, params)
+            if not same(api_data, await fn(params)):
+                print(f"   {name}: results differ between the API and SQL paths")
+            p50, p95, rate = await timed(lambda: via_http(args.api, path, params), args.n, args.concurrency)
+            print(f"   {name:36s} {'http':5s} {p50:8.2f} {p95:8.2f} {rate:8.1f}")
+        p50, p95, rate = await timed(lambda: fn(params), args.n, args.concurrency)
+        print(f"   {name:36s} {'sql':5s} {p50:8.2f} {p95:8.2f} {rate:8.1f}")
+    await direct.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for OCR page preprocessing (legacy PIL chain vs services.ingest.ocr_prep)
+
+Usage (from the repo root): PYTHONPATH=. python setup-test/bench_ocr_prep.py [file.pdf] [--pages N] [--method otsu|sauvola|fixed]
+Without a PDF it uses a synthetic A4 page rendered at the OCR target size.
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+from services.ingest.ocr_prep import TARGET_PX, preprocess_gray, render_page_gray, target_zoom
+
+
+def legacy(img):
+    # services/ingest/main.py before the single-pass rewrite (page rendered at zoom=2.0)
+    g = ImageOps.grayscale(img)
+    g = ImageOps.autocontrast(g)
+    max_side = max(g.size)
+    if max_side < 1800:
+        scale = 1800 / max_side
+        g = g.resize((int(g.width * scale), int(g.height * scale)), Image.Resampling.LANCZOS)
+    g = g.filter(ImageFilter.UnsharpMask(radius=1, percent=120, threshold=8))
+    arr = np.array(g)
+    bw = (arr > 180) * 255
+    return Image.fromarray(bw.astype(np.uint8), mode="L")
+
+
+def synthetic_page(zoom):
+    w, h = int(595 * zoom), int(842 * zoom)
+    rng = np.random.default_rng(0)
+    arr = np.full((h, w, 3), 235, dtype=np.uint8)
+    for y in range(int(60 * zoom), h - int(60 * zoom), int(14 * zoom)):
+        arr[y:y + int(6 * zoom), int(50 * zoom):w - int(50 * zoom)] = 40
+    arr += rng.integers(0, 15, size=arr.shape, dtype=np.uint8)
+    return Image.fromarray(arr, "RGB")
+
+
+def pdf_pages(path, n):
+    import fitz
+    doc = fitz.open(path)
+    for i in range(min(n, len(doc))):
+        page = doc.load_page(i)
+        yield page
+
+
+def time_ms(fn, *args, **kw):
+    t0 = time.perf_counter()
+    fn(*args, **kw)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdf", nargs="?")
+    ap.add_argument("--pages", type=int, default=10)
+    ap.add_argument("--method", default="otsu")
+    args = ap.parse_args()
+
+    old_ms, new_ms = [], []
+    old_peak = new_peak = 0
+    if args.pdf:
+        import fitz
+        for page in pdf_pages(args.pdf, args.pages):
+            # tracemalloc sees the Python/NumPy side (pixmap samples copies, arrays), not MuPDF/PIL internals
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0), alpha=False)
+            legacy(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+            old_ms.append((time.perf_counter() - t0) * 1000)
+            old_peak = max(old_peak, tracemalloc.get_traced_memory()[1] + pix.width * pix.height * 3)
+            tracemalloc.stop()
+            del pix
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            gray, pix = render_page_gray(page)  # zero-copy view, preprocessed in place
+            preprocess_gray(gray, method=args.method)
+            new_ms.append((time.perf_counter() - t0) * 1000)
+            new_peak = max(new_peak, tracemalloc.get_traced_memory()[1] + pix.width * pix.height)
+            tracemalloc.stop()
+            del gray, pix
+    else:
+        old_page = synthetic_page(2.0)
+        new_page = synthetic_page(target_zoom(595, 842)).convert("L")
+        for _ in range(args.pages):
+            old_ms.append(time_ms(legacy, old_page))
+            new_ms.append(time_ms(preprocess_gray, np.array(new_page), method=args.method))
+
+    print(f"=== OCR preprocessing, {len(old_ms)} page(s), target {TARGET_PX}px, {args.method} ===")
+    print(f"   legacy PIL chain : {statistics.median(old_ms):8.1f} ms/page (median)")
+    print(f"   single pass      : {statistics.median(new_ms):8.1f} ms/page (median)")
+    print(f"   speedup          : {statistics.median(old_ms) / max(statistics.median(new_ms), 1e-6):8.1f}x")
+    if old_peak:
+        print(f"   peak page memory : {old_peak / 2**20:8.1f} MB legacy vs {new_peak / 2**20:.1f} MB (pixmap + traced arrays)")
+
+
+if __name__ == "__main__":
+    main()
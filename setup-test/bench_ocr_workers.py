@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: pytesseract (one tesseract process per page) vs persistent tesserocr workers
+
+Usage (from the repo root): PYTHONPATH=. python setup-test/bench_ocr_workers.py [file.pdf] [--pages N] [--workers W]
+Without a PDF it OCRs synthetic text pages at the ingest target resolution.
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw
+
+from services.ingest.ocr_prep import TARGET_PX, target_zoom
+from services.ingest.ocr_workers import TESSEROCR_AVAILABLE, OcrWorkerPool
+
+LINE = "The quick brown fox jumps over the lazy dog. Well A-12 produced 1,234 bbl/d in 2023."
+
+
+def synthetic_pages(n):
+    w, h = int(TARGET_PX * 595 / 842), TARGET_PX
+    pages = []
+    for i in range(n):
+        img = Image.new("L", (w, h), 255)
+        draw = ImageDraw.Draw(img)
+        for row, y in enumerate(range(80, h - 80, 36)):
+            draw.text((60, y), f"{i}:{row} {LINE}", fill=0)
+        pages.append(img)
+    return pages
+
+
+def pdf_pages(path, n):
+    import fitz
+    doc = fitz.open(path)
+    pages = []
+    for i in range(min(n, len(doc))):
+        page = doc.load_page(i)
+        z = target_zoom(page.rect.width, page.rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(z, z), colorspace=fitz.csGRAY, alpha=False)
+        pages.append(Image.frombytes("L", (pix.width, pix.height), pix.samples))
+    return pages
+
+
+def run_pytesseract(pages, workers):
+    import pytesseract
+    with ThreadPoolExecutor(workers) as ex:
+        list(ex.map(lambda p: pytesseract.image_to_string(p, lang="eng", config="--oem 3 --psm 6"), pages))
+
+
+async def run_pool(pool, pages, workers):
+    sem = asyncio.Semaphore(workers)
+
+    async def one(p):
+        async with sem:
+            return await pool.ocr(p)
+
+    await asyncio.gather(*(one(p) for p in pages))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdf", nargs="?")
+    ap.add_argument("--pages", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    pages = pdf_pages(args.pdf, args.pages) if args.pdf else synthetic_pages(args.pages)
+    print(f"=== OCR throughput, {len(pages)} page(s), {args.workers} worker(s) ===")
+
+    t0 = time.perf_counter()
+    run_pytesseract(pages, args.workers)
+    dt = time.perf_counter() - t0
+    print(f"   pytesseract (process per page) : {len(pages) / dt:6.2f} pages/s")
+
+    if not TESSEROCR_AVAILABLE:
+        print("   tesserocr not installed - pip install tesserocr to compare")
+        return
+    pool = OcrWorkerPool(workers=args.workers, backend="tesserocr")
+    t0 = time.perf_counter()
+    pool.start()
+    print(f"   worker start + model load      : {time.perf_counter() - t0:6.2f} s (once per service)")
+    t0 = time.perf_counter()
+    asyncio.run(run_pool(pool, pages, args.workers))
+    dt = time.perf_counter() - t0
+    print(f"   tesserocr persistent workers   : {len(pages) / dt:6.2f} pages/s")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()